@@ -16,6 +16,10 @@ from PySide.QtCore import Qt
 from core.data.DataReader import DataReader
 from core.data.DataTransformer import DataTransformer
 from core.data.DataResizer import DataResizer
+from core.data.SliceCompositor import CompareModeAdd
+from core.data.SliceCompositor import CompareModeCheckerboard
+from core.data.SliceCompositor import CompareModeDifference
+from core.data.SliceCompositor import CompareModeBlend
 from ui.widgets.SliceViewerWidget import SliceViewerWidget
 from ui.widgets.SliceCompareViewerWidget import SliceCompareViewerWidget
 from vtk import vtkTransform
@@ -36,7 +40,7 @@ class CompareWidget(QWidget):
 		# Labels for underneath the compare widget
 		fixedLabel = self.createLabel("Fixed", "#f80")
 		fixedLabel.setAlignment(Qt.AlignRight)
-		centerLabel = self.createLabel("+", "#fff")
+		self.centerLabel = self.createLabel("+", "#fff")
 		movingLabel = self.createLabel("Moving", "#4bf")
 		movingLabel.setAlignment(Qt.AlignLeft)
 
@@ -44,7 +48,7 @@ class CompareWidget(QWidget):
 		horLayout.setContentsMargins(0, 0, 0, 0)
 		horLayout.addStretch(1)
 		horLayout.addWidget(fixedLabel)
-		horLayout.addWidget(centerLabel)
+		horLayout.addWidget(self.centerLabel)
 		horLayout.addWidget(movingLabel)
 		horLayout.addStretch(1)
 
@@ -57,11 +61,19 @@ class CompareWidget(QWidget):
 		for i in range(len(widgets)):
 			widget = widgets[i]
 			layout.addWidget(widget, 0, i)
+			if hasattr(widget, "compareModeChanged"):
+				widget.compareModeChanged.connect(self.compareModeChanged)
 		layout.addWidget(fixedDataTitleWidget, 1, 0)
 		layout.addWidget(combinedTextWidget, 1, 1)
 		layout.addWidget(movingDataTitleWidget, 1, 2)
 		self.setLayout(layout)
 
+	@Slot(object)
+	def compareModeChanged(self, mode):
+		symbols = {CompareModeAdd: "+", CompareModeCheckerboard: "#",
+			CompareModeDifference: "-", CompareModeBlend: "/"}
+		self.centerLabel.setText(symbols[mode])
+
 	def createLabel(self, text, color):
 		label = QLabel(text)
 		font = label.font()
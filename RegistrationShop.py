@@ -18,6 +18,11 @@ relPaths = [resizerPath]
 for path in relPaths:
 	sys.path.append(os.path.join(rootDir, path))
 
+# Measure the startup time with: python RegistrationShop.py --profile-startup
+from core.StartupProfiler import StartupProfiler
+if "--profile-startup" in sys.argv:
+	StartupProfiler.Instance().start()
+
 # PySide stuff
 from PySide.QtGui import QMainWindow
 from PySide.QtGui import QApplication
@@ -31,6 +36,7 @@ from PySide.QtGui import QSizePolicy
 from PySide.QtGui import QSplitter
 from PySide.QtCore import Qt
 from PySide.QtCore import Slot
+from PySide.QtCore import QTimer
 
 # Import core stuff
 from core import AppVars
@@ -39,14 +45,20 @@ from core.project import ProjectController
 from core.data import DataReader
 from core.data import DataTransformer
 from core.data import DataWriter
+from core.data import DataQuantizer
+from core.data import DisplayVolumeRegistry
+from core.data.DataQuantizer import DisplayTypeNative
 from core.elastix import ParameterList
+from core.registration import ImageRegistration
+from core.MapperBackend import MapperBackend
 # Import ui elements
 from ui import MainWindow
 from ui import WindowDialog
 from ui import RenderController
 from ui import MultiRenderController
+from ui import RenderScheduler
+from ui.RenderWindowInteractor import RenderWindowInteractor
 from ui.dialogs import FileTypeDialog
-from ui.dialogs import ElastixMainDialog
 from ui.dialogs import ResetVisualizationDialog
 from ui.widgets import RenderWidget
 from ui.widgets import MultiRenderWidget
@@ -56,13 +68,10 @@ from ui.widgets import MultiRenderPropWidget
 from ui.widgets import LandmarkWidget
 from ui.widgets import StatusWidget
 from ui.widgets.ToolbarWidget import ToolbarWidget
-from ui.transformations import UserTransformationTool
-from ui.transformations import LandmarkTransformationTool
-from ui.transformations import DeformableTransformationTool
 from ui.transformations import Transformation
-from InspectionTool import CompareWidget
-from InspectionTool import ComparisonController
 from vtk import vtkTransform
+# The transformation tools, the elastix dialog and the comparison tool
+# are imported on first use to speed up the startup
 
 
 # Define settings parameters
@@ -88,12 +97,35 @@ class RegistrationShop(MainWindow, WindowDialog):
 		# Instantiate the project controller
 		ProjectController.Instance()
 
+		# Limit the number of frames per second for all render widgets
+		maximumFrameRate = float(RegistrationShop.settings.value("render/maximumFrameRate", 60))
+		RenderScheduler.Instance().setMaximumFrameRate(maximumFrameRate)
+
+		# Coalesce mouse moves in all render widgets
+		mouseMoveInterval = int(RegistrationShop.settings.value("interaction/minimumMouseMoveInterval", 0))
+		RenderWindowInteractor.MinimumMouseMoveInterval = mouseMoveInterval
+
+		# Scalar type of the volumes that are displayed
+		displayType = RegistrationShop.settings.value("render/displayScalarType", DisplayTypeNative)
+		DataQuantizer.DisplayType = displayType
+
+		# Memory for display volumes that are cached for later use (in MB)
+		cacheBudget = int(RegistrationShop.settings.value("data/displayCacheBudget", 1024))
+		DisplayVolumeRegistry.Instance().memoryBudget = cacheBudget * 1024 * 1024
+
+		# Register linear transforms in-process instead of with elastix
+		inProcess = str(RegistrationShop.settings.value("registration/inProcess", True)).lower() == "true"
+		ImageRegistration.Enabled = inProcess
+
+		# Select the volume mappers before any render widget is created
+		backend = RegistrationShop.settings.value("render/backend", "auto")
+		MapperBackend.Instance().setPreference(backend)
+
 		# Initialize the user interface
 		self.initUI()
-
-		lastProject = RegistrationShop.settings.value("project/lastProject", None)
-		if lastProject:
-			self.openProject(lastProject)
+		StartupProfiler.Instance().mark("User interface created")
+		# The last project is restored by restoreLastProject() after the
+		# window is shown
 
 	def initialize(self):
 		# Initialize the render window interactors only after calling show()
@@ -102,6 +134,26 @@ class RegistrationShop(MainWindow, WindowDialog):
 		self.movingDataWidget.rwi.Initialize()
 		self.multiDataWidget.rwi.Initialize()
 
+	@Slot()
+	def restoreLastProject(self):
+		"""
+		Opens the project that was open when the application was closed.
+		Called from the event loop after the main window is painted, so the
+		window appears before the data of the project is loaded.
+		"""
+		lastProject = RegistrationShop.settings.value("project/lastProject", None)
+		if lastProject:
+			statusWidget = StatusWidget.Instance()
+			statusWidget.setText("Opening the last project...")
+			self.openProject(lastProject)
+			statusWidget.setText("")
+
+		profiler = StartupProfiler.Instance()
+		profiler.mark("Last project restored")
+		if profiler.enabled:
+			profiler.stop()
+			print profiler.report()
+
 	# UI setup methods
 
 	def initUI(self):
@@ -136,6 +188,16 @@ class RegistrationShop(MainWindow, WindowDialog):
 		self.movingDataWidget = RenderWidget()
 		self.multiDataWidget = MultiRenderWidget()
 
+		# Render coarser data during interaction
+		voxelBudget = int(RegistrationShop.settings.value("render/interactiveVoxelBudget", 4000000))
+		idleTimeout = int(RegistrationShop.settings.value("render/interactiveIdleTimeout", 300))
+		# Only give the region of the clipping box to the mappers
+		subVolumeMode = str(RegistrationShop.settings.value("render/clippingSubVolume", False)).lower() == "true"
+		for widget in [self.fixedDataWidget, self.movingDataWidget, self.multiDataWidget]:
+			widget.levelOfDetail.voxelBudget = voxelBudget
+			widget.levelOfDetail.idleTimeout = idleTimeout
+			widget.clippingBox.setSubVolumeMode(subVolumeMode)
+
 		self.fixedRenderController = RenderController(self.fixedDataWidget, "fixed")
 		self.movingRenderController = RenderController(self.movingDataWidget, "moving")
 		self.multiRenderController = MultiRenderController(self.multiDataWidget)
@@ -244,6 +306,12 @@ class RegistrationShop(MainWindow, WindowDialog):
 
 		self.multiDataWidget.transformations.transformationChanged.connect(self.movingDataWidget.transformationsUpdated)
 
+		# Changes are written to the journal of the project
+		self.multiDataWidget.transformations.transformationChanged.connect(projectController.transformationsChanged)
+		self.fixedRenderController.visualizationUpdated.connect(projectController.fixedSettingsUpdated)
+		self.movingRenderController.visualizationUpdated.connect(projectController.movingSettingsUpdated)
+		self.multiRenderController.visualizationUpdated.connect(projectController.multiSettingsUpdated)
+
 	def createActions(self):
 		"""
 		Create actions that can be attached to buttons and menus.
@@ -380,6 +448,7 @@ class RegistrationShop(MainWindow, WindowDialog):
 		if self.transformTool is not None:
 			self.transformTool.cleanUp()
 
+		from ui.transformations.UserTransformationTool import UserTransformationTool
 		self.transformTool = UserTransformationTool()
 		self.transformTool.setRenderWidgets(moving=self.movingDataWidget, multi=self.multiDataWidget)
 		self.multiPropWidget.setTransformTool(self.transformTool)
@@ -396,6 +465,7 @@ class RegistrationShop(MainWindow, WindowDialog):
 		if self.transformTool is not None:
 			self.transformTool.cleanUp()
 
+		from ui.transformations.LandmarkTransformationTool import LandmarkTransformationTool
 		self.transformTool = LandmarkTransformationTool()
 		self.transformTool.setRenderWidgets(fixed=self.fixedDataWidget,
 			moving=self.movingDataWidget,
@@ -432,6 +502,8 @@ class RegistrationShop(MainWindow, WindowDialog):
 		statusWidget.setText("Choose a template for a deformable transform. After choosing "
 			"a template you will be able to review and adjust the parameters.")
 
+		from ui.dialogs.ElastixMainDialog import ElastixMainDialog
+		from ui.transformations.DeformableTransformationTool import DeformableTransformationTool
 		dialog = ElastixMainDialog(self)
 		dialog.setModal(True)
 		result = dialog.exec_()
@@ -571,10 +643,12 @@ class RegistrationShop(MainWindow, WindowDialog):
 			fileName = QFileDialog.getExistingDirectory(self, "Open project", "", QFileDialog.ShowDirsOnly)
 
 		if len(fileName) > 0:
-			fullName = fileName + ProjectController.Instance().ProjectFile
-			if os.path.isfile(fullName):
+			projectController = ProjectController.Instance()
+			fullName = fileName + projectController.ProjectFile
+			legacyName = fileName + projectController.LegacyProjectFile
+			if os.path.isfile(fullName) or os.path.isfile(legacyName):
 				self.multiDataWidget.transformations.clear()
-				loaded = ProjectController.Instance().loadProject(fileName)
+				loaded = projectController.loadProject(fileName)
 				if loaded:
 					RegistrationShop.settings.setValue("project/lastProject", fileName)
 				else:
@@ -630,7 +704,13 @@ class RegistrationShop(MainWindow, WindowDialog):
 				" and make sure to load two datasets.")
 			return
 
+		from InspectionTool import CompareWidget
+		from InspectionTool import ComparisonController
+
 		if hasattr(self, "compareWidget"):
+			# The widgets of the previous comparison are destroyed
+			for widget in self.controller.widgets:
+				RenderScheduler.Instance().cancel(widget)
 			del self.compareWidget
 
 		transform = self.multiDataWidget.transformations.completeTransform()
@@ -665,6 +745,10 @@ def main():
 	mainWindow.raise_()
 	mainWindow.show()
 	mainWindow.initialize()
+	# Paint the window before the last project is restored
+	app.processEvents()
+	StartupProfiler.Instance().mark("First paint")
+	QTimer.singleShot(0, mainWindow.restoreLastProject)
 	sys.exit(app.exec_())
 
 if __name__ == '__main__':
@@ -0,0 +1,241 @@
+#!/usr/local/bin/python
+"""
+RegistrationShopBatch
+
+Applies the transformations of RegistrationShop projects to their moving
+data without starting the user interface. Deformable registrations that
+were prepared but not finished are run with elastix first. Projects are
+processed in parallel and a report with the timings is written as JSON.
+
+	python RegistrationShopBatch.py project1 project2 ... --report report.json
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+import multiprocessing
+from vtk import vtkTransform
+from core.project.ProjectFolder import ReadProject
+from core.data import DataReader
+from core.data import DataTransformer
+from core.data import DataWriter
+from core.elastix import ElastixCommand
+from core.vtkDrawing import TransformWithMatrix
+
+# Type of the transformations that are made by elastix (Transformation.TypeDeformable)
+TypeDeformable = "Automatic transform"
+
+# Files that the deformable transformation tool writes to the output folder
+ParameterFile = "Parameters.txt"
+InitialTransformationFile = "InitialTransformation.txt"
+
+
+def ProcessProject(folder, outputFileName=None, fileType=DataReader.TypeMHD):
+	"""
+	Runs the unfinished elastix registrations of the project in the folder
+	and writes the moving data, transformed by all the transformations of
+	the project, to outputFileName. Returns a report with the timings (in
+	seconds) of the steps. Errors are part of the report instead of being
+	raised, so that one project can not stop a batch.
+
+	:type folder: unicode
+	:rtype: dict
+	"""
+	folder = os.path.abspath(folder)
+	if outputFileName is None:
+		outputFileName = os.path.join(folder, "registered." + fileType)
+	report = {"project": folder, "output": outputFileName, "success": False,
+		"error": None, "timings": dict()}
+	timings = report["timings"]
+	start = time.time()
+
+	try:
+		stepStart = time.time()
+		project = ReadProject(folder)
+		transformations = ProjectTransformations(project)
+		timings["load"] = time.time() - stepStart
+
+		stepStart = time.time()
+		report["registrations"] = RunPendingRegistrations(project, transformations)
+		timings["elastix"] = time.time() - stepStart
+
+		movingData = project.movingData
+		if transformations and transformations[-1]["Filename"]:
+			movingData = transformations[-1]["Filename"]
+
+		stepStart = time.time()
+		imageData = DataReader().GetImageData(movingData)
+		timings["read"] = time.time() - stepStart
+
+		stepStart = time.time()
+		transform = CompleteTransform(transformations)
+		outputData = DataTransformer().TransformImageData(imageData, transform)
+		timings["transform"] = time.time() - stepStart
+
+		stepStart = time.time()
+		DataWriter().WriteToFile(outputData, outputFileName, fileType)
+		timings["write"] = time.time() - stepStart
+		report["success"] = True
+	except Exception, e:
+		report["error"] = str(e)
+		report["traceback"] = traceback.format_exc()
+
+	timings["total"] = time.time() - start
+	return report
+
+
+def ProjectTransformations(project):
+	"""
+	Returns the transformations of the project as dictionaries, like
+	TransformationList.getPythonVersion() writes them.
+
+	:rtype: list of dict
+	"""
+	if not project.multiSettings:
+		return []
+	transformations = project.multiSettings.get("transformations") or []
+	# Very old projects store the transformations as lists
+	return [item for item in transformations if isinstance(item, dict)]
+
+
+def CompleteTransform(transformations):
+	"""
+	Returns the transform of the last data set of the transformations,
+	like TransformationList.completeTransform() does when the last
+	transformation is active: the concatenation of the transforms that
+	belong to the same data set as the last transformation.
+
+	:rtype: vtkTransform
+	"""
+	tempTransform = vtkTransform()
+	tempTransform.PreMultiply()
+	if transformations:
+		fileName = transformations[-1]["Filename"]
+		for transformation in reversed(transformations):
+			if transformation["Filename"] != fileName:
+				break
+			tempTransform.Concatenate(transformation["Transformation"].originalObject())
+		tempTransform.Update()
+	return TransformWithMatrix(tempTransform.GetMatrix())
+
+
+def RunPendingRegistrations(project, transformations):
+	"""
+	Runs elastix for the deformable transformations of which the result
+	does not exist yet, but for which the parameter file was written.
+	Returns the number of registrations that were run.
+
+	:rtype: int
+	"""
+	registrations = 0
+	for index, transformation in enumerate(transformations):
+		outputData = transformation["Filename"]
+		if transformation["TransformationType"] != TypeDeformable or not outputData:
+			continue
+		if os.path.exists(outputData):
+			continue
+
+		outputFolder = os.path.dirname(outputData)
+		parameterFile = os.path.join(outputFolder, ParameterFile)
+		if not os.path.exists(parameterFile):
+			raise IOError("No result and no parameter file for registration: " + outputData)
+		initialTransformation = os.path.join(outputFolder, InitialTransformationFile)
+		if not os.path.exists(initialTransformation):
+			initialTransformation = None
+		# The moving data of a registration is the result of the previous step
+		movingData = transformations[index - 1]["Filename"] if index > 0 else project.movingData
+
+		command = ElastixCommand(fixedData=project.fixedData,
+			movingData=movingData,
+			outputFolder=outputFolder,
+			transformation=parameterFile,
+			initialTransformation=initialTransformation)
+		if not command.isValid():
+			raise IOError("Invalid input for registration: " + outputData)
+		command.execute()
+		if not os.path.exists(outputData):
+			raise IOError("Elastix did not produce a result, see the log in: " + outputFolder)
+		registrations += 1
+	return registrations
+
+
+def ProcessProjects(folders, outputFolder=None, fileType=DataReader.TypeMHD, numberOfProcesses=None):
+	"""
+	Processes the projects with a pool of processes and returns the report
+	of the batch.
+
+	:rtype: dict
+	"""
+	if numberOfProcesses is None:
+		numberOfProcesses = multiprocessing.cpu_count()
+	numberOfProcesses = max(1, min(numberOfProcesses, len(folders)))
+
+	jobs = []
+	for folder in folders:
+		outputFileName = None
+		if outputFolder:
+			name = os.path.basename(os.path.normpath(folder))
+			outputFileName = os.path.join(outputFolder, name + "." + fileType)
+		jobs.append((folder, outputFileName, fileType))
+
+	start = time.time()
+	if numberOfProcesses == 1:
+		projects = [_ProcessJob(job) for job in jobs]
+	else:
+		pool = multiprocessing.Pool(numberOfProcesses)
+		try:
+			projects = pool.map(_ProcessJob, jobs, chunksize=1)
+		finally:
+			pool.close()
+			pool.join()
+
+	succeeded = len([report for report in projects if report["success"]])
+	return {"processes": numberOfProcesses,
+		"total": time.time() - start,
+		"succeeded": succeeded,
+		"failed": len(projects) - succeeded,
+		"projects": projects}
+
+
+def _ProcessJob(job):
+	return ProcessProject(*job)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Applies the transformations of "
+		"RegistrationShop projects to their moving data.")
+	parser.add_argument("projects", nargs="+", help="project folders")
+	parser.add_argument("-o", "--output", help="folder for the results (default: "
+		"registered.<type> in the project folder)")
+	parser.add_argument("-t", "--type", default=DataReader.TypeMHD,
+		choices=[DataReader.TypeMHD, DataReader.TypeMHA, DataReader.TypeVTI],
+		help="file type of the results")
+	parser.add_argument("-j", "--processes", type=int, default=None,
+		help="number of projects that are processed at the same time (default: number of cores)")
+	parser.add_argument("-r", "--report", help="file for the JSON report (default: stdout)")
+	arguments = parser.parse_args()
+
+	if arguments.output and not os.path.exists(arguments.output):
+		os.makedirs(arguments.output)
+
+	report = ProcessProjects(arguments.projects, arguments.output, arguments.type, arguments.processes)
+	data = json.dumps(report, indent=2, sort_keys=True)
+	if arguments.report:
+		with open(arguments.report, "w") as reportFile:
+			reportFile.write(data)
+	else:
+		print data
+
+	for project in report["projects"]:
+		if not project["success"]:
+			sys.stderr.write("Failed: " + project["project"] + ": " + project["error"] + "\n")
+	sys.exit(1 if report["failed"] else 0)
+
+if __name__ == '__main__':
+	main()
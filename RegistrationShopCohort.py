@@ -0,0 +1,65 @@
+#!/usr/local/bin/python
+"""
+RegistrationShopCohort
+
+Registers a cohort of data sets with elastix, as described by a manifest
+(see core/elastix/ElastixBatch.py for the format). The state of every
+registration is kept in a journal, so running the same command again
+after an interruption only runs the registrations that are not done.
+
+	python RegistrationShopCohort.py cohort.csv --output results --processes 4
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import sys
+import argparse
+from core.elastix.ElastixBatch import ReadManifest
+from core.elastix.ElastixBatch import BatchRunner
+from core.elastix.ElastixBatch import StateFailed
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+templateFolder = os.path.join(rootDir, "resources/transformations")
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Registers a cohort of data sets with elastix.")
+	parser.add_argument("manifest", help="CSV file with the fixed data, moving data and "
+		"parameter file (and optionally the output folder) of every registration")
+	parser.add_argument("-o", "--output", help="folder for the results (default: "
+		"'results' next to the manifest)")
+	parser.add_argument("-j", "--processes", type=int, default=1,
+		help="number of registrations that run at the same time")
+	parser.add_argument("--journal", help="file with the state of the registrations "
+		"(default: cohort.jsonl in the output folder)")
+	arguments = parser.parse_args()
+
+	rows = ReadManifest(arguments.manifest, arguments.output, templateFolder)
+	outputFolder = arguments.output
+	if outputFolder is None:
+		outputFolder = os.path.join(os.path.dirname(os.path.abspath(arguments.manifest)), "results")
+	if not os.path.exists(outputFolder):
+		os.makedirs(outputFolder)
+	journalFileName = arguments.journal or os.path.join(outputFolder, "cohort.jsonl")
+
+	runner = BatchRunner(rows, journalFileName, arguments.processes)
+	runner.restore()
+	summary = runner.summary()
+	print "Registrations:", len(rows), "done:", summary["done"], "to do:", len(rows) - summary["done"]
+
+	runner.run()
+
+	for row in rows:
+		runtime = "%.1f s" % row.runtime if row.runtime is not None else "-"
+		metric = str(row.metric) if row.metric is not None else "-"
+		print "%-8s %10s %14s  %s" % (row.state, runtime, metric, row.movingData)
+		if row.error:
+			print "         ", row.error
+	summary = runner.summary()
+	print "Done:", summary["done"], "failed:", summary["failed"]
+	sys.exit(1 if summary[StateFailed] else 0)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,62 @@
+#!/usr/local/bin/python
+"""
+RegistrationShopSequence
+
+Registers the frames of a time series to a reference with elastix. The
+transform of every frame is the initial transform of the next frame
+(warm start). The iterations and the time per frame are reported as
+JSON, so that the gain of the warm start can be measured by running the
+same series with --cold.
+
+	python RegistrationShopSequence.py reference.mhd frame*.mhd -p Parameters.txt --output results
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import sys
+import json
+import argparse
+from core.elastix.ElastixSequence import SequenceRunner
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+templateFolder = os.path.join(rootDir, "resources/transformations")
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Registers the frames of a time series to a reference.")
+	parser.add_argument("fixed", help="reference data set")
+	parser.add_argument("frames", nargs="+", help="frames of the time series, in order")
+	parser.add_argument("-p", "--parameters", required=True, help="elastix parameter file "
+		"or the name of one of the templates in resources/transformations")
+	parser.add_argument("-o", "--output", default="results", help="folder for the results")
+	parser.add_argument("-t0", "--initial", help="initial transform of the first frame")
+	parser.add_argument("--cold", action="store_true", help="do not use the transform "
+		"of the previous frame as initial transform")
+	parser.add_argument("-r", "--report", help="file for the JSON report (default: stdout)")
+	arguments = parser.parse_args()
+
+	parameterFile = arguments.parameters
+	if not os.path.exists(parameterFile):
+		for name in [parameterFile, parameterFile + ".txt"]:
+			if os.path.exists(os.path.join(templateFolder, name)):
+				parameterFile = os.path.join(templateFolder, name)
+				break
+
+	runner = SequenceRunner(arguments.fixed, arguments.frames, parameterFile,
+		arguments.output, arguments.initial)
+	runner.warmStart = not arguments.cold
+	runner.run()
+
+	report = runner.report()
+	data = json.dumps(report, indent=2, sort_keys=True)
+	if arguments.report:
+		with open(arguments.report, "w") as reportFile:
+			reportFile.write(data)
+	else:
+		print data
+	sys.exit(1 if report["failed"] else 0)
+
+if __name__ == '__main__':
+	main()
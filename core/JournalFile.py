@@ -0,0 +1,72 @@
+"""
+JournalFile
+
+Append-only files with one JSON record per line. Every record is flushed
+as soon as it is written, so that the records survive a crash. A crash
+can leave the last line partly written: that line is removed when the
+file is opened again, and is skipped when the file is read.
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import json
+
+
+def OpenJournalFile(fileName):
+	"""
+	Opens the journal file for appending. A partly written last line is
+	removed first, so that new records start on a line of their own.
+
+	:rtype: file
+	"""
+	if os.path.exists(fileName):
+		with open(fileName, "rb+") as journalFile:
+			journalFile.truncate(_CompleteLength(journalFile))
+	return open(fileName, "a")
+
+
+def WriteJournalRecord(journalFile, record):
+	"""
+	Appends the record (a dictionary) as one line and flushes the file.
+	"""
+	journalFile.write(json.dumps(record, separators=(",", ":")) + "\n")
+	journalFile.flush()
+
+
+def ReadJournalFile(fileName):
+	"""
+	Returns the records in the journal file. Lines that are not a complete
+	record are skipped.
+
+	:rtype: list of dict
+	"""
+	records = []
+	if not os.path.exists(fileName):
+		return records
+	with open(fileName, "r") as journalFile:
+		for line in journalFile:
+			try:
+				record = json.loads(line)
+			except ValueError:
+				continue
+			if isinstance(record, dict):
+				records.append(record)
+	return records
+
+
+def _CompleteLength(journalFile):
+	"""
+	Returns the length of the file up to and including the last newline.
+	"""
+	journalFile.seek(0, os.SEEK_END)
+	end = journalFile.tell()
+	while end > 0:
+		start = max(0, end - 4096)
+		journalFile.seek(start)
+		index = journalFile.read(end - start).rfind("\n")
+		if index >= 0:
+			return start + index + 1
+		end = start
+	return 0
@@ -0,0 +1,298 @@
+"""
+MapperBackend
+
+Selects the volume mappers that are used by the render widgets.
+The GPU backend uses the OpenGL GPU ray cast mappers (the multi volume
+mapper is part of the custom vtk build). The CPU backend uses the
+multi-threaded vtkFixedPointVolumeRayCastMapper, so that volumes can
+also be rendered on machines without a (capable) GPU, like virtual
+machines and headless servers.
+
+The CPU mappers accept the same calls as the GPU mappers. Calls that
+have no CPU counterpart (like the custom shader bounds) are ignored.
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import sys
+import multiprocessing
+import vtk
+from vtk import vtkFixedPointVolumeRayCastMapper
+from vtk import vtkVolume
+from core.decorators import Singleton
+
+BackendAuto = "auto"
+BackendGPU = "gpu"
+BackendCPU = "cpu"
+Backends = [BackendAuto, BackendGPU, BackendCPU]
+
+# Shader types of the GPU mappers
+ShaderTypeComposite = 0
+ShaderTypeMIP = 1
+ShaderTypeMIDA = 2
+
+
+# Parts of the names of OpenGL renderers that render in software. The GPU
+# mappers work with them, but are much slower than the CPU mappers.
+SoftwareRenderers = ["llvmpipe", "softpipe", "software rasterizer", "swrast", "gdi generic",
+	"microsoft basic render"]
+
+
+def DetectCapabilities():
+	"""
+	Detects which volume mappers can be used on this machine. When the GPU
+	mappers are available and there is a display, a small hidden render
+	window is opened to check whether the OpenGL context can actually run
+	the GPU mapper.
+
+	:rtype: dict
+	"""
+	capabilities = dict()
+	capabilities["gpuVolumeMapper"] = hasattr(vtk, "vtkOpenGLGPUVolumeRayCastMapper")
+	capabilities["gpuMultiVolumeMapper"] = hasattr(vtk, "vtkOpenGLGPUMultiVolumeRayCastMapper")
+	# Without a display there is no OpenGL context for the GPU mappers
+	if sys.platform.startswith("linux"):
+		capabilities["display"] = bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+	else:
+		capabilities["display"] = True
+	capabilities["numberOfThreads"] = multiprocessing.cpu_count()
+	capabilities["renderSupported"] = False
+	capabilities["softwareRenderer"] = False
+	if capabilities["gpuVolumeMapper"] and capabilities["display"]:
+		capabilities.update(_ProbeRenderWindow())
+	return capabilities
+
+
+def SelectBackend(preference, capabilities):
+	"""
+	Returns the backend to use for the preference (one of Backends) and
+	the detected capabilities. The GPU backend is only selected when both
+	GPU mappers are available, there is a display and the GPU mapper can
+	render in the OpenGL context. The automatic preference also picks the
+	CPU backend when OpenGL is rendered in software.
+
+	:rtype: str
+	"""
+	gpuAvailable = (capabilities["gpuVolumeMapper"]
+		and capabilities["gpuMultiVolumeMapper"]
+		and capabilities["display"]
+		and capabilities["renderSupported"])
+	if preference == BackendCPU or not gpuAvailable:
+		if preference == BackendGPU:
+			print "Warning: GPU volume mappers are not available, using the CPU backend"
+		return BackendCPU
+	if preference == BackendAuto and capabilities["softwareRenderer"]:
+		return BackendCPU
+	return BackendGPU
+
+
+def _ProbeRenderWindow():
+	"""
+	Renders a hidden render window of one pixel and asks the GPU volume
+	mapper whether it is supported by the OpenGL context of the window.
+
+	:rtype: dict
+	"""
+	renderWindow = vtk.vtkRenderWindow()
+	renderWindow.SetOffScreenRendering(1)
+	renderWindow.SetSize(1, 1)
+	try:
+		renderWindow.Render()
+		mapper = vtk.vtkOpenGLGPUVolumeRayCastMapper()
+		renderSupported = bool(mapper.IsRenderSupported(renderWindow, vtk.vtkVolumeProperty()))
+		report = (renderWindow.ReportCapabilities() or "").lower()
+		softwareRenderer = any(name in report for name in SoftwareRenderers)
+	finally:
+		renderWindow.Finalize()
+	return {"renderSupported": renderSupported, "softwareRenderer": softwareRenderer}
+
+
+@Singleton
+class MapperBackend(object):
+	"""
+	MapperBackend creates the volume mappers for the render widgets.
+	The backend is selected once at startup with setPreference(), before
+	the render widgets are created.
+	"""
+
+	def __init__(self):
+		object.__init__(self)
+
+		self.capabilities = DetectCapabilities()
+		self.backend = SelectBackend(BackendAuto, self.capabilities)
+		#: Update rate that the CPU mappers try to keep during interaction
+		self.interactiveUpdateRate = 10.0
+
+	def setPreference(self, preference):
+		if preference not in Backends:
+			print "Warning: unknown render backend:", preference
+			preference = BackendAuto
+		self.backend = SelectBackend(preference, self.capabilities)
+
+	def isSoftware(self):
+		return self.backend == BackendCPU
+
+	def createVolumeMapper(self):
+		if self.isSoftware():
+			return CpuVolumeMapper()
+		mapper = vtk.vtkOpenGLGPUVolumeRayCastMapper()
+		mapper.SetAutoAdjustSampleDistances(1)
+		return mapper
+
+	def createMultiVolumeMapper(self):
+		"""
+		Returns a mapper for two volumes. On the CPU backend the second
+		volume is rendered by a separate volume (mapper.secondVolume)
+		that also has to be added to the renderer.
+		"""
+		if self.isSoftware():
+			return CpuMultiVolumeMapper()
+		return vtk.vtkOpenGLGPUMultiVolumeRayCastMapper()
+
+	def configureInteractor(self, rwi):
+		"""
+		Sets the update rates of the render window interactor. The GPU
+		mappers always render at full quality. The CPU mappers lower
+		their image sample distance during interaction to keep up with
+		the interactive update rate.
+		"""
+		if self.isSoftware():
+			rwi.SetDesiredUpdateRate(self.interactiveUpdateRate)
+			rwi.SetStillUpdateRate(0.001)
+		else:
+			rwi.SetDesiredUpdateRate(0)
+
+
+class CpuVolumeMapper(vtkFixedPointVolumeRayCastMapper):
+	"""
+	Multi-threaded CPU ray cast mapper that accepts the calls for the
+	GPU volume mapper. MIP is rendered with the maximum intensity blend
+	mode. MIDA has no CPU counterpart and is rendered as composite.
+	"""
+
+	def __init__(self):
+		super(CpuVolumeMapper, self).__init__()
+		ConfigureCpuMapper(self)
+
+	def SetInputData(self, imageData):
+		vtkFixedPointVolumeRayCastMapper.SetInputData(self, imageData)
+		AdaptSampleDistances(self, imageData)
+
+	def SetShaderType(self, shaderType):
+		SetBlendModeForShaderType(self, shaderType)
+
+	def SetLowerBound(self, lowerBound):
+		pass
+
+	def SetUpperBound(self, upperBound):
+		pass
+
+	def SetBrightness(self, brightness):
+		pass
+
+	def SetWindow(self, window):
+		pass
+
+	def SetLevel(self, level):
+		pass
+
+
+class CpuMultiVolumeMapper(vtkFixedPointVolumeRayCastMapper):
+	"""
+	Renders two volumes on the CPU. This mapper renders the first input
+	and secondVolume renders the second input. The renderer composites
+	the two volumes, so overlapping parts are not blended per sample
+	like the GPU multi volume mapper does.
+	"""
+
+	def __init__(self):
+		super(CpuMultiVolumeMapper, self).__init__()
+		ConfigureCpuMapper(self)
+
+		self.secondMapper = vtkFixedPointVolumeRayCastMapper()
+		ConfigureCpuMapper(self.secondMapper)
+		self.secondVolume = vtkVolume()
+		self.secondVolume.SetMapper(self.secondMapper)
+
+	def SetInputData(self, port, imageData):
+		if port == 0:
+			vtkFixedPointVolumeRayCastMapper.SetInputData(self, imageData)
+			AdaptSampleDistances(self, imageData)
+		else:
+			self.secondMapper.SetInputData(imageData)
+			AdaptSampleDistances(self.secondMapper, imageData)
+
+	def SetClippingPlanes(self, planes):
+		vtkFixedPointVolumeRayCastMapper.SetClippingPlanes(self, planes)
+		self.secondMapper.SetClippingPlanes(planes)
+
+	def SetBlendModeToComposite(self):
+		vtkFixedPointVolumeRayCastMapper.SetBlendModeToComposite(self)
+		self.secondMapper.SetBlendModeToComposite()
+
+	def SetProperty2(self, volumeProperty):
+		self.secondVolume.SetProperty(volumeProperty)
+
+	def GetProperty2(self):
+		return self.secondVolume.GetProperty()
+
+	def SetSecondInputUserTransform(self, transform):
+		self.secondVolume.SetUserTransform(transform)
+
+	def SetShaderType1(self, shaderType):
+		SetBlendModeForShaderType(self, shaderType)
+
+	def SetShaderType2(self, shaderType):
+		SetBlendModeForShaderType(self.secondMapper, shaderType)
+
+	def SetBlendType(self, blendType):
+		pass
+
+	def SetLowerBound1(self, lowerBound):
+		pass
+
+	def SetUpperBound1(self, upperBound):
+		pass
+
+	def SetBrightness1(self, brightness):
+		pass
+
+	def SetLowerBound2(self, lowerBound):
+		pass
+
+	def SetUpperBound2(self, upperBound):
+		pass
+
+	def SetBrightness2(self, brightness):
+		pass
+
+
+def ConfigureCpuMapper(mapper):
+	mapper.SetNumberOfThreads(multiprocessing.cpu_count())
+	mapper.AutoAdjustSampleDistancesOn()
+	mapper.SetMinimumImageSampleDistance(1.0)
+	mapper.SetMaximumImageSampleDistance(8.0)
+
+
+def AdaptSampleDistances(mapper, imageData):
+	"""
+	Sets the sample distances of a CPU mapper to the spacing of the image
+	data: one sample per voxel when the view is still and one sample per
+	four voxels during interaction.
+	"""
+	if imageData is None:
+		return
+	spacing = min(abs(value) for value in imageData.GetSpacing())
+	if spacing <= 0:
+		return
+	mapper.SetSampleDistance(spacing)
+	mapper.SetInteractiveSampleDistance(4.0 * spacing)
+
+
+def SetBlendModeForShaderType(mapper, shaderType):
+	if shaderType == ShaderTypeMIP:
+		mapper.SetBlendModeToMaximumIntensity()
+	else:
+		mapper.SetBlendModeToComposite()
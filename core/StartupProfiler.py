@@ -0,0 +1,139 @@
+"""
+StartupProfiler
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import sys
+import time
+import __builtin__
+from core.decorators import Singleton
+
+
+@Singleton
+class StartupProfiler(object):
+	"""
+	StartupProfiler measures where the time goes during the startup of
+	the application: the import time of every module and the time until
+	named moments (marks), like the first paint of the main window.
+
+	The import times are measured by wrapping the builtin __import__, so
+	start() should be called before the modules of interest are imported.
+	Only the first import of a module is measured, under its full name
+	(implicit relative imports are resolved to their package). The self time of a
+	module excludes the time of the modules that it imports itself.
+	"""
+
+	def __init__(self):
+		object.__init__(self)
+
+		self.startTime = time.time()
+		self.enabled = False
+		self.imports = dict()  # module name: [inclusive time, self time]
+		self.marks = []  # (name, seconds since start)
+		self._stack = []
+		self._originalImport = None
+
+	def start(self):
+		if self.enabled:
+			return
+		self.enabled = True
+		self._originalImport = __builtin__.__import__
+		__builtin__.__import__ = self._import
+
+	def stop(self):
+		if not self.enabled:
+			return
+		self.enabled = False
+		__builtin__.__import__ = self._originalImport
+		self._originalImport = None
+
+	def mark(self, name):
+		"""
+		Records the time since the start of the application.
+		"""
+		self.marks.append((name, time.time() - self.startTime))
+
+	def report(self, numberOfModules=20):
+		"""
+		Returns a report with the marks and the modules that took the most
+		time to import.
+
+		:rtype: str
+		"""
+		lines = ["Startup timing:"]
+		for name, seconds in self.marks:
+			lines.append("  %-40s %8.1f ms" % (name, seconds * 1000.0))
+
+		if self.imports:
+			lines.append("Slowest imports (self / inclusive):")
+			modules = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)
+			for name, (inclusive, exclusive) in modules[:numberOfModules]:
+				lines.append("  %-40s %8.1f ms %8.1f ms" % (name, exclusive * 1000.0, inclusive * 1000.0))
+			total = sum(exclusive for inclusive, exclusive in self.imports.values())
+			lines.append("  %-40s %8.1f ms" % ("Total", total * 1000.0))
+		return "\n".join(lines)
+
+	# Private methods
+
+	def _import(self, name, globals=None, locals=None, fromlist=None, level=-1):
+		candidates = _ModuleNames(name, globals, level)
+		if _LoadedModule(candidates) is not None:
+			return self._originalImport(name, globals, locals, fromlist, level)
+
+		start = time.time()
+		self._stack.append(0.0)
+		try:
+			return self._originalImport(name, globals, locals, fromlist, level)
+		finally:
+			inclusive = time.time() - start
+			children = self._stack.pop()
+			if self._stack:
+				self._stack[-1] += inclusive
+			# Entries are keyed by the full name of the module that was
+			# imported, not by the (possibly relative) name that was asked for
+			moduleName = _LoadedModule(candidates)
+			if moduleName is not None:
+				if moduleName not in self.imports:
+					self.imports[moduleName] = [0.0, 0.0]
+				self.imports[moduleName][0] += inclusive
+				self.imports[moduleName][1] += inclusive - children
+
+
+def _ModuleNames(name, globals, level):
+	"""
+	Returns the full names of the modules that an import statement can
+	refer to, in the order in which Python 2 tries them: first relative to
+	the package of the importing module (unless the import is absolute),
+	then the absolute name (unless the import is explicitly relative).
+
+	:rtype: list of str
+	"""
+	names = []
+	if level != 0 and globals:
+		package = globals.get("__package__")
+		if not package:
+			package = globals.get("__name__") or ""
+			if "__path__" not in globals:
+				package = package.rpartition(".")[0]
+		for _ in range(max(level, 1) - 1):
+			package = package.rpartition(".")[0]
+		if package:
+			names.append(package + "." + name if name else package)
+	if level <= 0:
+		names.append(name)
+	return names
+
+
+def _LoadedModule(names):
+	"""
+	Returns the first name that refers to a loaded module. Python 2 stores
+	None in sys.modules for relative names that turned out not to exist.
+
+	:rtype: str
+	"""
+	for name in names:
+		if sys.modules.get(name) is not None:
+			return name
+	return None
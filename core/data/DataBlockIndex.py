@@ -0,0 +1,247 @@
+"""
+DataBlockIndex
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import weakref
+import itertools
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import numpy as np
+from vtk.util.numpy_support import vtk_to_numpy
+from core.operations import RayBoxIntersections
+
+# Tolerance (in blocks) for points that lie on the border of a block
+_epsilon = 1e-9
+
+
+class DataBlockIndex(object):
+	"""
+	DataBlockIndex divides a volume into blocks of blockSize^3 voxels and
+	stores the minimum and maximum scalar value of every block. Neighbouring
+	blocks share the voxels on their border, so that interpolated values
+	between two blocks are also covered by the range of both blocks.
+	The index can be used to skip parts of the volume that can't contain
+	interesting values. Positions are in local coordinates of the image data.
+	Use BlockIndexForImageData() to get an index that is cached per volume.
+	"""
+
+	def __init__(self, imageData, blockSize=16):
+		super(DataBlockIndex, self).__init__()
+
+		self.blockSize = blockSize
+		self.mTime = imageData.GetMTime()
+		self.minimum = None
+		self.maximum = None
+
+		extent = imageData.GetExtent()
+		self._dimensions = np.array(imageData.GetDimensions(), dtype=np.int64)
+		self._origin = np.array(imageData.GetOrigin(), dtype=np.float64)
+		self._spacing = np.array(imageData.GetSpacing(), dtype=np.float64)
+		self._extentMin = np.array([extent[0], extent[2], extent[4]], dtype=np.float64)
+
+		scalars = vtk_to_numpy(imageData.GetPointData().GetScalars())
+		if scalars.ndim > 1:
+			scalars = scalars[:, 0]
+		dimensions = self._dimensions
+		self._volume = scalars.reshape(dimensions[2], dimensions[1], dimensions[0])
+		self._build()
+
+	def shape(self):
+		"""
+		Returns the number of blocks in x, y and z direction.
+		"""
+		return tuple(reversed(self.minimum.shape))
+
+	def blocksInRange(self, lower, upper):
+		"""
+		Returns a boolean array (indexed as [z, y, x]) of the blocks that
+		contain values within [lower, upper].
+		"""
+		return (self.maximum >= lower) & (self.minimum <= upper)
+
+	def blockBounds(self, block):
+		"""
+		Returns the bounds of a block (x, y, z index) in local coordinates.
+		"""
+		voxelMin = np.array(block) * self.blockSize
+		voxelMax = np.minimum(voxelMin + self.blockSize, self._dimensions - 1)
+		return self._voxelBounds(voxelMin, voxelMax)
+
+	def firstBlockAlongRay(self, p1, p2, threshold=None, blocks=None):
+		"""
+		Returns the first block along the segment p1-p2 that contains values
+		larger than threshold and the ratio along the segment where the
+		segment enters that block. Instead of a threshold, a boolean array
+		of blocks (like the result of blocksInRange) can be given.
+		Returns None if all blocks along the segment are empty.
+
+		:rtype: tuple(block, float) or None
+		"""
+		if blocks is None:
+			blocks = self.maximum > threshold
+		p1 = np.asarray(p1, dtype=np.float64)
+		p2 = np.asarray(p2, dtype=np.float64)
+		bounds = self._voxelBounds(np.zeros(3), self._dimensions - 1)
+		hits, tNear, tFar = RayBoxIntersections(p1, p2 - p1, bounds)
+		tNear = max(tNear[0], 0.0)
+		tFar = min(tFar[0], 1.0)
+		if not hits[0] or tNear > tFar:
+			return None
+
+		# Walk through the grid of blocks with a 3D-DDA (Amanatides and Woo):
+		# every step crosses the nearest block border along the segment
+		shape = np.array(self.shape())
+		begin = self._blockCoordinates(p1 + (p2 - p1) * tNear)
+		direction = self._blockCoordinates(p2) - self._blockCoordinates(p1)
+		block = np.clip(np.floor(begin).astype(np.int64), 0, shape - 1)
+		step = np.sign(direction).astype(np.int64)
+		with np.errstate(divide="ignore", invalid="ignore"):
+			tDelta = np.abs(1.0 / direction)
+			tNext = tNear + (block + (step > 0) - begin) / direction
+		tNext[step == 0] = np.inf
+
+		t = tNear
+		while True:
+			result = self._filledBlockAtPoint(blocks, block, begin + direction * (t - tNear))
+			if result is not None:
+				return result, t
+			t = tNext.min()
+			if t > tFar:
+				return None
+			# Cross all borders at t at once: the blocks that the segment only
+			# touches at an edge or a corner are checked at the next point
+			crossed = (step != 0) & (tNext - t <= _epsilon * tDelta)
+			block = block + step * crossed
+			tNext[crossed] += tDelta[crossed]
+			if np.any(block < 0) or np.any(block >= shape):
+				result = self._filledBlockAtPoint(blocks, block, begin + direction * (t - tNear))
+				return (result, t) if result is not None else None
+
+	def boundsAboveThreshold(self, threshold):
+		"""
+		Returns the tight bounds (in local coordinates) of all the voxels
+		with a value larger than threshold, or None if there are no such
+		voxels. Only the blocks that contain such values are inspected.
+		"""
+		filled = self.maximum > threshold
+		if not np.any(filled):
+			return None
+
+		# Region (in voxels) that is covered by the filled blocks
+		blocks = np.nonzero(filled)
+		low = [blocks[i].min() * self.blockSize for i in range(3)]
+		high = [min((blocks[i].max() + 1) * self.blockSize, self._volume.shape[i] - 1) for i in range(3)]
+		region = self._volume[low[0]:high[0] + 1, low[1]:high[1] + 1, low[2]:high[2] + 1] > threshold
+
+		voxelMin = np.zeros(3)
+		voxelMax = np.zeros(3)
+		for axis in range(3):
+			others = tuple(i for i in range(3) if i != axis)
+			present = np.nonzero(np.any(region, axis=others))[0]
+			# Index of the voxel array is [z, y, x]
+			voxelMin[2 - axis] = low[axis] + present[0]
+			voxelMax[2 - axis] = low[axis] + present[-1]
+		return self._voxelBounds(voxelMin, voxelMax)
+
+	# Private methods
+
+	def _build(self):
+		"""
+		Calculates the minimum and maximum for every block. Slabs of blocks
+		are processed in separate threads (numpy releases the GIL).
+		"""
+		blockSize = self.blockSize
+		depth = self._volume.shape[0]
+		starts = range(0, max(depth - 1, 1), blockSize)
+
+		def reduceSlab(start):
+			slab = self._volume[start:min(start + blockSize, depth - 1) + 1]
+			minimum = slab.min(axis=0)
+			maximum = slab.max(axis=0)
+			for axis in range(2):
+				minimum = _reduceBlocks(np.minimum, minimum, axis, blockSize)
+				maximum = _reduceBlocks(np.maximum, maximum, axis, blockSize)
+			return minimum, maximum
+
+		processes = max(1, min(len(starts), multiprocessing.cpu_count()))
+		if processes > 1:
+			pool = ThreadPool(processes)
+			try:
+				results = pool.map(reduceSlab, starts)
+			finally:
+				pool.close()
+		else:
+			results = map(reduceSlab, starts)
+
+		self.minimum = np.array([result[0] for result in results])
+		self.maximum = np.array([result[1] for result in results])
+
+	def _filledBlockAtPoint(self, blocks, block, point):
+		"""
+		Returns a filled block (x, y, z) of which the closed box contains the
+		point (in block coordinates), or None. Besides the block itself, the
+		neighbours are checked when the point lies on the border with them.
+		"""
+		shape = self.shape()
+		offsets = []
+		for axis in range(3):
+			axisOffsets = [0]
+			if abs(point[axis] - block[axis]) <= _epsilon:
+				axisOffsets.append(-1)
+			if abs(point[axis] - block[axis] - 1) <= _epsilon:
+				axisOffsets.append(1)
+			offsets.append(axisOffsets)
+		for offset in itertools.product(*offsets):
+			x, y, z = [block[axis] + offset[axis] for axis in range(3)]
+			if 0 <= x < shape[0] and 0 <= y < shape[1] and 0 <= z < shape[2] and blocks[z, y, x]:
+				return (int(x), int(y), int(z))
+		return None
+
+	def _voxelBounds(self, voxelMin, voxelMax):
+		lower = (self._extentMin + voxelMin) * self._spacing + self._origin
+		upper = (self._extentMin + voxelMax) * self._spacing + self._origin
+		bounds = []
+		for i in range(3):
+			bounds += [min(lower[i], upper[i]), max(lower[i], upper[i])]
+		return bounds
+
+	def _blockCoordinates(self, point):
+		"""
+		Returns the continuous block coordinates (x, y, z) of a point.
+		"""
+		return ((point - self._origin) / self._spacing - self._extentMin) / self.blockSize
+
+
+def _reduceBlocks(ufunc, array, axis, blockSize):
+	"""
+	Reduces blocks of blockSize along axis of the array. The first element
+	of the next block is included in each block.
+	"""
+	length = array.shape[axis]
+	starts = np.arange(0, max(length - 1, 1), blockSize)
+	result = ufunc.reduceat(array, starts, axis=axis)
+	ends = np.minimum(starts + blockSize, length - 1)
+	border = np.take(array, ends, axis=axis)
+	return ufunc(result, border)
+
+
+# Block indices are cached per image data object
+_blockIndices = weakref.WeakKeyDictionary()
+
+
+def BlockIndexForImageData(imageData, blockSize=16):
+	"""
+	Returns the block index of the image data. The index is built only once
+	and is rebuilt when the image data has been modified.
+
+	:rtype: DataBlockIndex
+	"""
+	indices = _blockIndices.setdefault(imageData, {})
+	index = indices.get(blockSize)
+	if index is None or index.mTime != imageData.GetMTime():
+		index = DataBlockIndex(imageData, blockSize)
+		indices[blockSize] = index
+	return index
@@ -0,0 +1,61 @@
+"""
+DataPyramid
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+from vtk import vtkImageShrink3D
+
+
+class DataPyramid(object):
+	"""
+	DataPyramid holds coarser versions of an image data object. Every
+	level halves the dimensions of the previous level by averaging blocks
+	of 2x2x2 voxels. Level 0 is the image data itself. Levels are created
+	the first time they are asked for.
+	"""
+
+	def __init__(self, imageData, maximumLevel=3):
+		super(DataPyramid, self).__init__()
+
+		self.imageData = imageData
+		self.maximumLevel = maximumLevel
+		self._levels = [imageData]
+
+	def level(self, level):
+		"""
+		Returns the image data for the level.
+
+		:rtype: vtkImageData
+		"""
+		level = max(0, min(level, self.maximumLevel))
+		while len(self._levels) <= level:
+			previous = self._levels[-1]
+			shrink = vtkImageShrink3D()
+			shrink.SetInputData(previous)
+			shrink.SetShrinkFactors(2, 2, 2)
+			shrink.AveragingOn()
+			shrink.Update()
+			self._levels.append(shrink.GetOutput())
+		return self._levels[level]
+
+	def levelForVoxelBudget(self, budget):
+		"""
+		Returns the finest level that has at most budget voxels.
+		"""
+		return LevelForVoxelBudget(self.imageData.GetDimensions(), budget, self.maximumLevel)
+
+
+def LevelForVoxelBudget(dimensions, budget, maximumLevel=3):
+	"""
+	Returns the finest pyramid level for data with the given dimensions
+	that has at most budget voxels. If no level fits within the budget
+	the coarsest level is returned.
+	"""
+	level = 0
+	dimensions = list(dimensions)
+	while level < maximumLevel and dimensions[0] * dimensions[1] * dimensions[2] > budget:
+		dimensions = [max(1, dimension // 2) for dimension in dimensions]
+		level += 1
+	return level
@@ -0,0 +1,144 @@
+"""
+DataQuantizer
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+from vtk import vtkImageShiftScale
+from vtk import vtkDoubleArray
+from vtk import vtkIntArray
+from vtk import vtkDataArray
+from vtk import VTK_UNSIGNED_CHAR
+from vtk import VTK_UNSIGNED_SHORT
+from vtk import VTK_FLOAT
+from vtk import VTK_DOUBLE
+
+DisplayTypeNative = "native"
+DisplayTypeUInt16 = "uint16"
+DisplayTypeUInt8 = "uint8"
+DisplayTypes = [DisplayTypeNative, DisplayTypeUInt16, DisplayTypeUInt8]
+
+# Names of the field data arrays that record the quantization
+QuantizationKey = "QuantizationShiftScale"
+SourceRangeKey = "QuantizationSourceRange"
+SourceTypeKey = "QuantizationSourceType"
+
+_scalarTypes = {
+	DisplayTypeUInt16: (VTK_UNSIGNED_SHORT, 65535.0),
+	DisplayTypeUInt8: (VTK_UNSIGNED_CHAR, 255.0)
+}
+
+
+class DataQuantizer(object):
+	"""
+	DataQuantizer converts image data into a smaller scalar type for
+	display. The scalar range of the data is stretched over the range of
+	the new type: display = (source + shift) * scale. The shift and scale
+	and the original scalar range are stored in the field data of the
+	result, so that values of the source data can be mapped to values of
+	the display data with Quantization().
+	"""
+
+	#: Display type that is used when no type is given to QuantizeData
+	DisplayType = DisplayTypeNative
+
+	def __init__(self):
+		super(DataQuantizer, self).__init__()
+
+	def QuantizeData(self, imageData, displayType=None):
+		"""
+		Returns a quantized copy of the image data. The image data itself is
+		returned when the display type is native or when quantizing would
+		not save memory.
+
+		:rtype: vtkImageData
+		"""
+		if displayType is None:
+			displayType = DataQuantizer.DisplayType
+		if imageData is None or displayType not in _scalarTypes:
+			return imageData
+
+		scalarType, typeMaximum = _scalarTypes[displayType]
+		scalars = imageData.GetPointData().GetScalars()
+		isFloat = imageData.GetScalarType() in [VTK_FLOAT, VTK_DOUBLE]
+		if not isFloat and scalars.GetDataTypeSize() <= _DataTypeSize(scalarType):
+			return imageData
+
+		minimum, maximum = imageData.GetScalarRange()
+		shift = -minimum
+		scale = typeMaximum / (maximum - minimum) if maximum > minimum else 1.0
+
+		shiftScale = vtkImageShiftScale()
+		shiftScale.SetInputData(imageData)
+		shiftScale.SetShift(shift)
+		shiftScale.SetScale(scale)
+		shiftScale.SetOutputScalarType(scalarType)
+		shiftScale.ClampOverflowOn()
+		shiftScale.Update()
+
+		output = shiftScale.GetOutput()
+		fieldData = output.GetFieldData()
+		fieldData.AddArray(_DoubleArray(QuantizationKey, [shift, scale]))
+		fieldData.AddArray(_DoubleArray(SourceRangeKey, [minimum, maximum]))
+		sourceType = vtkIntArray()
+		sourceType.SetName(SourceTypeKey)
+		sourceType.InsertNextValue(imageData.GetScalarType())
+		fieldData.AddArray(sourceType)
+		return output
+
+
+def Quantization(imageData):
+	"""
+	Returns the shift and scale with which the image data was quantized.
+	Image data that is not quantized returns (0.0, 1.0).
+
+	:rtype: tuple(float, float)
+	"""
+	array = _FieldArray(imageData, QuantizationKey)
+	if array is None:
+		return 0.0, 1.0
+	return array.GetValue(0), array.GetValue(1)
+
+
+def SourceScalarRange(imageData):
+	"""
+	Returns the scalar range of the source data of the image data.
+
+	:rtype: tuple(float, float)
+	"""
+	array = _FieldArray(imageData, SourceRangeKey)
+	if array is None:
+		return imageData.GetScalarRange()
+	return array.GetValue(0), array.GetValue(1)
+
+
+def SourceScalarTypeAsString(imageData):
+	"""
+	Returns the name of the scalar type of the source data of the image
+	data, like GetScalarTypeAsString() does.
+
+	:rtype: str
+	"""
+	array = _FieldArray(imageData, SourceTypeKey)
+	if array is None:
+		return imageData.GetScalarTypeAsString()
+	return vtkDataArray.CreateDataArray(array.GetValue(0)).GetDataTypeAsString()
+
+
+def _FieldArray(imageData, name):
+	if imageData is None:
+		return None
+	return imageData.GetFieldData().GetArray(name)
+
+
+def _DoubleArray(name, values):
+	array = vtkDoubleArray()
+	array.SetName(name)
+	for value in values:
+		array.InsertNextValue(value)
+	return array
+
+
+def _DataTypeSize(scalarType):
+	return 1 if scalarType == VTK_UNSIGNED_CHAR else 2
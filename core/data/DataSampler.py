@@ -0,0 +1,151 @@
+"""
+DataSampler
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import math
+import numpy as np
+from vtk.util.numpy_support import vtk_to_numpy
+
+
+class DataSampler(object):
+	"""
+	DataSampler samples the first scalar component of an image dataset at a
+	batch of positions with trilinear interpolation. Positions are given in
+	the local coordinates of the image data. Positions outside of the
+	volume get the value outValue.
+	The numpy view on the volume is kept between calls, so the sampler
+	can be reused for multiple rays on the same image data.
+	"""
+
+	def __init__(self):
+		super(DataSampler, self).__init__()
+
+		self.outValue = 0.0
+		# Number of samples per voxel along a ray
+		self.samplesPerVoxel = 2.0
+		self.minimumSamples = 16
+		self.maximumSamples = 4096
+
+		self.imageData = None
+		self._mTime = None
+		self._volume = None
+		self._origin = None
+		self._spacing = None
+		self._extentMin = None
+		self._shape = None
+
+	def setImageData(self, imageData):
+		"""
+		Sets the image data to sample from. The volume is only looked up
+		again when the image data or its modification time changed.
+		"""
+		if imageData is self.imageData and imageData.GetMTime() == self._mTime:
+			return
+
+		self.imageData = imageData
+		self._mTime = imageData.GetMTime()
+
+		extent = imageData.GetExtent()
+		dimensions = imageData.GetDimensions()
+		scalars = vtk_to_numpy(imageData.GetPointData().GetScalars())
+		if scalars.ndim > 1:
+			scalars = scalars[:, 0]
+		# Point data is ordered with x running fastest: index as [z, y, x]
+		self._volume = scalars.reshape(dimensions[2], dimensions[1], dimensions[0])
+		self._origin = np.array(imageData.GetOrigin(), dtype=np.float64)
+		self._spacing = np.array(imageData.GetSpacing(), dtype=np.float64)
+		self._extentMin = np.array([extent[0], extent[2], extent[4]], dtype=np.float64)
+		self._shape = np.array(dimensions, dtype=np.int64)
+
+	def sampleCount(self, p1, p2):
+		"""
+		Returns the number of steps for sampling the line from p1 to p2,
+		based on the length of the line and the smallest voxel spacing.
+
+		:rtype: int
+		"""
+		length = np.linalg.norm(np.asarray(p2, dtype=np.float64) - np.asarray(p1, dtype=np.float64))
+		smallestSpacing = float(np.min(np.abs(self._spacing)))
+		if smallestSpacing == 0.0:
+			return self.minimumSamples
+		count = int(math.ceil(length / smallestSpacing * self.samplesPerVoxel))
+		return max(self.minimumSamples, min(self.maximumSamples, count))
+
+	def sampleLine(self, p1, p2, nrOfSteps=None):
+		"""
+		Samples the line from p1 to p2 (both included) in nrOfSteps steps.
+		If nrOfSteps is not given, it is calculated with sampleCount().
+
+		:rtype: numpy array of length nrOfSteps + 1
+		"""
+		if nrOfSteps is None:
+			nrOfSteps = self.sampleCount(p1, p2)
+		p1 = np.asarray(p1, dtype=np.float64)
+		p2 = np.asarray(p2, dtype=np.float64)
+		ratios = np.linspace(0.0, 1.0, nrOfSteps + 1)
+		points = p1 + ratios[:, np.newaxis] * (p2 - p1)
+		return self.samplePoints(points)
+
+	def samplePoints(self, points):
+		"""
+		Samples the volume at the given positions.
+
+		:type points: array-like of shape (n, 3)
+		:rtype: numpy array of length n
+		"""
+		points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+		# Continuous index coordinates
+		index = (points - self._origin) / self._spacing - self._extentMin
+
+		upper = self._shape - 1
+		tolerance = 1e-5
+		inside = np.all((index >= -tolerance) & (index <= upper + tolerance), axis=1)
+		index = np.clip(index, 0, upper)
+
+		lower = np.floor(index).astype(np.int64)
+		lower = np.minimum(lower, np.maximum(upper - 1, 0))
+		upperIndex = np.minimum(lower + 1, upper)
+		fraction = index - lower
+
+		x0, y0, z0 = lower[:, 0], lower[:, 1], lower[:, 2]
+		x1, y1, z1 = upperIndex[:, 0], upperIndex[:, 1], upperIndex[:, 2]
+		fx, fy, fz = fraction[:, 0], fraction[:, 1], fraction[:, 2]
+
+		volume = self._volume
+		c00 = volume[z0, y0, x0] * (1.0 - fx) + volume[z0, y0, x1] * fx
+		c10 = volume[z0, y1, x0] * (1.0 - fx) + volume[z0, y1, x1] * fx
+		c01 = volume[z1, y0, x0] * (1.0 - fx) + volume[z1, y0, x1] * fx
+		c11 = volume[z1, y1, x0] * (1.0 - fx) + volume[z1, y1, x1] * fx
+		c0 = c00 * (1.0 - fy) + c10 * fy
+		c1 = c01 * (1.0 - fy) + c11 * fy
+		result = c0 * (1.0 - fz) + c1 * fz
+
+		result[~inside] = self.outValue
+		return result
+
+
+def EdgeCandidates(samples, threshold=0.1):
+	"""
+	Returns the gradient magnitude of the samples and the indices of the
+	samples that are likely to lie on an edge: local maxima of the gradient
+	magnitude that are larger than threshold times the largest gradient.
+
+	:type samples: array-like
+	:rtype: tuple of numpy arrays
+	"""
+	samples = np.asarray(samples, dtype=np.float64)
+	if len(samples) < 2:
+		return np.zeros(len(samples)), np.array([], dtype=np.int64)
+
+	gradient = np.abs(np.gradient(samples))
+	if len(gradient) < 3:
+		return gradient, np.array([np.argmax(gradient)], dtype=np.int64)
+
+	center = gradient[1:-1]
+	isMaximum = (center >= gradient[:-2]) & (center > gradient[2:])
+	isMaximum &= center > threshold * gradient.max()
+	candidates = np.nonzero(isMaximum)[0] + 1
+	return gradient, candidates
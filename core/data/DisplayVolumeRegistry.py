@@ -0,0 +1,278 @@
+"""
+DisplayVolumeRegistry
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from Queue import PriorityQueue
+from core.decorators import Singleton
+from core.worker import Command
+from core.worker import Worker
+from DataReader import DataReader
+from DataResizer import DataResizer
+from DataQuantizer import DataQuantizer
+
+# Maximum number of voxels of a display volume
+DisplayVoxelBudget = 25000000
+
+# Priorities of prefetches: lower values are loaded first
+PriorityHigh = 0
+PriorityLow = 10
+
+
+@Singleton
+class DisplayVolumeRegistry(object):
+	"""
+	DisplayVolumeRegistry shares the display volumes (the resized and
+	quantized copies of the data files) between the render controllers.
+	Controllers that show the same file get the same vtkImageData
+	instance, so a file is only read, resized and quantized once.
+
+	The display volumes are shared, so they should be treated as read-only:
+	make a copy before changing one. Every acquire() should be matched by
+	a release(). Display volumes that are no longer used are kept in a
+	cache, so going back to a recently used file (like stepping through the
+	transformation history) does not read the file again. When the cache
+	holds more than memoryBudget bytes, the least recently used display
+	volumes are dropped.
+
+	Files can be prefetched: they are then loaded by background workers in
+	order of priority and put into the cache. acquire() waits for a
+	prefetch that is still loading instead of loading the file again.
+	"""
+
+	def __init__(self):
+		object.__init__(self)
+
+		#: Number of threads that load prefetched files
+		self.numberOfWorkers = 2
+		#: Maximum number of bytes of the display volumes that are not in use
+		self.memoryBudget = 1024 * 1024 * 1024
+
+		self._entries = dict()  # key: [imageData, reference count]
+		self._cache = OrderedDict()  # key: imageData, least recently used first
+		self._loads = dict()  # key: _LoadCommand of a prefetch
+		self._lock = threading.Lock()
+		self._queue = PriorityQueue()
+		self._workers = []
+		self._order = 0
+
+	def acquire(self, fileName, maximum=DisplayVoxelBudget, displayType=None):
+		"""
+		Returns the display volume for the file and increments its reference
+		count. The file is read when no controller holds it yet.
+
+		:type fileName: str
+		:rtype: vtkImageData
+		"""
+		if displayType is None:
+			displayType = DataQuantizer.DisplayType
+		key = self._key(fileName, maximum, displayType)
+
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None:
+				entry[1] += 1
+				return entry[0]
+			imageData = self._cache.pop(key, None)
+			if imageData is not None:
+				self._entries[key] = [imageData, 1]
+				return imageData
+			load = self._loads.pop(key, None)
+			if load is not None and not load.started:
+				# Loading it here is faster than waiting in the queue
+				load.cancelled = True
+				load = None
+
+		imageData = None
+		if load is not None:
+			load.done.wait()
+			imageData = load.imageData
+		if imageData is None:
+			imageData = LoadDisplayVolume(fileName, maximum, displayType)
+
+		with self._lock:
+			# The finished prefetch also put the volume in the cache
+			self._cache.pop(key, None)
+			entry = self._entries.setdefault(key, [imageData, 0])
+			entry[1] += 1
+			return entry[0]
+
+	def release(self, imageData):
+		"""
+		Decrements the reference count of a display volume that was returned
+		by acquire(). A display volume that is no longer used moves to the
+		cache. Image data that is unknown to the registry is ignored, so it
+		is safe to release None.
+		"""
+		if imageData is None:
+			return
+		with self._lock:
+			for key, entry in self._entries.items():
+				if entry[0] is imageData:
+					entry[1] -= 1
+					if entry[1] <= 0:
+						del self._entries[key]
+						self._cache[key] = imageData
+						self._evict()
+					return
+
+	def prefetch(self, fileName, maximum=DisplayVoxelBudget, displayType=None, priority=PriorityHigh):
+		"""
+		Starts loading the display volume for the file in the background.
+		Files that are already loaded, cached or prefetched are skipped.
+		"""
+		if not fileName or not os.path.exists(fileName):
+			return
+		if displayType is None:
+			displayType = DataQuantizer.DisplayType
+		key = self._key(fileName, maximum, displayType)
+
+		with self._lock:
+			if key in self._entries or key in self._loads:
+				return
+			if key in self._cache:
+				# Prefetching counts as a use of the cached volume
+				self._cache[key] = self._cache.pop(key)
+				return
+			self._order += 1
+			load = _LoadCommand(self, key, fileName, maximum, displayType, priority, self._order)
+			self._loads[key] = load
+
+		self._startWorkers()
+		self._queue.put(load)
+
+	def cancelPrefetches(self):
+		"""
+		Cancels the prefetches that did not start yet.
+		"""
+		with self._lock:
+			for load in self._loads.values():
+				load.cancelled = True
+			self._loads = dict()
+
+	def waitForPrefetches(self):
+		"""
+		Blocks until all prefetches are finished.
+		"""
+		self._queue.join()
+
+	def referenceCount(self, imageData):
+		with self._lock:
+			for entry in self._entries.values():
+				if entry[0] is imageData:
+					return entry[1]
+		return 0
+
+	def numberOfVolumes(self):
+		return len(self._entries)
+
+	def numberOfPrefetches(self):
+		return len(self._loads)
+
+	def numberOfCachedVolumes(self):
+		return len(self._cache)
+
+	def clearCache(self):
+		with self._lock:
+			self._cache = OrderedDict()
+
+	# Private methods
+
+	def _key(self, fileName, maximum, displayType):
+		"""
+		The modification time is part of the key, so that a file that is
+		written again (for instance a new registration result) is read again.
+		"""
+		path = os.path.abspath(fileName)
+		try:
+			modified = os.path.getmtime(path)
+		except OSError:
+			modified = None
+		return (path, modified, maximum, displayType)
+
+	def _prefetchFinished(self, load):
+		with self._lock:
+			if self._loads.get(load.key) is load:
+				del self._loads[load.key]
+			if load.imageData is not None and load.key not in self._entries:
+				self._cache[load.key] = load.imageData
+				self._evict()
+
+	def _evict(self):
+		"""
+		Drops the least recently used display volumes from the cache until
+		it fits within the memory budget. Should be called with the lock.
+		"""
+		size = sum(_MemorySize(imageData) for imageData in self._cache.values())
+		while size > self.memoryBudget and self._cache:
+			key, imageData = self._cache.popitem(last=False)
+			size -= _MemorySize(imageData)
+
+	def _startWorkers(self):
+		while len(self._workers) < self.numberOfWorkers:
+			worker = Worker(self._queue)
+			worker.setDaemon(True)
+			worker.start()
+			self._workers.append(worker)
+
+
+def LoadDisplayVolume(fileName, maximum=DisplayVoxelBudget, displayType=None):
+	"""
+	Reads the file and returns the resized and quantized display volume.
+
+	:rtype: vtkImageData
+	"""
+	dataReader = DataReader()
+	imageData = dataReader.GetImageData(fileName)
+	resizer = DataResizer()
+	imageData = resizer.ResizeData(imageData, maximum=maximum)
+	quantizer = DataQuantizer()
+	return quantizer.QuantizeData(imageData, displayType)
+
+
+def _MemorySize(imageData):
+	return imageData.GetActualMemorySize() * 1024
+
+
+class _LoadCommand(Command):
+	"""
+	Loads a display volume on a worker thread. Commands are ordered by
+	priority and then by the order in which they were added.
+	"""
+
+	def __init__(self, registry, key, fileName, maximum, displayType, priority, order):
+		super(_LoadCommand, self).__init__()
+
+		self.registry = registry
+		self.key = key
+		self.fileName = fileName
+		self.maximum = maximum
+		self.displayType = displayType
+		self.priority = priority
+		self.order = order
+		self.started = False
+		self.cancelled = False
+		self.imageData = None
+		self.done = threading.Event()
+
+	def __lt__(self, other):
+		return (self.priority, self.order) < (other.priority, other.order)
+
+	def execute(self):
+		with self.registry._lock:
+			if self.cancelled:
+				self.done.set()
+				return
+			self.started = True
+		try:
+			self.imageData = LoadDisplayVolume(self.fileName, self.maximum, self.displayType)
+		except Exception, e:
+			# acquire() will load the file again and report the error
+			print "Warning: could not prefetch", self.fileName, e
+		self.registry._prefetchFinished(self)
+		self.done.set()
@@ -0,0 +1,134 @@
+"""
+LandmarkIO
+
+Reading and writing of landmark sets. Landmark sets are lists of
+[fixedPoint, movingPoint] pairs where either of the points can be None.
+Points are in the local data coordinates of the fixed and moving data.
+
+Two formats are supported:
+- CSV with one landmark set per row:
+	index,fixed_x,fixed_y,fixed_z,moving_x,moving_y,moving_z
+  Coordinates of a missing point are left empty.
+- fcsv (3D Slicer markups). One fcsv file contains the points of one
+  data set, so a landmark set is stored as two fcsv files. Slicer uses
+  RAS coordinates, while the data coordinates are LPS (like DICOM and
+  ITK), so x and y are negated when reading and writing RAS files.
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import csv
+
+CsvHeader = ["index", "fixed_x", "fixed_y", "fixed_z", "moving_x", "moving_y", "moving_z"]
+FcsvHeader = [
+	"# Markups fiducial file version = 4.6",
+	"# CoordinateSystem = 0",
+	"# columns = id,x,y,z,ow,ox,oy,oz,vis,sel,lock,label,desc,associatedNodeID"
+]
+# Values of the CoordinateSystem field of fcsv files: older versions of
+# Slicer write a number, newer versions write the name
+FcsvRAS = ["0", "RAS"]
+FcsvLPS = ["1", "LPS"]
+
+
+def ReadLandmarksCsv(filename):
+	"""
+	Returns the landmark sets in the CSV file.
+
+	:rtype: list of [fixed, moving]
+	"""
+	landmarkSets = []
+	with open(filename, "rb") as csvFile:
+		for row in csv.reader(csvFile):
+			if not row or row[0].strip().startswith("#") or row[0].strip() == CsvHeader[0]:
+				continue
+			if len(row) < 7:
+				raise ValueError("Expected 7 columns in landmark file: " + ",".join(row))
+			landmarkSets.append([_ParsePoint(row[1:4]), _ParsePoint(row[4:7])])
+	return landmarkSets
+
+
+def WriteLandmarksCsv(filename, landmarkSets):
+	with open(filename, "wb") as csvFile:
+		writer = csv.writer(csvFile)
+		writer.writerow(CsvHeader)
+		for index in range(len(landmarkSets)):
+			fixed, moving = landmarkSets[index]
+			writer.writerow([index] + _FormatPoint(fixed) + _FormatPoint(moving))
+
+
+def ReadPointsFcsv(filename):
+	"""
+	Returns the points in a 3D Slicer markups (fcsv) file, converted to
+	LPS coordinates. Files without a CoordinateSystem field are RAS.
+
+	:rtype: list of points
+	"""
+	points = []
+	coordinateSystem = FcsvRAS[0]
+	with open(filename, "rb") as fcsvFile:
+		for row in csv.reader(fcsvFile):
+			if not row:
+				continue
+			if row[0].startswith("#"):
+				key, separator, value = row[0][1:].partition("=")
+				if key.strip() == "CoordinateSystem":
+					coordinateSystem = value.strip().upper()
+				continue
+			points.append([float(value) for value in row[1:4]])
+
+	if coordinateSystem in FcsvRAS:
+		return [_FlipRASLPS(point) for point in points]
+	if coordinateSystem in FcsvLPS:
+		return points
+	raise ValueError("Unsupported coordinate system in landmark file: " + coordinateSystem)
+
+
+def WritePointsFcsv(filename, points, prefix="F"):
+	"""
+	Writes the points as 3D Slicer markups in RAS coordinates. Missing
+	points (None) are skipped, but the label keeps the index of the
+	landmark set.
+	"""
+	with open(filename, "wb") as fcsvFile:
+		for line in FcsvHeader:
+			fcsvFile.write(line + "\n")
+		writer = csv.writer(fcsvFile)
+		for index in range(len(points)):
+			point = points[index]
+			if point is None:
+				continue
+			label = prefix + "-" + str(index + 1)
+			writer.writerow(["vtkMRMLMarkupsFiducialNode_" + str(index)] + _FormatPoint(_FlipRASLPS(point))
+				+ [0, 0, 0, 1, 1, 1, 0, label, "", ""])
+
+
+def LandmarkSetsFromPoints(fixedPoints, movingPoints):
+	"""
+	Combines two lists of points into landmark sets. The lists don't
+	have to be of equal length.
+	"""
+	count = max(len(fixedPoints), len(movingPoints))
+	fixedPoints = list(fixedPoints) + [None] * (count - len(fixedPoints))
+	movingPoints = list(movingPoints) + [None] * (count - len(movingPoints))
+	return [[fixedPoints[i], movingPoints[i]] for i in range(count)]
+
+
+def _ParsePoint(values):
+	if any(value.strip() == "" for value in values):
+		return None
+	return [float(value) for value in values]
+
+
+def _FlipRASLPS(point):
+	"""
+	Converts a point from RAS to LPS coordinates or the other way around.
+	"""
+	return [-point[0], -point[1], point[2]]
+
+
+def _FormatPoint(point):
+	if point is None:
+		return ["", "", ""]
+	return [repr(float(value)) for value in point]
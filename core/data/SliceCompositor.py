@@ -0,0 +1,166 @@
+"""
+SliceCompositor
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import numpy as np
+from vtk import vtkImageData
+from vtk import VTK_UNSIGNED_CHAR
+from vtk.util.numpy_support import vtk_to_numpy
+
+CompareModeAdd = "Add"
+CompareModeCheckerboard = "Checkerboard"
+CompareModeDifference = "Difference"
+CompareModeBlend = "Blend"
+
+CompareModes = [CompareModeAdd, CompareModeCheckerboard, CompareModeDifference, CompareModeBlend]
+
+
+class SliceCompositor(object):
+	"""
+	SliceCompositor fuses two 2D slices (for instance the reslice output of
+	two vtkImagePlaneWidgets) into one RGB image. The intensities of both
+	slices are mapped with the same window onto a ramp from black to the
+	color of the slice.
+	The result is written into an output image that is reused between calls,
+	so that no new vtk objects have to be created while scrolling.
+	"""
+
+	def __init__(self):
+		super(SliceCompositor, self).__init__()
+
+		self.mode = CompareModeAdd
+		self.fixedColor = [1.0, 1.0, 1.0]
+		self.movingColor = [1.0, 1.0, 1.0]
+		# Size of the checkerboard tiles in pixels
+		self.checkerSize = 16
+		# Opacity of the moving slice when blending
+		self.blendFactor = 0.5
+
+		self.output = vtkImageData()
+		self._outputArray = None
+		self._fixedBuffer = None
+		self._movingBuffer = None
+		self._resultBuffer = None
+		self._checkerMask = None
+		self._checkerKey = None
+
+	def setMode(self, mode):
+		if mode not in CompareModes:
+			raise ValueError("Unknown compare mode: " + str(mode))
+		self.mode = mode
+
+	def compose(self, fixedSlice, movingSlice, lower, upper):
+		"""
+		Maps both slices with the window [lower, upper] and combines them
+		into the output image with the current mode.
+
+		:type fixedSlice: vtkImageData
+		:type movingSlice: vtkImageData
+		:rtype: vtkImageData
+		"""
+		dimensions = fixedSlice.GetDimensions()
+		self._prepareOutput(fixedSlice)
+
+		fixed = self._sliceArray(fixedSlice)
+		moving = self._sliceArray(movingSlice)
+		if moving.shape != fixed.shape:
+			# Both slices should be sampled on the same grid, so just
+			# compare the part that they share
+			moving = self._resizedArray(moving, fixed.shape)
+
+		self._normalize(fixed, lower, upper, self._fixedBuffer)
+		self._normalize(moving, lower, upper, self._movingBuffer)
+
+		f = self._fixedBuffer
+		m = self._movingBuffer
+		result = self._resultBuffer
+		fixedColor = np.asarray(self.fixedColor, dtype=np.float32) * 255.0
+		movingColor = np.asarray(self.movingColor, dtype=np.float32) * 255.0
+
+		if self.mode == CompareModeAdd:
+			np.multiply(f[:, np.newaxis], fixedColor, out=result)
+			result += m[:, np.newaxis] * movingColor
+		elif self.mode == CompareModeBlend:
+			np.multiply(f[:, np.newaxis], fixedColor * (1.0 - self.blendFactor), out=result)
+			result += m[:, np.newaxis] * (movingColor * self.blendFactor)
+		elif self.mode == CompareModeDifference:
+			np.subtract(f, m, out=f)
+			np.abs(f, out=f)
+			f *= 255.0
+			result[:] = f[:, np.newaxis]
+		elif self.mode == CompareModeCheckerboard:
+			mask = self._checkerboard(dimensions)
+			np.multiply(f[:, np.newaxis], fixedColor, out=result)
+			result[mask] = m[mask, np.newaxis] * movingColor
+
+		np.clip(result, 0.0, 255.0, out=result)
+		self._outputArray[:] = result
+		self.output.GetPointData().GetScalars().Modified()
+		self.output.Modified()
+		return self.output
+
+	# Private methods
+
+	def _prepareOutput(self, imageData):
+		"""
+		(Re)allocates the output and the buffers only when the size of
+		the slices has changed.
+		"""
+		self.output.SetOrigin(imageData.GetOrigin())
+		self.output.SetSpacing(imageData.GetSpacing())
+		extent = imageData.GetExtent()
+		if self._outputArray is not None and tuple(self.output.GetExtent()) == tuple(extent):
+			return
+
+		self.output.SetExtent(extent)
+		self.output.AllocateScalars(VTK_UNSIGNED_CHAR, 3)
+		self._outputArray = vtk_to_numpy(self.output.GetPointData().GetScalars())
+		size = self._outputArray.shape[0]
+		self._fixedBuffer = np.empty(size, dtype=np.float32)
+		self._movingBuffer = np.empty(size, dtype=np.float32)
+		self._resultBuffer = np.empty((size, 3), dtype=np.float32)
+
+	def _sliceArray(self, imageData):
+		"""
+		Returns a view on the first component of the scalars.
+		"""
+		array = vtk_to_numpy(imageData.GetPointData().GetScalars())
+		if array.ndim > 1:
+			array = array[:, 0]
+		return array
+
+	def _resizedArray(self, array, shape):
+		result = np.zeros(shape, dtype=array.dtype)
+		size = min(array.shape[0], shape[0])
+		result[:size] = array[:size]
+		return result
+
+	def _normalize(self, array, lower, upper, out):
+		"""
+		Maps the values of array onto [0, 1] within the window [lower, upper].
+		"""
+		width = float(upper - lower)
+		if width == 0.0:
+			width = 1.0
+		np.subtract(array, lower, out=out)
+		out *= 1.0 / width
+		np.clip(out, 0.0, 1.0, out=out)
+
+	def _checkerboard(self, dimensions):
+		"""
+		Returns a flat boolean mask for the tiles that should show the
+		moving slice. The mask is cached for the given dimensions.
+		"""
+		key = (tuple(dimensions), self.checkerSize)
+		if key != self._checkerKey:
+			size = max(1, int(self.checkerSize))
+			x = np.arange(dimensions[0]) // size
+			y = np.arange(dimensions[1]) // size
+			tiles = (x[np.newaxis, :] + y[:, np.newaxis]) % 2 == 1
+			# Point data of vtkImageData is ordered with x running fastest
+			self._checkerMask = np.tile(tiles.ravel(), dimensions[2])
+			self._checkerKey = key
+		return self._checkerMask
@@ -0,0 +1,57 @@
+"""
+SubVolume
+
+Extraction of the part of a volume that lies within some bounds, so
+that only the region of interest has to be given to a mapper.
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import math
+from vtk import vtkExtractVOI
+
+
+def ExtentForBounds(imageData, bounds, margin=0):
+	"""
+	Returns the extent of the voxels of the image data that lie within
+	the bounds (in local coordinates), grown by margin voxels on every
+	side. Returns None if the extent covers the complete image data.
+
+	:rtype: list of 6 ints or None
+	"""
+	wholeExtent = imageData.GetExtent()
+	origin = imageData.GetOrigin()
+	spacing = imageData.GetSpacing()
+
+	extent = []
+	for axis in range(3):
+		lower = (bounds[2 * axis] - origin[axis]) / spacing[axis]
+		upper = (bounds[2 * axis + 1] - origin[axis]) / spacing[axis]
+		lower, upper = min(lower, upper), max(lower, upper)
+		extent.append(max(int(math.floor(lower)) - margin, wholeExtent[2 * axis]))
+		extent.append(min(int(math.ceil(upper)) + margin, wholeExtent[2 * axis + 1]))
+		# Keep at least one voxel when the bounds are outside of the data
+		if extent[-2] > extent[-1]:
+			extent[-2] = extent[-1] = min(max(extent[-2], wholeExtent[2 * axis]), wholeExtent[2 * axis + 1])
+
+	if extent == list(wholeExtent):
+		return None
+	return extent
+
+
+def ExtractSubVolume(imageData, extent):
+	"""
+	Returns a copy of the voxels within the extent. The copy keeps the
+	origin and spacing of the image data, so it stays at the same place.
+	If extent is None, the image data itself is returned.
+
+	:rtype: vtkImageData
+	"""
+	if extent is None:
+		return imageData
+	extractor = vtkExtractVOI()
+	extractor.SetInputData(imageData)
+	extractor.SetVOI(extent)
+	extractor.Update()
+	return extractor.GetOutput()
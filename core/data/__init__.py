@@ -1,4 +1,6 @@
 from DataReader import DataReader
 from DataWriter import DataWriter
 from DataResizer import DataResizer
+from DataQuantizer import DataQuantizer
 from DataTransformer import DataTransformer
+from DisplayVolumeRegistry import DisplayVolumeRegistry
@@ -38,7 +38,7 @@ class Elastix(object):
 		if not os.path.exists(command.outputFolder):
 			os.makedirs(command.outputFolder)
 
-		numberOfCores = multiprocessing.cpu_count()
+		numberOfCores = command.numberOfThreads or multiprocessing.cpu_count()
 
 		# Create Elastix command with the right parameters
 		commands = ["elastix",
@@ -0,0 +1,315 @@
+"""
+ElastixBatch
+
+Registration of cohorts: many moving data sets that are registered to
+a fixed data set (an atlas) with the same parameter file.
+
+A batch is described by a manifest: a CSV file with one registration per
+row. The columns are the fixed data, the moving data, the parameter file
+and (optionally) the output folder:
+
+	fixed,moving,parameters,output
+	atlas.mhd,subject01.mhd,Default Deformable
+	atlas.mhd,subject02.mhd,params/Custom.txt,results/subject02
+
+Relative paths are relative to the manifest. A parameter file can also be
+the name of one of the templates in resources/transformations.
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import csv
+import time
+import hashlib
+import threading
+import multiprocessing
+from Elastix import Elastix
+from ElastixCommand import ElastixCommand
+from ElastixLog import FinalMetric
+from ElastixLog import LogFile
+from core.worker import Command
+from core.worker import Operator
+from core.JournalFile import OpenJournalFile
+from core.JournalFile import WriteJournalRecord
+from core.JournalFile import ReadJournalFile
+
+# States of the rows of a batch
+StatePending = "pending"
+StateRunning = "running"
+StateDone = "done"
+StateFailed = "failed"
+
+# Name of the data set that elastix writes to the output folder
+ResultFile = "result.0.mhd"
+
+
+class BatchRow(object):
+	"""
+	BatchRow is one registration of a batch and its state.
+	"""
+
+	def __init__(self, fixedData, movingData, parameterFile, outputFolder):
+		super(BatchRow, self).__init__()
+
+		self.fixedData = fixedData
+		self.movingData = movingData
+		self.parameterFile = parameterFile
+		self.outputFolder = outputFolder
+		self.state = StatePending
+		self.runtime = None
+		self.metric = None
+		self.error = None
+
+	def inputs(self):
+		"""
+		Returns the absolute paths of the fixed data, the moving data and
+		the parameter file.
+
+		:rtype: dict
+		"""
+		return {"fixed": os.path.abspath(self.fixedData),
+			"moving": os.path.abspath(self.movingData),
+			"parameters": os.path.abspath(self.parameterFile)}
+
+	def key(self):
+		"""
+		Rows are identified by their inputs, so that the journal still
+		applies after rows are added to or removed from the manifest.
+		"""
+		return RowKey(self.fixedData, self.movingData, self.parameterFile)
+
+	def resultData(self):
+		return os.path.join(self.outputFolder, ResultFile)
+
+	def record(self):
+		record = {"key": self.key(), "state": self.state, "runtime": self.runtime,
+			"metric": self.metric, "error": self.error}
+		record.update(self.inputs())
+		return record
+
+
+def RowKey(fixedData, movingData, parameterFile):
+	"""
+	Returns a short hash of the absolute paths of the inputs of a row.
+
+	:rtype: str
+	"""
+	paths = [os.path.abspath(path) for path in [fixedData, movingData, parameterFile]]
+	return hashlib.sha1("\n".join(paths)).hexdigest()[:16]
+
+
+def ReadManifest(fileName, outputFolder=None, templateFolder=None):
+	"""
+	Returns the rows of the manifest. Rows without an output folder get a
+	folder in outputFolder (default: 'results' next to the manifest) that
+	is named after the moving data and the key of the row, so the folder
+	does not depend on the position of the row in the manifest.
+
+	:type fileName: str
+	:rtype: list of BatchRow
+	"""
+	manifestFolder = os.path.dirname(os.path.abspath(fileName))
+	if outputFolder is None:
+		outputFolder = os.path.join(manifestFolder, "results")
+
+	rows = []
+	with open(fileName, "r") as manifestFile:
+		for values in csv.reader(manifestFile):
+			values = [value.strip() for value in values]
+			if not values or not values[0] or values[0].startswith("#"):
+				continue
+			if values[0].lower() == "fixed":
+				# Header
+				continue
+			if len(values) < 3:
+				raise ValueError("Manifest row needs fixed, moving and parameter file: " + ",".join(values))
+
+			fixedData = _Path(manifestFolder, values[0])
+			movingData = _Path(manifestFolder, values[1])
+			parameterFile = _ParameterFile(manifestFolder, values[2], templateFolder)
+			if len(values) > 3 and values[3]:
+				rowOutputFolder = _Path(manifestFolder, values[3])
+			else:
+				name = os.path.splitext(os.path.basename(movingData))[0]
+				key = RowKey(fixedData, movingData, parameterFile)
+				rowOutputFolder = os.path.join(outputFolder, "%s-%s" % (name, key))
+			rows.append(BatchRow(fixedData, movingData, parameterFile, rowOutputFolder))
+	return rows
+
+
+class BatchJournal(object):
+	"""
+	BatchJournal writes every change of the state of a row as one JSON
+	line to a file, so the progress of a batch survives an interruption.
+	Records can be written from several threads. A record that was only
+	partly written when the batch was interrupted is removed.
+	"""
+
+	def __init__(self, fileName):
+		super(BatchJournal, self).__init__()
+
+		self.fileName = fileName
+		self._lock = threading.Lock()
+		self._file = OpenJournalFile(fileName)
+
+	def record(self, row):
+		record = row.record()
+		with self._lock:
+			WriteJournalRecord(self._file, record)
+
+	def close(self):
+		with self._lock:
+			self._file.close()
+
+
+def ReadBatchJournal(fileName):
+	"""
+	Returns the last record of every row in the journal. A record that was
+	only partly written when the batch was interrupted is ignored.
+
+	:rtype: dict
+	"""
+	records = dict()
+	for record in ReadJournalFile(fileName):
+		if "key" in record:
+			records[record["key"]] = record
+	return records
+
+
+class BatchRunner(object):
+	"""
+	BatchRunner runs the rows of a batch with a limited number of elastix
+	processes at the same time. The cores of the machine are divided over
+	the processes. Rows that are done according to the journal (and of
+	which the result still exists) are skipped, so an interrupted batch
+	continues where it stopped. Rows that were running or failed are run
+	again.
+	"""
+
+	def __init__(self, rows, journalFileName, numberOfProcesses=1):
+		super(BatchRunner, self).__init__()
+
+		self.rows = rows
+		self.journalFileName = journalFileName
+		self.numberOfProcesses = max(1, numberOfProcesses)
+		#: Function that runs an ElastixCommand
+		self.process = Elastix.process
+
+	def run(self):
+		"""
+		Runs the rows that are not done yet and blocks until they are
+		finished. Returns the number of rows that were run.
+
+		:rtype: int
+		"""
+		self.restore()
+		rows = [row for row in self.rows if row.state != StateDone]
+		if not rows:
+			return 0
+
+		numberOfThreads = max(1, multiprocessing.cpu_count() / self.numberOfProcesses)
+		journal = BatchJournal(self.journalFileName)
+		try:
+			operator = Operator(min(self.numberOfProcesses, len(rows)))
+			for row in rows:
+				operator.addCommand(_BatchCommand(self, journal, row, numberOfThreads))
+			operator.queue.join()
+		finally:
+			journal.close()
+		return len(rows)
+
+	def restore(self):
+		"""
+		Sets the states of the rows to the states in the journal. Records
+		of which the inputs differ from the inputs of the row are ignored.
+		"""
+		records = ReadBatchJournal(self.journalFileName)
+		for row in self.rows:
+			record = records.get(row.key())
+			if record is None:
+				continue
+			inputs = row.inputs()
+			if any(record.get(name) != path for name, path in inputs.items()):
+				continue
+			row.state = record["state"]
+			row.runtime = record["runtime"]
+			row.metric = record["metric"]
+			row.error = record["error"]
+			if row.state == StateDone and not os.path.exists(row.resultData()):
+				row.state = StatePending
+			elif row.state == StateRunning:
+				# Interrupted while running
+				row.state = StatePending
+
+	def summary(self):
+		"""
+		Returns the number of rows for every state.
+
+		:rtype: dict
+		"""
+		result = dict((state, 0) for state in [StatePending, StateRunning, StateDone, StateFailed])
+		for row in self.rows:
+			result[row.state] += 1
+		return result
+
+
+class _BatchCommand(Command):
+	"""
+	Runs elastix for one row of a batch on a worker of the operator.
+	"""
+
+	def __init__(self, runner, journal, row, numberOfThreads):
+		super(_BatchCommand, self).__init__()
+
+		self.runner = runner
+		self.journal = journal
+		self.row = row
+		self.numberOfThreads = numberOfThreads
+
+	def execute(self):
+		row = self.row
+		row.state = StateRunning
+		row.runtime = None
+		row.metric = None
+		row.error = None
+		self.journal.record(row)
+
+		start = time.time()
+		try:
+			if not os.path.exists(row.outputFolder):
+				os.makedirs(row.outputFolder)
+			command = ElastixCommand(fixedData=row.fixedData,
+				movingData=row.movingData,
+				outputFolder=row.outputFolder,
+				transformation=row.parameterFile,
+				numberOfThreads=self.numberOfThreads)
+			if not command.isValid():
+				raise IOError("Invalid input files or output folder")
+			self.runner.process(command)
+			if not os.path.exists(row.resultData()):
+				raise IOError("Elastix did not produce a result, see " + os.path.join(row.outputFolder, LogFile))
+			row.metric = FinalMetric(row.outputFolder)
+			row.state = StateDone
+		except Exception, e:
+			row.error = str(e)
+			row.state = StateFailed
+		row.runtime = time.time() - start
+		self.journal.record(row)
+
+
+def _Path(folder, path):
+	return os.path.normpath(os.path.join(folder, os.path.expanduser(path)))
+
+
+def _ParameterFile(folder, value, templateFolder):
+	path = _Path(folder, value)
+	if os.path.exists(path) or templateFolder is None:
+		return path
+	# Name of a template, with or without extension
+	for name in [value, value + ".txt"]:
+		templatePath = os.path.join(templateFolder, name)
+		if os.path.exists(templatePath):
+			return templatePath
+	return path
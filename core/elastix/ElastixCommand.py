@@ -21,7 +21,7 @@ class ElastixCommand(Command):
 	"""
 
 	def __init__(self, fixedData=None, movingData=None, outputFolder=None,
-		transformation=None, initialTransformation=None):
+		transformation=None, initialTransformation=None, numberOfThreads=None):
 		"""
 		Constructs a simple object with the provided parameters.
 
@@ -29,6 +29,8 @@ class ElastixCommand(Command):
 		:type movingData: str
 		:type outputFolder: str
 		:type transformation: str
+		:param numberOfThreads: Threads that elastix may use, all cores when None
+		:type numberOfThreads: int
 		"""
 		super(ElastixCommand, self).__init__()
 		
@@ -37,6 +39,7 @@ class ElastixCommand(Command):
 		self.outputFolder = outputFolder
 		self.transformation = transformation
 		self.initialTransformation = initialTransformation  # not tested
+		self.numberOfThreads = numberOfThreads
 
 	def isValid(self):
 		"""
@@ -0,0 +1,63 @@
+"""
+ElastixLog
+
+Reading of the results from the log that elastix writes to its output
+folder.
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import re
+
+# Name of the log that elastix writes to the output folder
+LogFile = "elastix.log"
+
+_finalMetricExpression = re.compile(r"Final metric value\s*=\s*(\S+)")
+# Rows of the iteration tables start with the iteration number and a tab
+_iterationExpression = re.compile(r"^\d+\t")
+
+
+def FinalMetric(outputFolder):
+	"""
+	Returns the last final metric value in the elastix log of the output
+	folder, or None when there is no log or no metric in it.
+
+	:rtype: float
+	"""
+	metric = None
+	for line in _LogLines(outputFolder):
+		match = _finalMetricExpression.search(line)
+		if match:
+			try:
+				metric = float(match.group(1))
+			except ValueError:
+				pass
+	return metric
+
+
+def IterationCount(outputFolder):
+	"""
+	Returns the number of optimizer iterations in the elastix log of the
+	output folder, summed over all resolutions, or None when there is no
+	log.
+
+	:rtype: int
+	"""
+	if not os.path.exists(os.path.join(outputFolder, LogFile)):
+		return None
+	iterations = 0
+	for line in _LogLines(outputFolder):
+		if _iterationExpression.match(line):
+			iterations += 1
+	return iterations
+
+
+def _LogLines(outputFolder):
+	fileName = os.path.join(outputFolder, LogFile)
+	if not os.path.exists(fileName):
+		return
+	with open(fileName, "r") as logFile:
+		for line in logFile:
+			yield line
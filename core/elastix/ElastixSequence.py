@@ -0,0 +1,225 @@
+"""
+ElastixSequence
+
+Registration of time series: every frame is registered to the same
+fixed data set (the reference).
+
+The optimum of a frame is usually very close to the optimum of the
+previous frame, so the transform that elastix found for a frame is used
+as the initial transform (-t0) of the next frame. Elastix writes the
+transform in the same parameter file format that TransformixTransformation
+produces. While elastix registers a frame, the next frame is read from
+disk in the background.
+
+The transform that elastix writes refers to its own initial transform
+(InitialTransformParametersFileName), which elastix reads and applies as
+well. Passing it on unchanged would make every frame evaluate the whole
+chain of the frames before it. Linear transforms are therefore flattened
+into one affine transform without an initial transform before they are
+passed on. Other transforms (like B-splines) are chained, up to
+maximumChainLength transforms, after which the chain starts again from
+the initial transform of the sequence.
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import time
+import multiprocessing
+from Elastix import Elastix
+from ElastixCommand import ElastixCommand
+from ElastixLog import FinalMetric
+from ElastixLog import IterationCount
+from ElastixLog import LogFile
+from LinearTransform import FlattenTransformation
+from core.worker import Command
+from core.worker import Operator
+
+# Name of the transform that elastix writes to the output folder
+TransformFile = "TransformParameters.0.txt"
+# Name of the flattened linear transform, written next to TransformFile
+LinearTransformFile = "TransformParameters.linear.txt"
+
+
+class SequenceFrame(object):
+	"""
+	SequenceFrame is one frame of a time series and its registration result.
+	"""
+
+	def __init__(self, movingData, outputFolder):
+		super(SequenceFrame, self).__init__()
+
+		self.movingData = movingData
+		self.outputFolder = outputFolder
+		self.initialTransformation = None
+		self.success = False
+		self.runtime = None
+		self.readTime = None
+		self.iterations = None
+		self.metric = None
+		self.error = None
+
+	def transformation(self):
+		return os.path.join(self.outputFolder, TransformFile)
+
+	def linearTransformation(self):
+		return os.path.join(self.outputFolder, LinearTransformFile)
+
+	def record(self):
+		return {"movingData": self.movingData, "outputFolder": self.outputFolder,
+			"initialTransformation": self.initialTransformation, "success": self.success,
+			"runtime": self.runtime, "readTime": self.readTime,
+			"iterations": self.iterations, "metric": self.metric, "error": self.error}
+
+
+class SequenceRunner(object):
+	"""
+	SequenceRunner registers the frames of a time series in order. When
+	warmStart is enabled, the result of a frame is the initial transform of
+	the next frame. A frame that fails does not break the chain: the next
+	frame starts from the last transform that was found.
+
+	Linear transforms are passed on as one flattened affine transform.
+	Other transforms refer to the transform of the frame before them, so at
+	most maximumChainLength of them are chained.
+	"""
+
+	def __init__(self, fixedData, frames, parameterFile, outputFolder, initialTransformation=None):
+		"""
+		:param frames: File names of the frames, in order
+		:type frames: list of str
+		:param initialTransformation: Initial transform of the first frame
+		:type initialTransformation: str
+		"""
+		super(SequenceRunner, self).__init__()
+
+		self.fixedData = fixedData
+		self.parameterFile = parameterFile
+		self.initialTransformation = initialTransformation
+		self.warmStart = True
+		#: Maximum number of transforms that elastix reads for the initial
+		#: transform of a frame, when the transforms can not be flattened
+		self.maximumChainLength = 8
+		self.numberOfThreads = multiprocessing.cpu_count()
+		#: Function that runs an ElastixCommand
+		self.process = Elastix.process
+
+		self.frames = []
+		for index, movingData in enumerate(frames):
+			name = os.path.splitext(os.path.basename(movingData))[0]
+			frameFolder = os.path.join(outputFolder, "%04d-%s" % (index, name))
+			self.frames.append(SequenceFrame(movingData, frameFolder))
+
+	def run(self):
+		"""
+		Registers all frames and blocks until they are done. Returns the
+		number of frames that were registered successfully.
+
+		:rtype: int
+		"""
+		# One worker reads the next frame while elastix runs
+		reader = Operator()
+		if self.frames:
+			reader.addCommand(_ReadFrameCommand(self.frames[0]))
+
+		initialTransformation = self.initialTransformation
+		chainLength = 1 if initialTransformation else 0
+		for index, frame in enumerate(self.frames):
+			reader.queue.join()
+			if index + 1 < len(self.frames):
+				reader.addCommand(_ReadFrameCommand(self.frames[index + 1]))
+
+			frame.initialTransformation = initialTransformation
+			self._register(frame)
+			if not frame.success or not self.warmStart or not os.path.exists(frame.transformation()):
+				continue
+			if FlattenTransformation(frame.transformation(), frame.linearTransformation()):
+				initialTransformation = frame.linearTransformation()
+				chainLength = 1
+			elif chainLength < self.maximumChainLength:
+				initialTransformation = frame.transformation()
+				chainLength += 1
+			else:
+				initialTransformation = self.initialTransformation
+				chainLength = 1 if initialTransformation else 0
+		reader.queue.join()
+		return len([frame for frame in self.frames if frame.success])
+
+	def report(self):
+		"""
+		Returns the results and timings of the frames and the totals, so that
+		runs with and without warm start can be compared.
+
+		:rtype: dict
+		"""
+		frames = [frame for frame in self.frames if frame.success]
+		return {"warmStart": self.warmStart,
+			"succeeded": len(frames),
+			"failed": len(self.frames) - len(frames),
+			"runtime": sum(frame.runtime for frame in frames),
+			"iterations": sum(frame.iterations or 0 for frame in frames),
+			"frames": [frame.record() for frame in self.frames]}
+
+	def _register(self, frame):
+		start = time.time()
+		try:
+			if not os.path.exists(frame.outputFolder):
+				os.makedirs(frame.outputFolder)
+			command = ElastixCommand(fixedData=self.fixedData,
+				movingData=frame.movingData,
+				outputFolder=frame.outputFolder,
+				transformation=self.parameterFile,
+				initialTransformation=frame.initialTransformation,
+				numberOfThreads=self.numberOfThreads)
+			if not command.isValid():
+				raise IOError("Invalid input files or output folder")
+			self.process(command)
+			if not os.path.exists(frame.transformation()):
+				raise IOError("Elastix did not produce a transform, see " + os.path.join(frame.outputFolder, LogFile))
+			frame.success = True
+		except Exception, e:
+			frame.error = str(e)
+		frame.runtime = time.time() - start
+		frame.iterations = IterationCount(frame.outputFolder)
+		frame.metric = FinalMetric(frame.outputFolder)
+
+
+class _ReadFrameCommand(Command):
+	"""
+	Reads the files of a frame, so that they are in the file cache of the
+	operating system when elastix opens them.
+	"""
+
+	def __init__(self, frame):
+		super(_ReadFrameCommand, self).__init__()
+
+		self.frame = frame
+
+	def execute(self):
+		start = time.time()
+		try:
+			for fileName in _DataFiles(self.frame.movingData):
+				with open(fileName, "rb") as dataFile:
+					while dataFile.read(1024 * 1024):
+						pass
+		except IOError:
+			# Elastix will report the missing file
+			pass
+		self.frame.readTime = time.time() - start
+
+
+def _DataFiles(fileName):
+	"""
+	Returns the files of a data set: the header and the raw data file of
+	a MetaImage header (.mhd), otherwise just the file itself.
+	"""
+	fileNames = [fileName]
+	if not fileName.lower().endswith(".mhd"):
+		return fileNames
+	with open(fileName, "r") as headerFile:
+		for line in headerFile:
+			key, separator, value = line.partition("=")
+			if key.strip() == "ElementDataFile" and value.strip() != "LOCAL":
+				fileNames.append(os.path.join(os.path.dirname(fileName), value.strip()))
+	return fileNames
@@ -0,0 +1,170 @@
+"""
+LinearTransform
+
+Reading and composing of the linear transforms in the transform parameter
+files that elastix writes (TransformParameters.0.txt).
+
+A transform parameter file can point to an initial transform with
+InitialTransformParametersFileName. Elastix then applies the initial
+transform first and this transform after it (HowToCombineTransforms
+"Compose"). FlattenTransformation() replaces such a chain of linear
+transforms by one affine transform without an initial transform.
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import re
+import numpy as np
+
+NoInitialTransform = "NoInitialTransform"
+
+# Transforms that can be written as a matrix
+LinearTransforms = ["TranslationTransform", "EulerTransform", "AffineTransform"]
+
+# Parameters that describe the fixed image, copied to the flattened transform
+_imageParameters = ["FixedImageDimension", "MovingImageDimension",
+	"FixedInternalImagePixelType", "MovingInternalImagePixelType",
+	"UseDirectionCosines", "Size", "Index", "Spacing", "Origin", "Direction"]
+
+_parameterExpression = re.compile(r"^\s*\((\w+)\s+(.*)\)\s*$")
+_valueExpression = re.compile(r'"[^"]*"|\S+')
+
+
+def ReadTransformParameters(fileName):
+	"""
+	Returns the parameters in a transform parameter file as a dictionary of
+	parameter names and lists of values (strings, without quotes).
+
+	:rtype: dict
+	"""
+	parameters = dict()
+	with open(fileName, "r") as parameterFile:
+		for line in parameterFile:
+			line = line.split("//")[0]
+			match = _parameterExpression.match(line)
+			if not match:
+				continue
+			values = _valueExpression.findall(match.group(2))
+			parameters[match.group(1)] = [value.strip('"') for value in values]
+	return parameters
+
+
+def TransformMatrix(parameters):
+	"""
+	Returns the homogeneous matrix of the transform in the parameters (as
+	returned by ReadTransformParameters) or None if the transform is not
+	linear. The initial transform is not included.
+
+	:rtype: numpy.ndarray
+	"""
+	transform = parameters.get("Transform", [None])[0]
+	if transform not in LinearTransforms:
+		return None
+	try:
+		dimension = int(parameters.get("FixedImageDimension", [3])[0])
+		values = [float(value) for value in parameters["TransformParameters"]]
+		center = [float(value) for value in parameters.get("CenterOfRotationPoint", [0.0] * dimension)]
+	except (KeyError, ValueError):
+		return None
+
+	if transform == "TranslationTransform":
+		rotation = np.identity(dimension)
+		translation = values[:dimension]
+	elif transform == "AffineTransform":
+		# Matrix in row-major order, followed by the translation
+		rotation = np.array(values[:dimension * dimension]).reshape(dimension, dimension)
+		translation = values[dimension * dimension:]
+	elif dimension == 2:
+		rotation = _RotationZ(values[0])[:2, :2]
+		translation = values[1:]
+	else:
+		rotationX = _RotationX(values[0])
+		rotationY = _RotationY(values[1])
+		rotationZ = _RotationZ(values[2])
+		if parameters.get("ComputeZYX", ["false"])[0] == "true":
+			rotation = np.dot(rotationZ, np.dot(rotationY, rotationX))
+		else:
+			rotation = np.dot(rotationZ, np.dot(rotationX, rotationY))
+		translation = values[3:]
+	if len(translation) != dimension or len(center) != dimension:
+		return None
+
+	# T(x) = R (x - c) + c + t
+	center = np.array(center)
+	matrix = np.identity(dimension + 1)
+	matrix[:dimension, :dimension] = rotation
+	matrix[:dimension, dimension] = center + np.array(translation) - np.dot(rotation, center)
+	return matrix
+
+
+def FlattenTransformation(fileName, outputFileName):
+	"""
+	Writes the transform of a transform parameter file, composed with its
+	chain of initial transforms, as one affine transform without an initial
+	transform. Returns False (and writes nothing) if a transform in the
+	chain is not linear.
+
+	:rtype: bool
+	"""
+	parameters = ReadTransformParameters(fileName)
+	matrix = _ChainMatrix(parameters)
+	if matrix is None:
+		return False
+
+	dimension = matrix.shape[0] - 1
+	values = list(matrix[:dimension, :dimension].flatten()) + list(matrix[:dimension, dimension])
+	lines = ['(Transform "AffineTransform")',
+		"(NumberOfParameters %d)" % len(values),
+		"(TransformParameters %s)" % " ".join(repr(float(value)) for value in values),
+		'(InitialTransformParametersFileName "%s")' % NoInitialTransform,
+		'(HowToCombineTransforms "Compose")',
+		"(CenterOfRotationPoint %s)" % " ".join(["0.0"] * dimension)]
+	for key in _imageParameters:
+		if key in parameters:
+			lines.append("(%s %s)" % (key, " ".join(_FormatValue(value) for value in parameters[key])))
+	with open(outputFileName, "w") as parameterFile:
+		parameterFile.write("\n".join(lines) + "\n")
+	return True
+
+
+def _ChainMatrix(parameters):
+	matrix = TransformMatrix(parameters)
+	if matrix is None:
+		return None
+	initialFileName = parameters.get("InitialTransformParametersFileName", [NoInitialTransform])[0]
+	if initialFileName == NoInitialTransform:
+		return matrix
+	if parameters.get("HowToCombineTransforms", ["Compose"])[0] != "Compose":
+		return None
+	if not os.path.exists(initialFileName):
+		return None
+	initialMatrix = _ChainMatrix(ReadTransformParameters(initialFileName))
+	if initialMatrix is None or initialMatrix.shape != matrix.shape:
+		return None
+	# The initial transform is applied first
+	return np.dot(matrix, initialMatrix)
+
+
+def _FormatValue(value):
+	try:
+		float(value)
+		return value
+	except ValueError:
+		return '"%s"' % value
+
+
+def _RotationX(angle):
+	cosine, sine = np.cos(angle), np.sin(angle)
+	return np.array([[1.0, 0.0, 0.0], [0.0, cosine, -sine], [0.0, sine, cosine]])
+
+
+def _RotationY(angle):
+	cosine, sine = np.cos(angle), np.sin(angle)
+	return np.array([[cosine, 0.0, sine], [0.0, 1.0, 0.0], [-sine, 0.0, cosine]])
+
+
+def _RotationZ(angle):
+	cosine, sine = np.cos(angle), np.sin(angle)
+	return np.array([[cosine, -sine, 0.0], [sine, cosine, 0.0], [0.0, 0.0, 1.0]])
@@ -3,3 +3,5 @@ from ElastixCommand import ElastixCommand
 from Parameter import Parameter
 from ParameterList import ParameterList
 from TransformixTransformation import TransformixTransformation
+from ElastixBatch import BatchRunner
+from ElastixSequence import SequenceRunner
@@ -9,7 +9,7 @@ Input is never adjusted.
 """
 import math
 import collections
-from vtk import vtkMath
+import numpy as np
 
 
 def Dot(u, v):
@@ -81,35 +81,8 @@ def ClosestPoints(p1, p2, q1, q2, clamp=False):
 		to clamp the output between the two given points.
 	return: the two closest points on line p and q
 	"""
-	u = Subtract(p2, p1)
-	v = Subtract(q2, q1)
-	w = Subtract(p1, q1)
-	a = Dot(u, u)  # always >= 0
-	b = Dot(u, v)
-	c = Dot(v, v)  # always >= 0
-	d = Dot(u, w)
-	e = Dot(v, w)
-	D = a * c - b * b  # always >= 0
-	sc = tc = 0.0
-
-	# compute the line parameters of the two closest points
-	if (D < 0.0000001):  # the lines are almost parallel
-		sc = 0.0
-		if b > c:  # use the largest denominator
-			tc = d / b
-		else:
-			tc = e / c
-	else:
-		sc = (b * e - c * d) / D
-		tc = (a * e - b * d) / D
-
-	if clamp:
-		sc = max(sc, 0)
-		tc = max(sc, 0)
-		sc = min(sc, 1)
-		tc = min(tc, 1)
-
-	return Add(Multiply(u, sc), p1), Add(Multiply(v, tc), q1)
+	closestP, closestQ = ClosestPointsBatch(p1, p2, q1, q2, clamp)
+	return list(closestP[0]), list(closestQ[0])
 
 
 def LineIntersectionWithTriangle(pointA, pointB, triangle):
@@ -123,40 +96,153 @@ def LineIntersectionWithTriangle(pointA, pointB, triangle):
 	specified triangle.
 	:rtype: bool, list(3)
 	"""
-	A = pointA
-	B = pointB
-	P0 = triangle[0]
-	P1 = triangle[1]
-	P2 = triangle[2]
-
-	matrix = [[0 for x in range(3)] for x in range(3)]
-	matrix[0][0] = A[0] - B[0]
-	matrix[1][0] = A[1] - B[1]
-	matrix[2][0] = A[2] - B[2]
-	matrix[0][1] = P1[0] - P0[0]
-	matrix[1][1] = P1[1] - P0[1]
-	matrix[2][1] = P1[2] - P0[2]
-	matrix[0][2] = P2[0] - P0[0]
-	matrix[1][2] = P2[1] - P0[1]
-	matrix[2][2] = P2[2] - P0[2]
-
-	inVector = [0 for x in range(3)]
-	inVector[0] = A[0] - P0[0]
-	inVector[1] = A[1] - P0[1]
-	inVector[2] = A[2] - P0[2]
-
-	outVector = [0 for x in range(3)]
-	vtkMath.LinearSolve3x3(matrix, inVector, outVector)
-
-	intersectsTriangle = False
-	if (outVector[0] >= 0 and outVector[0] <= 1
-		and outVector[1] >= 0 and outVector[1] <= 1
-		and outVector[2] >= 0 and outVector[2] <= 1
-		and outVector[1] + outVector[2] <= 1):
-		intersectsTriangle = True
-
-	# intersection = Ia + (Ib - Ia)*t
-	vec = Subtract(pointB, pointA)
-	vec = Multiply(vec, outVector[0])
-	intersection = Add(pointA, vec)
-	return intersectsTriangle, intersection
+	hits, intersections = LineIntersectionsWithTriangles(pointA, pointB, [triangle])
+	return bool(hits[0]), list(intersections[0])
+
+
+# Batch operations. These work on numpy arrays of vectors (shape (n, 3))
+# and also accept a single vector, which is treated as a batch of one.
+
+def MatrixToArray(matrix):
+	"""
+	Returns a 4x4 numpy array for a vtkMatrix4x4 or a nested list.
+	"""
+	if hasattr(matrix, "GetElement"):
+		return np.array([[matrix.GetElement(i, j) for j in range(4)] for i in range(4)])
+	return np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+
+
+def TransformPoints(matrix, points):
+	"""
+	Transforms a batch of points with a 4x4 matrix (vtkMatrix4x4 or array).
+	:rtype: numpy array (n, 3)
+	"""
+	matrix = MatrixToArray(matrix)
+	points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+	result = np.dot(points, matrix[0:3, 0:3].T) + matrix[0:3, 3]
+	w = np.dot(points, matrix[3, 0:3]) + matrix[3, 3]
+	if np.any(w != 1.0):
+		result /= w[:, np.newaxis]
+	return result
+
+
+def TransformVectors(matrix, vectors):
+	"""
+	Transforms a batch of direction vectors with the linear part of a 4x4
+	matrix (the translation is ignored).
+	:rtype: numpy array (n, 3)
+	"""
+	matrix = MatrixToArray(matrix)
+	vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+	return np.dot(vectors, matrix[0:3, 0:3].T)
+
+
+def ClosestPointsBatch(p1, p2, q1, q2, clamp=False):
+	"""
+	Batch version of ClosestPoints: for every pair of lines p and q returns
+	the closest points on line p and on line q.
+	:rtype: numpy array (n, 3), numpy array (n, 3)
+	"""
+	p1 = np.asarray(p1, dtype=np.float64).reshape(-1, 3)
+	p2 = np.asarray(p2, dtype=np.float64).reshape(-1, 3)
+	q1 = np.asarray(q1, dtype=np.float64).reshape(-1, 3)
+	q2 = np.asarray(q2, dtype=np.float64).reshape(-1, 3)
+	u = p2 - p1
+	v = q2 - q1
+	w = p1 - q1
+	a = np.einsum("ij,ij->i", u, u)  # always >= 0
+	b = np.einsum("ij,ij->i", u, v)
+	c = np.einsum("ij,ij->i", v, v)  # always >= 0
+	d = np.einsum("ij,ij->i", u, w)
+	e = np.einsum("ij,ij->i", v, w)
+	D = a * c - b * b  # always >= 0
+
+	with np.errstate(divide="ignore", invalid="ignore"):
+		sc = (b * e - c * d) / D
+		tc = (a * e - b * d) / D
+		# When the lines are almost parallel, use the largest denominator
+		parallel = D < 0.0000001
+		sc[parallel] = 0.0
+		tc[parallel] = np.where(b > c, d / b, e / c)[parallel]
+
+	if clamp:
+		sc = np.clip(sc, 0.0, 1.0)
+		tc = np.clip(tc, 0.0, 1.0)
+
+	return p1 + u * sc[:, np.newaxis], q1 + v * tc[:, np.newaxis]
+
+
+def LineIntersectionsWithTriangles(pointA, pointB, triangles):
+	"""
+	Batch version of LineIntersectionWithTriangle. The lines and the
+	triangles are broadcast against each other, so one line can be tested
+	against many triangles (or many lines against one triangle).
+	:type triangles: array-like (m, 3, 3)
+	:rtype: numpy array of bools, numpy array (n, 3)
+	"""
+	A = np.asarray(pointA, dtype=np.float64).reshape(-1, 3)
+	B = np.asarray(pointB, dtype=np.float64).reshape(-1, 3)
+	triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+	P0 = triangles[:, 0]
+
+	# Solve [A - B, P1 - P0, P2 - P0] * x = A - P0 with Cramer's rule
+	col0 = A - B
+	col1 = triangles[:, 1] - P0
+	col2 = triangles[:, 2] - P0
+	rhs = A - P0
+	col0, col1, col2, rhs, A, B = np.broadcast_arrays(col0, col1, col2, rhs, A, B)
+
+	cross12 = np.cross(col1, col2)
+	det = np.einsum("ij,ij->i", col0, cross12)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		t = np.einsum("ij,ij->i", rhs, cross12) / det
+		s1 = np.einsum("ij,ij->i", col0, np.cross(rhs, col2)) / det
+		s2 = np.einsum("ij,ij->i", col0, np.cross(col1, rhs)) / det
+	singular = det == 0
+	t[singular] = 0.0
+	s1[singular] = 0.0
+	s2[singular] = 0.0
+
+	hits = ((t >= 0) & (t <= 1) & (s1 >= 0) & (s1 <= 1)
+		& (s2 >= 0) & (s2 <= 1) & (s1 + s2 <= 1) & ~singular)
+	intersections = A + (B - A) * t[:, np.newaxis]
+	return hits, intersections
+
+
+def RayBoxIntersections(origins, directions, bounds, matrix=None):
+	"""
+	Slab test for a batch of rays against a box. The box is defined by
+	bounds (xmin, xmax, ymin, ymax, zmin, zmax) in local coordinates and
+	an optional 4x4 matrix that transforms the box into the coordinates of
+	the rays. The rays are given by origins + t * directions.
+	Returns for every ray whether it hits the box and the parameters t
+	where the ray enters and exits the box.
+	:rtype: numpy array of bools, numpy array, numpy array
+	"""
+	origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+	directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+	if matrix is not None:
+		# Transform the rays into the local coordinates of the box. The
+		# ray parameter t is invariant under affine transformations.
+		inverse = np.linalg.inv(MatrixToArray(matrix))
+		origins = TransformPoints(inverse, origins)
+		directions = TransformVectors(inverse, directions)
+
+	lower = np.array(bounds[0::2], dtype=np.float64)
+	upper = np.array(bounds[1::2], dtype=np.float64)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		t1 = (lower - origins) / directions
+		t2 = (upper - origins) / directions
+	tMin = np.minimum(t1, t2)
+	tMax = np.maximum(t1, t2)
+
+	# Rays that run parallel to a slab either lie within the slab or miss it
+	parallel = directions == 0
+	inside = (origins >= lower) & (origins <= upper)
+	tMin[parallel] = np.where(inside, -np.inf, np.inf)[parallel]
+	tMax[parallel] = np.where(inside, np.inf, -np.inf)[parallel]
+
+	tNear = tMin.max(axis=1)
+	tFar = tMax.min(axis=1)
+	hits = tNear <= tFar
+	return hits, tNear, tFar
@@ -23,6 +23,8 @@ class Project(object):
 		self.movingSettings = None
 		self.multiSettings = None
 		self.transformations = None
+		# Sequence number of the last journal record that is part of the project
+		self.journalSequence = 0
 
 	def __eq__(self, other):
 		if not isinstance(other, Project):
@@ -8,9 +8,19 @@ ProjectController
 from PySide.QtCore import QObject
 from PySide.QtCore import Slot
 from PySide.QtCore import Signal
-import yaml
+from PySide.QtCore import QTimer
 
 from Project import Project
+from ProjectSerializer import ProjectSerializer
+from ProjectJournal import ProjectJournal
+from ProjectJournal import RecordTransformations
+from ProjectJournal import RecordSettings
+from ProjectJournal import RecordLandmarks
+from ProjectFolder import ReadProject
+import ProjectFolder
+from core.vtkObjectWrapper import vtkTransformWrapper
+from core.data.DisplayVolumeRegistry import DisplayVolumeRegistry
+from core.data.DisplayVolumeRegistry import PriorityLow
 from core.decorators import Singleton
 
 
@@ -29,8 +39,10 @@ class ProjectController(QObject):
 	multiSettingsChanged = Signal(object)
 	projectChanged = Signal(Project)
 
-	# Define the standard project file name
-	ProjectFile = u"/project.yaml"
+	# Names of the files in the project folder
+	ProjectFile = ProjectFolder.ProjectFile
+	LegacyProjectFile = ProjectFolder.LegacyProjectFile
+	JournalFile = ProjectFolder.JournalFile
 
 	def __init__(self, project=None):
 		"""
@@ -49,6 +61,22 @@ class ProjectController(QObject):
 		if self.currentProject is None:
 			self.currentProject = Project()
 
+		#: Number of data sets in the transformation history that are prefetched
+		self.numberOfHistoryPrefetches = 2
+
+		self.journal = ProjectJournal()
+		#: Number of journal records after which the project is saved
+		self.compactionThreshold = 500
+		self._journaling = True
+		self._transformationState = []
+		# Render settings are written to the journal after a short delay,
+		# so that dragging a slider does not write a record for every step
+		self._dirtySettings = set()
+		self._settingsTimer = QTimer(self)
+		self._settingsTimer.setSingleShot(True)
+		self._settingsTimer.setInterval(1000)
+		self._settingsTimer.timeout.connect(self._recordSettings)
+
 	def loadProject(self, folder=None):
 		"""
 		:param folder: Directory of project
@@ -56,12 +84,9 @@ class ProjectController(QObject):
 		:returns:: Success, whether the project could be loaded
 		:rtype: bool
 		"""
-		projectFileName = folder + self.ProjectFile
-		projectFile = open(projectFileName, "r")
-
 		try:
-			project = yaml.load(projectFile)
-			self.currentProject = project
+			# Also recovers the changes that were not saved (after a crash)
+			self.currentProject = ReadProject(folder)
 		except Exception, e:
 			print e
 			return False
@@ -70,12 +95,19 @@ class ProjectController(QObject):
 			self.currentProject = Project()
 			return False
 
+		# Start loading both data sets at once, the controllers will
+		# use the results when the file changed signals are emitted
+		self._prefetchData(self.currentProject)
+
+		# Loading the project should not end up in the journal
+		self._journaling = False
 		self.projectChanged.emit(self.currentProject)
 		self.fixedFileChanged.emit(self.currentProject.fixedData)
 		self.movingFileChanged.emit(self.currentProject.movingData)
 		self.fixedSettingsChanged.emit(self.currentProject.fixedSettings)
 		self.movingSettingsChanged.emit(self.currentProject.movingSettings)
 		self.multiSettingsChanged.emit(self.currentProject.multiSettings)
+		self._startJournal()
 
 		return True
 
@@ -96,23 +128,29 @@ class ProjectController(QObject):
 			self.currentProject.movingSettings = self.movingRenderController.getRenderSettings()
 		if self.multiRenderController:
 			self.currentProject.multiSettings = self.multiRenderController.getRenderSettings()
+		self.currentProject.journalSequence = self.journal.sequence
+		self._settingsTimer.stop()
+		self._dirtySettings = set()
 
 		try:
 			projectFileName = self.currentProject.folder + self.ProjectFile
-			projectFile = open(projectFileName, "w+")
-
-			# Create a readable project file
-			yaml.dump(self.currentProject, projectFile, default_flow_style=False)
-			projectFile.close()
+			serializer = ProjectSerializer()
+			serializer.saveProject(self.currentProject, projectFileName)
 		except Exception, e:
 			print e
 			return False
 
+		# The saved project contains all the changes of the journal
+		if self.journal.fileName == self.currentProject.folder + self.JournalFile:
+			self.journal.clear()
+		else:
+			self._startJournal()
+
 		# TODO:
 		# If folder is empty:
 			# If the project is set to not reference the datasets:
 				# Copy fixed/moving data over and update the data references
-			# Save a yaml representation of the project into the directory
+			# Save a representation of the project into the directory
 		# If folder is not empty:
 			# Ask the user if it should be emptied
 
@@ -121,6 +159,10 @@ class ProjectController(QObject):
 	def newProject(self):
 		# Set a new project as current project
 		self.currentProject = Project()
+		registry = DisplayVolumeRegistry.Instance()
+		registry.cancelPrefetches()
+		registry.clearCache()
+		self._journaling = False
 		# Send out the signals!
 		self.projectChanged.emit(self.currentProject)
 		self.fixedFileChanged.emit(self.currentProject.fixedData)
@@ -128,6 +170,53 @@ class ProjectController(QObject):
 		self.fixedSettingsChanged.emit(self.currentProject.fixedSettings)
 		self.movingSettingsChanged.emit(self.currentProject.movingSettings)
 		self.multiSettingsChanged.emit(self.currentProject.multiSettings)
+		self._startJournal()
+
+	# Slots for the journal
+
+	@Slot(object)
+	def transformationsChanged(self, transformations):
+		"""
+		Writes the changes of the transformation list to the journal. Only
+		the transformations after the first changed transformation are
+		written.
+
+		:type transformations: TransformationList
+		"""
+		if not self._journaling:
+			return
+		state = _TransformationState(transformations)
+		keep = 0
+		while (keep < len(state) and keep < len(self._transformationState)
+			and state[keep] == self._transformationState[keep]):
+			keep += 1
+		if keep == len(state) and keep == len(self._transformationState):
+			return
+		self._transformationState = state
+		appended = transformations.getPythonVersion()[keep:]
+		self._record(RecordTransformations, {"keep": keep, "append": appended})
+
+	@Slot(object)
+	def fixedSettingsUpdated(self, visualization=None):
+		self._settingsUpdated("fixedSettings")
+
+	@Slot(object)
+	def movingSettingsUpdated(self, visualization=None):
+		self._settingsUpdated("movingSettings")
+
+	@Slot(object)
+	def multiSettingsUpdated(self, visualization=None):
+		self._settingsUpdated("multiSettings")
+
+	def recordLandmarks(self, index, landmarks, transform):
+		"""
+		Writes the landmarks and the transform of the landmark transformation
+		at index to the journal.
+		"""
+		if not self._journaling:
+			return
+		data = {"index": index, "landmarks": landmarks, "transform": vtkTransformWrapper(transform)}
+		self._record(RecordLandmarks, data)
 
 	# Slots for signals of SlicerWidget
 	@Slot(basestring)
@@ -157,3 +246,101 @@ class ProjectController(QObject):
 
 		# Emit signal that data set file name has changed
 		self.movingFileChanged.emit(self.currentProject.movingData)
+
+	# Private methods
+
+	def _prefetchData(self, project):
+		"""
+		Starts loading the fixed and moving data of the project in the
+		background. The data of the most recent transformations in the
+		history is loaded at low priority.
+		"""
+		registry = DisplayVolumeRegistry.Instance()
+		registry.cancelPrefetches()
+		registry.prefetch(project.fixedData)
+		registry.prefetch(project.movingData)
+		for fileName in _HistoryFileNames(project, self.numberOfHistoryPrefetches):
+			registry.prefetch(fileName, priority=PriorityLow)
+
+	def _startJournal(self):
+		"""
+		Opens the journal of the current project and remembers the current
+		transformations, so that only changes are written.
+		"""
+		self._settingsTimer.stop()
+		self._dirtySettings = set()
+		self.journal.close()
+		if self.currentProject.folder:
+			try:
+				self.journal.open(self.currentProject.folder + self.JournalFile,
+					self.currentProject.journalSequence)
+			except IOError, e:
+				print e
+		self._transformationState = []
+		if self.multiRenderController:
+			transformations = self.multiRenderController.multiRenderWidget.transformations
+			self._transformationState = _TransformationState(transformations)
+		self._journaling = True
+
+	def _settingsUpdated(self, name):
+		if not self._journaling or not self.journal.isOpen():
+			return
+		self._dirtySettings.add(name)
+		self._settingsTimer.start()
+
+	def _recordSettings(self):
+		controllers = {
+			"fixedSettings": self.fixedRenderController,
+			"movingSettings": self.movingRenderController,
+			"multiSettings": self.multiRenderController}
+		for name in sorted(self._dirtySettings):
+			if controllers[name] is None:
+				continue
+			settings = dict(controllers[name].getRenderSettings())
+			# Transformations have their own records
+			settings.pop("transformations", None)
+			self._record(RecordSettings, {"name": name, "settings": settings})
+		self._dirtySettings = set()
+
+	def _record(self, recordType, data):
+		if not self.journal.isOpen():
+			return
+		try:
+			self.journal.record(recordType, data)
+		except Exception, e:
+			print e
+			return
+		# Compact the journal into a new snapshot of the project
+		if self.journal.numberOfRecords >= self.compactionThreshold:
+			self.saveProject()
+
+
+def _TransformationState(transformations):
+	"""
+	Returns a list that identifies the transformations and their transforms,
+	so that changes of the transformation list can be found.
+	"""
+	state = []
+	for index in range(len(transformations)):
+		transformation = transformations[index]
+		matrix = transformation.transform.GetMatrix()
+		values = tuple(matrix.GetElement(i, j) for i in range(4) for j in range(4))
+		state.append((id(transformation), transformation.transformType, transformation.filename, values))
+	return state
+
+
+def _HistoryFileNames(project, maximum):
+	"""
+	Returns the file names of the data sets of the most recent
+	transformations, except for the moving data itself.
+	"""
+	if not project.multiSettings or not project.multiSettings.get("transformations"):
+		return []
+	fileNames = []
+	for transformation in reversed(project.multiSettings["transformations"]):
+		fileName = transformation.get("Filename")
+		if fileName and fileName != project.movingData and fileName not in fileNames:
+			fileNames.append(fileName)
+		if len(fileNames) >= maximum:
+			break
+	return fileNames
@@ -0,0 +1,41 @@
+"""
+ProjectFolder
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+from ProjectSerializer import ProjectSerializer
+from ProjectSerializer import LoadLegacyProject
+from ProjectJournal import ReadJournal
+from ProjectJournal import ReplayJournal
+
+# Names of the files in a project folder
+ProjectFile = u"/project.json"
+# Project file of older versions, which is read when there is no project file
+LegacyProjectFile = u"/project.yaml"
+# Journal with the changes since the project was last saved
+JournalFile = u"/journal.jsonl"
+
+
+def ReadProject(folder):
+	"""
+	Reads the project in the folder and replays the changes in its journal
+	that were not saved in the project file (after a crash).
+
+	:type folder: unicode
+	:rtype: Project
+	"""
+	if os.path.exists(folder + ProjectFile):
+		serializer = ProjectSerializer()
+		project = serializer.loadProject(folder + ProjectFile)
+	else:
+		project = LoadLegacyProject(folder + LegacyProjectFile)
+	project.folder = folder
+
+	records = ReadJournal(folder + JournalFile)
+	recovered = ReplayJournal(project, records)
+	if recovered > 0:
+		print "Recovered", recovered, "changes from the project journal"
+	return project
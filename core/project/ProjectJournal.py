@@ -0,0 +1,146 @@
+"""
+ProjectJournal
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+from ProjectSerializer import EncodeValue
+from ProjectSerializer import DecodeValue
+from core.JournalFile import OpenJournalFile
+from core.JournalFile import WriteJournalRecord
+from core.JournalFile import ReadJournalFile
+
+# Types of journal records
+RecordTransformations = "transformations"
+RecordSettings = "settings"
+RecordLandmarks = "landmarks"
+
+
+class ProjectJournal(object):
+	"""
+	ProjectJournal is an append-only log of the changes to a project. Every
+	change is written as one JSON line to the journal file in the project
+	folder as soon as it happens, so the cost of a record depends on the
+	size of the change, not on the size of the project.
+
+	Records have increasing sequence numbers. When the project is saved
+	(a snapshot), the sequence number of the last record is saved in the
+	project and the journal is cleared. After a crash, the records that
+	are newer than the snapshot are replayed onto the project with
+	ReplayJournal().
+	"""
+
+	def __init__(self):
+		super(ProjectJournal, self).__init__()
+
+		self.fileName = None
+		self.sequence = 0
+		self.numberOfRecords = 0
+		self._file = None
+
+	def open(self, fileName, sequence=0):
+		"""
+		Opens the journal file for appending. New records get sequence
+		numbers that are larger than sequence. A record that was only partly
+		written when the application crashed is removed.
+		"""
+		self.close()
+		self.fileName = fileName
+		self.sequence = sequence
+		self.numberOfRecords = 0
+		self._file = OpenJournalFile(fileName)
+
+	def close(self):
+		if self._file is not None:
+			self._file.close()
+		self._file = None
+		self.fileName = None
+
+	def isOpen(self):
+		return self._file is not None
+
+	def record(self, recordType, data):
+		"""
+		Appends a record to the journal. Does nothing if the journal is not
+		open (for instance when the project has no folder yet).
+		"""
+		if self._file is None:
+			return
+		self.sequence += 1
+		record = {"sequence": self.sequence, "type": recordType, "data": EncodeValue(data)}
+		WriteJournalRecord(self._file, record)
+		self.numberOfRecords += 1
+
+	def clear(self):
+		"""
+		Removes all records from the journal. Should be called after the
+		project is saved. The sequence numbers keep increasing.
+		"""
+		if self._file is None:
+			return
+		self._file.seek(0)
+		self._file.truncate()
+		self._file.flush()
+		self.numberOfRecords = 0
+
+
+def ReadJournal(fileName):
+	"""
+	Returns the records in the journal file. A record that was only partly
+	written when the application crashed is ignored.
+
+	:rtype: list of dict
+	"""
+	records = ReadJournalFile(fileName)
+	for record in records:
+		record["data"] = DecodeValue(record["data"])
+	return records
+
+
+def ReplayJournal(project, records):
+	"""
+	Applies the records that are newer than the project to the project.
+	Returns the number of records that are applied.
+
+	:rtype: int
+	"""
+	applied = 0
+	for record in records:
+		if record["sequence"] <= project.journalSequence:
+			continue
+		_ApplyRecord(project, record["type"], record["data"])
+		project.journalSequence = record["sequence"]
+		applied += 1
+	return applied
+
+
+def _ApplyRecord(project, recordType, data):
+	if recordType == RecordTransformations:
+		# The first 'keep' transformations did not change
+		transformations = _Transformations(project)
+		project.multiSettings["transformations"] = transformations[:data["keep"]] + data["append"]
+	elif recordType == RecordSettings:
+		settings = data["settings"]
+		if data["name"] == "multiSettings":
+			# Transformations have their own records
+			settings["transformations"] = _Transformations(project)
+		setattr(project, str(data["name"]), settings)
+	elif recordType == RecordLandmarks:
+		transformations = _Transformations(project)
+		index = data["index"]
+		if 0 <= index < len(transformations):
+			transformations[index]["Landmarks"] = data["landmarks"]
+			transformations[index]["Transformation"] = data["transform"]
+	else:
+		print "Warning: unknown record in project journal:", recordType
+
+
+def _Transformations(project):
+	if project.multiSettings is None:
+		project.multiSettings = dict()
+	transformations = project.multiSettings.get("transformations")
+	if transformations is None:
+		transformations = []
+		project.multiSettings["transformations"] = transformations
+	return transformations
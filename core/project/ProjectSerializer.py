@@ -0,0 +1,304 @@
+"""
+ProjectSerializer
+
+Reading and writing of project files.
+
+A project is saved as two files: a compact JSON file with the structure
+of the project and a .npy file next to it with all the numeric arrays
+(transform matrices and transfer function nodes) in one float64 buffer.
+The JSON file refers to the arrays by offset and shape:
+
+	{"formatVersion": 1, "title": ..., "multiSettings": {...}}
+	{"$type": "transform", "values": {"$array": [offset, 16]}}
+
+Both files are written to temporary files in the project folder first and
+then renamed over the old files: the array file first, the JSON file last.
+The JSON file stores the size and checksum of the arrays, so a JSON file
+that is loaded with the array file of another save (after a crash between
+the two renames) is refused instead of giving wrong values.
+
+Only the wrapper types in WrapperTypes can be stored in a project, so
+loading a project never constructs arbitrary objects. Projects of older
+versions of RegistrationShop (project.yaml) can be read with
+LoadLegacyProject(), which uses a safe YAML loader that only constructs
+the same known types.
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import os
+import json
+import zlib
+import numpy
+import yaml
+from Project import Project
+from core.vtkObjectWrapper import vtkCameraWrapper
+from core.vtkObjectWrapper import vtkTransformWrapper
+from core.vtkObjectWrapper import vtkPiecewiseFunctionWrapper
+from core.vtkObjectWrapper import vtkColorTransferFunctionWrapper
+from core.vtkObjectWrapper import vtkVolumePropertyWrapper
+
+FormatVersion = 1
+
+# Attributes of a project that are stored
+ProjectAttributes = ["title", "fixedData", "movingData", "isReference",
+	"fixedSettings", "movingSettings", "multiSettings", "transformations",
+	"journalSequence"]
+
+# Wrapper class name: (type name in the file, attributes stored as arrays)
+WrapperTypes = {
+	"vtkCameraWrapper": ("camera", []),
+	"vtkTransformWrapper": ("transform", ["values"]),
+	"vtkPiecewiseFunctionWrapper": ("piecewiseFunction", ["nodes"]),
+	"vtkColorTransferFunctionWrapper": ("colorTransferFunction", ["nodes"]),
+	"vtkVolumePropertyWrapper": ("volumeProperty", []),
+	"VolumeVisualizationWrapper": ("volumeVisualization", [])
+}
+
+_ClassNames = dict((value[0], key) for key, value in WrapperTypes.items())
+
+
+class ProjectSerializer(object):
+	"""
+	ProjectSerializer writes projects to and reads projects from disk.
+	"""
+
+	def __init__(self):
+		super(ProjectSerializer, self).__init__()
+
+	def saveProject(self, project, fileName):
+		"""
+		Writes the project to fileName and the arrays of the project to
+		ArrayFileName(fileName).
+		"""
+		arrays = _ArrayWriter()
+		structure = dict()
+		structure["formatVersion"] = FormatVersion
+		for attribute in ProjectAttributes:
+			structure[attribute] = EncodeValue(getattr(project, attribute, None), arrays)
+		buffer = arrays.buffer()
+		structure["arrays"] = {"size": buffer.size, "checksum": _Checksum(buffer)}
+
+		arrayFileName = ArrayFileName(fileName)
+		with open(arrayFileName + ".tmp", "wb") as arrayFile:
+			numpy.save(arrayFile, buffer)
+			_Sync(arrayFile)
+		# dumps is much faster than dump, which writes the file in small chunks
+		data = json.dumps(structure, separators=(",", ":"))
+		with open(fileName + ".tmp", "w") as projectFile:
+			projectFile.write(data)
+			_Sync(projectFile)
+
+		_ReplaceFile(arrayFileName + ".tmp", arrayFileName)
+		_ReplaceFile(fileName + ".tmp", fileName)
+
+	def loadProject(self, fileName):
+		"""
+		Reads the project from fileName.
+
+		:rtype: Project
+		"""
+		with open(fileName, "r") as projectFile:
+			structure = json.load(projectFile)
+
+		version = structure.get("formatVersion")
+		if version is None or version > FormatVersion:
+			raise ValueError("Unsupported project format version: " + str(version))
+
+		arrayFileName = ArrayFileName(fileName)
+		buffer = numpy.load(arrayFileName) if os.path.exists(arrayFileName) else None
+		# Projects of before the checksum have no arrays entry
+		if "arrays" in structure:
+			arrays = structure["arrays"]
+			if buffer is None or buffer.size != arrays["size"] or _Checksum(buffer) != arrays["checksum"]:
+				raise ValueError("Project arrays do not belong to project file: " + fileName)
+
+		project = Project()
+		for attribute in ProjectAttributes:
+			if attribute in structure:
+				setattr(project, attribute, DecodeValue(structure[attribute], buffer))
+		return project
+
+
+def ArrayFileName(fileName):
+	"""
+	Returns the name of the file with the arrays of a project file.
+	"""
+	return os.path.splitext(fileName)[0] + ".npy"
+
+
+def _Checksum(buffer):
+	return zlib.crc32(buffer.tobytes()) & 0xffffffff
+
+
+def _Sync(openFile):
+	"""
+	Makes sure that the contents of the file are on disk before it is
+	renamed.
+	"""
+	openFile.flush()
+	os.fsync(openFile.fileno())
+
+
+def _ReplaceFile(source, destination):
+	"""
+	Renames source to destination. On POSIX systems the rename replaces
+	destination atomically. Windows does not rename over an existing file,
+	so there the old file is removed first.
+	"""
+	try:
+		os.rename(source, destination)
+	except OSError:
+		if not os.path.exists(destination):
+			raise
+		os.remove(destination)
+		os.rename(source, destination)
+
+
+def LoadLegacyProject(fileName):
+	"""
+	Reads a project that was saved as a YAML object dump (project.yaml).
+
+	:rtype: Project
+	"""
+	with open(fileName, "r") as projectFile:
+		project = yaml.load(projectFile, Loader=LegacyProjectLoader)
+	if not isinstance(project, Project):
+		raise ValueError("No project found in: " + fileName)
+	return project
+
+
+class LegacyProjectLoader(yaml.SafeLoader):
+	"""
+	Safe YAML loader that also understands the python tags that are used
+	in project.yaml files. Only Project and the wrapper types are
+	constructed, every other python object results in an error.
+	"""
+	pass
+
+
+def _ConstructTuple(loader, node):
+	return tuple(loader.construct_sequence(node))
+
+
+def _ConstructUnicode(loader, node):
+	return unicode(loader.construct_scalar(node))
+
+
+def _ConstructLong(loader, node):
+	return long(loader.construct_yaml_int(node))
+
+
+def _ConstructObject(loader, suffix, node):
+	className = suffix.split(".")[-1]
+	cls = _WrapperClass(className)
+	if cls is None:
+		raise yaml.constructor.ConstructorError(None, None,
+			"unsupported object in project file: " + suffix, node.start_mark)
+	instance = cls()
+	instance.__dict__.update(loader.construct_mapping(node, deep=True))
+	return instance
+
+
+LegacyProjectLoader.add_constructor(u"tag:yaml.org,2002:python/tuple", _ConstructTuple)
+LegacyProjectLoader.add_constructor(u"tag:yaml.org,2002:python/unicode", _ConstructUnicode)
+LegacyProjectLoader.add_constructor(u"tag:yaml.org,2002:python/str", _ConstructUnicode)
+LegacyProjectLoader.add_constructor(u"tag:yaml.org,2002:python/long", _ConstructLong)
+LegacyProjectLoader.add_multi_constructor(u"tag:yaml.org,2002:python/object:", _ConstructObject)
+
+
+def _WrapperClass(className):
+	"""
+	Returns the class for the name of one of the types that can be stored
+	in a project, or None if the type is not allowed.
+	"""
+	if className == "Project":
+		return Project
+	if className not in WrapperTypes:
+		return None
+	if className == "VolumeVisualizationWrapper":
+		# Imported here: the core package does not depend on the ui package
+		from ui.visualizations.VolumeVisualizationWrapper import VolumeVisualizationWrapper
+		return VolumeVisualizationWrapper
+	classes = [vtkCameraWrapper, vtkTransformWrapper, vtkPiecewiseFunctionWrapper,
+		vtkColorTransferFunctionWrapper, vtkVolumePropertyWrapper]
+	return dict((cls.__name__, cls) for cls in classes)[className]
+
+
+class _ArrayWriter(object):
+	"""
+	Collects the arrays of a project into one float64 buffer.
+	"""
+
+	def __init__(self):
+		super(_ArrayWriter, self).__init__()
+		self._arrays = []
+		self._size = 0
+
+	def add(self, values):
+		array = numpy.asarray(values, dtype=numpy.float64)
+		reference = [self._size] + list(array.shape)
+		self._arrays.append(array.ravel())
+		self._size += array.size
+		return {"$array": reference}
+
+	def buffer(self):
+		if not self._arrays:
+			return numpy.zeros(0, dtype=numpy.float64)
+		return numpy.concatenate(self._arrays)
+
+
+def EncodeValue(value, arrays=None):
+	"""
+	Returns the value as a structure that can be written as JSON. The
+	array attributes of wrappers are added to arrays (an _ArrayWriter), or
+	stored as lists when arrays is None.
+	"""
+	if value is None or isinstance(value, (bool, int, long, float, basestring)):
+		return value
+	if isinstance(value, (list, tuple)):
+		return [EncodeValue(item, arrays) for item in value]
+	if isinstance(value, dict):
+		return dict((unicode(key), EncodeValue(item, arrays)) for key, item in value.items())
+	if isinstance(value, numpy.ndarray):
+		return value.tolist()
+	if isinstance(value, numpy.generic):
+		return value.item()
+
+	className = type(value).__name__
+	if className not in WrapperTypes:
+		raise ValueError("Can not store object of type " + className + " in a project")
+	typeName, arrayAttributes = WrapperTypes[className]
+	result = {"$type": typeName}
+	for attribute, item in value.__dict__.items():
+		if attribute in arrayAttributes and arrays is not None:
+			result[attribute] = arrays.add(item)
+		else:
+			result[attribute] = EncodeValue(item, arrays)
+	return result
+
+
+def DecodeValue(value, buffer=None):
+	"""
+	Returns the value for a structure that was created by EncodeValue.
+	"""
+	if isinstance(value, list):
+		return [DecodeValue(item, buffer) for item in value]
+	if not isinstance(value, dict):
+		return value
+	if "$array" in value:
+		reference = value["$array"]
+		offset, shape = reference[0], reference[1:]
+		size = int(numpy.prod(shape))
+		return buffer[offset:offset + size].reshape(shape).tolist()
+	if "$type" in value:
+		cls = _WrapperClass(_ClassNames.get(value["$type"]))
+		if cls is None:
+			raise ValueError("Unknown type in project file: " + value["$type"])
+		instance = cls()
+		for attribute, item in value.items():
+			if attribute != "$type":
+				setattr(instance, str(attribute), DecodeValue(item, buffer))
+		return instance
+	return dict((key, DecodeValue(item, buffer)) for key, item in value.items())
@@ -0,0 +1,508 @@
+"""
+ImageRegistration
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import time
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import numpy as np
+from vtk.util.numpy_support import vtk_to_numpy
+from core.data.DataQuantizer import Quantization
+
+# Transform types, named like the transforms of elastix
+TransformTranslation = "TranslationTransform"
+TransformRigid = "EulerTransform"
+TransformAffine = "AffineTransform"
+TransformTypes = [TransformTranslation, TransformRigid, TransformAffine]
+
+# Metrics, named like the metrics of elastix
+MetricMeanSquares = "AdvancedMeanSquares"
+MetricNormalizedCorrelation = "AdvancedNormalizedCorrelation"
+MetricMattesMutualInformation = "AdvancedMattesMutualInformation"
+Metrics = [MetricMeanSquares, MetricNormalizedCorrelation, MetricMattesMutualInformation]
+
+# Parameters of the decay of the step length: a_k = a * ((A + 1) / (k + A + 1)) ** alpha
+_stepOffset = 20.0
+_stepDecay = 0.602
+# Samples are interpolated on several threads when there are at least this many per thread
+_samplesPerThread = 4096
+# Minimum number of samples inside the moving data for an iteration
+_minimumSamples = 16
+
+
+class ImageRegistration(object):
+	"""
+	ImageRegistration is an in-process multi-resolution registration of
+	two volumes with a translation, rigid or affine transform. It is a fast
+	alternative to elastix for the simple (linear) parameter lists: there
+	is no process to start and no data to write to disk.
+
+	Every iteration, the metric (mean squares, normalized correlation or
+	Mattes mutual information) and its derivative are calculated for a new
+	set of random voxels of the fixed data. The transform is updated with
+	gradient descent with a decreasing step length. The volumes are
+	downsampled for the first resolutions.
+
+	The parameters use the names and defaults of the elastix parameter
+	files, so a parameter list can be applied with setParameterList().
+	"""
+
+	#: Whether the transformation tools use this registration for the
+	#: parameter lists that it supports (instead of elastix)
+	Enabled = True
+
+	def __init__(self):
+		super(ImageRegistration, self).__init__()
+
+		self.transformType = TransformRigid
+		self.metric = MetricMattesMutualInformation
+		self.numberOfResolutions = 4
+		self.maximumNumberOfIterations = 250
+		self.numberOfSpatialSamples = 2048
+		self.numberOfHistogramBins = 32
+		self.automaticTransformInitialization = True
+		#: Step length in mm, the voxel size of the resolution when None
+		self.maximumStepLength = None
+		self.numberOfThreads = multiprocessing.cpu_count()
+		self.seed = 0
+
+		#: Results of the last registration
+		self.iterations = 0
+		self.metricValue = None
+		self.elapsedTime = None
+
+	def setParameterList(self, parameterList):
+		"""
+		Takes the settings from an elastix parameter list. Raises a ValueError
+		if the transform or metric of the parameter list is not supported.
+
+		:type parameterList: ParameterList
+		"""
+		values = _ParameterValues(parameterList)
+		transformType = values.get("Transform", self.transformType)
+		metric = values.get("Metric", self.metric)
+		if transformType not in TransformTypes:
+			raise ValueError("Unsupported transform: " + str(transformType))
+		if metric not in Metrics:
+			raise ValueError("Unsupported metric: " + str(metric))
+
+		self.transformType = transformType
+		self.metric = metric
+		self.numberOfResolutions = int(values.get("NumberOfResolutions", self.numberOfResolutions))
+		self.maximumNumberOfIterations = values.get("MaximumNumberOfIterations", self.maximumNumberOfIterations)
+		self.numberOfSpatialSamples = int(values.get("NumberOfSpatialSamples", self.numberOfSpatialSamples))
+		self.numberOfHistogramBins = int(values.get("NumberOfHistogramBins", self.numberOfHistogramBins))
+		self.automaticTransformInitialization = bool(values.get("AutomaticTransformInitialization",
+			self.automaticTransformInitialization))
+		self.maximumStepLength = values.get("MaximumStepLength", self.maximumStepLength)
+
+	def register(self, fixedData, movingData, initialMatrix=None):
+		"""
+		Registers the moving data to the fixed data. Returns the matrix that
+		maps points of the moving data onto the fixed data, so it can be
+		used like the transforms in a TransformationList. The initial matrix
+		(also moving to fixed) is the starting point of the registration.
+
+		:type fixedData: vtkImageData
+		:type movingData: vtkImageData
+		:type initialMatrix: numpy array (4, 4)
+		:rtype: numpy array (4, 4)
+		"""
+		start = time.time()
+		fixedVolume = _Volume.fromImageData(fixedData)
+		movingVolume = _Volume.fromImageData(movingData)
+
+		# The transform is optimized from fixed to moving coordinates:
+		# y = initial(T(x)), with T(x) = A (x - c) + c + t
+		if initialMatrix is not None:
+			initial = np.linalg.inv(np.asarray(initialMatrix, dtype=np.float64))
+		else:
+			initial = np.identity(4)
+			if self.automaticTransformInitialization:
+				initial[0:3, 3] = movingVolume.center() - fixedVolume.center()
+
+		transform = _Transform(self.transformType, fixedVolume.center(), fixedVolume.radius())
+		random = np.random.RandomState(self.seed)
+		pool = ThreadPool(max(1, self.numberOfThreads))
+		self.iterations = 0
+		try:
+			factors = [2 ** (self.numberOfResolutions - 1 - level) for level in range(self.numberOfResolutions)]
+			fixedLevels = pool.map(fixedVolume.downsampled, factors)
+			movingLevels = pool.map(movingVolume.downsampled, factors)
+			for level in range(self.numberOfResolutions):
+				iterations = _LevelValue(self.maximumNumberOfIterations, level)
+				stepLength = _LevelValue(self.maximumStepLength, level)
+				self._optimize(fixedLevels[level], movingLevels[level], transform, initial,
+					int(iterations), stepLength, random, pool)
+		finally:
+			pool.close()
+			pool.join()
+
+		self.elapsedTime = time.time() - start
+		return np.linalg.inv(np.dot(initial, transform.matrix()))
+
+	def _optimize(self, fixed, moving, transform, initial, iterations, stepLength, random, pool):
+		if not stepLength:
+			stepLength = float(np.mean(fixed.spacing))
+		metric = _MetricFunction(self.metric, fixed, moving, self.numberOfHistogramBins)
+
+		for iteration in range(iterations):
+			points, fixedValues = fixed.randomSamples(self.numberOfSpatialSamples, random)
+			transformed = _Apply(initial, transform.apply(points))
+			movingValues, gradients, inside = self._sample(moving, transformed, pool)
+			if np.count_nonzero(inside) < _minimumSamples:
+				break
+
+			value, derivative = metric(fixedValues[inside], movingValues[inside])
+			# Chain rule: d metric / d p = sum(d metric / d m * grad(m) * initial * dT / dp)
+			gradients = np.dot(gradients[inside], initial[0:3, 0:3])
+			gradient = transform.gradient(points[inside], derivative[:, np.newaxis] * gradients)
+
+			# Normalized gradient descent in scaled parameters: every step
+			# moves the points by about the step length
+			scaledGradient = gradient / transform.scales
+			norm = np.sqrt(np.dot(scaledGradient, scaledGradient))
+			if norm == 0:
+				break
+			step = stepLength * ((_stepOffset + 1.0) / (iteration + _stepOffset + 1.0)) ** _stepDecay
+			transform.parameters -= step * scaledGradient / norm / transform.scales
+			self.metricValue = value
+			self.iterations += 1
+
+	def _sample(self, volume, points, pool):
+		"""
+		Interpolates the volume and its gradient at the points, in chunks on
+		several threads for large numbers of points.
+		"""
+		chunks = min(max(1, self.numberOfThreads), len(points) // _samplesPerThread)
+		if chunks <= 1:
+			return volume.interpolate(points)
+		results = pool.map(volume.interpolate, np.array_split(points, chunks))
+		return tuple(np.concatenate([result[index] for result in results]) for index in range(3))
+
+
+def SupportsParameterList(parameterList):
+	"""
+	Returns whether ImageRegistration can do the registration that is
+	described by the elastix parameter list.
+
+	:rtype: bool
+	"""
+	values = _ParameterValues(parameterList)
+	return values.get("Transform") in TransformTypes and values.get("Metric", MetricMattesMutualInformation) in Metrics
+
+
+class _Volume(object):
+	"""
+	Scalar volume as a numpy array (z, y, x) with the geometry of the data.
+	"""
+
+	def __init__(self, data, origin, spacing):
+		super(_Volume, self).__init__()
+
+		self.data = data
+		self.origin = np.asarray(origin, dtype=np.float64)
+		self.spacing = np.asarray(spacing, dtype=np.float64)
+		self.dimensions = np.array(data.shape[::-1])  # x, y, z
+		self._flat = data.ravel()
+
+	@staticmethod
+	def fromImageData(imageData):
+		dimensions = imageData.GetDimensions()
+		scalars = vtk_to_numpy(imageData.GetPointData().GetScalars())
+		if scalars.ndim > 1:
+			scalars = scalars[:, 0]
+		# Values of quantized display data are mapped back to the source values
+		shift, scale = Quantization(imageData)
+		data = scalars.astype(np.float32) / np.float32(scale) - np.float32(shift)
+		data = data.reshape(dimensions[2], dimensions[1], dimensions[0])
+		if min(dimensions) < 2:
+			raise ValueError("Registration needs volumes of at least 2 voxels in every direction")
+		return _Volume(data, imageData.GetOrigin(), imageData.GetSpacing())
+
+	def center(self):
+		return self.origin + self.spacing * (self.dimensions - 1) / 2.0
+
+	def radius(self):
+		"""
+		Root mean square distance of the voxels to the center.
+		"""
+		extent = self.spacing * (self.dimensions - 1)
+		return max(float(np.sqrt(np.sum(extent ** 2) / 12.0)), 1e-6)
+
+	def downsampled(self, factor):
+		"""
+		Returns the volume downsampled by averaging blocks of factor^3 voxels.
+		Every direction keeps at least a few voxels.
+		"""
+		factors = [max(1, min(factor, dimension // 4)) for dimension in self.dimensions[::-1]]
+		if factors == [1, 1, 1]:
+			return self
+		shape = [dimension // f for dimension, f in zip(self.data.shape, factors)]
+		cropped = self.data[:shape[0] * factors[0], :shape[1] * factors[1], :shape[2] * factors[2]]
+		blocks = cropped.reshape(shape[0], factors[0], shape[1], factors[1], shape[2], factors[2])
+		data = blocks.mean(axis=(1, 3, 5), dtype=np.float32)
+		factors = np.array(factors[::-1], dtype=np.float64)
+		origin = self.origin + (factors - 1.0) / 2.0 * self.spacing
+		return _Volume(data, origin, self.spacing * factors)
+
+	def randomSamples(self, count, random):
+		"""
+		Returns the positions and values of random voxels.
+		"""
+		indices = random.randint(0, self._flat.size, count)
+		nx, ny = self.dimensions[0], self.dimensions[1]
+		voxels = np.empty((count, 3))
+		voxels[:, 0] = indices % nx
+		voxels[:, 1] = (indices // nx) % ny
+		voxels[:, 2] = indices // (nx * ny)
+		return self.origin + voxels * self.spacing, self._flat[indices].astype(np.float64)
+
+	def interpolate(self, points):
+		"""
+		Returns the trilinear interpolation of the volume at the points, the
+		gradient of the interpolation (in world coordinates) and which points
+		are inside the volume.
+		"""
+		voxels = (points - self.origin) / self.spacing
+		maximum = self.dimensions - 1
+		inside = np.all((voxels >= 0) & (voxels <= maximum), axis=1)
+		voxels = np.clip(voxels, 0, maximum)
+		lower = np.minimum(np.floor(voxels).astype(np.intp), maximum - 1)
+		fx, fy, fz = (voxels - lower).T
+
+		nx, ny = self.dimensions[0], self.dimensions[1]
+		base = lower[:, 2] * (nx * ny) + lower[:, 1] * nx + lower[:, 0]
+		flat = self._flat
+		c000 = flat[base]
+		c100 = flat[base + 1]
+		c010 = flat[base + nx]
+		c110 = flat[base + nx + 1]
+		c001 = flat[base + nx * ny]
+		c101 = flat[base + nx * ny + 1]
+		c011 = flat[base + nx * ny + nx]
+		c111 = flat[base + nx * ny + nx + 1]
+
+		# Interpolate along x, then y, then z
+		c00 = c000 + fx * (c100 - c000)
+		c10 = c010 + fx * (c110 - c010)
+		c01 = c001 + fx * (c101 - c001)
+		c11 = c011 + fx * (c111 - c011)
+		c0 = c00 + fy * (c10 - c00)
+		c1 = c01 + fy * (c11 - c01)
+		values = c0 + fz * (c1 - c0)
+
+		gradients = np.empty((len(points), 3))
+		dx0 = (c100 - c000) + fy * ((c110 - c010) - (c100 - c000))
+		dx1 = (c101 - c001) + fy * ((c111 - c011) - (c101 - c001))
+		gradients[:, 0] = dx0 + fz * (dx1 - dx0)
+		gradients[:, 1] = (c10 - c00) + fz * ((c11 - c01) - (c10 - c00))
+		gradients[:, 2] = c1 - c0
+		gradients /= self.spacing
+		return values, gradients, inside
+
+
+class _Transform(object):
+	"""
+	Parameterized transform T(x) = A (x - c) + c + t around the center c of
+	the fixed data. The scales of the parameters express how far a change
+	of a parameter moves the points, so that the rotation and matrix
+	parameters can be optimized together with the translation.
+	"""
+
+	def __init__(self, transformType, center, radius):
+		super(_Transform, self).__init__()
+
+		self.transformType = transformType
+		self.center = center
+		if transformType == TransformTranslation:
+			self.parameters = np.zeros(3)
+			self.scales = np.ones(3)
+		elif transformType == TransformRigid:
+			# Angles around x, y and z, translation
+			self.parameters = np.zeros(6)
+			self.scales = np.array([radius] * 3 + [1.0] * 3)
+		else:
+			# Matrix (row by row), translation
+			self.parameters = np.concatenate([np.identity(3).ravel(), np.zeros(3)])
+			self.scales = np.array([radius] * 9 + [1.0] * 3)
+
+	def linear(self):
+		if self.transformType == TransformTranslation:
+			return np.identity(3)
+		if self.transformType == TransformRigid:
+			return _Rotation(self.parameters[0:3])[0]
+		return self.parameters[0:9].reshape(3, 3)
+
+	def translation(self):
+		return self.parameters[-3:]
+
+	def matrix(self):
+		matrix = np.identity(4)
+		linear = self.linear()
+		matrix[0:3, 0:3] = linear
+		matrix[0:3, 3] = self.center + self.translation() - np.dot(linear, self.center)
+		return matrix
+
+	def apply(self, points):
+		return np.dot(points - self.center, self.linear().T) + self.center + self.translation()
+
+	def gradient(self, points, derivatives):
+		"""
+		Returns the derivative of the metric to the parameters, given the
+		derivatives of the metric to the transformed points.
+		"""
+		gradient = np.zeros(len(self.parameters))
+		gradient[-3:] = derivatives.sum(axis=0)
+		if self.transformType == TransformTranslation:
+			return gradient
+
+		offsets = points - self.center
+		if self.transformType == TransformRigid:
+			derivedRotations = _Rotation(self.parameters[0:3])[1]
+			for index in range(3):
+				gradient[index] = np.sum(derivatives * np.dot(offsets, derivedRotations[index].T))
+		else:
+			gradient[0:9] = np.dot(derivatives.T, offsets).ravel()
+		return gradient
+
+
+def _Rotation(angles):
+	"""
+	Returns the rotation matrix R = Rz Ry Rx for the angles and the
+	derivatives of R to the three angles.
+	"""
+	cx, cy, cz = np.cos(angles)
+	sx, sy, sz = np.sin(angles)
+	rx = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+	ry = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+	rz = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+	drx = np.array([[0, 0, 0], [0, -sx, -cx], [0, cx, -sx]])
+	dry = np.array([[-sy, 0, cy], [0, 0, 0], [-cy, 0, -sy]])
+	drz = np.array([[-sz, -cz, 0], [cz, -sz, 0], [0, 0, 0]])
+	rotation = np.dot(rz, np.dot(ry, rx))
+	derivatives = [np.dot(rz, np.dot(ry, drx)), np.dot(rz, np.dot(dry, rx)), np.dot(drz, np.dot(ry, rx))]
+	return rotation, derivatives
+
+
+def _Apply(matrix, points):
+	return np.dot(points, matrix[0:3, 0:3].T) + matrix[0:3, 3]
+
+
+def _MetricFunction(metric, fixed, moving, numberOfBins):
+	"""
+	Returns a function that calculates the metric and its derivative to the
+	moving values for arrays of fixed and moving values. Lower is better.
+	"""
+	if metric == MetricMeanSquares:
+		return _MeanSquares
+	if metric == MetricNormalizedCorrelation:
+		return _NormalizedCorrelation
+	return _MattesMutualInformation(fixed.data, moving.data, numberOfBins)
+
+
+def _MeanSquares(fixedValues, movingValues):
+	difference = movingValues - fixedValues
+	return np.mean(difference ** 2), 2.0 * difference / len(difference)
+
+
+def _NormalizedCorrelation(fixedValues, movingValues):
+	fixedCentered = fixedValues - fixedValues.mean()
+	movingCentered = movingValues - movingValues.mean()
+	fixedSum = np.dot(fixedCentered, fixedCentered)
+	movingSum = np.dot(movingCentered, movingCentered)
+	if fixedSum == 0 or movingSum == 0:
+		return 0.0, np.zeros(len(movingValues))
+	denominator = np.sqrt(fixedSum * movingSum)
+	correlation = np.dot(fixedCentered, movingCentered) / denominator
+	derivative = fixedCentered / denominator - correlation * movingCentered / movingSum
+	return -correlation, -derivative
+
+
+class _MattesMutualInformation(object):
+	"""
+	Mutual information as in Mattes et al.: the joint histogram is made
+	with a zero order B-spline window for the fixed values and a cubic
+	B-spline window for the moving values, so that the metric can be
+	differentiated to the moving values.
+	"""
+
+	_padding = 2
+
+	def __init__(self, fixedData, movingData, numberOfBins):
+		super(_MattesMutualInformation, self).__init__()
+
+		self.numberOfBins = max(numberOfBins, 2 * self._padding + 1)
+		usedBins = self.numberOfBins - 2 * self._padding
+		self.fixedMinimum = float(fixedData.min())
+		self.fixedWidth = max((float(fixedData.max()) - self.fixedMinimum) / usedBins, 1e-12)
+		self.movingMinimum = float(movingData.min())
+		self.movingMaximum = float(movingData.max())
+		self.movingWidth = max((self.movingMaximum - self.movingMinimum) / usedBins, 1e-12)
+
+	def __call__(self, fixedValues, movingValues):
+		bins = self.numberOfBins
+		count = float(len(fixedValues))
+		fixedBins = np.floor((fixedValues - self.fixedMinimum) / self.fixedWidth).astype(np.intp) + self._padding
+		fixedBins = np.clip(fixedBins, self._padding, bins - self._padding - 1)
+		movingValues = np.clip(movingValues, self.movingMinimum, self.movingMaximum)
+		movingPositions = (movingValues - self.movingMinimum) / self.movingWidth + self._padding
+
+		# Every moving value contributes to the four bins around it
+		first = np.floor(movingPositions).astype(np.intp) - 1
+		movingBins = first[:, np.newaxis] + np.arange(4)
+		offsets = movingBins - movingPositions[:, np.newaxis]
+		weights = _CubicBSpline(offsets)
+		movingBins = np.clip(movingBins, 0, bins - 1)
+
+		flatBins = fixedBins[:, np.newaxis] * bins + movingBins
+		joint = np.bincount(flatBins.ravel(), weights.ravel(), bins * bins).reshape(bins, bins) / count
+		fixedMarginal = joint.sum(axis=1)
+		movingMarginal = joint.sum(axis=0)
+
+		nonZero = joint > 0
+		outer = np.outer(fixedMarginal, movingMarginal)
+		information = np.sum(joint[nonZero] * np.log(joint[nonZero] / outer[nonZero]))
+
+		# d MI / d m = sum over the bins of d joint / d m * log(joint / moving marginal)
+		logRatio = np.log(np.maximum(joint, 1e-300) / np.maximum(movingMarginal, 1e-300)[np.newaxis, :])
+		derivedWeights = -_CubicBSplineDerivative(offsets) / self.movingWidth
+		derivative = np.sum(derivedWeights * logRatio.ravel()[flatBins], axis=1) / count
+		return -information, -derivative
+
+
+def _CubicBSpline(x):
+	x = np.abs(x)
+	result = np.zeros(x.shape)
+	near = x < 1
+	far = (x >= 1) & (x < 2)
+	result[near] = (4.0 - 6.0 * x[near] ** 2 + 3.0 * x[near] ** 3) / 6.0
+	result[far] = (2.0 - x[far]) ** 3 / 6.0
+	return result
+
+
+def _CubicBSplineDerivative(x):
+	sign = np.sign(x)
+	x = np.abs(x)
+	result = np.zeros(x.shape)
+	near = x < 1
+	far = (x >= 1) & (x < 2)
+	result[near] = -2.0 * x[near] + 1.5 * x[near] ** 2
+	result[far] = -0.5 * (2.0 - x[far]) ** 2
+	return sign * result
+
+
+def _ParameterValues(parameterList):
+	return dict((parameter.key(), parameter.value()) for parameter in parameterList)
+
+
+def _LevelValue(value, level):
+	"""
+	Elastix parameters can have a value per resolution.
+	"""
+	if isinstance(value, (list, tuple)):
+		return value[min(level, len(value) - 1)]
+	return value
@@ -0,0 +1,281 @@
+"""
+LandmarkSolver
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import numpy as np
+
+# Transform types, in the same order as the landmark transformation tool
+TransformTypeRigid = 0
+TransformTypeSimilarity = 1
+TransformTypeAffine = 2
+
+
+class LandmarkSolver(object):
+	"""
+	LandmarkSolver calculates the least squares transform that maps source
+	landmarks onto target landmarks. It keeps running sums of the point
+	pairs, so adding, moving or removing a pair costs constant time and
+	solving only involves a 3x3 (or 4x4) system, no matter how many pairs
+	there are.
+	Rigid transforms are solved with the Kabsch method, similarity
+	transforms with the Umeyama method and affine transforms with linear
+	least squares.
+	For rejecting mislabeled pairs, the solver can be put in a robust mode:
+	either trimmed least squares or RANSAC.
+	"""
+
+	RobustNone = None
+	RobustTrimmed = "Trimmed"
+	RobustRansac = "Ransac"
+
+	def __init__(self):
+		super(LandmarkSolver, self).__init__()
+
+		self.transformType = TransformTypeRigid
+		self.robustMode = LandmarkSolver.RobustNone
+		# Fraction of pairs that is kept by trimmed least squares
+		self.trimFraction = 0.8
+		# Distance under which a pair is an inlier for RANSAC
+		self.inlierThreshold = 1.0
+		self.ransacIterations = 200
+		#: Keys of the pairs that were used for the last robust solution
+		self.inliers = None
+
+		self._pairs = dict()
+		self._reference = None
+		self._sums = _EmptySums()
+
+	def __len__(self):
+		return len(self._pairs)
+
+	def clear(self):
+		self._pairs = dict()
+		self._reference = None
+		self._sums = _EmptySums()
+		self.inliers = None
+
+	def setPair(self, key, source, target):
+		"""
+		Adds a point pair or replaces the pair with the same key.
+		"""
+		if self._reference is None:
+			# Sums are kept relative to the first point to prevent loss of
+			# precision for coordinates that are far away from the origin
+			self._reference = np.array(source, dtype=np.float64)
+		if key in self._pairs:
+			self.removePair(key)
+
+		source = np.array(source, dtype=np.float64)
+		target = np.array(target, dtype=np.float64)
+		self._pairs[key] = (source, target)
+		_AddToSums(self._sums, source - self._reference, target - self._reference, 1.0)
+
+	def removePair(self, key):
+		if key not in self._pairs:
+			return
+		source, target = self._pairs.pop(key)
+		_AddToSums(self._sums, source - self._reference, target - self._reference, -1.0)
+		if not self._pairs:
+			self.clear()
+
+	def keys(self):
+		return self._pairs.keys()
+
+	def solve(self, transformType=None):
+		"""
+		Returns the 4x4 matrix that maps the source points onto the target
+		points. Returns the identity matrix if there are no pairs.
+
+		:rtype: numpy array (4, 4)
+		"""
+		if transformType is None:
+			transformType = self.transformType
+		if not self._pairs:
+			return np.identity(4)
+
+		if self.robustMode == LandmarkSolver.RobustNone or len(self._pairs) <= _MinimalPairs(transformType):
+			self.inliers = None
+			return _Shifted(SolveFromSums(self._sums, transformType), self._reference)
+
+		keys = self._pairs.keys()
+		source = np.array([self._pairs[key][0] for key in keys])
+		target = np.array([self._pairs[key][1] for key in keys])
+		if self.robustMode == LandmarkSolver.RobustTrimmed:
+			matrix, mask = SolveTrimmed(source, target, transformType, self.trimFraction)
+		else:
+			matrix, mask = SolveRansac(source, target, transformType,
+				self.inlierThreshold, self.ransacIterations)
+		self.inliers = [keys[i] for i in range(len(keys)) if mask[i]]
+		return matrix
+
+	def residuals(self, matrix):
+		"""
+		Returns a dictionary with the distance between the transformed source
+		and the target of each pair.
+		"""
+		result = dict()
+		for key, (source, target) in self._pairs.items():
+			transformed = np.dot(matrix[0:3, 0:3], source) + matrix[0:3, 3]
+			result[key] = float(np.linalg.norm(transformed - target))
+		return result
+
+
+def SumsForPoints(source, target):
+	"""
+	Returns the sums that SolveFromSums needs for arrays of point pairs.
+	"""
+	sums = _EmptySums()
+	source = np.asarray(source, dtype=np.float64).reshape(-1, 3)
+	target = np.asarray(target, dtype=np.float64).reshape(-1, 3)
+	sums["n"] = float(len(source))
+	sums["source"] = source.sum(axis=0)
+	sums["target"] = target.sum(axis=0)
+	sums["sourceSource"] = np.dot(source.T, source)
+	sums["targetSource"] = np.dot(target.T, source)
+	return sums
+
+
+def SolveFromSums(sums, transformType):
+	"""
+	Solves the least squares transform for the given sums.
+
+	:rtype: numpy array (4, 4)
+	"""
+	n = sums["n"]
+	matrix = np.identity(4)
+	if n <= 0:
+		return matrix
+
+	sourceMean = sums["source"] / n
+	targetMean = sums["target"] / n
+
+	if transformType == TransformTypeAffine:
+		# Solve M * [s 1]^T = t for all pairs in the least squares sense
+		sourceMatrix = np.empty((4, 4))
+		sourceMatrix[0:3, 0:3] = sums["sourceSource"]
+		sourceMatrix[0:3, 3] = sums["source"]
+		sourceMatrix[3, 0:3] = sums["source"]
+		sourceMatrix[3, 3] = n
+		targetMatrix = np.empty((3, 4))
+		targetMatrix[:, 0:3] = sums["targetSource"]
+		targetMatrix[:, 3] = sums["target"]
+		matrix[0:3, :] = np.dot(targetMatrix, np.linalg.pinv(sourceMatrix))
+		return matrix
+
+	# Cross covariance between the centered target and source points
+	covariance = sums["targetSource"] - n * np.outer(targetMean, sourceMean)
+	u, s, vt = np.linalg.svd(covariance)
+	# Prevent reflections
+	d = np.ones(3)
+	if np.linalg.det(u) * np.linalg.det(vt) < 0:
+		d[2] = -1.0
+	rotation = np.dot(u * d, vt)
+
+	scale = 1.0
+	if transformType == TransformTypeSimilarity:
+		sourceVariance = np.trace(sums["sourceSource"]) - n * np.dot(sourceMean, sourceMean)
+		if sourceVariance > 0:
+			scale = np.dot(s, d) / sourceVariance
+
+	matrix[0:3, 0:3] = scale * rotation
+	matrix[0:3, 3] = targetMean - np.dot(matrix[0:3, 0:3], sourceMean)
+	return matrix
+
+
+def SolveTrimmed(source, target, transformType, fraction=0.8, iterations=5):
+	"""
+	Trimmed least squares: solves, keeps the given fraction of the pairs
+	with the smallest residuals and solves again, a number of times.
+
+	:rtype: numpy array (4, 4), numpy array of bools
+	"""
+	source = np.asarray(source, dtype=np.float64).reshape(-1, 3)
+	target = np.asarray(target, dtype=np.float64).reshape(-1, 3)
+	count = max(_MinimalPairs(transformType), int(round(fraction * len(source))))
+	count = min(count, len(source))
+
+	mask = np.ones(len(source), dtype=bool)
+	matrix = SolveFromSums(SumsForPoints(source, target), transformType)
+	for _ in range(iterations):
+		residuals = _Residuals(matrix, source, target)
+		newMask = np.zeros(len(source), dtype=bool)
+		newMask[np.argsort(residuals)[:count]] = True
+		if np.array_equal(newMask, mask):
+			break
+		mask = newMask
+		matrix = SolveFromSums(SumsForPoints(source[mask], target[mask]), transformType)
+	return matrix, mask
+
+
+def SolveRansac(source, target, transformType, threshold, iterations=200, seed=0):
+	"""
+	RANSAC: solves for random minimal subsets of the pairs and keeps the
+	solution with the most pairs within threshold. The final transform is
+	solved for all inliers of that solution.
+
+	:rtype: numpy array (4, 4), numpy array of bools
+	"""
+	source = np.asarray(source, dtype=np.float64).reshape(-1, 3)
+	target = np.asarray(target, dtype=np.float64).reshape(-1, 3)
+	sampleSize = _MinimalPairs(transformType)
+	random = np.random.RandomState(seed)
+
+	bestMask = np.ones(len(source), dtype=bool)
+	bestCount = 0
+	bestError = np.inf
+	for _ in range(iterations):
+		subset = random.choice(len(source), sampleSize, replace=False)
+		matrix = SolveFromSums(SumsForPoints(source[subset], target[subset]), transformType)
+		residuals = _Residuals(matrix, source, target)
+		mask = residuals < threshold
+		count = np.count_nonzero(mask)
+		error = residuals[mask].sum()
+		if count > bestCount or (count == bestCount and error < bestError):
+			bestMask, bestCount, bestError = mask, count, error
+
+	if bestCount < sampleSize:
+		bestMask = np.ones(len(source), dtype=bool)
+	matrix = SolveFromSums(SumsForPoints(source[bestMask], target[bestMask]), transformType)
+	return matrix, bestMask
+
+
+# Private functions
+
+def _EmptySums():
+	return {
+		"n": 0.0,
+		"source": np.zeros(3),
+		"target": np.zeros(3),
+		"sourceSource": np.zeros((3, 3)),
+		"targetSource": np.zeros((3, 3))
+	}
+
+
+def _AddToSums(sums, source, target, weight):
+	sums["n"] += weight
+	sums["source"] += weight * source
+	sums["target"] += weight * target
+	sums["sourceSource"] += weight * np.outer(source, source)
+	sums["targetSource"] += weight * np.outer(target, source)
+
+
+def _Shifted(matrix, reference):
+	"""
+	Returns the matrix for points that are not shifted by reference:
+	M' = T(reference) * M * T(-reference)
+	"""
+	result = matrix.copy()
+	result[0:3, 3] += reference - np.dot(matrix[0:3, 0:3], reference)
+	return result
+
+
+def _Residuals(matrix, source, target):
+	transformed = np.dot(source, matrix[0:3, 0:3].T) + matrix[0:3, 3]
+	return np.sqrt(((transformed - target) ** 2).sum(axis=1))
+
+
+def _MinimalPairs(transformType):
+	return 4 if transformType == TransformTypeAffine else 3
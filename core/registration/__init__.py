@@ -0,0 +1,2 @@
+from LandmarkSolver import LandmarkSolver
+from ImageRegistration import ImageRegistration
@@ -19,7 +19,15 @@ from vtk import vtkRegularPolygonSource
 from vtk import vtkDataSetMapper
 from vtk import vtkPolyDataMapper
 from vtk import vtkFollower
-from vtk import vtkAssembly
+from vtk import vtkActor2D
+from vtk import vtkLabeledDataMapper
+from vtk import vtkPolyData
+from vtk import vtkPoints
+from vtk import vtkCellArray
+from vtk import vtkStringArray
+from vtk import VTK_UNSIGNED_CHAR
+from vtk.util.numpy_support import numpy_to_vtk
+from vtk.util.numpy_support import numpy_to_vtkIdTypeArray
 from vtk import vtkMatrix4x4
 from vtk import vtkTransform
 from vtk import vtkOutlineSource
@@ -31,6 +39,7 @@ from vtk import vtkAppendPolyData
 from vtk import vtkCubeSource
 from vtk import vtkTransformFilter
 import math
+import numpy as np
 from core.operations import Add
 from core.operations import Subtract
 from core.operations import Multiply
@@ -85,15 +94,105 @@ def CreateLineBeginAndEnd(p1, p2, length, color=None):
 	each begin and end part is compared to the complete line.
 	:rtype: list of line actors
 	"""
+	return [CreateLine(begin, end, color) for begin, end in LineBeginAndEndSegments(p1, p2, length)]
+
+
+def LineSegmentsPolyData(segments, colors, opacity=1.0):
+	"""
+	Creates one poly data object for a list of line segments. Segments
+	is a list of (p1, p2) tuples and colors a list with an RGB color
+	(values between 0 and 1) for each segment. The colors are stored as
+	RGBA cell scalars.
+	"""
+	nrOfSegments = len(segments)
+	points = np.array(segments, dtype=np.float64).reshape(-1, 3)
+
+	# Every cell is stored as: 2, index of p1, index of p2
+	cells = np.empty((nrOfSegments, 3), dtype=np.int64)
+	cells[:, 0] = 2
+	cells[:, 1] = np.arange(0, 2 * nrOfSegments, 2)
+	cells[:, 2] = cells[:, 1] + 1
+
+	cellColors = np.empty((nrOfSegments, 4), dtype=np.uint8)
+	cellColors[:, 0:3] = np.round(np.array(colors, dtype=np.float64).reshape(-1, 3) * 255.0)
+	cellColors[:, 3] = int(round(opacity * 255.0))
+
+	vtkPointsObject = vtkPoints()
+	vtkPointsObject.SetData(numpy_to_vtk(points, deep=1))
+	lines = vtkCellArray()
+	lines.SetCells(nrOfSegments, numpy_to_vtkIdTypeArray(cells.ravel(), deep=1))
+	colorArray = numpy_to_vtk(cellColors, deep=1, array_type=VTK_UNSIGNED_CHAR)
+	colorArray.SetName("colors")
+
+	polyData = vtkPolyData()
+	polyData.SetPoints(vtkPointsObject)
+	polyData.SetLines(lines)
+	polyData.GetCellData().SetScalars(colorArray)
+	return polyData
+
+
+def CreateLineSegments(segments, colors, opacity=1.0):
+	"""
+	Creates one actor for a list of line segments with a color per
+	segment. Use this instead of CreateLine for drawing many lines:
+	all the segments are drawn with one draw call.
+	"""
+	mapper = vtkPolyDataMapper()
+	mapper.SetInputData(LineSegmentsPolyData(segments, colors, opacity))
+	mapper.SetScalarModeToUseCellData()
+	mapper.SetColorModeToDirectScalars()
+
+	actor = vtkActor()
+	actor.PickableOff()
+	actor.SetMapper(mapper)
+	return actor
+
+
+def CreateLabels(positions, labels, color=None, fontSize=12):
+	"""
+	Creates one 2D actor that draws a text label at each of the
+	positions. The labels always face the camera.
+	"""
+	points = vtkPoints()
+	points.SetData(numpy_to_vtk(np.array(positions, dtype=np.float64).reshape(-1, 3), deep=1))
+	texts = vtkStringArray()
+	texts.SetName("labels")
+	for label in labels:
+		texts.InsertNextValue(str(label))
+
+	polyData = vtkPolyData()
+	polyData.SetPoints(points)
+	polyData.GetPointData().AddArray(texts)
+
+	mapper = vtkLabeledDataMapper()
+	mapper.SetInputData(polyData)
+	mapper.SetLabelModeToLabelFieldData()
+	mapper.SetFieldDataName("labels")
+	textProperty = mapper.GetLabelTextProperty()
+	textProperty.SetFontSize(fontSize)
+	textProperty.ShadowOff()
+	textProperty.BoldOff()
+	if color:
+		textProperty.SetColor(color[0], color[1], color[2])
+
+	actor = vtkActor2D()
+	actor.PickableOff()
+	actor.SetMapper(mapper)
+	return actor
+
+
+def LineBeginAndEndSegments(p1, p2, length):
+	"""
+	Length is value between 0 and 0.5 to specify how long
+	each begin and end part is compared to the complete line.
+	:rtype: list of (begin, end) tuples
+	"""
 	point1 = p1
 	point2 = Add(p1, Multiply(Subtract(p2, p1), length))
 	point3 = p2
 	point4 = Add(p2, Multiply(Subtract(p1, p2), length))
 
-	line1 = CreateLine(point1, point2, color)
-	line2 = CreateLine(point3, point4, color)
-
-	return [line1, line2]
+	return [(point1, point2), (point3, point4)]
 
 
 def CreateSphere(radius, color=None):
@@ -332,6 +431,7 @@ def CreateOutline(bounds, color=None):
 def CreateBounds(bounds):
 	"""
 	Creates a boundary object to display around a volume.
+	All the lines are drawn by one actor.
 	:rtype: list of actors
 	"""
 	originX = bounds[0]
@@ -343,42 +443,47 @@ def CreateBounds(bounds):
 
 	linePartLength = 0.2
 
-	lineActors = []
-	lineActors += CreateLineBeginAndEnd([originX, originY, originZ], [boundX, originY, originZ], linePartLength)
-	lineActors += CreateLineBeginAndEnd([originX, originY, originZ], [originX, boundY, originZ], linePartLength)
-	lineActors += CreateLineBeginAndEnd([originX, originY, originZ], [originX, originY, boundZ], linePartLength)
-
-	ColorActor(lineActors[0], [1, 0, 0])
-	ColorActor(lineActors[2], [0, 1, 0])
-	ColorActor(lineActors[4], [0, 0, 1])
-
-	lineActors += CreateLineBeginAndEnd([boundX, boundY, boundZ], [boundX, boundY, originZ], linePartLength)
-	lineActors += CreateLineBeginAndEnd([boundX, boundY, boundZ], [originX, boundY, boundZ], linePartLength)
-	lineActors += CreateLineBeginAndEnd([boundX, boundY, boundZ], [boundX, originY, boundZ], linePartLength)
-
-	lineActors += CreateLineBeginAndEnd([boundX, originY, originZ], [boundX, originY, boundZ], linePartLength)
-	lineActors += CreateLineBeginAndEnd([boundX, originY, originZ], [boundX, boundY, originZ], linePartLength)
-	lineActors += CreateLineBeginAndEnd([originX, boundY, originZ], [originX, boundY, boundZ], linePartLength)
-	lineActors += CreateLineBeginAndEnd([originX, boundY, originZ], [boundX, boundY, originZ], linePartLength)
-	lineActors += CreateLineBeginAndEnd([originX, originY, boundZ], [originX, boundY, boundZ], linePartLength)
-	lineActors += CreateLineBeginAndEnd([originX, originY, boundZ], [boundX, originY, boundZ], linePartLength)
-
-	for lineActor in lineActors:
-		ColorActor(lineActor, color=None, opacity=0.5)
+	edges = [
+		([originX, originY, originZ], [boundX, originY, originZ]),
+		([originX, originY, originZ], [originX, boundY, originZ]),
+		([originX, originY, originZ], [originX, originY, boundZ]),
+		([boundX, boundY, boundZ], [boundX, boundY, originZ]),
+		([boundX, boundY, boundZ], [originX, boundY, boundZ]),
+		([boundX, boundY, boundZ], [boundX, originY, boundZ]),
+		([boundX, originY, originZ], [boundX, originY, boundZ]),
+		([boundX, originY, originZ], [boundX, boundY, originZ]),
+		([originX, boundY, originZ], [originX, boundY, boundZ]),
+		([originX, boundY, originZ], [boundX, boundY, originZ]),
+		([originX, originY, boundZ], [originX, boundY, boundZ]),
+		([originX, originY, boundZ], [boundX, originY, boundZ])
+	]
+
+	segments = []
+	for p1, p2 in edges:
+		segments += LineBeginAndEndSegments(p1, p2, linePartLength)
+
+	# The first parts of the axes that start in the origin are colored R, G and B
+	colors = [[1, 1, 1]] * len(segments)
+	colors[0] = [1, 0, 0]
+	colors[2] = [0, 1, 0]
+	colors[4] = [0, 0, 1]
+
+	dataGrid = CreateLineSegments(segments, colors, opacity=0.5)
 
 	mean = reduce(lambda x, y: x + y, bounds) / 3.0
 	sphereActor = CreateSphere(mean / 25.0)
 	sphereActor.SetPosition(originX, originY, originZ)
 
-	dataGrid = vtkAssembly()
-	for lineActor in lineActors:
-		dataGrid.AddPart(lineActor)
-
 	return [dataGrid, sphereActor]
 
 
 def CreateOrientationGrid(bounds, camera):
-	return []
+	"""
+	Creates 3 axes with nudges and labels that show the coordinates
+	in 3D space. All the lines are drawn by one actor and all the
+	labels by two label actors.
+	:rtype: list of actors
+	"""
 	originX = bounds[0]
 	originY = bounds[2]
 	originZ = bounds[4]
@@ -386,89 +491,51 @@ def CreateOrientationGrid(bounds, camera):
 	boundY = bounds[3] * 1.2
 	boundZ = bounds[5] * 1.2
 
-	lineActorsX = []
-	lineActorsY = []
-	lineActorsZ = []
-
-	lineText = []
+	segments = []
+	colors = []
+	labelPositions = []
+	labels = []
 
 	# Create the main axes
-	lineActorsX.append(CreateLine([0, 0, 0], [boundX, 0, 0]))
-	lineActorsX.append(CreateLine([0, 0, 0], [originX, 0, 0]))
-	lineActorsY.append(CreateLine([0, 0, 0], [0, boundY, 0]))
-	lineActorsY.append(CreateLine([0, 0, 0], [0, originY, 0]))
-	lineActorsZ.append(CreateLine([0, 0, 0], [0, 0, boundZ]))
-	lineActorsZ.append(CreateLine([0, 0, 0], [0, 0, originZ]))
-
-	# Create the nudges on the X axis
-	subdivSize = boundX / 10
-	subdivSize = ClosestToMeasurement(subdivSize)
-	smallHandleSize = subdivSize / 5.0
-	bigHandleSize = 2 * smallHandleSize
-
-	for index in range(1, int(boundX / subdivSize)):
-		handleSize = smallHandleSize if index % 5 != 0 else bigHandleSize
-		lineActorsX.append(CreateLine([index * subdivSize, 0, 0], [index * subdivSize, handleSize, 0]))
-		lineActorsX.append(CreateLine([index * subdivSize, 0, 0], [index * subdivSize, 0, handleSize]))
-		if index > 0 and index % 5 == 0:
-			textItem = CreateTextItem(str(index * subdivSize), 0.4 * subdivSize, camera)
-			textItem.SetPosition([index * subdivSize, -handleSize, -handleSize])
-			ColorActor(textItem, color=[0.6, 0.6, 0.6])
-			lineText.append(textItem)
-
-	textItemX = CreateTextItem("X", 0.5 * subdivSize, camera)
-	textItemX.SetPosition([boundX, 0, 0])
-
-	# Create the nudges on the Y axis
-	subdivSize = boundY / 10
-	subdivSize = ClosestToMeasurement(subdivSize)
-	smallHandleSize = subdivSize / 5.0
-
-	for index in range(1, int(boundY / subdivSize)):
-		handleSize = smallHandleSize if index % 5 != 0 else bigHandleSize
-		lineActorsY.append(CreateLine([0, index * subdivSize, 0], [handleSize, index * subdivSize, 0]))
-		lineActorsY.append(CreateLine([0, index * subdivSize, 0], [0, index * subdivSize, handleSize]))
-		if index > 0 and index % 5 == 0:
-			textItem = CreateTextItem(str(index * subdivSize), 0.4 * subdivSize, camera)
-			textItem.SetPosition([-smallHandleSize, index * subdivSize, -smallHandleSize])
-			ColorActor(textItem, color=[0.6, 0.6, 0.6])
-			lineText.append(textItem)
-
-	textItemY = CreateTextItem("Y", 0.5 * subdivSize, camera)
-	textItemY.SetPosition([0, boundY, 0])
-
-	# Create the nudges on the Z axis
-	subdivSize = boundZ / 10
-	subdivSize = ClosestToMeasurement(subdivSize)
-	smallHandleSize = subdivSize / 5.0
-
-	for index in range(1, int(boundZ / subdivSize)):
-		handleSize = smallHandleSize if index % 5 != 0 else bigHandleSize
-		lineActorsZ.append(CreateLine([0, 0, index * subdivSize], [handleSize, 0, index * subdivSize]))
-		lineActorsZ.append(CreateLine([0, 0, index * subdivSize], [0, handleSize, index * subdivSize]))
-		if index > 0 and index % 5 == 0:
-			textItem = CreateTextItem(str(index * subdivSize), 0.4 * subdivSize, camera)
-			textItem.SetPosition([-handleSize, -handleSize, index * subdivSize])
-			ColorActor(textItem, color=[0.6, 0.6, 0.6])
-			lineText.append(textItem)
-
-	textItemZ = CreateTextItem("Z", 0.5 * subdivSize, camera)
-	textItemZ.SetPosition([0, 0, boundZ])
-
-	# Color the axis: R, G and B
-	for lineActor in lineActorsX:
-		ColorActor(lineActor, [1, 0, 0])
-	for lineActor in lineActorsY:
-		ColorActor(lineActor, [0, 1, 0])
-	for lineActor in lineActorsZ:
-		ColorActor(lineActor, [0, 0, 1])
-
-	# Add the lines into one big assembly
-	dataGrid = vtkAssembly()
-	for lineActor in (lineActorsX + lineActorsY + lineActorsZ):
-		dataGrid.AddPart(lineActor)
-
-	return [dataGrid, textItemX, textItemY, textItemZ] + lineText
+	axes = [
+		([boundX, 0, 0], [originX, 0, 0], [1, 0, 0]),
+		([0, boundY, 0], [0, originY, 0], [0, 1, 0]),
+		([0, 0, boundZ], [0, 0, originZ], [0, 0, 1])
+	]
+	for bound, origin, color in axes:
+		segments += [([0, 0, 0], bound), ([0, 0, 0], origin)]
+		colors += [color, color]
+
+	# Create the nudges on the axes. The nudges of an axis point in
+	# the direction of the other two axes.
+	for axis in range(3):
+		bound = [boundX, boundY, boundZ][axis]
+		color = axes[axis][2]
+		subdivSize = ClosestToMeasurement(bound / 10)
+		smallHandleSize = subdivSize / 5.0
+		bigHandleSize = 2 * smallHandleSize
+		others = [other for other in range(3) if other != axis]
+
+		for index in range(1, int(bound / subdivSize)):
+			handleSize = smallHandleSize if index % 5 != 0 else bigHandleSize
+			position = [0, 0, 0]
+			position[axis] = index * subdivSize
+			for other in others:
+				handle = list(position)
+				handle[other] = handleSize
+				segments.append((position, handle))
+				colors.append(color)
+			if index % 5 == 0:
+				labelPosition = [-handleSize, -handleSize, -handleSize]
+				labelPosition[axis] = index * subdivSize
+				labelPositions.append(labelPosition)
+				labels.append(index * subdivSize)
+
+	lines = CreateLineSegments(segments, colors)
+	tickLabels = CreateLabels(labelPositions, labels, color=[0.6, 0.6, 0.6], fontSize=10)
+	axisLabels = CreateLabels([axis[0] for axis in axes], ["X", "Y", "Z"], fontSize=14)
+
+	return [lines, tickLabels, axisLabels]
 
 
 def ClosestToMeasurement(number):
@@ -27,13 +27,21 @@ class Operator(object):
 	Pool instead of Queue?
 	"""
 
-	def __init__(self):
+	def __init__(self, numberOfWorkers=1):
+		"""
+		:param numberOfWorkers: Number of commands that are processed at the same time
+		:type numberOfWorkers: int
+		"""
 		super(Operator, self).__init__()
 
 		self.queue = Queue()
-		self.worker = Worker(self.queue)
-		self.worker.setDaemon(True)
-		self.worker.start()
+		self.workers = []
+		for index in range(max(1, numberOfWorkers)):
+			worker = Worker(self.queue)
+			worker.setDaemon(True)
+			worker.start()
+			self.workers.append(worker)
+		self.worker = self.workers[0]
 
 	def addCommand(self, command):
 		self.queue.put(command)
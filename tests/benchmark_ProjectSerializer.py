@@ -0,0 +1,107 @@
+"""
+Compares saving and loading a large project as YAML object dump (the
+format of older versions) with the ProjectSerializer format.
+
+Run from the root of the repository:
+	python -m tests.benchmark_ProjectSerializer [transformations] [nodes]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import yaml
+from core.project import Project
+from core.project.ProjectSerializer import ProjectSerializer
+from core.project.ProjectSerializer import LoadLegacyProject
+from core.vtkObjectWrapper import vtkCameraWrapper
+from core.vtkObjectWrapper import vtkTransformWrapper
+from core.vtkObjectWrapper import vtkPiecewiseFunctionWrapper
+from core.vtkObjectWrapper import vtkColorTransferFunctionWrapper
+from vtk import vtkCamera
+from vtk import vtkTransform
+from vtk import vtkPiecewiseFunction
+from vtk import vtkColorTransferFunction
+
+
+def CreateProject(numberOfTransformations, numberOfNodes):
+	opacityFunction = vtkPiecewiseFunction()
+	colorFunction = vtkColorTransferFunction()
+	for index in range(numberOfNodes):
+		opacityFunction.AddPoint(index, index / float(numberOfNodes))
+		colorFunction.AddRGBPoint(index, 0.5, 0.2, index / float(numberOfNodes))
+
+	settings = dict()
+	settings["camera"] = vtkCameraWrapper(vtkCamera())
+	settings["slices"] = [False, False, False]
+	settings["visualizations"] = dict()
+	for key in ["Simple", "CT", "Transfer function"]:
+		settings["visualizations"][key] = {
+			"opacityFunction": vtkPiecewiseFunctionWrapper(opacityFunction),
+			"colorFunction": vtkColorTransferFunctionWrapper(colorFunction)}
+
+	transformations = []
+	for index in range(numberOfTransformations):
+		transform = vtkTransform()
+		transform.RotateX(index)
+		transform.Translate(index, 0.0, 0.0)
+		transformations.append({
+			"TransformationType": "Landmark transform",
+			"Transformation": vtkTransformWrapper(transform),
+			"Filename": None,
+			"Landmarks": [[(1.0, 2.0, 3.0), (3.0, 2.0, 1.0)]] * 10})
+
+	project = Project(title=u"Benchmark", fixedData=u"fixed.mhd", movingData=u"moving.mhd")
+	project.fixedSettings = settings
+	project.movingSettings = settings
+	project.multiSettings = {"camera": vtkCameraWrapper(vtkCamera()), "transformations": transformations}
+	return project
+
+
+def Measure(function, repeat=3):
+	timings = []
+	for _ in range(repeat):
+		start = time.time()
+		function()
+		timings.append(time.time() - start)
+	return min(timings)
+
+
+def Main(numberOfTransformations=500, numberOfNodes=256):
+	project = CreateProject(numberOfTransformations, numberOfNodes)
+	folder = tempfile.mkdtemp()
+	yamlFileName = os.path.join(folder, "project.yaml")
+	jsonFileName = os.path.join(folder, "project.json")
+	serializer = ProjectSerializer()
+
+	def saveYaml():
+		with open(yamlFileName, "w") as projectFile:
+			yaml.dump(project, projectFile, default_flow_style=False)
+
+	def loadYaml():
+		with open(yamlFileName, "r") as projectFile:
+			yaml.load(projectFile, Loader=yaml.Loader)
+
+	try:
+		results = [
+			("yaml save", Measure(saveYaml)),
+			("yaml load", Measure(loadYaml)),
+			("yaml load (safe)", Measure(lambda: LoadLegacyProject(yamlFileName))),
+			("json+npy save", Measure(lambda: serializer.saveProject(project, jsonFileName))),
+			("json+npy load", Measure(lambda: serializer.loadProject(jsonFileName)))]
+		sizes = [
+			("yaml", os.path.getsize(yamlFileName)),
+			("json+npy", os.path.getsize(jsonFileName) + os.path.getsize(jsonFileName[:-5] + ".npy"))]
+	finally:
+		shutil.rmtree(folder)
+
+	print "Project with", numberOfTransformations, "transformations and", numberOfNodes, "transfer function nodes"
+	for name, timing in results:
+		print "%-20s %8.1f ms" % (name, timing * 1000.0)
+	for name, size in sizes:
+		print "%-20s %8d bytes" % (name, size)
+
+
+if __name__ == '__main__':
+	Main(*[int(argument) for argument in sys.argv[1:]])
@@ -0,0 +1,139 @@
+import unittest
+import numpy as np
+from core.data.DataBlockIndex import DataBlockIndex
+from core.data.DataBlockIndex import BlockIndexForImageData
+from core.operations import RayBoxIntersections
+from vtk import vtkImageData
+from vtk import VTK_FLOAT
+from vtk.util.numpy_support import vtk_to_numpy
+
+
+class DataBlockIndexTest(unittest.TestCase):
+
+	def setUp(self):
+		# Volume of 40x33x20 voxels with a bright box in it
+		self.imageData = createImageData([40, 33, 20], [1.0, 1.0, 2.0])
+		volume = vtkVolume(self.imageData)
+		volume[5:9, 20:26, 18:35] = 100.0
+		self.index = DataBlockIndex(self.imageData, blockSize=16)
+
+	def tearDown(self):
+		del self.index
+
+	def testShape(self):
+		self.assertEquals(self.index.shape(), (3, 2, 2))
+
+	def testMinimumMaximum(self):
+		volume = vtkVolume(self.imageData)
+		shape = self.index.shape()
+		for z in range(shape[2]):
+			for y in range(shape[1]):
+				for x in range(shape[0]):
+					block = volume[z * 16:z * 16 + 17, y * 16:y * 16 + 17, x * 16:x * 16 + 17]
+					self.assertEquals(self.index.minimum[z, y, x], block.min())
+					self.assertEquals(self.index.maximum[z, y, x], block.max())
+
+	def testBlocksInRange(self):
+		blocks = self.index.blocksInRange(50, 200)
+		self.assertEquals(blocks.shape, (2, 2, 3))
+		self.assertEquals(np.count_nonzero(blocks), 2)
+		self.assertTrue(blocks[0, 1, 1])
+		self.assertTrue(blocks[0, 1, 2])
+		self.assertFalse(blocks[1, 0, 0])
+
+	def testBoundsAboveThreshold(self):
+		bounds = self.index.boundsAboveThreshold(50)
+		self.assertEquals(bounds, [18, 34, 20, 25, 10, 16])
+		self.assertIsNone(self.index.boundsAboveThreshold(100))
+
+	def testFirstBlockAlongRay(self):
+		result = self.index.firstBlockAlongRay([0, 22, 12], [39, 22, 12], 50)
+		self.assertIsNotNone(result)
+		block, ratio = result
+		self.assertEquals(block, (1, 1, 0))
+		self.assertAlmostEqual(ratio, 16.0 / 39.0)
+
+		# Ray that passes the bright box
+		self.assertIsNone(self.index.firstBlockAlongRay([0, 2, 30], [39, 2, 30], 50))
+		# Ray that misses the volume
+		self.assertIsNone(self.index.firstBlockAlongRay([-10, -10, -10], [-5, -5, -5], 50))
+
+	def testFirstBlockAlongRayWithBlocks(self):
+		blocks = self.index.blocksInRange(-1, 1)
+		result = self.index.firstBlockAlongRay([0, 22, 12], [39, 22, 12], blocks=blocks)
+		self.assertEquals(result[0], (0, 1, 0))
+		self.assertAlmostEqual(result[1], 0.0)
+
+	def testFirstBlockAlongRayClipsCorner(self):
+		# Ray that only clips the corner of block (1, 1, 0) at x + y = 32.2
+		blocks = np.zeros((2, 2, 3), dtype=bool)
+		blocks[0, 1, 1] = True
+		result = self.index.firstBlockAlongRay([10, 22.2, 5], [22.2, 10, 5], blocks=blocks)
+		self.assertIsNotNone(result)
+		self.assertEquals(result[0], (1, 1, 0))
+		self.assertAlmostEqual(result[1], 6.0 / 12.2)
+		# Ray that runs exactly along the border of two blocks
+		result = self.index.firstBlockAlongRay([0, 16, 5], [39, 16, 5], blocks=blocks)
+		self.assertEquals(result[0], (1, 1, 0))
+		self.assertAlmostEqual(result[1], 16.0 / 39.0)
+
+	def testFirstBlockAlongRayBruteForce(self):
+		random = np.random.RandomState(0)
+		shape = self.index.shape()
+		bounds = np.array(self.imageData.GetBounds())
+		size = bounds[1::2] - bounds[0::2]
+		for blockCount in [1, 3]:
+			filled = np.zeros(tuple(reversed(shape)), dtype=bool)
+			for _ in range(blockCount):
+				filled[random.randint(shape[2]), random.randint(shape[1]), random.randint(shape[0])] = True
+			for _ in range(1000):
+				p1 = bounds[0::2] - 0.25 * size + random.rand(3) * 1.5 * size
+				p2 = bounds[0::2] - 0.25 * size + random.rand(3) * 1.5 * size
+				expected = firstBlockBruteForce(self.index, filled, p1, p2)
+				result = self.index.firstBlockAlongRay(p1, p2, blocks=filled)
+				if expected is None:
+					self.assertIsNone(result)
+				else:
+					self.assertIsNotNone(result)
+					self.assertTrue(filled[result[0][2], result[0][1], result[0][0]])
+					self.assertAlmostEqual(result[1], expected, places=6)
+
+	def testIndexIsCached(self):
+		index = BlockIndexForImageData(self.imageData)
+		self.assertIs(index, BlockIndexForImageData(self.imageData))
+		self.imageData.Modified()
+		self.assertIsNot(index, BlockIndexForImageData(self.imageData))
+
+
+def firstBlockBruteForce(index, filled, p1, p2):
+	"""
+	Returns the smallest ratio along the segment where it enters one of
+	the filled blocks, or None.
+	"""
+	entries = []
+	for z, y, x in zip(*np.nonzero(filled)):
+		hits, tNear, tFar = RayBoxIntersections(p1, p2 - p1, index.blockBounds((x, y, z)))
+		tNear = max(tNear[0], 0.0)
+		tFar = min(tFar[0], 1.0)
+		if hits[0] and tNear <= tFar:
+			entries.append(tNear)
+	return min(entries) if entries else None
+
+
+def createImageData(dimensions, spacing):
+	imageData = vtkImageData()
+	imageData.SetDimensions(dimensions)
+	imageData.SetSpacing(spacing)
+	imageData.AllocateScalars(VTK_FLOAT, 1)
+	vtk_to_numpy(imageData.GetPointData().GetScalars())[:] = 0.0
+	return imageData
+
+
+def vtkVolume(imageData):
+	dimensions = imageData.GetDimensions()
+	scalars = vtk_to_numpy(imageData.GetPointData().GetScalars())
+	return scalars.reshape(dimensions[2], dimensions[1], dimensions[0])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from core.data.DataPyramid import DataPyramid
+from core.data.DataPyramid import LevelForVoxelBudget
+from vtk import vtkImageData
+from vtk import VTK_UNSIGNED_CHAR
+
+
+class DataPyramidTest(unittest.TestCase):
+
+	def setUp(self):
+		self.imageData = vtkImageData()
+		self.imageData.SetDimensions(16, 16, 8)
+		self.imageData.SetSpacing(1.0, 1.0, 2.0)
+		self.imageData.AllocateScalars(VTK_UNSIGNED_CHAR, 1)
+		self.imageData.GetPointData().GetScalars().Fill(10)
+
+	def testLevelForVoxelBudget(self):
+		self.assertEquals(LevelForVoxelBudget([16, 16, 8], 2048), 0)
+		self.assertEquals(LevelForVoxelBudget([16, 16, 8], 2047), 1)
+		self.assertEquals(LevelForVoxelBudget([16, 16, 8], 32), 2)
+		self.assertEquals(LevelForVoxelBudget([16, 16, 8], 1), 3)
+		self.assertEquals(LevelForVoxelBudget([16, 16, 8], 1, maximumLevel=2), 2)
+
+	def testLevels(self):
+		pyramid = DataPyramid(self.imageData)
+		self.assertEquals(pyramid.level(0), self.imageData)
+		level = pyramid.level(1)
+		self.assertEquals(level.GetDimensions(), (8, 8, 4))
+		self.assertEquals(level.GetSpacing(), (2.0, 2.0, 4.0))
+		self.assertEquals(level.GetScalarRange(), (10.0, 10.0))
+		# Levels are only created once
+		self.assertEquals(pyramid.level(1), level)
+		self.assertEquals(pyramid.level(10).GetDimensions(), (2, 2, 1))
+		self.assertEquals(pyramid.levelForVoxelBudget(300), 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from core.data import DataQuantizer
+from core.data.DataQuantizer import Quantization
+from core.data.DataQuantizer import SourceScalarRange
+from core.data.DataQuantizer import SourceScalarTypeAsString
+from core.data.DataQuantizer import DisplayTypeNative
+from core.data.DataQuantizer import DisplayTypeUInt16
+from core.data.DataQuantizer import DisplayTypeUInt8
+from vtk import vtkImageData
+from vtk import VTK_FLOAT
+from vtk import VTK_UNSIGNED_CHAR
+
+
+class DataQuantizerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.quantizer = DataQuantizer()
+		self.imageData = vtkImageData()
+		self.imageData.SetDimensions(5, 1, 1)
+		self.imageData.AllocateScalars(VTK_FLOAT, 1)
+		scalars = self.imageData.GetPointData().GetScalars()
+		for index, value in enumerate([-1000.0, 0.0, 1000.0, 2000.0, 3000.0]):
+			scalars.SetValue(index, value)
+
+	def testNative(self):
+		self.assertEquals(self.quantizer.QuantizeData(self.imageData, DisplayTypeNative), self.imageData)
+		self.assertEquals(Quantization(self.imageData), (0.0, 1.0))
+		self.assertEquals(SourceScalarRange(self.imageData), (-1000.0, 3000.0))
+
+	def testUInt16(self):
+		result = self.quantizer.QuantizeData(self.imageData, DisplayTypeUInt16)
+		self.assertEquals(result.GetScalarTypeAsString(), "unsigned short")
+		self.assertEquals(result.GetScalarRange(), (0.0, 65535.0))
+		shift, scale = Quantization(result)
+		self.assertEquals(shift, 1000.0)
+		self.assertAlmostEquals(scale, 65535.0 / 4000.0)
+		self.assertEquals(SourceScalarRange(result), (-1000.0, 3000.0))
+		self.assertEquals(SourceScalarTypeAsString(result), "float")
+		# A value of the source maps onto the value in the display data
+		value = result.GetPointData().GetScalars().GetValue(2)
+		self.assertAlmostEquals(value, (1000.0 + shift) * scale, delta=1.0)
+
+	def testUInt8(self):
+		result = self.quantizer.QuantizeData(self.imageData, DisplayTypeUInt8)
+		self.assertEquals(result.GetScalarRange(), (0.0, 255.0))
+
+	def testSmallTypeIsNotQuantized(self):
+		imageData = vtkImageData()
+		imageData.SetDimensions(2, 2, 2)
+		imageData.AllocateScalars(VTK_UNSIGNED_CHAR, 1)
+		self.assertEquals(self.quantizer.QuantizeData(imageData, DisplayTypeUInt16), imageData)
+
+
+if __name__ == '__main__':
+	unittest.main()
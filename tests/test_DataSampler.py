@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+from core.data.DataSampler import DataSampler
+from core.data.DataSampler import EdgeCandidates
+from vtk import vtkImageData
+from vtk import vtkImageInterpolator
+from vtk import VTK_FLOAT
+from vtk.util.numpy_support import vtk_to_numpy
+
+
+class DataSamplerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.imageData = createImageData([10, 8, 6], [0.5, 1.0, 2.0], [-1.0, 2.0, 3.0])
+		self.sampler = DataSampler()
+		self.sampler.setImageData(self.imageData)
+
+	def tearDown(self):
+		del self.sampler
+
+	def testSamplesMatchInterpolator(self):
+		interpolator = vtkImageInterpolator()
+		interpolator.Initialize(self.imageData)
+
+		points = [[-1.0, 2.0, 3.0], [0.3, 4.1, 7.7], [2.9, 8.5, 12.2], [3.5, 9.0, 13.0], [1.11, 3.3, 5.5]]
+		samples = self.sampler.samplePoints(points)
+		for i in range(len(points)):
+			point = points[i]
+			expected = interpolator.Interpolate(point[0], point[1], point[2], 0)
+			self.assertAlmostEqual(samples[i], expected, delta=1e-4 * max(1.0, abs(expected)))
+
+	def testOutsidePoints(self):
+		self.sampler.outValue = -1.0
+		samples = self.sampler.samplePoints([[-5.0, 0.0, 0.0], [100.0, 4.0, 5.0]])
+		self.assertEquals(list(samples), [-1.0, -1.0])
+
+	def testSampleLine(self):
+		samples = self.sampler.sampleLine([-1.0, 2.0, 3.0], [3.5, 2.0, 3.0], 9)
+		self.assertEquals(len(samples), 10)
+		# Values along the x axis are equal to the x index
+		self.assertAlmostEqual(samples[0], 0.0)
+		self.assertAlmostEqual(samples[-1], 9.0)
+
+	def testSampleCount(self):
+		# Smallest spacing is 0.5 and there are 2 samples per voxel
+		self.assertEquals(self.sampler.sampleCount([0, 0, 0], [20, 0, 0]), 80)
+		self.assertEquals(self.sampler.sampleCount([0, 0, 0], [0.1, 0, 0]), self.sampler.minimumSamples)
+		self.assertEquals(self.sampler.sampleCount([0, 0, 0], [1e6, 0, 0]), self.sampler.maximumSamples)
+
+	def testEdgeCandidates(self):
+		samples = [0, 0, 0, 0, 10, 10, 10, 10, 2, 2, 2]
+		gradient, candidates = EdgeCandidates(samples)
+		self.assertEquals(len(gradient), len(samples))
+		self.assertEquals(list(candidates), [4, 8])
+
+
+def createImageData(dimensions, spacing, origin):
+	imageData = vtkImageData()
+	imageData.SetDimensions(dimensions)
+	imageData.SetSpacing(spacing)
+	imageData.SetOrigin(origin)
+	imageData.AllocateScalars(VTK_FLOAT, 1)
+	scalars = vtk_to_numpy(imageData.GetPointData().GetScalars())
+	z, y, x = np.mgrid[0:dimensions[2], 0:dimensions[1], 0:dimensions[0]]
+	scalars[:] = (x + 10 * y + 100 * z * z).ravel()
+	return imageData
+
+
+if __name__ == '__main__':
+	unittest.main()
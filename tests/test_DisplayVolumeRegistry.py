@@ -0,0 +1,96 @@
+import unittest
+import os
+from core.data import DisplayVolumeRegistry
+from core.data.DataQuantizer import DisplayTypeNative
+from core.data.DisplayVolumeRegistry import PriorityLow
+
+
+class DisplayVolumeRegistryTest(unittest.TestCase):
+
+	def setUp(self):
+		self.registry = DisplayVolumeRegistry.Instance()
+		self.registry.clearCache()
+		self.fileName = os.path.join(os.path.dirname(__file__), "data/hi-3.mhd")
+		self.otherFileName = os.path.join(os.path.dirname(__file__), "data/hi-5.mhd")
+
+	def testSharedVolume(self):
+		first = self.registry.acquire(self.fileName, displayType=DisplayTypeNative)
+		second = self.registry.acquire(self.fileName, displayType=DisplayTypeNative)
+		self.assertIs(first, second)
+		self.assertEquals(self.registry.referenceCount(first), 2)
+		self.assertEquals(self.registry.numberOfVolumes(), 1)
+
+		other = self.registry.acquire(self.otherFileName, displayType=DisplayTypeNative)
+		self.assertIsNot(first, other)
+		self.assertEquals(self.registry.numberOfVolumes(), 2)
+
+		self.registry.release(first)
+		self.assertEquals(self.registry.referenceCount(first), 1)
+		self.registry.release(second)
+		self.assertEquals(self.registry.referenceCount(first), 0)
+		self.registry.release(other)
+		self.assertEquals(self.registry.numberOfVolumes(), 0)
+		self.assertEquals(self.registry.numberOfCachedVolumes(), 2)
+
+		# Released volumes are returned from the cache
+		cached = self.registry.acquire(self.fileName, displayType=DisplayTypeNative)
+		self.assertIs(cached, first)
+		self.assertEquals(self.registry.numberOfCachedVolumes(), 1)
+		self.registry.release(cached)
+
+	def testCacheBudget(self):
+		memoryBudget = self.registry.memoryBudget
+		first = self.registry.acquire(self.fileName, displayType=DisplayTypeNative)
+		second = self.registry.acquire(self.otherFileName, displayType=DisplayTypeNative)
+		# Only room for one of the volumes
+		self.registry.memoryBudget = max(first.GetActualMemorySize(), second.GetActualMemorySize()) * 1024
+		self.registry.release(first)
+		self.registry.release(second)
+		self.registry.memoryBudget = memoryBudget
+		self.assertEquals(self.registry.numberOfCachedVolumes(), 1)
+
+		# The least recently used volume is dropped
+		imageData = self.registry.acquire(self.otherFileName, displayType=DisplayTypeNative)
+		self.assertIs(imageData, second)
+		self.registry.release(imageData)
+
+	def testKeyedOnVoxelBudget(self):
+		full = self.registry.acquire(self.fileName, displayType=DisplayTypeNative)
+		small = self.registry.acquire(self.fileName, maximum=1000, displayType=DisplayTypeNative)
+		self.assertIsNot(full, small)
+		self.registry.release(full)
+		self.registry.release(small)
+		self.assertEquals(self.registry.numberOfVolumes(), 0)
+
+	def testPrefetch(self):
+		self.registry.prefetch(self.fileName, displayType=DisplayTypeNative)
+		self.registry.prefetch(self.otherFileName, displayType=DisplayTypeNative, priority=PriorityLow)
+		self.registry.waitForPrefetches()
+		self.assertEquals(self.registry.numberOfPrefetches(), 0)
+		self.assertEquals(self.registry.numberOfCachedVolumes(), 2)
+		self.assertEquals(self.registry.numberOfVolumes(), 0)
+
+		imageData = self.registry.acquire(self.fileName, displayType=DisplayTypeNative)
+		self.assertEquals(imageData.GetDimensions(), (21, 15, 9))
+		self.assertEquals(self.registry.numberOfCachedVolumes(), 1)
+		self.assertEquals(self.registry.numberOfVolumes(), 1)
+
+		# Prefetching a volume that is in use or cached does nothing
+		self.registry.prefetch(self.fileName, displayType=DisplayTypeNative)
+		self.registry.prefetch(self.otherFileName, displayType=DisplayTypeNative)
+		self.assertEquals(self.registry.numberOfPrefetches(), 0)
+
+		self.registry.release(imageData)
+		self.assertEquals(self.registry.numberOfVolumes(), 0)
+
+	def testPrefetchMissingFile(self):
+		self.registry.prefetch("missing.mhd")
+		self.assertEquals(self.registry.numberOfPrefetches(), 0)
+
+	def testReleaseUnknown(self):
+		self.registry.release(None)
+		self.assertEquals(self.registry.numberOfVolumes(), 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
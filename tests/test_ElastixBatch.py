@@ -0,0 +1,133 @@
+import unittest
+import os
+import shutil
+import tempfile
+from core.elastix.ElastixBatch import ReadManifest
+from core.elastix.ElastixBatch import ReadBatchJournal
+from core.elastix.ElastixBatch import BatchRunner
+from core.elastix.ElastixLog import FinalMetric
+from core.JournalFile import OpenJournalFile
+from core.JournalFile import WriteJournalRecord
+from core.JournalFile import ReadJournalFile
+from core.elastix.ElastixBatch import StateDone
+from core.elastix.ElastixBatch import StateFailed
+from core.elastix.ElastixBatch import StatePending
+
+
+class ElastixBatchTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.dataFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+		self.templateFolder = os.path.join(os.path.dirname(self.dataFolder), "..", "resources/transformations")
+		self.manifest = os.path.join(self.folder, "cohort.csv")
+		with open(self.manifest, "w") as manifestFile:
+			manifestFile.write("fixed,moving,parameters\n")
+			for name in ["hi-5.mhd", "hi-3.mhd", "missing.mhd"]:
+				manifestFile.write("%s,%s,%s\n" % (
+					os.path.join(self.dataFolder, "hi-3.mhd"),
+					os.path.join(self.dataFolder, name),
+					os.path.join(self.dataFolder, "Sample.txt")))
+		self.journal = os.path.join(self.folder, "cohort.jsonl")
+		self.processed = []
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def fakeProcess(self, command):
+		# Writes the files that elastix would write
+		self.processed.append(command.movingData)
+		open(os.path.join(command.outputFolder, "result.0.mhd"), "w").close()
+		with open(os.path.join(command.outputFolder, "elastix.log"), "w") as logFile:
+			logFile.write("Final metric value  = -0.5\n")
+
+	def testReadManifest(self):
+		rows = ReadManifest(self.manifest)
+		self.assertEquals(len(rows), 3)
+		self.assertEquals(rows[0].outputFolder, os.path.join(self.folder, "results", "hi-5-" + rows[0].key()))
+		self.assertEquals(rows[1].state, StatePending)
+		self.assertEquals(len(set(row.key() for row in rows)), 3)
+
+	def testTemplate(self):
+		with open(self.manifest, "w") as manifestFile:
+			manifestFile.write("fixed.mhd,moving.mhd,Default Rigid\n")
+		rows = ReadManifest(self.manifest, templateFolder=self.templateFolder)
+		self.assertTrue(os.path.exists(rows[0].parameterFile))
+
+	def testRunAndResume(self):
+		runner = BatchRunner(ReadManifest(self.manifest), self.journal, numberOfProcesses=2)
+		runner.process = self.fakeProcess
+		self.assertEquals(runner.run(), 3)
+		self.assertEquals(len(self.processed), 2)
+		self.assertEquals(runner.summary()[StateDone], 2)
+		self.assertEquals(runner.rows[0].metric, -0.5)
+		self.assertEquals(runner.rows[2].state, StateFailed)
+		self.assertIsNotNone(runner.rows[2].error)
+
+		records = ReadBatchJournal(self.journal)
+		self.assertEquals(len(records), 3)
+
+		# Only the failed row is run again
+		self.processed = []
+		runner = BatchRunner(ReadManifest(self.manifest), self.journal)
+		runner.process = self.fakeProcess
+		self.assertEquals(runner.run(), 1)
+		self.assertEquals(self.processed, [])
+		self.assertEquals(runner.summary()[StateDone], 2)
+		self.assertEquals(runner.rows[1].metric, -0.5)
+
+	def testRemovedRow(self):
+		runner = BatchRunner(ReadManifest(self.manifest), self.journal)
+		runner.process = self.fakeProcess
+		runner.run()
+
+		# Remove the first row: the other rows keep their own records
+		with open(self.manifest, "r") as manifestFile:
+			lines = manifestFile.readlines()
+		with open(self.manifest, "w") as manifestFile:
+			manifestFile.writelines(lines[:1] + lines[2:])
+		runner = BatchRunner(ReadManifest(self.manifest), self.journal)
+		runner.restore()
+		self.assertEquals([row.state for row in runner.rows], [StateDone, StateFailed])
+		self.assertTrue(runner.rows[0].movingData.endswith("hi-3.mhd"))
+
+	def testRecordWithOtherInputs(self):
+		rows = ReadManifest(self.manifest)
+		os.makedirs(rows[0].outputFolder)
+		open(rows[0].resultData(), "w").close()
+
+		# Record with the key of the row but with other inputs
+		rows[0].state = StateDone
+		record = rows[0].record()
+		record["moving"] = os.path.join(self.dataFolder, "other.mhd")
+		journalFile = OpenJournalFile(self.journal)
+		WriteJournalRecord(journalFile, record)
+		journalFile.close()
+
+		runner = BatchRunner(ReadManifest(self.manifest), self.journal)
+		runner.restore()
+		self.assertEquals(runner.rows[0].state, StatePending)
+
+	def testPartialRecord(self):
+		runner = BatchRunner(ReadManifest(self.manifest), self.journal)
+		runner.process = self.fakeProcess
+		runner.run()
+		with open(self.journal, "a") as journalFile:
+			journalFile.write('{"key":"0123","sta')
+
+		# The next run appends after the last complete record
+		runner = BatchRunner(ReadManifest(self.manifest), self.journal)
+		runner.process = self.fakeProcess
+		self.assertEquals(runner.run(), 1)
+		records = ReadBatchJournal(self.journal)
+		self.assertEquals(len(records), 3)
+		self.assertEquals(records[runner.rows[2].key()]["state"], StateFailed)
+		# Two records for every row of the first run, two for the failed row
+		self.assertEquals(len(ReadJournalFile(self.journal)), 8)
+
+	def testFinalMetric(self):
+		self.assertIsNone(FinalMetric(self.folder))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import os
+import shutil
+import tempfile
+from core.elastix.ElastixSequence import SequenceRunner
+from core.elastix.ElastixLog import IterationCount
+from core.elastix.LinearTransform import ReadTransformParameters
+
+
+class ElastixSequenceTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.dataFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+		self.frames = [os.path.join(self.dataFolder, name) for name in ["hi-3.mhd", "hi-5.mhd", "missing.mhd", "hi-3.mhd"]]
+		self.initialTransformations = []
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def fakeProcess(self, command):
+		# Writes the files that elastix would write
+		self.initialTransformations.append(command.initialTransformation)
+		open(os.path.join(command.outputFolder, "TransformParameters.0.txt"), "w").close()
+		with open(os.path.join(command.outputFolder, "elastix.log"), "w") as logFile:
+			logFile.write("1:ItNr\t2:Metric\n0\t-0.1\n1\t-0.2\n2\t-0.3\n")
+			logFile.write("Final metric value  = -0.3\n")
+
+	def testWarmStart(self):
+		runner = SequenceRunner(os.path.join(self.dataFolder, "hi-3.mhd"), self.frames,
+			os.path.join(self.dataFolder, "Sample.txt"), self.folder)
+		runner.process = self.fakeProcess
+		self.assertEquals(runner.run(), 3)
+
+		# The failed frame is skipped in the chain of initial transforms
+		frames = runner.frames
+		self.assertEquals(self.initialTransformations, [None, frames[0].transformation(), frames[1].transformation()])
+		self.assertEquals(frames[3].initialTransformation, frames[1].transformation())
+		self.assertIsNotNone(frames[2].error)
+		self.assertIsNotNone(frames[1].readTime)
+
+		report = runner.report()
+		self.assertEquals(report["failed"], 1)
+		self.assertEquals(report["iterations"], 9)
+		self.assertEquals(report["frames"][0]["metric"], -0.3)
+
+	def testColdStart(self):
+		runner = SequenceRunner(os.path.join(self.dataFolder, "hi-3.mhd"), self.frames[:2],
+			os.path.join(self.dataFolder, "Sample.txt"), self.folder)
+		runner.process = self.fakeProcess
+		runner.warmStart = False
+		runner.run()
+		self.assertEquals(self.initialTransformations, [None, None])
+
+	def translationProcess(self, command):
+		# Elastix result of a translation of 1 along x after the initial transform
+		self.fakeProcess(command)
+		with open(os.path.join(command.outputFolder, "TransformParameters.0.txt"), "w") as parameterFile:
+			parameterFile.write('(Transform "TranslationTransform")\n')
+			parameterFile.write("(TransformParameters 1 0 0)\n")
+			parameterFile.write('(InitialTransformParametersFileName "%s")\n' % (command.initialTransformation or "NoInitialTransform"))
+
+	def testLinearWarmStart(self):
+		runner = SequenceRunner(os.path.join(self.dataFolder, "hi-3.mhd"), self.frames[:2] * 2,
+			os.path.join(self.dataFolder, "Sample.txt"), self.folder)
+		runner.process = self.translationProcess
+		self.assertEquals(runner.run(), 4)
+
+		# Every frame starts from the flattened transform of the frame before it
+		frames = runner.frames
+		self.assertEquals(self.initialTransformations, [None] + [frame.linearTransformation() for frame in frames[:3]])
+		parameters = ReadTransformParameters(frames[3].linearTransformation())
+		self.assertEquals(parameters["InitialTransformParametersFileName"], ["NoInitialTransform"])
+		self.assertEquals([float(value) for value in parameters["TransformParameters"][9:]], [4.0, 0.0, 0.0])
+
+	def testChainLength(self):
+		runner = SequenceRunner(os.path.join(self.dataFolder, "hi-3.mhd"), self.frames[:2] * 3,
+			os.path.join(self.dataFolder, "Sample.txt"), self.folder)
+		runner.process = self.fakeProcess
+		runner.maximumChainLength = 2
+		runner.run()
+
+		# The chain starts again after two transforms
+		frames = runner.frames
+		self.assertEquals(self.initialTransformations, [None, frames[0].transformation(), frames[1].transformation(),
+			None, frames[3].transformation(), frames[4].transformation()])
+
+	def testIterationCount(self):
+		self.assertIsNone(IterationCount(self.folder))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import numpy as np
+from core.registration import ImageRegistration
+from core.registration.ImageRegistration import SupportsParameterList
+from core.registration.ImageRegistration import TransformTranslation
+from core.registration.ImageRegistration import TransformRigid
+from core.registration.ImageRegistration import TransformAffine
+from core.registration.ImageRegistration import MetricMeanSquares
+from core.registration.ImageRegistration import MetricNormalizedCorrelation
+from core.registration.ImageRegistration import MetricMattesMutualInformation
+from core.elastix import ParameterList
+from vtk import vtkImageData
+from vtk.util.numpy_support import numpy_to_vtk
+
+Centers = np.array([[14.0, 16.0, 18.0], [26.0, 18.0, 14.0], [18.0, 26.0, 22.0]])
+
+
+def Blobs(points):
+	values = np.zeros(len(points))
+	for index, center in enumerate(Centers):
+		values += (index + 1) * 100.0 * np.exp(-np.sum((points - center) ** 2, axis=1) / 18.0)
+	return values
+
+
+def BlobsData(matrix, size=40):
+	"""
+	Returns the blobs, moved by the inverse of matrix: the matrix maps the
+	returned data onto the original blobs.
+	"""
+	z, y, x = np.mgrid[0:size, 0:size, 0:size]
+	points = np.column_stack([x.ravel(), y.ravel(), z.ravel()]).astype(np.float64)
+	values = Blobs(np.dot(points, matrix[0:3, 0:3].T) + matrix[0:3, 3]).astype(np.float32)
+	imageData = vtkImageData()
+	imageData.SetDimensions(size, size, size)
+	imageData.GetPointData().SetScalars(numpy_to_vtk(values, deep=1))
+	return imageData
+
+
+def RotationMatrix(angle, translation):
+	matrix = np.identity(4)
+	matrix[0:3, 0:3] = [[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]]
+	matrix[0:3, 3] = translation
+	return matrix
+
+
+class ImageRegistrationTest(unittest.TestCase):
+
+	def setUp(self):
+		self.registration = ImageRegistration()
+		self.registration.numberOfResolutions = 3
+		self.registration.maximumNumberOfIterations = 150
+		self.fixedData = BlobsData(np.identity(4))
+
+	def assertRegistered(self, matrix, expected, tolerance=0.5):
+		registered = np.dot(Centers, matrix[0:3, 0:3].T) + matrix[0:3, 3]
+		centers = np.dot(Centers, expected[0:3, 0:3].T) + expected[0:3, 3]
+		self.assertLess(np.abs(registered - centers).max(), tolerance)
+
+	def testTranslation(self):
+		expected = RotationMatrix(0.0, [3.0, -2.0, 2.0])
+		self.registration.transformType = TransformTranslation
+		self.registration.metric = MetricMeanSquares
+		matrix = self.registration.register(self.fixedData, BlobsData(expected))
+		self.assertRegistered(matrix, expected)
+
+	def testRigid(self):
+		expected = RotationMatrix(0.15, [2.0, 1.0, -1.0])
+		for metric in [MetricMeanSquares, MetricNormalizedCorrelation, MetricMattesMutualInformation]:
+			self.registration.transformType = TransformRigid
+			self.registration.metric = metric
+			matrix = self.registration.register(self.fixedData, BlobsData(expected))
+			self.assertRegistered(matrix, expected)
+
+	def testAffineWithInitialMatrix(self):
+		expected = RotationMatrix(0.1, [1.0, 2.0, 0.0])
+		self.registration.transformType = TransformAffine
+		self.registration.metric = MetricNormalizedCorrelation
+		initialMatrix = RotationMatrix(0.0, [1.0, 1.0, 0.0])
+		matrix = self.registration.register(self.fixedData, BlobsData(expected), initialMatrix)
+		self.assertRegistered(matrix, expected)
+
+	def testParameterList(self):
+		path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../resources/transformations")
+		rigid = ParameterList()
+		rigid.loadFromFile(os.path.join(path, "Default Rigid.txt"))
+		deformable = ParameterList()
+		deformable.loadFromFile(os.path.join(path, "Default Deformable.txt"))
+		self.assertTrue(SupportsParameterList(rigid))
+		self.assertFalse(SupportsParameterList(deformable))
+
+		self.registration.setParameterList(rigid)
+		self.assertEquals(self.registration.transformType, TransformRigid)
+		self.assertEquals(self.registration.numberOfResolutions, 4)
+		self.assertRaises(ValueError, self.registration.setParameterList, deformable)
+
+
+if __name__ == '__main__':
+	unittest.main()
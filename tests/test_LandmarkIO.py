@@ -0,0 +1,62 @@
+import os
+import unittest
+from core.data.LandmarkIO import ReadLandmarksCsv
+from core.data.LandmarkIO import WriteLandmarksCsv
+from core.data.LandmarkIO import ReadPointsFcsv
+from core.data.LandmarkIO import WritePointsFcsv
+from core.data.LandmarkIO import LandmarkSetsFromPoints
+
+
+class LandmarkIOTest(unittest.TestCase):
+
+	def setUp(self):
+		self.path = os.path.dirname(os.path.abspath(__file__))
+		self.landmarkSets = [
+			[[1.0, 2.0, 3.0], [4.0, 5.0, 6.5]],
+			[[0.1, -0.2, 1e6], None],
+			[None, [7.0, 8.0, 9.0]]
+		]
+
+	def tearDown(self):
+		for name in ["landmarks.csv", "landmarks.fcsv"]:
+			path = os.path.join(self.path, name)
+			if os.path.exists(path):
+				os.remove(path)
+
+	def testCsv(self):
+		filename = os.path.join(self.path, "landmarks.csv")
+		WriteLandmarksCsv(filename, self.landmarkSets)
+		self.assertEquals(ReadLandmarksCsv(filename), self.landmarkSets)
+
+	def testFcsv(self):
+		filename = os.path.join(self.path, "landmarks.fcsv")
+		points = [set[0] for set in self.landmarkSets]
+		WritePointsFcsv(filename, points)
+		self.assertEquals(ReadPointsFcsv(filename), [x for x in points if x is not None])
+
+	def testFcsvCoordinateSystem(self):
+		filename = os.path.join(self.path, "landmarks.fcsv")
+		# Points are written in RAS
+		WritePointsFcsv(filename, [[1.0, 2.0, 3.0]])
+		with open(filename, "r") as fcsvFile:
+			lines = fcsvFile.read().splitlines()
+		self.assertIn("# CoordinateSystem = 0", lines)
+		self.assertEquals(lines[-1].split(",")[1:4], ["-1.0", "-2.0", "3.0"])
+
+		# LPS files are read as is
+		with open(filename, "w") as fcsvFile:
+			fcsvFile.write("# Markups fiducial file version = 4.11\n# CoordinateSystem = LPS\n")
+			fcsvFile.write("1,1.0,2.0,3.0,0,0,0,1,1,1,0,F-1,,\n")
+		self.assertEquals(ReadPointsFcsv(filename), [[1.0, 2.0, 3.0]])
+
+		with open(filename, "w") as fcsvFile:
+			fcsvFile.write("# CoordinateSystem = 2\n")
+		self.assertRaises(ValueError, ReadPointsFcsv, filename)
+
+	def testLandmarkSetsFromPoints(self):
+		sets = LandmarkSetsFromPoints([[1, 1, 1], [2, 2, 2]], [[3, 3, 3]])
+		self.assertEquals(sets, [[[1, 1, 1], [3, 3, 3]], [[2, 2, 2], None]])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import numpy as np
+from core.registration import LandmarkSolver
+from core.registration.LandmarkSolver import TransformTypeRigid
+from core.registration.LandmarkSolver import TransformTypeSimilarity
+from core.registration.LandmarkSolver import TransformTypeAffine
+from vtk import vtkLandmarkTransform
+from vtk import vtkPoints
+
+
+class LandmarkSolverTest(unittest.TestCase):
+
+	def setUp(self):
+		self.solver = LandmarkSolver()
+		random = np.random.RandomState(1)
+		self.source = random.uniform(-50, 50, (20, 3)) + [1000, 0, 0]
+		self.rotation = rotationMatrix([1, 2, 3], 0.4)
+		self.translation = np.array([5.0, -3.0, 12.0])
+
+	def tearDown(self):
+		del self.solver
+
+	def testEmptySolverReturnsIdentity(self):
+		self.assertTrue(np.allclose(self.solver.solve(), np.identity(4)))
+
+	def testRigid(self):
+		target = np.dot(self.source, self.rotation.T) + self.translation
+		self.addPairs(self.source, target)
+
+		matrix = self.solver.solve(TransformTypeRigid)
+		self.assertTrue(np.allclose(matrix[0:3, 0:3], self.rotation))
+		self.assertTrue(np.allclose(matrix[0:3, 3], self.translation))
+
+	def testSimilarity(self):
+		target = 1.5 * np.dot(self.source, self.rotation.T) + self.translation
+		self.addPairs(self.source, target)
+
+		matrix = self.solver.solve(TransformTypeSimilarity)
+		self.assertTrue(np.allclose(matrix[0:3, 0:3], 1.5 * self.rotation))
+		self.assertTrue(np.allclose(matrix[0:3, 3], self.translation))
+
+	def testAffineMatchesVtk(self):
+		random = np.random.RandomState(2)
+		linear = np.identity(3) + random.uniform(-0.2, 0.2, (3, 3))
+		target = np.dot(self.source, linear.T) + self.translation + random.normal(0, 0.5, self.source.shape)
+		self.addPairs(self.source, target)
+
+		matrix = self.solver.solve(TransformTypeAffine)
+		expected = vtkMatrix(self.source, target, TransformTypeAffine)
+		self.assertTrue(np.allclose(matrix, expected, atol=1e-6))
+
+	def testRigidMatchesVtkWithNoise(self):
+		random = np.random.RandomState(3)
+		target = np.dot(self.source, self.rotation.T) + self.translation + random.normal(0, 0.5, self.source.shape)
+		self.addPairs(self.source, target)
+
+		matrix = self.solver.solve(TransformTypeRigid)
+		# vtkPoints uses floats, so the result of vtk is less precise
+		expected = vtkMatrix(self.source, target, TransformTypeRigid)
+		self.assertTrue(np.allclose(matrix, expected, atol=1e-3))
+
+	def testUpdateAndRemovePairs(self):
+		target = np.dot(self.source, self.rotation.T) + self.translation
+		self.addPairs(self.source, target)
+		# Move one landmark to a wrong position and back again
+		self.solver.setPair(0, self.source[0], target[0] + 30.0)
+		self.assertFalse(np.allclose(self.solver.solve()[0:3, 3], self.translation))
+		self.solver.setPair(0, self.source[0], target[0])
+		self.assertTrue(np.allclose(self.solver.solve()[0:3, 3], self.translation))
+
+		self.solver.removePair(5)
+		self.assertEquals(len(self.solver), len(self.source) - 1)
+		self.assertTrue(np.allclose(self.solver.solve()[0:3, 0:3], self.rotation))
+
+	def testRobustModes(self):
+		target = np.dot(self.source, self.rotation.T) + self.translation
+		# Misplace two of the landmarks
+		target[3] += [40.0, 0.0, 0.0]
+		target[7] -= [0.0, 35.0, 10.0]
+		self.addPairs(self.source, target)
+
+		matrix = self.solver.solve()
+		self.assertFalse(np.allclose(matrix[0:3, 0:3], self.rotation, atol=1e-5))
+
+		for mode in [LandmarkSolver.RobustTrimmed, LandmarkSolver.RobustRansac]:
+			self.solver.robustMode = mode
+			matrix = self.solver.solve()
+			self.assertTrue(np.allclose(matrix[0:3, 0:3], self.rotation))
+			self.assertTrue(np.allclose(matrix[0:3, 3], self.translation))
+			self.assertNotIn(3, self.solver.inliers)
+			self.assertNotIn(7, self.solver.inliers)
+
+	def addPairs(self, source, target):
+		for i in range(len(source)):
+			self.solver.setPair(i, source[i], target[i])
+
+
+def rotationMatrix(axis, angle):
+	axis = np.array(axis, dtype=np.float64)
+	axis /= np.linalg.norm(axis)
+	x, y, z = axis
+	cross = np.array([[0, -z, y], [z, 0, -x], [-y, x, 0]])
+	return np.identity(3) + np.sin(angle) * cross + (1 - np.cos(angle)) * np.dot(cross, cross)
+
+
+def vtkMatrix(source, target, transformType):
+	sourcePoints = vtkPoints()
+	targetPoints = vtkPoints()
+	for i in range(len(source)):
+		sourcePoints.InsertNextPoint(source[i])
+		targetPoints.InsertNextPoint(target[i])
+	transform = vtkLandmarkTransform()
+	if transformType == TransformTypeRigid:
+		transform.SetModeToRigidBody()
+	elif transformType == TransformTypeAffine:
+		transform.SetModeToAffine()
+	transform.SetSourceLandmarks(sourcePoints)
+	transform.SetTargetLandmarks(targetPoints)
+	transform.Update()
+	matrix = transform.GetMatrix()
+	return np.array([[matrix.GetElement(i, j) for j in range(4)] for i in range(4)])
+
+
+if __name__ == '__main__':
+	unittest.main()
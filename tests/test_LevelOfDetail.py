@@ -0,0 +1,142 @@
+import unittest
+from ui.LevelOfDetail import LevelOfDetail
+from ui.LevelOfDetail import LevelOfDetailMapper
+from vtk import vtkFixedPointVolumeRayCastMapper
+from vtk import vtkImageData
+from vtk import vtkPlane
+from vtk import vtkInteractorStyleTrackballCamera
+from vtk import VTK_UNSIGNED_CHAR
+
+
+class CountingMapper(vtkFixedPointVolumeRayCastMapper):
+	"""
+	Mapper that counts the calls of SetSampleDistance.
+	"""
+
+	def __init__(self):
+		super(CountingMapper, self).__init__()
+		self.sampleDistanceCalls = 0
+
+	def SetSampleDistance(self, distance):
+		self.sampleDistanceCalls += 1
+		vtkFixedPointVolumeRayCastMapper.SetSampleDistance(self, distance)
+
+
+class InputMapper(object):
+	"""
+	Mapper for several volumes that keeps the inputs per port.
+	"""
+
+	def __init__(self):
+		super(InputMapper, self).__init__()
+		self.inputs = dict()
+
+	def SetInputData(self, port, imageData):
+		self.inputs[port] = imageData
+
+
+class FakeRenderWidget(object):
+
+	def __init__(self):
+		super(FakeRenderWidget, self).__init__()
+		self.rwi = self
+		self.style = vtkInteractorStyleTrackballCamera()
+		self.levelOfDetailMapper = None
+		self.renders = 0
+
+	def GetInteractorStyle(self):
+		return self.style
+
+	def setLevelOfDetailMapper(self, mapper):
+		self.levelOfDetailMapper = mapper
+
+	def render(self):
+		self.renders += 1
+
+
+def CreateImageData(dimensions):
+	imageData = vtkImageData()
+	imageData.SetDimensions(dimensions)
+	imageData.AllocateScalars(VTK_UNSIGNED_CHAR, 1)
+	imageData.GetPointData().GetScalars().Fill(10)
+	return imageData
+
+
+class LevelOfDetailMapperTest(unittest.TestCase):
+
+	def setUp(self):
+		self.mapper = LevelOfDetailMapper(CountingMapper)
+
+	def testLastSetterCallIsReplayed(self):
+		for distance in range(1, 101):
+			self.mapper.SetSampleDistance(float(distance))
+		self.mapper.SetImageSampleDistance(2.0)
+
+		levelMapper = self.mapper.createLevelMapper()
+		self.assertEquals(levelMapper.sampleDistanceCalls, 1)
+		self.assertEquals(levelMapper.GetSampleDistance(), 100.0)
+		self.assertEquals(levelMapper.GetImageSampleDistance(), 2.0)
+		self.assertEquals(self.mapper.mapper().GetSampleDistance(), 100.0)
+
+	def testSetterIsPassedOnToLevelMappers(self):
+		levelMapper = self.mapper.createLevelMapper()
+		self.mapper.SetImageSampleDistance(3.0)
+		self.assertEquals(levelMapper.GetImageSampleDistance(), 3.0)
+		self.assertEquals(self.mapper.GetImageSampleDistance(), 3.0)
+
+	def testInputIsNotCopied(self):
+		imageData = CreateImageData([4, 4, 4])
+		self.mapper.SetInputData(imageData)
+		levelMapper = self.mapper.createLevelMapper()
+		self.assertIsNone(levelMapper.GetInput())
+		self.assertEquals(self.mapper.mapper().GetInput(), imageData)
+
+
+	def testAddIsNotRecorded(self):
+		# Only the full quality mapper gets the plane
+		self.mapper.AddClippingPlane(vtkPlane())
+		levelMapper = self.mapper.createLevelMapper()
+		self.assertEquals(self.mapper.mapper().GetClippingPlanes().GetNumberOfItems(), 1)
+		self.assertIsNone(levelMapper.GetClippingPlanes())
+
+
+class LevelOfDetailTest(unittest.TestCase):
+
+	def setUp(self):
+		self.widget = FakeRenderWidget()
+		self.levelOfDetail = LevelOfDetail(self.widget, InputMapper)
+		self.largeData = CreateImageData([32, 32, 16])
+		self.smallData = CreateImageData([8, 8, 4])
+		self.levelOfDetail.setImageData([self.largeData, self.smallData])
+
+	def tearDown(self):
+		self.levelOfDetail.cleanUp()
+
+	def testLevelsPerVolume(self):
+		# Only the large volume has more voxels than the budget
+		self.levelOfDetail.voxelBudget = 4000
+		self.levelOfDetail.startInteraction()
+		self.assertEquals(self.levelOfDetail.level, 1)
+		mapper = self.widget.levelOfDetailMapper
+		self.assertIsNot(mapper, self.levelOfDetail.mapper.mapper())
+		self.assertEquals(mapper.inputs[0].GetDimensions(), (16, 16, 8))
+		self.assertEquals(mapper.inputs[1], self.smallData)
+
+		self.levelOfDetail.endInteraction()
+		self.assertEquals(self.levelOfDetail.level, 0)
+		self.assertIs(self.widget.levelOfDetailMapper, self.levelOfDetail.mapper.mapper())
+		self.assertEquals(self.widget.renders, 1)
+
+		# The mapper of the levels is made only once
+		self.levelOfDetail.startInteraction()
+		self.assertIs(self.widget.levelOfDetailMapper, mapper)
+
+	def testWithinBudget(self):
+		self.levelOfDetail.voxelBudget = 20000
+		self.levelOfDetail.startInteraction()
+		self.assertEquals(self.levelOfDetail.level, 0)
+		self.assertIs(self.widget.levelOfDetailMapper, self.levelOfDetail.mapper.mapper())
+
+
+if __name__ == '__main__':
+	unittest.main()
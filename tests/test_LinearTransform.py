@@ -0,0 +1,72 @@
+import unittest
+import os
+import math
+import shutil
+import tempfile
+import numpy as np
+from core.elastix.LinearTransform import ReadTransformParameters
+from core.elastix.LinearTransform import TransformMatrix
+from core.elastix.LinearTransform import FlattenTransformation
+
+
+class LinearTransformTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def writeTransformation(self, name, lines):
+		fileName = os.path.join(self.folder, name)
+		with open(fileName, "w") as parameterFile:
+			parameterFile.write("\n".join(lines) + "\n")
+		return fileName
+
+	def transformPoint(self, fileName, point):
+		matrix = TransformMatrix(ReadTransformParameters(fileName))
+		return np.dot(matrix, list(point) + [1.0])[:3]
+
+	def testEuler(self):
+		fileName = self.writeTransformation("euler.txt", [
+			'(Transform "EulerTransform")',
+			"(TransformParameters 0 0 %r 0 0 1) // rotation around z" % (math.pi / 2.0),
+			"(CenterOfRotationPoint 1 0 0)",
+			'(InitialTransformParametersFileName "NoInitialTransform")'])
+		self.assertTrue(np.allclose(self.transformPoint(fileName, (2.0, 0.0, 0.0)), (1.0, 1.0, 1.0)))
+
+	def testNotLinear(self):
+		fileName = self.writeTransformation("bspline.txt", [
+			'(Transform "BSplineTransform")',
+			"(TransformParameters 0 0 0 0)"])
+		self.assertIsNone(TransformMatrix(ReadTransformParameters(fileName)))
+		self.assertFalse(FlattenTransformation(fileName, os.path.join(self.folder, "flat.txt")))
+
+	def testFlatten(self):
+		euler = self.writeTransformation("euler.txt", [
+			'(Transform "EulerTransform")',
+			"(TransformParameters 0 0 %r 0 0 1)" % (math.pi / 2.0),
+			"(CenterOfRotationPoint 1 0 0)",
+			'(InitialTransformParametersFileName "NoInitialTransform")',
+			'(FixedInternalImagePixelType "float")',
+			"(Origin -1.5 3e-05 0)"])
+		affine = self.writeTransformation("affine.txt", [
+			'(Transform "AffineTransform")',
+			"(TransformParameters 2 0 0 0 2 0 0 0 2 0 0 0)",
+			'(InitialTransformParametersFileName "%s")' % euler,
+			'(HowToCombineTransforms "Compose")',
+			'(FixedInternalImagePixelType "float")',
+			"(Origin -1.5 3e-05 0)"])
+		flat = os.path.join(self.folder, "flat.txt")
+		self.assertTrue(FlattenTransformation(affine, flat))
+
+		# The euler transform is applied first
+		self.assertTrue(np.allclose(self.transformPoint(flat, (2.0, 0.0, 0.0)), (2.0, 2.0, 2.0)))
+		parameters = ReadTransformParameters(flat)
+		self.assertEquals(parameters["InitialTransformParametersFileName"], ["NoInitialTransform"])
+		self.assertEquals(parameters["FixedInternalImagePixelType"], ["float"])
+		self.assertEquals(parameters["Origin"], ["-1.5", "3e-05", "0"])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from core.MapperBackend import SelectBackend
+from core.MapperBackend import CpuVolumeMapper
+from core.MapperBackend import CpuMultiVolumeMapper
+from core.MapperBackend import BackendAuto
+from core.MapperBackend import BackendGPU
+from core.MapperBackend import BackendCPU
+from vtk import vtkImageData
+from vtk import vtkVolumeProperty
+from vtk import vtkTransform
+from vtk import VTK_UNSIGNED_CHAR
+
+
+class MapperBackendTest(unittest.TestCase):
+
+	def setUp(self):
+		self.capabilities = {
+			"gpuVolumeMapper": True,
+			"gpuMultiVolumeMapper": True,
+			"display": True,
+			"numberOfThreads": 4,
+			"renderSupported": True,
+			"softwareRenderer": False
+		}
+		self.imageData = vtkImageData()
+		self.imageData.SetDimensions(4, 4, 4)
+		self.imageData.SetSpacing(0.5, 1.0, 2.0)
+		self.imageData.AllocateScalars(VTK_UNSIGNED_CHAR, 1)
+
+	def testSelectBackend(self):
+		self.assertEquals(SelectBackend(BackendAuto, self.capabilities), BackendGPU)
+		self.assertEquals(SelectBackend(BackendCPU, self.capabilities), BackendCPU)
+		self.capabilities["display"] = False
+		self.assertEquals(SelectBackend(BackendAuto, self.capabilities), BackendCPU)
+		self.capabilities["display"] = True
+		self.capabilities["gpuMultiVolumeMapper"] = False
+		self.assertEquals(SelectBackend(BackendGPU, self.capabilities), BackendCPU)
+
+	def testSelectBackendForOpenGLContext(self):
+		self.capabilities["renderSupported"] = False
+		self.assertEquals(SelectBackend(BackendAuto, self.capabilities), BackendCPU)
+		self.assertEquals(SelectBackend(BackendGPU, self.capabilities), BackendCPU)
+		# OpenGL in software (like Mesa llvmpipe in a virtual machine)
+		self.capabilities["renderSupported"] = True
+		self.capabilities["softwareRenderer"] = True
+		self.assertEquals(SelectBackend(BackendAuto, self.capabilities), BackendCPU)
+		self.assertEquals(SelectBackend(BackendGPU, self.capabilities), BackendGPU)
+
+	def testCpuVolumeMapper(self):
+		mapper = CpuVolumeMapper()
+		mapper.SetInputData(self.imageData)
+		self.assertEquals(mapper.GetSampleDistance(), 0.5)
+		self.assertEquals(mapper.GetInteractiveSampleDistance(), 2.0)
+		mapper.SetShaderType(1)
+		self.assertEquals(mapper.GetBlendMode(), mapper.MAXIMUM_INTENSITY_BLEND)
+		mapper.SetShaderType(2)
+		self.assertEquals(mapper.GetBlendMode(), mapper.COMPOSITE_BLEND)
+
+	def testCpuMultiVolumeMapper(self):
+		mapper = CpuMultiVolumeMapper()
+		mapper.SetInputData(0, self.imageData)
+		mapper.SetInputData(1, self.imageData)
+		self.assertEquals(mapper.GetInput(), self.imageData)
+		self.assertEquals(mapper.secondMapper.GetInput(), self.imageData)
+
+		volumeProperty = vtkVolumeProperty()
+		mapper.SetProperty2(volumeProperty)
+		self.assertEquals(mapper.GetProperty2(), volumeProperty)
+		transform = vtkTransform()
+		mapper.SetSecondInputUserTransform(transform)
+		self.assertEquals(mapper.secondVolume.GetUserTransform(), transform)
+
+
+if __name__ == '__main__':
+	unittest.main()
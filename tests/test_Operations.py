@@ -110,3 +110,62 @@ class OperationsTest(unittest.TestCase):
 		sca2 = 2
 		sca3 = 3
 		self.assertRaises(AssertionError, Mean, [sca1, sca2, sca3])
+
+	def testClosestPoints(self):
+		p, q = ClosestPoints([0, 0, 0], [2, 0, 0], [1, -1, 1], [1, 1, 1])
+		self.assertEquals(p, [1, 0, 0])
+		self.assertEquals(q, [1, 0, 1])
+
+	def testClosestPointsClamped(self):
+		p, q = ClosestPoints([0, 0, 0], [1, 0, 0], [3, -1, 0], [3, 1, 0], clamp=True)
+		self.assertEquals(p, [1, 0, 0])
+		self.assertEquals(q, [3, 0, 0])
+
+	def testClosestPointsBatch(self):
+		p1 = [[0, 0, 0], [0, 0, 0]]
+		p2 = [[2, 0, 0], [0, 2, 0]]
+		q1 = [[1, -1, 1], [-1, 1, 0]]
+		q2 = [[1, 1, 1], [1, 1, 0]]
+		p, q = ClosestPointsBatch(p1, p2, q1, q2)
+		self.assertEquals(p.tolist(), [[1, 0, 0], [0, 1, 0]])
+		self.assertEquals(q.tolist(), [[1, 0, 1], [0, 1, 0]])
+
+	def testLineIntersectionWithTriangle(self):
+		triangle = [[0, 0, 0], [1, 0, 0], [0, 1, 0]]
+		hit, intersection = LineIntersectionWithTriangle([0.25, 0.25, 1], [0.25, 0.25, -1], triangle)
+		self.assertTrue(hit)
+		self.assertEquals(intersection, [0.25, 0.25, 0])
+
+		hit, intersection = LineIntersectionWithTriangle([1, 1, 1], [1, 1, -1], triangle)
+		self.assertFalse(hit)
+
+	def testLineIntersectionsWithTriangles(self):
+		triangles = [[[0, 0, 0], [1, 0, 0], [0, 1, 0]], [[0, 0, 2], [1, 0, 2], [0, 1, 2]]]
+		hits, intersections = LineIntersectionsWithTriangles([0.25, 0.25, 1], [0.25, 0.25, -1], triangles)
+		self.assertEquals(hits.tolist(), [True, False])
+		self.assertEquals(intersections[1].tolist(), [0.25, 0.25, 2])
+
+	def testTransformPoints(self):
+		matrix = [[2, 0, 0, 1], [0, 1, 0, 2], [0, 0, 1, 3], [0, 0, 0, 1]]
+		result = TransformPoints(matrix, [[0, 0, 0], [1, 1, 1]])
+		self.assertEquals(result.tolist(), [[1, 2, 3], [3, 3, 4]])
+
+	def testRayBoxIntersections(self):
+		bounds = [0, 1, 0, 1, 0, 1]
+		origins = [[-1, 0.5, 0.5], [-1, 2, 0.5], [0.5, 0.5, 0.5]]
+		directions = [[1, 0, 0], [1, 0, 0], [0, 0, 2]]
+		hits, tNear, tFar = RayBoxIntersections(origins, directions, bounds)
+		self.assertEquals(hits.tolist(), [True, False, True])
+		self.assertEquals(tNear[0], 1)
+		self.assertEquals(tFar[0], 2)
+		self.assertEquals(tNear[2], -0.25)
+		self.assertEquals(tFar[2], 0.25)
+
+	def testRayBoxIntersectionsWithMatrix(self):
+		bounds = [0, 1, 0, 1, 0, 1]
+		# Box is translated to [10, 11] on the x axis
+		matrix = [[1, 0, 0, 10], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+		hits, tNear, tFar = RayBoxIntersections([0, 0.5, 0.5], [1, 0, 0], bounds, matrix)
+		self.assertTrue(hits[0])
+		self.assertEquals(tNear[0], 10)
+		self.assertEquals(tFar[0], 11)
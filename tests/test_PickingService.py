@@ -0,0 +1,115 @@
+import unittest
+import numpy as np
+from ui.transformations.PickingService import PickingService
+from vtk import vtkImageData
+from vtk import vtkVolume
+from vtk import vtkPlane
+from vtk import vtkFixedPointVolumeRayCastMapper
+from vtk import vtkVolumeProperty
+from vtk import vtkPiecewiseFunction
+from vtk import vtkRenderer
+from vtk import vtkRenderWindow
+from vtk import VTK_FLOAT
+from vtk.util.numpy_support import vtk_to_numpy
+
+
+class PickingServiceTest(unittest.TestCase):
+
+	def setUp(self):
+		# Volume of 40x33x20 voxels with blocks of 16 voxels. Only block
+		# (1, 1, 0) contains visible values.
+		imageData = vtkImageData()
+		imageData.SetDimensions(40, 33, 20)
+		imageData.SetSpacing(1.0, 1.0, 2.0)
+		imageData.AllocateScalars(VTK_FLOAT, 1)
+		scalars = vtk_to_numpy(imageData.GetPointData().GetScalars())
+		scalars[:] = 0.0
+		scalars.reshape(20, 33, 40)[4:8, 20:28, 20:28] = 100.0
+
+		opacityFunction = vtkPiecewiseFunction()
+		opacityFunction.AddPoint(0.0, 0.0)
+		opacityFunction.AddPoint(100.0, 1.0)
+		volumeProperty = vtkVolumeProperty()
+		volumeProperty.SetScalarOpacity(opacityFunction)
+		mapper = vtkFixedPointVolumeRayCastMapper()
+		mapper.SetInputData(imageData)
+		volume = vtkVolume()
+		volume.SetProperty(volumeProperty)
+		volume.SetMapper(mapper)
+
+		self.widget = FakeRenderWidget(imageData, volume)
+		self.service = PickingService(self.widget)
+
+	def tearDown(self):
+		del self.service
+		del self.widget
+
+	def testCornerClippingRayIsPicked(self):
+		# The ray only clips the corner of the visible block at x + y = 32.2
+		x, y = self.widget.lookAlong([10.0, 22.2, 5.0], [22.2, 10.0, 5.0])
+		self.service.pick(x, y)
+		self.assertEquals(self.service.skippedPicks, 0)
+		self.assertEquals(self.service.executedPicks, 1)
+
+	def testRayPastVisibleBlockIsSkipped(self):
+		x, y = self.widget.lookAlong([10.0, 21.8, 5.0], [21.8, 10.0, 5.0])
+		self.service.pick(x, y)
+		self.assertEquals(self.service.skippedPicks, 1)
+		self.assertEquals(self.service.executedPicks, 0)
+
+
+	def testClippingPlanesInvalidateCache(self):
+		x, y = self.widget.lookAlong([10.0, 21.8, 5.0], [21.8, 10.0, 5.0])
+		self.service.pick(x, y)
+		self.service.pick(x, y)
+		self.assertEquals(self.service.cachedPicks, 1)
+
+		# Moving the clipping box only changes the planes of the mapper
+		plane = vtkPlane()
+		plane.SetNormal(1.0, 0.0, 0.0)
+		self.widget.volume.GetMapper().AddClippingPlane(plane)
+		self.service.pick(x, y)
+		self.assertEquals(self.service.cachedPicks, 1)
+		plane.SetOrigin(5.0, 0.0, 0.0)
+		self.service.pick(x, y)
+		self.assertEquals(self.service.cachedPicks, 1)
+		self.assertEquals(self.service.skippedPicks, 3)
+
+
+class FakeRenderWidget(object):
+	"""
+	Has the parts of a render widget that the picking service uses.
+	"""
+
+	def __init__(self, imageData, volume):
+		super(FakeRenderWidget, self).__init__()
+
+		self.imageData = imageData
+		self.volume = volume
+		self.renderer = vtkRenderer()
+		self.renderWindow = vtkRenderWindow()
+		self.renderWindow.SetOffScreenRendering(1)
+		self.renderWindow.SetSize(100, 100)
+		self.renderWindow.AddRenderer(self.renderer)
+
+	def lookAlong(self, point1, point2):
+		"""
+		Points the camera along the line and returns the display position
+		of which the ray runs through both points.
+		"""
+		point1 = np.array(point1)
+		point2 = np.array(point2)
+		camera = self.renderer.GetActiveCamera()
+		camera.SetPosition(point1 - 100.0 * (point2 - point1))
+		camera.SetFocalPoint(point2)
+		camera.SetViewUp(0.0, 0.0, 1.0)
+		camera.SetClippingRange(1.0, 10000.0)
+
+		self.renderer.SetWorldPoint(point2[0], point2[1], point2[2], 1.0)
+		self.renderer.WorldToDisplay()
+		x, y, z = self.renderer.GetDisplayPoint()
+		return x, y
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -1,10 +1,18 @@
 import unittest
 import os
+import shutil
 from core.project import ProjectController
 
 
 class ProjectControllerTest(unittest.TestCase):
 
+	def tearDown(self):
+		# The project controller keeps a journal open in the project folder
+		ProjectController.Instance().journal.close()
+		projectPath = os.path.dirname(os.path.abspath(__file__)) + "/project"
+		if os.path.exists(projectPath):
+			shutil.rmtree(projectPath)
+
 	def testProjectController(self):
 		projectController = ProjectController.Instance()
 		self.assertIsNotNone(projectController.currentProject)
@@ -30,7 +38,8 @@ class ProjectControllerTest(unittest.TestCase):
 		self.assertIsNone(projectController.currentProject.folder)
 
 		# Test for existance of a project file in the project folder
-		self.assertTrue(os.path.exists(projectPath + "/project.yaml"))
+		self.assertTrue(os.path.exists(projectPath + "/project.json"))
+		self.assertTrue(os.path.exists(projectPath + "/project.npy"))
 		self.assertTrue(projectController.loadProject(projectPath))
 
 		# Load the project again from disk
@@ -39,6 +48,7 @@ class ProjectControllerTest(unittest.TestCase):
 		self.assertIn("Unique", projectController.currentProject.title)
 
 		try:
-			os.remove(projectPath + "/project.yaml")
+			os.remove(projectPath + "/project.json")
+			os.remove(projectPath + "/project.npy")
 		except Exception:
 			self.assertTrue(False)
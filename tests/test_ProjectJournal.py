@@ -0,0 +1,109 @@
+import unittest
+import os
+import shutil
+import tempfile
+from core.project import Project
+from core.project.ProjectJournal import ProjectJournal
+from core.project.ProjectJournal import ReadJournal
+from core.project.ProjectJournal import ReplayJournal
+from core.project.ProjectJournal import RecordTransformations
+from core.project.ProjectJournal import RecordSettings
+from core.project.ProjectJournal import RecordLandmarks
+from core.vtkObjectWrapper import vtkTransformWrapper
+from vtk import vtkTransform
+
+
+def WrappedTransformation(x):
+	transform = vtkTransform()
+	transform.Translate(x, 0.0, 0.0)
+	return {
+		"TransformationType": "Manual transform",
+		"Transformation": vtkTransformWrapper(transform),
+		"Filename": u"moving.mhd",
+		"Landmarks": None}
+
+
+class ProjectJournalTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.fileName = os.path.join(self.folder, "journal.jsonl")
+		self.journal = ProjectJournal()
+		self.journal.open(self.fileName)
+
+	def tearDown(self):
+		self.journal.close()
+		shutil.rmtree(self.folder)
+
+	def testTransformations(self):
+		self.journal.record(RecordTransformations, {"keep": 0, "append": [WrappedTransformation(1.0), WrappedTransformation(2.0)]})
+		self.journal.record(RecordTransformations, {"keep": 1, "append": [WrappedTransformation(3.0)]})
+		self.assertEquals(self.journal.numberOfRecords, 2)
+
+		records = ReadJournal(self.fileName)
+		self.assertEquals(len(records), 2)
+		project = Project()
+		self.assertEquals(ReplayJournal(project, records), 2)
+		self.assertEquals(project.journalSequence, 2)
+
+		transformations = project.multiSettings["transformations"]
+		self.assertEquals(len(transformations), 2)
+		transform = transformations[1]["Transformation"].originalObject()
+		self.assertEquals(transform.GetPosition(), (3.0, 0.0, 0.0))
+
+	def testSettingsAndLandmarks(self):
+		self.journal.record(RecordTransformations, {"keep": 0, "append": [WrappedTransformation(1.0)]})
+		self.journal.record(RecordSettings, {"name": "multiSettings", "settings": {"slices": [True, False, False]}})
+		landmarks = [[(1.0, 2.0, 3.0), None]]
+		transform = vtkTransform()
+		transform.Translate(5.0, 0.0, 0.0)
+		self.journal.record(RecordLandmarks, {"index": 0, "landmarks": landmarks, "transform": vtkTransformWrapper(transform)})
+
+		project = Project()
+		ReplayJournal(project, ReadJournal(self.fileName))
+		self.assertEquals(project.multiSettings["slices"], [True, False, False])
+		transformation = project.multiSettings["transformations"][0]
+		self.assertEquals(transformation["Landmarks"], [[[1.0, 2.0, 3.0], None]])
+		self.assertEquals(transformation["Transformation"].originalObject().GetPosition(), (5.0, 0.0, 0.0))
+
+	def testRecordsOfSnapshotAreSkipped(self):
+		self.journal.record(RecordSettings, {"name": "fixedSettings", "settings": {"slices": [True, True, True]}})
+		self.journal.record(RecordSettings, {"name": "fixedSettings", "settings": {"slices": [False, True, False]}})
+		project = Project()
+		project.journalSequence = 1
+		self.assertEquals(ReplayJournal(project, ReadJournal(self.fileName)), 1)
+		self.assertEquals(project.fixedSettings["slices"], [False, True, False])
+
+	def testPartialRecord(self):
+		self.journal.record(RecordSettings, {"name": "fixedSettings", "settings": {}})
+		self.journal.close()
+		with open(self.fileName, "a") as journalFile:
+			journalFile.write('{"sequence":2,"type":"sett')
+		self.assertEquals(len(ReadJournal(self.fileName)), 1)
+
+	def testRecordAfterPartialRecord(self):
+		self.journal.record(RecordSettings, {"name": "fixedSettings", "settings": {}})
+		self.journal.close()
+		with open(self.fileName, "a") as journalFile:
+			journalFile.write('{"sequence":2,"type":"sett')
+
+		# The next session continues after the last complete record
+		self.journal.open(self.fileName, 1)
+		for index in range(3):
+			self.journal.record(RecordSettings, {"name": "fixedSettings", "settings": {"index": index}})
+		records = ReadJournal(self.fileName)
+		self.assertEquals([record["sequence"] for record in records], [1, 2, 3, 4])
+		self.assertEquals(records[-1]["data"]["settings"], {"index": 2})
+
+	def testClear(self):
+		self.journal.record(RecordSettings, {"name": "fixedSettings", "settings": {}})
+		self.journal.clear()
+		self.assertEquals(ReadJournal(self.fileName), [])
+		self.journal.record(RecordSettings, {"name": "fixedSettings", "settings": {}})
+		records = ReadJournal(self.fileName)
+		self.assertEquals(len(records), 1)
+		self.assertEquals(records[0]["sequence"], 2)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import os
+import shutil
+import tempfile
+import yaml
+from core.project import Project
+from core.project.ProjectSerializer import ProjectSerializer
+from core.project.ProjectSerializer import LoadLegacyProject
+from core.project.ProjectSerializer import ArrayFileName
+from core.vtkObjectWrapper import vtkCameraWrapper
+from core.vtkObjectWrapper import vtkTransformWrapper
+from core.vtkObjectWrapper import vtkPiecewiseFunctionWrapper
+from vtk import vtkCamera
+from vtk import vtkTransform
+from vtk import vtkPiecewiseFunction
+
+
+class ProjectSerializerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.fileName = os.path.join(self.folder, "project.json")
+
+		transform = vtkTransform()
+		transform.Translate(1.0, 2.0, 3.0)
+		opacityFunction = vtkPiecewiseFunction()
+		opacityFunction.AddPoint(0.0, 0.0)
+		opacityFunction.AddPoint(100.0, 0.5)
+
+		self.project = Project(title=u"TestProject", fixedData=u"fixed.mhd",
+			movingData=u"moving.mhd", isReference=True)
+		self.project.fixedSettings = {
+			"slices": [True, False, False],
+			"camera": vtkCameraWrapper(vtkCamera()),
+			"opacityFunction": vtkPiecewiseFunctionWrapper(opacityFunction)}
+		self.project.multiSettings = {
+			"transformations": [{
+				"TransformationType": "Manual transform",
+				"Transformation": vtkTransformWrapper(transform),
+				"Filename": None,
+				"Landmarks": [[(1.0, 2.0, 3.0), None]]}]}
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def testSaveAndLoad(self):
+		serializer = ProjectSerializer()
+		serializer.saveProject(self.project, self.fileName)
+		self.assertTrue(os.path.exists(self.fileName))
+		self.assertTrue(os.path.exists(ArrayFileName(self.fileName)))
+
+		project = serializer.loadProject(self.fileName)
+		self.assertEquals(project, self.project)
+
+		settings = project.fixedSettings
+		self.assertEquals(settings["slices"], [True, False, False])
+		self.assertEquals(list(settings["camera"].position), [0.0, 0.0, 1.0])
+		self.assertEquals(settings["opacityFunction"].nodes[1], [100.0, 0.5, 0.5, 0.0])
+
+		transformation = project.multiSettings["transformations"][0]
+		transform = transformation["Transformation"].originalObject()
+		self.assertEquals(transform.GetPosition(), (1.0, 2.0, 3.0))
+		self.assertEquals(transformation["Landmarks"], [[[1.0, 2.0, 3.0], None]])
+
+	def testSaveReplacesFiles(self):
+		serializer = ProjectSerializer()
+		serializer.saveProject(self.project, self.fileName)
+		self.project.title = u"Saved again"
+		serializer.saveProject(self.project, self.fileName)
+		self.assertEquals(sorted(os.listdir(self.folder)), ["project.json", "project.npy"])
+		self.assertEquals(serializer.loadProject(self.fileName).title, u"Saved again")
+
+	def testArraysOfOtherSave(self):
+		serializer = ProjectSerializer()
+		serializer.saveProject(self.project, self.fileName)
+		shutil.copy(self.fileName, self.fileName + ".old")
+
+		# Crash after the array file of the next save was renamed
+		transform = vtkTransform()
+		transform.Translate(4.0, 5.0, 6.0)
+		self.project.multiSettings["transformations"][0]["Transformation"] = vtkTransformWrapper(transform)
+		serializer.saveProject(self.project, self.fileName)
+		shutil.copy(self.fileName + ".old", self.fileName)
+		self.assertRaises(ValueError, serializer.loadProject, self.fileName)
+
+	def testUnknownObject(self):
+		self.project.fixedSettings = {"object": object()}
+		serializer = ProjectSerializer()
+		self.assertRaises(ValueError, serializer.saveProject, self.project, self.fileName)
+
+	def testLegacyProject(self):
+		legacyFileName = os.path.join(self.folder, "project.yaml")
+		with open(legacyFileName, "w") as projectFile:
+			yaml.dump(self.project, projectFile, default_flow_style=False)
+
+		project = LoadLegacyProject(legacyFileName)
+		self.assertEquals(project, self.project)
+		transformation = project.multiSettings["transformations"][0]
+		self.assertEquals(transformation["Transformation"].originalObject().GetPosition(), (1.0, 2.0, 3.0))
+
+	def testLegacyProjectIsSafe(self):
+		legacyFileName = os.path.join(self.folder, "project.yaml")
+		with open(legacyFileName, "w") as projectFile:
+			projectFile.write("!!python/object/apply:os.system ['echo unsafe']\n")
+		self.assertRaises(yaml.YAMLError, LoadLegacyProject, legacyFileName)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import shutil
+import tempfile
+from core.project import Project
+from core.project.ProjectSerializer import ProjectSerializer
+from core.data import DataReader
+from core.vtkObjectWrapper import vtkTransformWrapper
+from RegistrationShopBatch import ProcessProject
+from RegistrationShopBatch import ProcessProjects
+from RegistrationShopBatch import CompleteTransform
+from vtk import vtkTransform
+
+
+def WrappedTransformation(x, fileName):
+	transform = vtkTransform()
+	transform.Translate(x, 0.0, 0.0)
+	return {
+		"TransformationType": "Manual transform",
+		"Transformation": vtkTransformWrapper(transform),
+		"Filename": fileName,
+		"Landmarks": None}
+
+
+class RegistrationShopBatchTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.dataFileName = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data/hi-3.mhd")
+		self.projectFolder = os.path.join(self.folder, "project")
+		os.makedirs(self.projectFolder)
+
+		project = Project(title="Batch", fixedData=self.dataFileName, movingData=self.dataFileName)
+		project.multiSettings = {"transformations": [
+			WrappedTransformation(1.0, self.dataFileName),
+			WrappedTransformation(2.0, self.dataFileName)]}
+		ProjectSerializer().saveProject(project, os.path.join(self.projectFolder, "project.json"))
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def testCompleteTransform(self):
+		transformations = [
+			WrappedTransformation(1.0, "first.mhd"),
+			WrappedTransformation(2.0, "second.mhd"),
+			WrappedTransformation(3.0, "second.mhd")]
+		# Only the transformations of the last data set are concatenated
+		transform = CompleteTransform(transformations)
+		self.assertEquals(transform.GetMatrix().GetElement(0, 3), 5.0)
+		transform = CompleteTransform([])
+		self.assertEquals(transform.GetMatrix().GetElement(0, 3), 0.0)
+
+	def testProcessProject(self):
+		report = ProcessProject(self.projectFolder)
+		self.assertTrue(report["success"], report["error"])
+		self.assertEquals(report["registrations"], 0)
+		self.assertTrue(os.path.exists(os.path.join(self.projectFolder, "registered.mhd")))
+		for step in ["load", "elastix", "read", "transform", "write", "total"]:
+			self.assertIn(step, report["timings"])
+
+		imageData = DataReader().GetImageData(report["output"])
+		self.assertEquals(imageData.GetDimensions(), (21, 15, 9))
+
+	def testProcessProjects(self):
+		outputFolder = os.path.join(self.folder, "output")
+		os.makedirs(outputFolder)
+		missingFolder = os.path.join(self.folder, "missing")
+		report = ProcessProjects([self.projectFolder, missingFolder], outputFolder, numberOfProcesses=2)
+		self.assertEquals(report["succeeded"], 1)
+		self.assertEquals(report["failed"], 1)
+		self.assertTrue(os.path.exists(os.path.join(outputFolder, "project.mhd")))
+		self.assertIsNotNone(report["projects"][1]["error"])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from ui.RenderScheduler import RenderScheduler
+
+
+class FakeWidget(object):
+
+	def __init__(self, fails=False):
+		super(FakeWidget, self).__init__()
+		self.fails = fails
+		self.renders = 0
+
+	def renderNow(self):
+		if self.fails:
+			raise RuntimeError("Internal C++ object already deleted.")
+		self.renders += 1
+
+
+class RenderSchedulerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.scheduler = RenderScheduler.Instance()
+		self.scheduler.flush()
+		self.scheduler.resetCounters()
+
+	def testRendersOnce(self):
+		widget = FakeWidget()
+		for _ in range(3):
+			self.scheduler.scheduleRender(widget)
+		self.assertTrue(self.scheduler.isScheduled(widget))
+		self.scheduler.flush()
+		self.assertEquals(widget.renders, 1)
+		self.assertEquals(self.scheduler.counters(), {"requested": 3, "executed": 1})
+
+	def testCancel(self):
+		widget = FakeWidget()
+		self.scheduler.scheduleRender(widget)
+		self.scheduler.cancel(widget)
+		self.assertFalse(self.scheduler.isScheduled(widget))
+		self.scheduler.flush()
+		self.assertEquals(widget.renders, 0)
+
+	def testFailingWidget(self):
+		widgets = [FakeWidget(), FakeWidget(fails=True), FakeWidget()]
+		for widget in widgets:
+			self.scheduler.scheduleRender(widget)
+		self.scheduler.flush()
+		self.assertEquals([widget.renders for widget in widgets], [1, 0, 1])
+
+
+if __name__ == '__main__':
+	unittest.main()
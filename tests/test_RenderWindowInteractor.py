@@ -0,0 +1,48 @@
+import unittest
+import time
+from ui.RenderWindowInteractor import MouseMoveCoalescer
+
+
+class MouseMoveCoalescerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.dispatched = []
+		self.coalescer = MouseMoveCoalescer(self.dispatched.append)
+
+	def testOnlyLatestMoveIsDispatched(self):
+		for x in range(5):
+			self.coalescer.receive((x, 0))
+		self.assertTrue(self.coalescer.hasPendingMove())
+		self.assertEquals(self.dispatched, [])
+
+		self.coalescer.flush()
+		self.assertEquals(self.dispatched, [(4, 0)])
+		self.assertEquals(self.coalescer.counters(), {"received": 5, "dispatched": 1})
+
+		# Nothing is pending after a flush
+		self.coalescer.flush()
+		self.assertEquals(self.dispatched, [(4, 0)])
+
+	def testCancel(self):
+		self.coalescer.receive((1, 2))
+		self.coalescer.cancel()
+		self.coalescer.flush()
+		self.assertEquals(self.dispatched, [])
+		self.assertEquals(self.coalescer.counters(), {"received": 1, "dispatched": 0})
+
+		self.coalescer.resetCounters()
+		self.assertEquals(self.coalescer.counters(), {"received": 0, "dispatched": 0})
+
+	def testMinimumInterval(self):
+		self.assertEquals(self.coalescer.timeUntilNextDispatch(), 0)
+		self.coalescer.minimumInterval = 1000
+		self.coalescer.receive((1, 2))
+		self.coalescer.flush()
+		delay = self.coalescer.timeUntilNextDispatch()
+		self.assertTrue(0 < delay <= 1000)
+		self.coalescer._lastDispatchTime = time.time() - 2.0
+		self.assertEquals(self.coalescer.timeUntilNextDispatch(), 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
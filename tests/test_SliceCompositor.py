@@ -0,0 +1,81 @@
+import unittest
+from core.data.SliceCompositor import SliceCompositor
+from core.data.SliceCompositor import CompareModeAdd
+from core.data.SliceCompositor import CompareModeCheckerboard
+from core.data.SliceCompositor import CompareModeDifference
+from core.data.SliceCompositor import CompareModeBlend
+from vtk import vtkImageData
+from vtk import VTK_FLOAT
+from vtk.util.numpy_support import vtk_to_numpy
+
+
+class SliceCompositorTest(unittest.TestCase):
+
+	def setUp(self):
+		self.compositor = SliceCompositor()
+		self.compositor.fixedColor = [1.0, 0.0, 0.0]
+		self.compositor.movingColor = [0.0, 0.0, 1.0]
+		self.fixed = createSlice([4, 4, 1], 100.0)
+		self.moving = createSlice([4, 4, 1], 50.0)
+
+	def tearDown(self):
+		del self.compositor
+
+	def testAdd(self):
+		self.compositor.setMode(CompareModeAdd)
+		output = self.compositor.compose(self.fixed, self.moving, 0.0, 100.0)
+		colors = vtk_to_numpy(output.GetPointData().GetScalars())
+
+		self.assertEquals(output.GetDimensions(), (4, 4, 1))
+		self.assertEquals(list(colors[0]), [255, 0, 127])
+
+	def testOutputIsReused(self):
+		output = self.compositor.compose(self.fixed, self.moving, 0.0, 100.0)
+		scalars = output.GetPointData().GetScalars()
+		otherOutput = self.compositor.compose(self.moving, self.fixed, 0.0, 100.0)
+
+		self.assertIs(output, otherOutput)
+		self.assertIs(scalars, otherOutput.GetPointData().GetScalars())
+		self.assertEquals(list(vtk_to_numpy(scalars)[0]), [127, 0, 255])
+
+	def testDifference(self):
+		self.compositor.setMode(CompareModeDifference)
+		output = self.compositor.compose(self.fixed, self.moving, 0.0, 200.0)
+		colors = vtk_to_numpy(output.GetPointData().GetScalars())
+
+		self.assertEquals(list(colors[5]), [63, 63, 63])
+
+	def testBlend(self):
+		self.compositor.setMode(CompareModeBlend)
+		self.compositor.blendFactor = 0.25
+		output = self.compositor.compose(self.fixed, self.moving, 0.0, 100.0)
+		colors = vtk_to_numpy(output.GetPointData().GetScalars())
+
+		self.assertEquals(list(colors[0]), [191, 0, 31])
+
+	def testCheckerboard(self):
+		self.compositor.setMode(CompareModeCheckerboard)
+		self.compositor.checkerSize = 2
+		output = self.compositor.compose(self.fixed, self.moving, 0.0, 100.0)
+		colors = vtk_to_numpy(output.GetPointData().GetScalars())
+
+		# First tile shows the fixed slice, the tile next to it the moving slice
+		self.assertEquals(list(colors[0]), [255, 0, 0])
+		self.assertEquals(list(colors[2]), [0, 0, 127])
+		self.assertEquals(list(colors[8]), [0, 0, 127])
+		self.assertEquals(list(colors[10]), [255, 0, 0])
+
+	def testUnknownMode(self):
+		self.assertRaises(ValueError, self.compositor.setMode, "Unknown")
+
+
+def createSlice(dimensions, value):
+	imageData = vtkImageData()
+	imageData.SetDimensions(dimensions)
+	imageData.AllocateScalars(VTK_FLOAT, 1)
+	vtk_to_numpy(imageData.GetPointData().GetScalars())[:] = value
+	return imageData
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from core.StartupProfiler import StartupProfiler
+
+
+class StartupProfilerTest(unittest.TestCase):
+
+	def testImportTimes(self):
+		profiler = StartupProfiler.Instance()
+		sys.modules.pop("colorsys", None)
+		profiler.start()
+		try:
+			import colorsys
+		finally:
+			profiler.stop()
+
+		self.assertFalse(profiler.enabled)
+		self.assertIn("colorsys", profiler.imports)
+		inclusive, exclusive = profiler.imports["colorsys"]
+		self.assertTrue(inclusive >= exclusive >= 0.0)
+		self.assertIsNotNone(colorsys)
+
+		profiler.mark("Test")
+		report = profiler.report()
+		self.assertIn("colorsys", report)
+		self.assertIn("Test", report)
+
+	def testRelativeImports(self):
+		# Two packages that both have a module named helper
+		folder = tempfile.mkdtemp()
+		for package in ["profilera", "profilerb"]:
+			os.makedirs(os.path.join(folder, package))
+			with open(os.path.join(folder, package, "__init__.py"), "w") as moduleFile:
+				moduleFile.write("import helper\nimport other\n")
+			with open(os.path.join(folder, package, "other.py"), "w") as moduleFile:
+				moduleFile.write("import helper\n")
+			with open(os.path.join(folder, package, "helper.py"), "w") as moduleFile:
+				moduleFile.write("value = 1\n")
+
+		profiler = StartupProfiler.Instance()
+		sys.path.insert(0, folder)
+		profiler.start()
+		try:
+			import profilera
+			helperTime = list(profiler.imports["profilera.helper"])
+			import profilerb
+		finally:
+			profiler.stop()
+			sys.path.remove(folder)
+			for name in list(sys.modules):
+				if name.startswith("profilera") or name.startswith("profilerb"):
+					del sys.modules[name]
+			shutil.rmtree(folder)
+
+		self.assertIsNotNone(profilera)
+		self.assertIsNotNone(profilerb)
+		self.assertIn("profilera.helper", profiler.imports)
+		self.assertIn("profilerb.helper", profiler.imports)
+		self.assertIn("profilerb.other", profiler.imports)
+		self.assertNotIn("helper", profiler.imports)
+		# The second import of helper (in other) is not measured
+		self.assertEquals(profiler.imports["profilera.helper"], helperTime)
+
+	def testStopRestoresImport(self):
+		import __builtin__
+		original = __builtin__.__import__
+		profiler = StartupProfiler.Instance()
+		profiler.start()
+		profiler.stop()
+		self.assertIs(__builtin__.__import__, original)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from core.data.SubVolume import ExtentForBounds
+from core.data.SubVolume import ExtractSubVolume
+from vtk import vtkImageData
+from vtk import VTK_UNSIGNED_CHAR
+
+
+class SubVolumeTest(unittest.TestCase):
+
+	def setUp(self):
+		self.imageData = vtkImageData()
+		self.imageData.SetDimensions(10, 10, 10)
+		self.imageData.SetOrigin(-5.0, 0.0, 0.0)
+		self.imageData.SetSpacing(1.0, 1.0, 2.0)
+		self.imageData.AllocateScalars(VTK_UNSIGNED_CHAR, 1)
+
+	def testExtentForBounds(self):
+		bounds = self.imageData.GetBounds()
+		self.assertIsNone(ExtentForBounds(self.imageData, bounds))
+		extent = ExtentForBounds(self.imageData, [-2.5, 0.5, 2.0, 3.0, 4.0, 8.5])
+		self.assertEquals(extent, [2, 6, 2, 3, 2, 5])
+		extent = ExtentForBounds(self.imageData, [-2.5, 0.5, 2.0, 3.0, 4.0, 8.5], margin=3)
+		self.assertEquals(extent, [0, 9, 0, 6, 0, 8])
+
+	def testExtentOutsideOfData(self):
+		extent = ExtentForBounds(self.imageData, [100, 200, 0, 9, 0, 18])
+		self.assertEquals(extent, [9, 9, 0, 9, 0, 9])
+
+	def testExtractSubVolume(self):
+		self.assertEquals(ExtractSubVolume(self.imageData, None), self.imageData)
+		subVolume = ExtractSubVolume(self.imageData, [2, 6, 2, 3, 2, 5])
+		self.assertEquals(subVolume.GetDimensions(), (5, 2, 4))
+		self.assertEquals(subVolume.GetBounds(), (-3.0, 1.0, 2.0, 3.0, 4.0, 10.0))
+
+
+if __name__ == '__main__':
+	unittest.main()
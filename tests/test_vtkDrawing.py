@@ -0,0 +1,33 @@
+import unittest
+from core.vtkDrawing import LineSegmentsPolyData
+from core.vtkDrawing import CreateBounds
+from core.vtkDrawing import CreateOrientationGrid
+from vtk import vtkCamera
+
+
+class vtkDrawingTest(unittest.TestCase):
+
+	def testLineSegmentsPolyData(self):
+		segments = [([0, 0, 0], [1, 0, 0]), ([0, 0, 0], [0, 2, 0])]
+		polyData = LineSegmentsPolyData(segments, [[1, 0, 0], [0, 1, 0]], opacity=0.5)
+		self.assertEquals(polyData.GetNumberOfPoints(), 4)
+		self.assertEquals(polyData.GetNumberOfLines(), 2)
+		self.assertEquals(polyData.GetPoint(3), (0.0, 2.0, 0.0))
+		colors = polyData.GetCellData().GetScalars()
+		self.assertEquals(colors.GetTuple(1), (0.0, 255.0, 0.0, 128.0))
+
+	def testCreateBounds(self):
+		items = CreateBounds([0, 10, 0, 20, 0, 30])
+		self.assertEquals(len(items), 2)
+		self.assertEquals(items[0].GetMapper().GetInput().GetNumberOfLines(), 24)
+
+	def testCreateOrientationGrid(self):
+		items = CreateOrientationGrid([0, 100, 0, 100, 0, 100], vtkCamera())
+		self.assertEquals(len(items), 3)
+		# 6 axis lines, 2 nudges for each of the 11 ticks per axis
+		self.assertEquals(items[0].GetMapper().GetInput().GetNumberOfLines(), 6 + 3 * 11 * 2)
+		self.assertEquals(items[1].GetMapper().GetInput().GetNumberOfPoints(), 6)
+
+
+if __name__ == '__main__':
+	unittest.main()
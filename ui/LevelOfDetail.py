@@ -0,0 +1,217 @@
+"""
+LevelOfDetail
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import weakref
+from collections import OrderedDict
+from PySide.QtCore import QObject
+from PySide.QtCore import QTimer
+from PySide.QtCore import Signal
+from ui.Interactor import Interactor
+from core.data.DataPyramid import DataPyramid
+
+
+class LevelOfDetail(QObject, Interactor):
+	"""
+	LevelOfDetail renders a coarser version of the data of a render widget
+	while the user is interacting: rotating the camera or dragging one of
+	the box widgets. Full quality is restored on the end of the
+	interaction, or when no interaction happened for idleTimeout
+	milliseconds (for instance when an end event got lost).
+
+	Every combination of levels gets its own mapper, so that switching
+	levels doesn't upload the data to the GPU again. The mappers are made
+	with createMapper. The widget uses the mapper attribute, which passes
+	the settings on to all the mappers, and should implement
+	setLevelOfDetailMapper(mapper), which gives the volume the mapper of
+	the current level.
+	"""
+
+	levelChanged = Signal(int)
+
+	def __init__(self, widget, createMapper):
+		super(LevelOfDetail, self).__init__()
+
+		self.widget = widget
+		#: Mapper of the full quality data, passes its settings on to the other levels
+		self.mapper = LevelOfDetailMapper(createMapper)
+		#: Maximum number of voxels (per volume) that is rendered during interaction
+		self.voxelBudget = 4000000
+		#: Milliseconds without interaction after which full quality is restored
+		self.idleTimeout = 300
+		self.enabled = True
+		#: The effective level: 0 is full quality, every next level halves the dimensions
+		self.level = 0
+
+		self._pyramids = []
+		self._levels = []
+		self._interacting = False
+		# Mappers for combinations of levels other than full quality
+		self._mappers = dict()
+
+		self._timer = QTimer(self)
+		self._timer.setSingleShot(True)
+		self._timer.timeout.connect(self.endInteraction)
+
+		self.observe(self.widget.rwi.GetInteractorStyle())
+
+	def observe(self, obj):
+		"""
+		Observes the start, end and interaction events of a vtk object,
+		like an interactor style or a box widget.
+		"""
+		self.AddObserver(obj, "StartInteractionEvent", self._startInteractionEvent)
+		self.AddObserver(obj, "InteractionEvent", self._interactionEvent)
+		self.AddObserver(obj, "EndInteractionEvent", self._endInteractionEvent)
+
+	def setImageData(self, imageDatas):
+		"""
+		Sets the image data objects that are rendered by the widget. Full
+		quality is restored, a running interaction continues with the
+		levels of the new data on its next event.
+		"""
+		self._interacting = False
+		self._timer.stop()
+		self._pyramids = [DataPyramid(imageData) for imageData in imageDatas]
+		self._setLevels([0] * len(self._pyramids))
+		self._mappers = dict()
+
+	def startInteraction(self):
+		self._interacting = True
+		self._timer.start(self.idleTimeout)
+		if self.enabled:
+			self._setLevels([pyramid.levelForVoxelBudget(self.voxelBudget) for pyramid in self._pyramids])
+
+	def interact(self):
+		# Interaction continues after the idle timeout restored full quality
+		if not self._interacting:
+			self.startInteraction()
+		else:
+			self._timer.start(self.idleTimeout)
+
+	def endInteraction(self):
+		self._interacting = False
+		self._timer.stop()
+		if self.level != 0:
+			self._setLevels([0] * len(self._pyramids))
+			self.widget.render()
+
+	def activeMapper(self):
+		"""
+		Returns the mapper of the current level.
+		"""
+		if not any(self._levels):
+			return self.mapper.mapper()
+		return self._mappers[tuple(self._levels)]
+
+	def cleanUp(self):
+		self._interacting = False
+		self._timer.stop()
+		self.cleanUpCallbacks()
+		self._pyramids = []
+		self._levels = []
+		self._mappers = dict()
+
+	# Private methods
+
+	def _setLevels(self, levels):
+		"""
+		Every volume gets its own level, so that a small volume is not
+		made coarser than needed. The reported level is the coarsest one.
+		"""
+		if levels == self._levels:
+			return
+		self._levels = levels
+		if any(levels) and tuple(levels) not in self._mappers:
+			self._mappers[tuple(levels)] = self._createMapper(levels)
+		self.widget.setLevelOfDetailMapper(self.activeMapper())
+		level = max(levels) if levels else 0
+		if level != self.level:
+			self.level = level
+			self.levelChanged.emit(level)
+
+	def _createMapper(self, levels):
+		mapper = self.mapper.createLevelMapper()
+		imageDatas = [self._pyramids[i].level(levels[i]) for i in range(len(levels))]
+		if len(imageDatas) == 1:
+			mapper.SetInputData(imageDatas[0])
+		else:
+			for port in range(len(imageDatas)):
+				mapper.SetInputData(port, imageDatas[port])
+		return mapper
+
+	def _startInteractionEvent(self, obj, event):
+		self.startInteraction()
+
+	def _interactionEvent(self, obj, event):
+		self.interact()
+
+	def _endInteractionEvent(self, obj, event):
+		self.endInteraction()
+
+
+class LevelOfDetailMapper(object):
+	"""
+	LevelOfDetailMapper stands in for the mapper of the full quality data.
+	Calls that change the settings of the mapper (Set...) are passed on to
+	the mappers of the other levels as well. The last call of every setter
+	is repeated on mappers that are created later. The input is only given
+	to the full quality mapper. Other calls (like Add... and Remove...) go
+	to the full quality mapper only, so settings that the levels share
+	should be made with a setter (like SetClippingPlanes).
+	"""
+
+	def __init__(self, createMapper):
+		super(LevelOfDetailMapper, self).__init__()
+
+		self._createMapper = createMapper
+		self._mapper = createMapper()
+		self._levelMappers = []
+		# Setter name: arguments of its last call, in the order of the calls
+		self._calls = OrderedDict()
+
+	def mapper(self):
+		"""
+		Returns the mapper of the full quality data.
+		"""
+		return self._mapper
+
+	def createLevelMapper(self):
+		"""
+		Returns a new mapper with the same settings as the full quality
+		mapper, but without input.
+		"""
+		mapper = self._createMapper()
+		for name, args in self._calls.items():
+			getattr(mapper, name)(*args)
+		self._levelMappers = [item for item in self._levelMappers if item() is not None]
+		self._levelMappers.append(weakref.ref(mapper))
+		return mapper
+
+	def SetInputData(self, *args):
+		self._mapper.SetInputData(*args)
+
+	def SetInputConnection(self, *args):
+		self._mapper.SetInputConnection(*args)
+
+	def RemoveAllInputs(self):
+		self._mapper.RemoveAllInputs()
+
+	def __getattr__(self, name):
+		attribute = getattr(self._mapper, name)
+		if not callable(attribute) or not name.startswith("Set"):
+			return attribute
+
+		def call(*args):
+			# Only the last call of a setter matters
+			self._calls.pop(name, None)
+			self._calls[name] = args
+			for reference in self._levelMappers:
+				mapper = reference()
+				if mapper is not None:
+					getattr(mapper, name)(*args)
+			return attribute(*args)
+		return call
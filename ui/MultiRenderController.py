@@ -10,8 +10,7 @@ from PySide.QtCore import Slot
 from PySide.QtCore import Signal
 from PySide.QtGui import QWidget
 from core.vtkObjectWrapper import vtkCameraWrapper
-from core.data import DataReader
-from core.data import DataResizer
+from core.data import DisplayVolumeRegistry
 from ui.transformations import TransformationList
 from ui.visualizations import MultiVisualizationTypeMix
 from ui.visualizations import MultiVolumeVisualizationFactory
@@ -51,7 +50,9 @@ class MultiRenderController(QObject):
 		"""
 		:type fileName: str
 		"""
+		registry = DisplayVolumeRegistry.Instance()
 		if fileName is None:
+			registry.release(self.fixedImageData)
 			self.fixedImageData = None
 			self.fixedVisualization = None
 			self.visualization = None
@@ -63,13 +64,12 @@ class MultiRenderController(QObject):
 			self.visualizationChanged.emit(self.visualization)
 			return
 
-		# Read image data
-		dataReader = DataReader()
-		imageData = dataReader.GetImageData(fileName)
-		# TODO: there should be a setting for this, either in project, per loaded
-		# data file or a general setting
-		resizer = DataResizer()
-		self.fixedImageData = resizer.ResizeData(imageData, maximum=25000000)
+		# Get the display volume that is shared with the render controller
+		# TODO: there should be a setting for the voxel budget, either in
+		# project, per loaded data file or a general setting
+		imageData = registry.acquire(fileName)
+		registry.release(self.fixedImageData)
+		self.fixedImageData = imageData
 
 		# Give the image data to the widget
 		self.multiRenderWidget.setFixedData(self.fixedImageData)
@@ -80,7 +80,9 @@ class MultiRenderController(QObject):
 
 	@Slot(basestring)
 	def setMovingFile(self, fileName):
+		registry = DisplayVolumeRegistry.Instance()
 		if fileName is None:
+			registry.release(self.movingImageData)
 			self.movingImageData = None
 			self.movingVisualization = None
 			self.multiRenderWidget.setMovingData(self.movingImageData)
@@ -89,12 +91,10 @@ class MultiRenderController(QObject):
 			self.visualizationChanged.emit(self.movingVisualization)
 			return
 
-		# Read image data
-		dataReader = DataReader()
-		# self.movingImageData = dataReader.GetImageData(fileName)
-		imageData = dataReader.GetImageData(fileName)
-		resizer = DataResizer()
-		self.movingImageData = resizer.ResizeData(imageData, maximum=25000000)
+		# Get the display volume that is shared with the render controller
+		imageData = registry.acquire(fileName)
+		registry.release(self.movingImageData)
+		self.movingImageData = imageData
 
 		# Give the image data to the widget
 		self.multiRenderWidget.setMovingData(self.movingImageData)
@@ -106,17 +106,19 @@ class MultiRenderController(QObject):
 	@Slot(object)
 	def setRenderSettings(self, renderSettings):
 		if renderSettings is not None:
-			self.slices = renderSettings["slices"]
+			# Settings that are recovered from the project journal can be incomplete
+			self.slices = renderSettings.get("slices", [False, False, False])
 			self.multiRenderWidget.setSlices(self.slices)
-			cameraWrapper = renderSettings["camera"]
-			cameraWrapper.applyToObject(self.multiRenderWidget.renderer.GetActiveCamera())
-			transformationsWrapped = renderSettings["transformations"]
+			cameraWrapper = renderSettings.get("camera")
+			if cameraWrapper is not None:
+				cameraWrapper.applyToObject(self.multiRenderWidget.renderer.GetActiveCamera())
+			transformationsWrapped = renderSettings.get("transformations")
 			if transformationsWrapped is not None:
 				transformations = TransformationList()
 				transformations.setPythonVersion(transformationsWrapped)
 				self.multiRenderWidget.transformations = transformations
-			self.clippingBox = renderSettings["clippingBox"]
-			self.clippingPlanes = renderSettings["clippingPlanes"]
+			self.clippingBox = renderSettings.get("clippingBox", False)
+			self.clippingPlanes = renderSettings.get("clippingPlanes", True)
 			self.updateVisualization()
 			self.slicesChanged.emit(self.slices)
 			self.clippingBoxChanged.emit(self.clippingBox)
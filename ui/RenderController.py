@@ -22,8 +22,7 @@ from ui.visualizations import VisualizationTypeMIP
 from ui.visualizations import VolumeVisualizationFactory
 from ui.visualizations import VolumeVisualizationWrapper
 from core.vtkObjectWrapper import vtkCameraWrapper
-from core.data import DataReader
-from core.data import DataResizer
+from core.data import DisplayVolumeRegistry
 
 
 class RenderController(QObject):
@@ -72,7 +71,9 @@ class RenderController(QObject):
 		"""
 		:type fileName: str
 		"""
+		registry = DisplayVolumeRegistry.Instance()
 		if fileName is None:
+			registry.release(self.imageData)
 			self.imageData = None
 			self.visualization = None
 			self.renderWidget.setData(self.imageData)
@@ -81,11 +82,12 @@ class RenderController(QObject):
 			self.visualizationChanged.emit(self.visualization)
 			return
 
-		# Read image data
-		dataReader = DataReader()
-		imageData = dataReader.GetImageData(fileName)
-		resizer = DataResizer()
-		self.imageData = resizer.ResizeData(imageData, maximum=25000000)
+		# Get the display volume that is shared with the multi render
+		# controller. Acquire before releasing, so that setting the same
+		# file again does not read the file again
+		imageData = registry.acquire(fileName)
+		registry.release(self.imageData)
+		self.imageData = imageData
 
 		# Give the image data to the widget
 		self.renderWidget.setData(self.imageData)
@@ -168,6 +170,7 @@ class RenderController(QObject):
 
 		if self.visualizationType in self.visualizations:
 			self.visualization = self.visualizations[self.visualizationType]
+			self.visualization.setQuantization(self.imageData)
 			self.visualization.updateTransferFunction()
 		else:
 			self.visualization = VolumeVisualizationFactory.CreateProperty(self.visualizationType)
@@ -177,6 +180,7 @@ class RenderController(QObject):
 				elif self.tag == "moving":
 					self.visualization.color = self.visualization.colors[1]
 			self.visualization.setImageData(self.imageData)
+			self.visualization.setQuantization(self.imageData)
 			self.visualization.updateTransferFunction()
 			self.visualizations[self.visualizationType] = self.visualization
 
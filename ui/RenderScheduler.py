@@ -0,0 +1,129 @@
+"""
+RenderScheduler
+
+Coalesces render requests of the render widgets. Calling render() on
+a widget only marks that widget as dirty. Once per turn of the event
+loop the scheduler flushes all dirty widgets so that every render
+window is rendered at most once, no matter how many times it was asked
+to render in the meantime.
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import time
+from PySide.QtCore import QObject
+from PySide.QtCore import QTimer
+from core.decorators import Singleton
+
+
+@Singleton
+class RenderScheduler(QObject):
+	"""
+	RenderScheduler keeps a list of widgets that requested a render.
+	Widgets that want to be scheduled should implement renderNow(),
+	which does the actual rendering.
+	"""
+
+	def __init__(self):
+		QObject.__init__(self)
+
+		self._dirtyWidgets = []
+		self._maximumFrameRate = 60.0
+		self._lastFlushTime = 0.0
+
+		self._timer = QTimer(self)
+		self._timer.setSingleShot(True)
+		self._timer.timeout.connect(self.flush)
+
+		#: Number of times render() was called on a scheduled widget
+		self.requestedRenders = 0
+		#: Number of times a widget was actually rendered
+		self.executedRenders = 0
+
+	def setMaximumFrameRate(self, frameRate):
+		"""
+		Sets the maximum number of flushes per second. Use 0 (or None) to
+		flush on every turn of the event loop.
+
+		:type frameRate: float
+		"""
+		self._maximumFrameRate = frameRate
+
+	def maximumFrameRate(self):
+		"""
+		:rtype: float
+		"""
+		return self._maximumFrameRate
+
+	def scheduleRender(self, widget):
+		"""
+		Marks the widget as dirty and makes sure that a flush is scheduled.
+		"""
+		self.requestedRenders += 1
+		if widget not in self._dirtyWidgets:
+			self._dirtyWidgets.append(widget)
+		if not self._timer.isActive():
+			self._timer.start(self._timeUntilNextFlush())
+
+	def isScheduled(self, widget):
+		"""
+		:rtype: bool
+		"""
+		return widget in self._dirtyWidgets
+
+	def cancel(self, widget):
+		"""
+		Removes a widget from the dirty list. Should be called when the
+		widget is about to be destroyed.
+		"""
+		if widget in self._dirtyWidgets:
+			self._dirtyWidgets.remove(widget)
+
+	def flush(self):
+		"""
+		Renders all the dirty widgets. Can also be called directly when
+		rendering can't wait for the next turn of the event loop.
+		A widget that fails to render does not keep the other widgets
+		from rendering.
+		"""
+		self._timer.stop()
+		widgets = self._dirtyWidgets
+		self._dirtyWidgets = []
+		self._lastFlushTime = time.time()
+		for widget in widgets:
+			self.executedRenders += 1
+			try:
+				widget.renderNow()
+			except Exception, e:
+				print "Warning: render failed:", e
+
+	def counters(self):
+		"""
+		Returns the number of requested and executed renders.
+
+		:rtype: dict
+		"""
+		return {"requested": self.requestedRenders,
+			"executed": self.executedRenders}
+
+	def resetCounters(self):
+		self.requestedRenders = 0
+		self.executedRenders = 0
+
+	# Private methods
+
+	def _timeUntilNextFlush(self):
+		"""
+		Returns the number of milliseconds to wait before flushing, so
+		that the maximum frame rate is never exceeded.
+
+		:rtype: int
+		"""
+		if not self._maximumFrameRate:
+			return 0
+		interval = 1.0 / self._maximumFrameRate
+		elapsed = time.time() - self._lastFlushTime
+		if elapsed >= interval:
+			return 0
+		return int((interval - elapsed) * 1000.0)
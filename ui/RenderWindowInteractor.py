@@ -0,0 +1,148 @@
+"""
+RenderWindowInteractor
+
+The render window interactor of vtk (a QWidget) that coalesces mouse move
+events. Qt can deliver many more mouse moves than vtk can handle: every
+move can trigger picks and renders. Only the latest position is passed on
+to vtk per turn of the event loop (or per minimum interval).
+
+:Authors:
+	Berend Klein Haneveld
+"""
+
+import time
+from PySide.QtCore import QObject
+from PySide.QtCore import QTimer
+from PySide.QtGui import QMouseEvent
+from vtk.qt4.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
+
+
+class MouseMoveCoalescer(QObject):
+	"""
+	MouseMoveCoalescer keeps the latest mouse move and passes it on to the
+	dispatch function with a single-shot timer. Mouse moves that arrive
+	before the timer fires replace the pending one.
+	"""
+
+	def __init__(self, dispatch, minimumInterval=0):
+		"""
+		:param dispatch: Function that is called with the latest mouse move
+		:param minimumInterval: Minimum number of milliseconds between two
+			dispatched mouse moves. With 0, mouse moves are coalesced per
+			turn of the event loop.
+		"""
+		super(MouseMoveCoalescer, self).__init__()
+
+		self.dispatch = dispatch
+		self.minimumInterval = minimumInterval
+		self._pendingMove = None
+		self._lastDispatchTime = 0.0
+		self._timer = QTimer(self)
+		self._timer.setSingleShot(True)
+		self._timer.timeout.connect(self.flush)
+
+		#: Number of mouse moves that were received
+		self.receivedMoves = 0
+		#: Number of mouse moves that were dispatched
+		self.dispatchedMoves = 0
+
+	def receive(self, move):
+		"""
+		Replaces the pending mouse move and makes sure that a dispatch is
+		scheduled.
+		"""
+		self.receivedMoves += 1
+		self._pendingMove = move
+		if not self._timer.isActive():
+			self._timer.start(self.timeUntilNextDispatch())
+
+	def flush(self):
+		"""
+		Dispatches the pending mouse move (if there is one) right away.
+		"""
+		self._timer.stop()
+		if self._pendingMove is None:
+			return
+		move = self._pendingMove
+		self._pendingMove = None
+		self._lastDispatchTime = time.time()
+		self.dispatchedMoves += 1
+		self.dispatch(move)
+
+	def cancel(self):
+		self._timer.stop()
+		self._pendingMove = None
+
+	def hasPendingMove(self):
+		return self._pendingMove is not None
+
+	def counters(self):
+		return {"received": self.receivedMoves,
+			"dispatched": self.dispatchedMoves}
+
+	def resetCounters(self):
+		self.receivedMoves = 0
+		self.dispatchedMoves = 0
+
+	def timeUntilNextDispatch(self):
+		"""
+		Returns the number of milliseconds to wait before the pending mouse
+		move can be dispatched.
+		"""
+		if not self.minimumInterval:
+			return 0
+		elapsed = (time.time() - self._lastDispatchTime) * 1000.0
+		return int(max(0, self.minimumInterval - elapsed))
+
+
+class RenderWindowInteractor(QVTKRenderWindowInteractor):
+	"""
+	QVTKRenderWindowInteractor of vtk that coalesces mouse moves. A pending
+	mouse move is flushed before other mouse, key and wheel events, so that
+	those events are never handled before the move that came first.
+	"""
+
+	#: Default minimum number of milliseconds between two mouse moves that
+	#: are passed on to vtk
+	MinimumMouseMoveInterval = 0
+
+	def __init__(self, parent=None, **kw):
+		QVTKRenderWindowInteractor.__init__(self, parent, **kw)
+
+		self.mouseMoves = MouseMoveCoalescer(self._dispatchMouseMove,
+			RenderWindowInteractor.MinimumMouseMoveInterval)
+
+	def Finalize(self):
+		self.mouseMoves.cancel()
+		QVTKRenderWindowInteractor.Finalize(self)
+
+	def mouseMoveEvent(self, ev):
+		# Qt deletes the event after this handler, so keep a copy
+		self.mouseMoves.receive(QMouseEvent(ev.type(), ev.pos(), ev.button(), ev.buttons(), ev.modifiers()))
+
+	def mousePressEvent(self, ev):
+		self.mouseMoves.flush()
+		QVTKRenderWindowInteractor.mousePressEvent(self, ev)
+
+	def mouseReleaseEvent(self, ev):
+		self.mouseMoves.flush()
+		QVTKRenderWindowInteractor.mouseReleaseEvent(self, ev)
+
+	def keyPressEvent(self, ev):
+		self.mouseMoves.flush()
+		QVTKRenderWindowInteractor.keyPressEvent(self, ev)
+
+	def keyReleaseEvent(self, ev):
+		self.mouseMoves.flush()
+		QVTKRenderWindowInteractor.keyReleaseEvent(self, ev)
+
+	def wheelEvent(self, ev):
+		self.mouseMoves.flush()
+		QVTKRenderWindowInteractor.wheelEvent(self, ev)
+
+	def leaveEvent(self, ev):
+		self.mouseMoves.flush()
+		QVTKRenderWindowInteractor.leaveEvent(self, ev)
+
+	def _dispatchMouseMove(self, ev):
+		QVTKRenderWindowInteractor.mouseMoveEvent(self, ev)
@@ -1,4 +1,5 @@
 from MainWindow import MainWindow
 from WindowDialog import WindowDialog
+from RenderScheduler import RenderScheduler
 from RenderController import RenderController
 from MultiRenderController import MultiRenderController
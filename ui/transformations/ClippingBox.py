@@ -7,11 +7,16 @@ ClippingBox
 from ui.Interactor import Interactor
 from PySide.QtCore import QObject
 from PySide.QtCore import Signal
+from PySide.QtCore import QTimer
 from vtk import vtkBoxWidget
 from vtk import vtkPlanes
 from vtk import vtkImagePlaneWidget
 from vtk import vtkPolyData
 from vtk import vtkTransform
+from vtk import VTK_UNSIGNED_CHAR
+from vtk.util.numpy_support import numpy_to_vtk
+from core.data.SubVolume import ExtentForBounds
+import numpy as np
 
 
 class ClippingBox(QObject, Interactor):
@@ -29,9 +34,22 @@ class ClippingBox(QObject, Interactor):
 		self.clippingBox = vtkBoxWidget()
 		self.planes = [vtkImagePlaneWidget() for _ in range(6)]
 		self.transform = vtkTransform()  # For future functionality
+		self.imageData = None
+
+		#: When enabled, only the part of the volume within the box is given to the mapper
+		self.subVolumeMode = False
+		#: Number of voxels around the box that are part of the sub volume
+		self.subVolumeMargin = 2
 
 		self._clippingBoxState = False
 		self._clippingPlanesState = False
+		self._lookupTableKey = None
+
+		# The sub volume is only extracted when the box stops moving
+		self._subVolumeTimer = QTimer(self)
+		self._subVolumeTimer.setSingleShot(True)
+		self._subVolumeTimer.setInterval(250)
+		self._subVolumeTimer.timeout.connect(self._updateSubVolume)
 
 	def setWidget(self, widget):
 		"""
@@ -47,6 +65,7 @@ class ClippingBox(QObject, Interactor):
 		self.clippingBox.InsideOutOn()
 		self.clippingBox.GetSelectedFaceProperty().SetOpacity(0.3)
 		self.AddObserver(self.clippingBox, "InteractionEvent", self.transformCallback)
+		self.AddObserver(self.clippingBox, "EndInteractionEvent", self.endInteractionCallback)
 		# Prepare the image plane widgets
 		for plane in self.planes:
 			plane.SetInteractor(self.widget.rwi)
@@ -99,6 +118,7 @@ class ClippingBox(QObject, Interactor):
 		"""
 		self.showClippingBox(False)
 		self.showClippingPlanes(False)
+		self._subVolumeTimer.stop()
 		self.cleanUpCallbacks()
 
 	def update(self):
@@ -111,42 +131,28 @@ class ClippingBox(QObject, Interactor):
 			if self._clippingPlanesState:
 				self.showClippingPlanes(False)
 			return
-		elif volVis.visualizationType != VisualizationTypeSimple:
-			for plane in self.planes:
-				lookupTable = plane.GetLookupTable()
-				lookupTable.SetAlphaRange(1.0, 1.0)
-				lookupTable.Build()
+
+		nrOfValues = self.planes[0].GetLookupTable().GetNumberOfTableValues()
+		if volVis.visualizationType != VisualizationTypeSimple:
+			key = (nrOfValues, None, None, None, volVis.visualizationType)
+		else:
+			# TODO: also use the upper bound
+			key = (nrOfValues, volVis.minimum, volVis.maximum, volVis.lowerBound, volVis.visualizationType)
+
+		if key == self._lookupTableKey:
 			return
+		self._lookupTableKey = key
 
-		# TODO: also use the upper bound
-		minimum = volVis.minimum
-		maximum = volVis.maximum
-		lowerBound = volVis.lowerBound
-		window = maximum - minimum
-		level = minimum + window / 2.0
-
-		for i in range(6):
-			self.planes[i].SetWindowLevel(window, level)
-			lookupTable = self.planes[i].GetLookupTable()
-			nrOfValues = lookupTable.GetNumberOfTableValues()
-			lowerBorder = (lowerBound - minimum) / (maximum - minimum)
-			currVal = 0.0
-			j = 0
-			# Make all values beneath a certain gray value transparent
-			while currVal < lowerBorder and j < nrOfValues:
-				value = list(lookupTable.GetTableValue(j))
-				value[3] = 0.0
-				lookupTable.SetTableValue(j, value)
-				currVal = value[0]
-				j += 1
-			# Don't forget to set all the following opacity values to 1.0
-			while j < nrOfValues:
-				value = list(lookupTable.GetTableValue(j))
-				value[3] = 1.0
-				lookupTable.SetTableValue(j, value)
-				j += 1
-
-			lookupTable.Build()
+		if volVis.visualizationType == VisualizationTypeSimple:
+			# The planes show the display data, so map the range of the visualization
+			window = (volVis.maximum - volVis.minimum) * volVis.scale
+			level = volVis.displayValue(volVis.minimum) + window / 2.0
+			for plane in self.planes:
+				plane.SetWindowLevel(window, level)
+
+		table = PlaneLookupTable(*key)
+		for plane in self.planes:
+			plane.GetLookupTable().SetTable(table)
 
 	def setImageData(self, imageData):
 		"""
@@ -154,6 +160,7 @@ class ClippingBox(QObject, Interactor):
 		Sets imagedata for all the vtkImagePlaneWidgets
 		"""
 		self.imageData = imageData
+		self._lookupTableKey = None
 		if self.imageData is None:
 			self.showClippingBox(False)
 			self.showClippingPlanes(False)
@@ -187,11 +194,27 @@ class ClippingBox(QObject, Interactor):
 		planes = vtkPlanes()
 		self.clippingBox.GetPlanes(planes)
 		self._updateMapperWithClippingPlanes(planes)
+		self._updateSubVolume()
+
+	def setSubVolumeMode(self, enabled):
+		"""
+		Enables or disables the sub volume mode. In sub volume mode the
+		widget only gives the region of the clipping box (plus a margin)
+		to the mapper instead of the complete volume.
+		"""
+		self.subVolumeMode = enabled
+		self._updateSubVolume()
 
 	def transformCallback(self, arg1, arg2):
 		planes = vtkPlanes()
 		arg1.GetPlanes(planes)
 		self._updateMapperWithClippingPlanes(planes)
+		if self.subVolumeMode:
+			self._subVolumeTimer.start()
+
+	def endInteractionCallback(self, arg1, arg2):
+		if self._subVolumeTimer.isActive():
+			self._updateSubVolume()
 
 	# Private methods
 		
@@ -263,3 +286,53 @@ class ClippingBox(QObject, Interactor):
 	def _updateMapperWithClippingPlanes(self, planes):
 		self.widget.mapper.SetClippingPlanes(planes)
 		self._updateImagePlanePlacement()
+
+	def _updateSubVolume(self):
+		"""
+		Tells the widget which extent of the image data should be rendered.
+		The clipping planes still do the exact clipping, the sub volume
+		only makes sure that the mapper doesn't hold the whole volume.
+		"""
+		self._subVolumeTimer.stop()
+		if self.widget is None or self.imageData is None:
+			return
+		extent = None
+		if self.subVolumeMode:
+			polyData = vtkPolyData()
+			self.clippingBox.GetPolyData(polyData)
+			extent = ExtentForBounds(self.imageData, polyData.GetBounds(), self.subVolumeMargin)
+		self.widget.setRenderExtent(extent)
+
+
+# Lookup tables that are already computed, keyed by the parameters
+# that were used to create them
+_lookupTables = dict()
+
+
+def PlaneLookupTable(nrOfValues, minimum, maximum, lowerBound, visualizationType):
+	"""
+	Returns a gray scale RGBA lookup table for the image planes. All values
+	below the lower bound are made transparent. If no bounds are given,
+	the table is completely opaque.
+	The result is cached, so the same vtkUnsignedCharArray is returned
+	for the same parameters and it can be shared by multiple planes.
+
+	:rtype: vtkUnsignedCharArray
+	"""
+	key = (nrOfValues, minimum, maximum, lowerBound, visualizationType)
+	if key in _lookupTables:
+		return _lookupTables[key]
+
+	ramp = np.linspace(0.0, 1.0, nrOfValues)
+	table = np.empty((nrOfValues, 4), dtype=np.uint8)
+	table[:, 0:3] = np.round(ramp * 255.0)[:, np.newaxis]
+	table[:, 3] = 255
+	if lowerBound is not None and maximum != minimum:
+		# Make all values beneath a certain gray value transparent
+		lowerBorder = (lowerBound - minimum) / float(maximum - minimum)
+		table[ramp < lowerBorder, 3] = 0
+
+	if len(_lookupTables) > 32:
+		_lookupTables.clear()
+	_lookupTables[key] = numpy_to_vtk(table, deep=1, array_type=VTK_UNSIGNED_CHAR)
+	return _lookupTables[key]
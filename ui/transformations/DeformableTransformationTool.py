@@ -5,6 +5,7 @@ DeformableTransformationTool
 	Berend Klein Haneveld 2013
 """
 import os
+import numpy as np
 from TransformationTool import TransformationTool
 from ParameterWidget import ParameterWidget
 from ui.transformations import Transformation
@@ -14,7 +15,12 @@ from core.decorators import overrides
 from core.worker import Operator
 from core.elastix import ElastixCommand
 from core.elastix import TransformixTransformation
+from core.registration import ImageRegistration
+from core.registration.ImageRegistration import SupportsParameterList
+from core.vtkDrawing import TransformWithMatrix
 from core.project import ProjectController
+from core.data.DataQuantizer import SourceScalarRange
+from core.data.DataQuantizer import SourceScalarTypeAsString
 from PySide.QtGui import QWidget
 from PySide.QtGui import QLabel
 from PySide.QtGui import QGridLayout
@@ -51,7 +57,14 @@ class DeformableTransformationTool(TransformationTool):
 		* Write parameter file to output folder
 		* Call elastix to process the data
 		* Load the new data into the moving widget / project
+
+		Linear registrations (translation, rigid, affine) are done in-process
+		by ImageRegistration when it is enabled.
 		"""
+		if ImageRegistration.Enabled and SupportsParameterList(self.transformation):
+			self.applyLinearTransform()
+			return
+
 		statusWidget = StatusWidget.Instance()
 		statusWidget.setText("Please grab a cup of coffee while Elastix " +
 			"performs the registration: this might take a while...")
@@ -85,11 +98,11 @@ class DeformableTransformationTool(TransformationTool):
 			param = self.transformation[i]
 			if param.key() == "DefaultPixelValue":
 				# Set the default pixel value to minimum scalar value
-				scalarRange = self.movingWidget.imageData.GetScalarRange()
+				scalarRange = SourceScalarRange(self.movingWidget.imageData)
 				param.setValue(scalarRange[0])
 			if param.key() == "ResultImagePixelType":
 				# Set the resulting image pixel type to the type of the input data
-				pixelType = self.movingWidget.imageData.GetScalarTypeAsString()
+				pixelType = SourceScalarTypeAsString(self.movingWidget.imageData)
 				param.setValue(pixelType)
 
 		self.transformation.saveToFile(parameterFilePath)
@@ -128,6 +141,38 @@ class DeformableTransformationTool(TransformationTool):
 			from subprocess import call
 			call(["open", outputFolder])
 
+	def applyLinearTransform(self):
+		"""
+		Registers the data sets of the render widgets with ImageRegistration
+		and appends the result to the transformations. No new data set is
+		made: the transform is applied to the current moving data.
+		"""
+		statusWidget = StatusWidget.Instance()
+		self.startedElastix.emit("Registering data...")
+
+		transformations = self.multiWidget.transformations
+		currentMatrix = _Matrix(transformations.completeTransform())
+		# Without a transform, the registration starts by aligning the centers
+		initialMatrix = None if np.allclose(currentMatrix, np.identity(4)) else currentMatrix
+
+		registration = ImageRegistration()
+		registration.setParameterList(self.transformation)
+		try:
+			matrix = registration.register(self.fixedWidget.imageData, self.movingWidget.imageData, initialMatrix)
+		except ValueError, e:
+			self.endedElastix.emit()
+			statusWidget.setText("The registration failed: " + str(e))
+			return
+		self.endedElastix.emit()
+
+		# Only the change on top of the current transform is appended
+		change = np.dot(matrix, np.linalg.inv(currentMatrix))
+		movingData = ProjectController.Instance().currentProject.movingData
+		transformation = Transformation(TransformWithMatrix(list(change.ravel())),
+			Transformation.TypeDeformable, movingData)
+		transformations.append(transformation)
+		statusWidget.setText("Registration finished in %.1f seconds." % registration.elapsedTime)
+
 	@overrides(TransformationTool)
 	def cancelTransform(self):
 		pass
@@ -153,3 +198,8 @@ class DeformableTransformationTool(TransformationTool):
 		widget = QWidget()
 		widget.setLayout(layout)
 		return widget
+
+
+def _Matrix(transform):
+	matrix = transform.GetMatrix()
+	return np.array([[matrix.GetElement(i, j) for j in range(4)] for i in range(4)])
@@ -0,0 +1,156 @@
+"""
+LandmarkGlyphs
+
+:Authors:
+	Berend Klein Haneveld
+"""
+from vtk import vtkActor
+from vtk import vtkGlyph3D
+from vtk import vtkPoints
+from vtk import vtkPolyData
+from vtk import vtkPolyDataMapper
+from vtk import vtkRegularPolygonSource
+from vtk import vtkSphereSource
+from vtk import vtkTransform
+from vtk import vtkTransformPolyDataFilter
+from vtk import VTK_UNSIGNED_CHAR
+from vtk.util.numpy_support import numpy_to_vtk
+from core.operations import TransformPoints
+import numpy as np
+
+
+class LandmarkGlyphs(object):
+	"""
+	LandmarkGlyphs draws all the landmarks of one type (fixed or moving)
+	in one renderer with just two actors: a sphere glyph for every landmark
+	in the renderer and a circle glyph around every landmark in the overlay.
+	The circles are turned towards the camera. Colors and sizes are stored
+	per point, so updating the landmarks never creates new actors.
+	"""
+	def __init__(self, renderer, overlay, flag="fixed"):
+		super(LandmarkGlyphs, self).__init__()
+
+		self.renderer = renderer
+		self.overlay = overlay
+		self.flag = flag
+
+		self.colorActive = [0.5, 1.0, 0.5]
+		self.colorInactive = [0.8, 0.8, 0.8]
+		self.opacityActive = 0.7
+		self.opacityInactive = 0.4
+
+		self.scale = None
+		self.transform = vtkTransform()
+		self.activeIndex = -1
+		self._positions = []
+
+		self.polyData = vtkPolyData()
+
+		sphereSource = vtkSphereSource()
+		sphereSource.SetRadius(0.1)
+		sphereSource.SetThetaResolution(18)
+		sphereSource.SetPhiResolution(18)
+		self.landmarks = self._createGlyphActor(sphereSource.GetOutputPort(), "sphereColors")
+
+		circleSource = vtkRegularPolygonSource()
+		circleSource.SetNumberOfSides(32)
+		circleSource.SetRadius(1.2)
+		circleSource.SetGeneratePolygon(False)
+		# Rotates the circles so that they face the camera
+		self.circleTransform = vtkTransform()
+		circleFilter = vtkTransformPolyDataFilter()
+		circleFilter.SetInputConnection(circleSource.GetOutputPort())
+		circleFilter.SetTransform(self.circleTransform)
+		self.landmarkIndicators = self._createGlyphActor(circleFilter.GetOutputPort(), "circleColors")
+		self.landmarkIndicators.GetProperty().SetLineWidth(2)
+
+		camera = self.renderer.GetActiveCamera()
+		self._cameraObserver = camera.AddObserver("ModifiedEvent", self._cameraModified)
+		self._cameraModified(camera)
+
+		self.renderer.AddViewProp(self.landmarks)
+		self.overlay.AddViewProp(self.landmarkIndicators)
+
+	def cleanUp(self):
+		self.renderer.GetActiveCamera().RemoveObserver(self._cameraObserver)
+		self.renderer.RemoveViewProp(self.landmarks)
+		self.overlay.RemoveViewProp(self.landmarkIndicators)
+
+	def setPositions(self, positions):
+		"""
+		Sets the positions of all landmarks in local coordinates. The
+		index in the list is the id of the landmark. Positions can be
+		None for landmarks that are not placed (yet).
+		"""
+		self._positions = positions
+		self.update()
+
+	def update(self):
+		"""
+		Rebuilds the points and the color and scale arrays in one go.
+		"""
+		ids = [i for i in range(len(self._positions)) if self._positions[i] is not None]
+		positions = np.array([self._positions[i] for i in ids], dtype=np.float64).reshape(-1, 3)
+		locations = TransformPoints(self.transform.GetMatrix(), positions)
+
+		active = np.array(ids, dtype=np.int64) == self.activeIndex
+		colors = np.where(active[:, np.newaxis], self.colorActive, self.colorInactive)
+		opacities = np.where(active, self.opacityActive, self.opacityInactive)
+		sphereColors = np.empty((len(ids), 3), dtype=np.uint8)
+		sphereColors[:] = np.round(colors * 255.0)
+		circleColors = np.empty((len(ids), 4), dtype=np.uint8)
+		circleColors[:, 0:3] = sphereColors
+		circleColors[:, 3] = np.round(opacities * 255.0)
+		scales = np.empty(len(ids), dtype=np.float64)
+		scales[:] = self.scale if self.scale is not None else 1.0
+
+		points = vtkPoints()
+		points.SetData(numpy_to_vtk(locations, deep=1))
+		self.polyData.SetPoints(points)
+		pointData = self.polyData.GetPointData()
+		pointData.Initialize()
+		pointData.AddArray(_NamedArray(sphereColors, "sphereColors", VTK_UNSIGNED_CHAR))
+		pointData.AddArray(_NamedArray(circleColors, "circleColors", VTK_UNSIGNED_CHAR))
+		scaleArray = _NamedArray(scales, "scales")
+		pointData.AddArray(scaleArray)
+		pointData.SetScalars(scaleArray)
+		self.polyData.Modified()
+
+	# Private methods
+
+	def _createGlyphActor(self, sourcePort, colorArray):
+		glyph = vtkGlyph3D()
+		glyph.SetInputData(self.polyData)
+		glyph.SetSourceConnection(sourcePort)
+		glyph.SetScaleModeToScaleByScalar()
+		glyph.SetColorModeToColorByScalar()
+		glyph.OrientOff()
+		glyph.SetInputArrayToProcess(0, 0, 0, 0, "scales")
+
+		mapper = vtkPolyDataMapper()
+		mapper.SetInputConnection(glyph.GetOutputPort())
+		mapper.SetScalarModeToUsePointFieldData()
+		mapper.SelectColorArray(colorArray)
+		mapper.SetColorModeToDirectScalars()
+		mapper.ScalarVisibilityOn()
+
+		actor = vtkActor()
+		actor.PickableOff()
+		actor.SetMapper(mapper)
+		return actor
+
+	def _cameraModified(self, camera, event=None):
+		"""
+		Copies the orientation of the camera into the transform of the
+		circles, so that the circles always face the camera.
+		"""
+		viewMatrix = camera.GetViewTransformMatrix()
+		matrix = [viewMatrix.GetElement(j, i) if i < 3 and j < 3 else float(i == j)
+			for i in range(4) for j in range(4)]
+		self.circleTransform.SetMatrix(matrix)
+
+
+def _NamedArray(array, name, arrayType=None):
+	vtkArray = numpy_to_vtk(array, deep=1, array_type=arrayType)
+	vtkArray.SetName(name)
+	return vtkArray
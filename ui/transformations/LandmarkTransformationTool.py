@@ -4,7 +4,7 @@ LandmarkTransformationTool (TransformationTool)
 :Authors:
 	Berend Klein Haneveld
 """
-from Landmark import Landmark
+from LandmarkGlyphs import LandmarkGlyphs
 from TransformationTool import TransformationTool
 from ui.widgets.PointsWidget import PointsWidget
 from ui.widgets.StatusWidget import StatusWidget
@@ -14,16 +14,25 @@ from ui.transformations import Transformation
 from core.decorators import overrides
 from core.vtkDrawing import TransformWithMatrix
 from core.project import ProjectController
-from vtk import vtkPoints
-from vtk import vtkLandmarkTransform
+from core.registration import LandmarkSolver
+from core.data.LandmarkIO import ReadLandmarksCsv
+from core.data.LandmarkIO import WriteLandmarksCsv
+from core.data.LandmarkIO import ReadPointsFcsv
+from core.data.LandmarkIO import WritePointsFcsv
+from core.data.LandmarkIO import LandmarkSetsFromPoints
 from vtk import vtkTransform
 from PySide.QtGui import QWidget
 from PySide.QtGui import QGridLayout
 from PySide.QtGui import QComboBox
+from PySide.QtGui import QCheckBox
+from PySide.QtGui import QPushButton
+from PySide.QtGui import QFileDialog
+from PySide.QtGui import QMessageBox
 from PySide.QtGui import QLabel
 from PySide.QtCore import Signal
 from PySide.QtCore import Slot
 from PySide.QtCore import Qt
+import numpy as np
 
 # Define picker types
 SurfaceType = "SurfaceType"
@@ -46,13 +55,15 @@ class LandmarkTransformationTool(TransformationTool):
 		self.movingPicker = self._pickerForType(self.movingPickerType)
 
 		self.landmarkPointSets = []  # Sets of points
-		self.landmarkIndicators = []  # All the landmark indicator objects
+		self.landmarkGlyphs = []  # Landmark glyphs for each widget and type
 
 		self.originalTransform = None
 		self.originalScalingTransform = None
 
 		self.activeIndex = 0
 		self.landmarkTransformType = 0  # Rigid, Similarity or Affine
+		# Solver that keeps track of all the complete landmark sets
+		self.solver = LandmarkSolver()
 
 	@overrides(TransformationTool)
 	def getParameterWidget(self):
@@ -63,15 +74,27 @@ class LandmarkTransformationTool(TransformationTool):
 		self.landmarkComboBox.addItem("Similarity")
 		self.landmarkComboBox.addItem("Affine")
 
+		self.outlierCheckBox = QCheckBox("Reject outliers")
+		self.outlierCheckBox.setToolTip("Ignore landmarks that don't fit the transform of the other landmarks")
+
+		self.importButton = QPushButton("Import...")
+		self.importButton.clicked.connect(self.importLandmarks)
+		self.exportButton = QPushButton("Export...")
+		self.exportButton.clicked.connect(self.exportLandmarks)
+
 		layout = QGridLayout()
 		layout.setAlignment(Qt.AlignTop)
 		layout.setContentsMargins(0, 0, 0, 0)
 		layout.addWidget(QLabel("Transform type:"), 0, 0)
 		layout.addWidget(self.landmarkComboBox, 0, 1)
-		layout.addWidget(self.pointsWidget, 1, 0, 1, 2)
+		layout.addWidget(self.outlierCheckBox, 1, 1)
+		layout.addWidget(self.pointsWidget, 2, 0, 1, 2)
+		layout.addWidget(self.importButton, 3, 0)
+		layout.addWidget(self.exportButton, 3, 1)
 		
 		self.updatedLandmarks.connect(self.pointsWidget.setPoints)
 		self.landmarkComboBox.currentIndexChanged.connect(self.landmarkTransformTypeChanged)
+		self.outlierCheckBox.stateChanged.connect(self.rejectOutliersChanged)
 		self.pointsWidget.activeLandmarkChanged.connect(self.setActiveLandmark)
 		self.pointsWidget.landmarkDeleted.connect(self.deleteLandmark)
 
@@ -91,6 +114,13 @@ class LandmarkTransformationTool(TransformationTool):
 		self.fixedPicker.pickedLocation.connect(self.pickedFixedLocation)
 		self.movingPicker.pickedLocation.connect(self.pickedMovingLocation)
 
+		# All landmarks of one type in one widget are drawn by one glyph object
+		for widget, landmarkType in [(self.fixedWidget, "fixed"), (self.multiWidget, "fixed"),
+			(self.movingWidget, "moving"), (self.multiWidget, "moving")]:
+			self.landmarkGlyphs.append(LandmarkGlyphs(renderer=widget.renderer,
+				overlay=widget.rendererOverlay,
+				flag=landmarkType))
+
 		# Save the original complete transform
 		self.originalTransform = self.multiWidget.transformations.completeTransform()
 		self.originalScalingTransform = self.multiWidget.transformations.scalingTransform()
@@ -99,6 +129,8 @@ class LandmarkTransformationTool(TransformationTool):
 		currentProject = ProjectController.Instance().currentProject
 		transform = Transformation(vtkTransform(), Transformation.TypeLandmark, currentProject.movingData)
 		self.multiWidget.transformations.append(transform)
+		# Every change of the landmarks is written to the project journal
+		self.updatedLandmarks.connect(self._recordLandmarks)
 
 		statusWidget = StatusWidget.Instance()
 		statusWidget.setText("Place landmarks in both volumes to create a landmark transform. "
@@ -129,10 +161,12 @@ class LandmarkTransformationTool(TransformationTool):
 		self.fixedPicker.cleanUp()
 		self.movingPicker.cleanUp()
 
-		for landmarkIndicator in self.landmarkIndicators:
-			landmarkIndicator.cleanUp()
+		for landmarkGlyphs in self.landmarkGlyphs:
+			landmarkGlyphs.cleanUp()
 
+		self.landmarkGlyphs = []
 		self.landmarkPointSets = []
+		self.solver.clear()
 
 		self.fixedWidget.render()
 		self.movingWidget.render()
@@ -160,21 +194,8 @@ class LandmarkTransformationTool(TransformationTool):
 	@Slot(int)
 	def deleteLandmark(self, index):
 		if index < len(self.landmarkPointSets):
+			self.solver.removePair(id(self.landmarkPointSets[index]))
 			del self.landmarkPointSets[index]
-		indices = []
-		for i in range(len(self.landmarkIndicators)):
-			indicator = self.landmarkIndicators[i]
-			if indicator.id == index:
-				indicator.cleanUp()
-				indices.append(i)
-
-		indices.reverse()
-		for i in indices:
-			del self.landmarkIndicators[i]
-
-		for indicator in self.landmarkIndicators:
-			if indicator.id > index:
-				indicator.id -= 1
 
 		self.activeIndex = len(self.landmarkPointSets)
 		self.pointsWidget.activeIndex = self.activeIndex
@@ -203,6 +224,89 @@ class LandmarkTransformationTool(TransformationTool):
 		self._updateTransform()
 		self.multiWidget.render()
 
+	@Slot(int)
+	def rejectOutliersChanged(self, state):
+		"""
+		Called when the outlier check box is toggled. Outliers are rejected
+		with trimmed least squares.
+		"""
+		if state == Qt.Checked:
+			self.solver.robustMode = LandmarkSolver.RobustTrimmed
+		else:
+			self.solver.robustMode = LandmarkSolver.RobustNone
+		self._updateTransform()
+		self.multiWidget.render()
+
+	@Slot()
+	def importLandmarks(self):
+		"""
+		Imports landmark sets from a CSV file with fixed and moving points or
+		from a 3D Slicer markups file (fcsv) with points for one of the data
+		sets. The imported landmarks replace the current landmarks.
+		"""
+		fileName, other = QFileDialog.getOpenFileName(self.pointsWidget, "Import landmarks",
+			"", "Landmark files (*.csv *.fcsv)")
+		if not fileName:
+			return
+
+		try:
+			if fileName.lower().endswith(".fcsv"):
+				points = ReadPointsFcsv(fileName)
+				answer = QMessageBox.question(self.pointsWidget, "Import landmarks",
+					"Are the points in this file from the fixed data set?",
+					QMessageBox.Yes | QMessageBox.No)
+				if answer == QMessageBox.Yes:
+					movingPoints = [landmarkSet[1] for landmarkSet in self.landmarkPointSets]
+					landmarkSets = LandmarkSetsFromPoints(points, movingPoints)
+				else:
+					fixedPoints = [landmarkSet[0] for landmarkSet in self.landmarkPointSets]
+					landmarkSets = LandmarkSetsFromPoints(fixedPoints, points)
+			else:
+				landmarkSets = ReadLandmarksCsv(fileName)
+		except Exception, e:
+			QMessageBox.warning(self.pointsWidget, "Import landmarks", "Could not read landmarks: " + str(e))
+			return
+
+		self.setLandmarkPointSets(landmarkSets)
+
+	@Slot()
+	def exportLandmarks(self):
+		"""
+		Exports the landmark sets to a CSV file or to two 3D Slicer markups
+		files (one for the fixed and one for the moving points).
+		"""
+		fileName, other = QFileDialog.getSaveFileName(self.pointsWidget, "Export landmarks",
+			"", "CSV files (*.csv);;Slicer markups (*.fcsv)")
+		if not fileName:
+			return
+
+		if fileName.lower().endswith(".fcsv"):
+			baseName = fileName[:-len(".fcsv")]
+			WritePointsFcsv(baseName + "-fixed.fcsv", [x[0] for x in self.landmarkPointSets], "F")
+			WritePointsFcsv(baseName + "-moving.fcsv", [x[1] for x in self.landmarkPointSets], "M")
+		else:
+			WriteLandmarksCsv(fileName, self.landmarkPointSets)
+
+	def setLandmarkPointSets(self, landmarkSets):
+		"""
+		Replaces all landmarks at once. The solver and the glyphs are only
+		updated once for the whole collection.
+		"""
+		self.landmarkPointSets = landmarkSets
+		self.solver.clear()
+		for landmarkSet in self.landmarkPointSets:
+			self._updateSolver(landmarkSet)
+
+		self.activeIndex = len(self.landmarkPointSets)
+		self.pointsWidget.activeIndex = self.activeIndex
+		self._updateTransform()
+		self._update()
+		self.updatedLandmarks.emit(self.landmarkPointSets)
+
+		self.fixedWidget.render()
+		self.movingWidget.render()
+		self.multiWidget.render()
+
 	@Slot(list)
 	def pickedFixedLocation(self, location):
 		"""
@@ -258,21 +362,13 @@ class LandmarkTransformationTool(TransformationTool):
 	def _pickedLocation(self, location, landmarkType):
 		if self.activeIndex < len(self.landmarkPointSets):
 			# Just update the landmark
-			landmarks = [x for x in self.landmarkIndicators if (x.id == self.activeIndex and x.flag == landmarkType)]
-			for landmark in landmarks:
-				landmark.position = location
-
 			index = 0 if landmarkType == "fixed" else 1
-			if not self.landmarkPointSets[self.activeIndex][index]:
-				# Add another landmark indicator if there was no landmark
-				self._addLandmarkIndicator(location, landmarkType)
-
 			self.landmarkPointSets[self.activeIndex][index] = location
+			self._updateSolver(self.landmarkPointSets[self.activeIndex])
 		else:
 			# Add the location to the landmark points as a set
 			landmarkSet = [location, None] if (landmarkType == "fixed") else [None, location]
 			self.landmarkPointSets.append(landmarkSet)
-			self._addLandmarkIndicator(location, landmarkType)
 
 		self._updateTransform()
 		self._update()
@@ -280,45 +376,35 @@ class LandmarkTransformationTool(TransformationTool):
 		self.multiWidget.render()
 		self.movingWidget.render()
 
+	@Slot(list)
+	def _recordLandmarks(self, landmarkSets):
+		index = len(self.multiWidget.transformations) - 1
+		transformation = self.multiWidget.transformations[index]
+		ProjectController.Instance().recordLandmarks(index, landmarkSets, transformation.transform)
+
+	def _updateSolver(self, landmarkSet):
+		"""
+		Updates the point pair of the landmark set in the solver. The solver
+		keeps running sums, so this takes constant time.
+		"""
+		fixedPoint, movingPoint = landmarkSet
+		if fixedPoint is None or movingPoint is None:
+			return
+		# Transform the point from the moving landmark with the original transform
+		transPoint = self.originalTransform.TransformPoint(movingPoint)
+		self.solver.setPair(id(landmarkSet), fixedPoint, transPoint)
+
 	def _updateTransform(self):
 		"""
 		Update the landmark transform
 		"""
-		if PointsSetsIsEmpty(self.landmarkPointSets):
+		if len(self.solver) == 0:
 			return
 
-		numberOfSets = NumberOfSets(self.landmarkPointSets)
-		fixedPoints = vtkPoints()
-		movingPoints = vtkPoints()
-		fixedPoints.SetNumberOfPoints(numberOfSets)
-		movingPoints.SetNumberOfPoints(numberOfSets)
-
-		pointsetIndex = 0
-		for index in range(len(self.landmarkPointSets)):
-			pointset = self.landmarkPointSets[index]
-			if pointset[0] and pointset[1]:
-				fixedPoint = pointset[0]
-				movingPoint = pointset[1]
-				# Transform the point from the moving landmark with the original transform
-				transPoint = self.originalTransform.TransformPoint(movingPoint)
-				fixedPoints.SetPoint(pointsetIndex, fixedPoint)
-				movingPoints.SetPoint(pointsetIndex, transPoint)
-				pointsetIndex += 1
-
-		landmarkTransform = vtkLandmarkTransform()
-		if self.landmarkTransformType == 0:
-			landmarkTransform.SetModeToRigidBody()
-		elif self.landmarkTransformType == 1:
-			landmarkTransform.SetModeToSimilarity()
-		elif self.landmarkTransformType == 2:
-			landmarkTransform.SetModeToAffine()
-		landmarkTransform.SetSourceLandmarks(fixedPoints)
-		landmarkTransform.SetTargetLandmarks(movingPoints)
-		landmarkTransform.Update()
-
-		transform = TransformWithMatrix(landmarkTransform.GetMatrix())
-		transform.Inverse()
-		
+		# The solver maps the fixed points onto the moving points
+		matrix = self.solver.solve(self.landmarkTransformType)
+		transform = TransformWithMatrix(list(np.linalg.inv(matrix).ravel()))
+
 		transformation = self.multiWidget.transformations[-1]
 		assert transformation.transformType == Transformation.TypeLandmark
 		transformation.transform = transform
@@ -326,44 +412,31 @@ class LandmarkTransformationTool(TransformationTool):
 		self._updateLandmarkTransforms()
 
 	def _update(self):
-		for landmark in self.landmarkIndicators:
-			landmark.active = landmark.id == self.activeIndex
-			landmark.update()
+		fixedPoints = [landmarkSet[0] for landmarkSet in self.landmarkPointSets]
+		movingPoints = [landmarkSet[1] for landmarkSet in self.landmarkPointSets]
+		for landmarkGlyphs in self.landmarkGlyphs:
+			if landmarkGlyphs.scale is None:
+				landmarkGlyphs.scale = self._landmarkScale(landmarkGlyphs.flag)
+			landmarkGlyphs.activeIndex = self.activeIndex
+			if landmarkGlyphs.flag == "fixed":
+				landmarkGlyphs.setPositions(fixedPoints)
+			else:
+				landmarkGlyphs.setPositions(movingPoints)
 		self._updateLandmarkTransforms()
 
 	def _updateLandmarkTransforms(self):
-		# Update the transforms
-		for landmarkIndicator in self.landmarkIndicators:
-			if landmarkIndicator.flag == "moving" and landmarkIndicator.renderer == self.movingWidget.renderer:
-				# landmarkIndicator.transform = self.multiWidget.transformations.scalingTransform()
-				# landmarkIndicator.update()
-				pass
-			elif landmarkIndicator.flag == "moving" and landmarkIndicator.renderer == self.multiWidget.renderer:
-				landmarkIndicator.transform = self.multiWidget.transformations.completeTransform()
-				landmarkIndicator.update()
-
-	def _addLandmarkIndicator(self, location, landmarkType):
+		# Moving landmarks in the multi widget follow the complete transform
+		for landmarkGlyphs in self.landmarkGlyphs:
+			if landmarkGlyphs.flag == "moving" and landmarkGlyphs.renderer == self.multiWidget.renderer:
+				landmarkGlyphs.transform = self.multiWidget.transformations.completeTransform()
+				landmarkGlyphs.update()
+
+	def _landmarkScale(self, landmarkType):
 		imageData = self.fixedWidget.imageData if landmarkType == "fixed" else self.movingWidget.imageData
 		bounds = imageData.GetBounds()
 		sizes = [bounds[1] - bounds[0], bounds[3] - bounds[2], bounds[5] - bounds[4]]
 		smallest = min(sizes)
-		scale = smallest / 30.0
-
-		# Create landmark for the correct widget
-		widget = self.fixedWidget if landmarkType == "fixed" else self.movingWidget
-		landmark = self._landmarkForWidget(widget, landmarkType)
-		landmark.id = self.activeIndex
-		landmark.position = location
-		landmark.scale = scale
-
-		# Create landmark for multi widget
-		landmarkMulti = self._landmarkForWidget(self.multiWidget, landmarkType)
-		landmarkMulti.id = self.activeIndex
-		landmarkMulti.position = location
-		landmarkMulti.scale = scale
-
-		self.landmarkIndicators.append(landmark)
-		self.landmarkIndicators.append(landmarkMulti)
+		return smallest / 30.0
 
 	def _focusCamera(self, widget, location):
 		if not location:
@@ -374,30 +447,3 @@ class LandmarkTransformationTool(TransformationTool):
 
 		camera = widget.renderer.GetActiveCamera()
 		camera.SetFocalPoint(worldPoint)
-
-	def _landmarkForWidget(self, widget, landmarkType):
-		return Landmark(index=self.activeIndex,
-			renderer=widget.renderer,
-			overlay=widget.rendererOverlay,
-			flag=landmarkType)
-
-
-def PointsSetsIsEmpty(points):
-	"""
-	Returns whether there are actual point sets in the
-	given collection for which both landmarks are set.
-	"""
-	return NumberOfSets(points) == 0
-
-
-def NumberOfSets(points):
-	"""
-	Returns the total number of landmark sets in the
-	given collection of pointsets.
-	"""
-	count = 0
-	for pointset in points:
-		if pointset[0] is not None and pointset[1] is not None:
-			count += 1
-
-	return count
@@ -0,0 +1,221 @@
+"""
+PickingService
+
+:Authors:
+	Berend Klein Haneveld
+"""
+import time
+from collections import OrderedDict
+from vtk import vtkVolumePicker
+from PySide.QtCore import QObject
+from PySide.QtCore import QTimer
+from PySide.QtCore import Signal
+from core.data.DataBlockIndex import BlockIndexForImageData
+from core.operations import Normalize
+from core.operations import Subtract
+from core.operations import TransformPoints
+from core.operations import MatrixToArray
+from ui.transformations.TwoStepPicker import rayForMouse
+import numpy as np
+
+
+class PickingService(QObject):
+	"""
+	PickingService picks points on the surface of the volume of a render
+	widget. Picks are cached by pixel and by the modification times of the
+	camera, the volume, its mapper and clipping planes, so picking the same
+	pixel again in an unchanged scene is free.
+	Requests are throttled to a maximum pick rate: only the latest
+	requested position is picked.
+	Before running the picker on the whole renderer, the block index of the
+	volume is used to check whether the ray passes any visible part of the
+	volume at all.
+	"""
+
+	pickFinished = Signal(object, object)
+
+	def __init__(self, widget):
+		super(PickingService, self).__init__()
+
+		self.widget = widget
+		self.maximumPickRate = 60.0
+		self.maximumCacheSize = 512
+		self.opacityIsovalue = 0.05
+
+		self.picker = vtkVolumePicker()
+		self.picker.SetTolerance(1e-6)
+		self.picker.SetVolumeOpacityIsovalue(self.opacityIsovalue)
+		self.picker.PickFromListOn()
+		self.picker.AddPickList(self.widget.volume)
+
+		self._cache = OrderedDict()
+		self._visibleBlocks = None
+		self._visibleBlocksKey = None
+		self._pendingPosition = None
+		self._lastPickTime = 0.0
+		self._timer = QTimer(self)
+		self._timer.setSingleShot(True)
+		self._timer.timeout.connect(self.flush)
+
+		#: Number of picks that were requested
+		self.requestedPicks = 0
+		#: Number of picks that were answered from the cache
+		self.cachedPicks = 0
+		#: Number of picks that were skipped with the block index
+		self.skippedPicks = 0
+		#: Number of picks that were done by the vtk picker
+		self.executedPicks = 0
+
+	def requestPick(self, x, y):
+		"""
+		Requests a pick at the display position. The result is emitted with
+		the pickFinished signal, directly or as soon as the maximum pick rate
+		allows it.
+		"""
+		self.requestedPicks += 1
+		self._pendingPosition = (x, y)
+		if self._timer.isActive():
+			return
+		delay = self._timeUntilNextPick()
+		if delay == 0:
+			self.flush()
+		else:
+			self._timer.start(delay)
+
+	def flush(self):
+		"""
+		Picks the pending position right away (if there is one).
+		"""
+		self._timer.stop()
+		if self._pendingPosition is None:
+			return
+		x, y = self._pendingPosition
+		self._pendingPosition = None
+		self._lastPickTime = time.time()
+		position, normal = self.pick(x, y)
+		self.pickFinished.emit(position, normal)
+
+	def pick(self, x, y):
+		"""
+		Returns the picked position and normal for the display position.
+		"""
+		key = self._cacheKey(x, y)
+		if key in self._cache:
+			self.cachedPicks += 1
+			return self._cache[key]
+
+		if self._rayMissesVolume(x, y):
+			self.skippedPicks += 1
+			result = self._missedPick(x, y)
+		else:
+			self.executedPicks += 1
+			self.picker.Pick(x, y, 0, self.widget.renderer)
+			result = (self.picker.GetPickPosition(), self.picker.GetPickNormal())
+
+		self._cache[key] = result
+		if len(self._cache) > self.maximumCacheSize:
+			self._cache.popitem(last=False)
+		return result
+
+	def counters(self):
+		return {"requested": self.requestedPicks,
+			"cached": self.cachedPicks,
+			"skipped": self.skippedPicks,
+			"executed": self.executedPicks}
+
+	def cleanUp(self):
+		self._timer.stop()
+		self._pendingPosition = None
+		self._cache.clear()
+
+	# Private methods
+
+	def _cacheKey(self, x, y):
+		volume = self.widget.volume
+		return (x, y,
+			self.widget.renderer.GetActiveCamera().GetMTime(),
+			volume.GetMTime(),
+			volume.GetProperty().GetMTime(),
+			self.widget.imageData.GetMTime(),
+			_MapperMTime(volume.GetMapper()))
+
+	def _timeUntilNextPick(self):
+		if not self.maximumPickRate:
+			return 0
+		interval = 1.0 / self.maximumPickRate
+		elapsed = time.time() - self._lastPickTime
+		if elapsed >= interval:
+			return 0
+		return int((interval - elapsed) * 1000.0)
+
+	def _rayMissesVolume(self, x, y):
+		"""
+		Returns True if the ray for the display position doesn't pass any
+		block that contains visible values. In that case the picker won't
+		hit anything either.
+		"""
+		index = BlockIndexForImageData(self.widget.imageData)
+		p1, p2 = rayForMouse(self.widget.renderer, x, y)
+		# Transform the ray into local coordinates of the volume
+		inverse = np.linalg.inv(MatrixToArray(self.widget.volume.GetMatrix()))
+		q1, q2 = TransformPoints(inverse, [p1, p2])
+		return index.firstBlockAlongRay(q1, q2, blocks=self._visibleBlocksForIndex(index)) is None
+
+	def _visibleBlocksForIndex(self, index):
+		"""
+		Returns the blocks that contain values for which the opacity is
+		above the isovalue of the picker. Gradient opacity is ignored, so
+		the result errs on the side of visibility.
+		"""
+		opacityFunction = self.widget.volume.GetProperty().GetScalarOpacity()
+		key = (id(index), index.mTime, opacityFunction.GetMTime())
+		if key == self._visibleBlocksKey:
+			return self._visibleBlocks
+
+		nrOfSamples = 256
+		lower, upper = self.widget.imageData.GetScalarRange()
+		values = np.linspace(lower, upper, nrOfSamples)
+		visible = np.array([opacityFunction.GetValue(value) >= self.opacityIsovalue for value in values])
+		# Number of visible samples up to and including each sample
+		counts = np.concatenate([[0], np.cumsum(visible)])
+		step = (upper - lower) / float(nrOfSamples - 1) if upper > lower else 1.0
+		first = np.clip(np.floor((index.minimum - lower) / step).astype(np.int64), 0, nrOfSamples - 1)
+		last = np.clip(np.ceil((index.maximum - lower) / step).astype(np.int64), 0, nrOfSamples - 1)
+
+		self._visibleBlocks = counts[last + 1] - counts[first] > 0
+		self._visibleBlocksKey = key
+		return self._visibleBlocks
+
+	def _missedPick(self, x, y):
+		"""
+		Returns the same result as the picker gives when nothing is hit:
+		the point on the focal plane with the normal pointing to the camera.
+		"""
+		p1, p2 = rayForMouse(self.widget.renderer, x, y)
+		renderer = self.widget.renderer
+		focalPoint = renderer.GetActiveCamera().GetFocalPoint()
+		renderer.SetWorldPoint(focalPoint[0], focalPoint[1], focalPoint[2], 1.0)
+		renderer.WorldToDisplay()
+		depth = renderer.GetDisplayPoint()[2]
+		renderer.SetDisplayPoint(x, y, depth)
+		renderer.DisplayToWorld()
+		world = renderer.GetWorldPoint()
+		position = tuple(world[i] / world[3] for i in range(3))
+		return position, tuple(Normalize(Subtract(p1, p2)))
+
+
+
+def _MapperMTime(mapper):
+	"""
+	Returns the latest modification time of the mapper and its clipping
+	planes. Moving the clipping box only modifies the mapper and the planes.
+	"""
+	if mapper is None:
+		return 0
+	mTime = mapper.GetMTime()
+	planes = mapper.GetClippingPlanes()
+	if planes is not None:
+		mTime = max(mTime, planes.GetMTime())
+		for index in range(planes.GetNumberOfItems()):
+			mTime = max(mTime, planes.GetItemAsObject(index).GetMTime())
+	return mTime
@@ -6,12 +6,13 @@ SurfacePicker
 """
 import math
 from Picker import Picker
+from PickingService import PickingService
 from ui.Interactor import Interactor
-from vtk import vtkVolumePicker
 from vtk import vtkActor
 from vtk import vtkConeSource
 from vtk import vtkDataSetMapper
 from PySide.QtCore import Signal
+from PySide.QtCore import Slot
 
 
 class SurfacePicker(Picker, Interactor):
@@ -24,10 +25,9 @@ class SurfacePicker(Picker, Interactor):
 	def __init__(self):
 		super(SurfacePicker, self).__init__()
 		self.props = []
-		self.picker = vtkVolumePicker()
-		self.picker.SetTolerance(1e-6)
-		self.picker.SetVolumeOpacityIsovalue(0.05)
+		self.pickingService = None
 		self.widget = None
+		self._lastPick = None
 
 	def setWidget(self, widget):
 		self.widget = widget
@@ -61,14 +61,16 @@ class SurfacePicker(Picker, Interactor):
 		self.widget.renderer.AddViewProp(self.redCone)
 		self.widget.renderer.AddViewProp(self.greenCone)
 
-		self.picker.PickFromListOn()
-		self.picker.AddPickList(self.widget.volume)
+		self.pickingService = PickingService(self.widget)
+		self.pickingService.pickFinished.connect(self.pickFinished)
 
 		self.AddObserver(self.widget.rwi, "MouseMoveEvent", self.mouseMove)
 		self.AddObserver(self.widget.rwi, "KeyPressEvent", self.keyPress)
 
 	def cleanUp(self):
 		super(SurfacePicker, self).cleanUp()
+		if self.pickingService:
+			self.pickingService.cleanUp()
 		if self.widget:
 			self.widget.renderer.RemoveViewProp(self.greenCone)
 			self.widget.renderer.RemoveViewProp(self.redCone)
@@ -78,8 +80,16 @@ class SurfacePicker(Picker, Interactor):
 
 	def mouseMove(self, iren, event=""):
 		self.widget.rwi.HideCursor()
-		p, n = PickPoint(iren, self.widget.renderer, self.picker)
-		
+		x, y = iren.GetEventPosition()
+		self.pickingService.requestPick(x, y)
+
+	@Slot(object, object)
+	def pickFinished(self, p, n):
+		# Don't update the cones when the result didn't change
+		if (p, n) == self._lastPick:
+			return
+		self._lastPick = (p, n)
+
 		self.redCone.SetPosition(p[0], p[1], p[2])
 		self.greenCone.SetPosition(p[0], p[1], p[2])
 		PointCone(self.redCone, n[0], n[1], n[2])
@@ -91,6 +101,8 @@ class SurfacePicker(Picker, Interactor):
 		key = iren.GetKeyCode()
 		if key != "a" and key != " ":
 			return
+		# Make sure the cones are at the latest requested position
+		self.pickingService.flush()
 		pos = self.redCone.GetPosition()
 		self.pickedLocation.emit(pos)
 		self.widget.render()
@@ -106,12 +118,3 @@ def PointCone(actor, nx, ny, nz):
 		actor.RotateWXYZ(180, 0, 1, 0)
 		n = -n
 	actor.RotateWXYZ(180, (nx+n)*0.5, ny*0.5, nz*0.5)
-
-
-def PickPoint(iren, renderer, picker):
-	"""
-	Returns the picked position and normal.
-	"""
-	x, y = iren.GetEventPosition()
-	picker.Pick(x, y, 0, renderer)
-	return picker.GetPickPosition(), picker.GetPickNormal()
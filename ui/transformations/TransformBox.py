@@ -37,14 +37,23 @@ class TransformBox(QObject, Interactor):
 		self.transformBox.InsideOutOn()
 		self.transformBox.PlaceWidget()
 
+		self.AddObserver(self.transformBox, "StartInteractionEvent", self.startInteraction)
 		self.AddObserver(self.transformBox, "InteractionEvent", self.transformCallback)
+		self.AddObserver(self.transformBox, "EndInteractionEvent", self.endInteraction)
 		self.transformBox.GetSelectedFaceProperty().SetOpacity(0.3)
 		self.transformBox.EnabledOn()
 
 	def setTransform(self, transform):
 		self.transformBox.SetTransform(transform)
 
+	def startInteraction(self, arg1, arg2):
+		self.widget.levelOfDetail.startInteraction()
+
+	def endInteraction(self, arg1, arg2):
+		self.widget.levelOfDetail.endInteraction()
+
 	def transformCallback(self, arg1, arg2):
+		self.widget.levelOfDetail.interact()
 		transform = vtkTransform()
 		arg1.GetTransform(transform)
 		self.transformUpdated.emit(transform)
@@ -11,6 +11,8 @@ from Transformation import Transformation
 from core.vtkObjectWrapper import vtkTransformWrapper
 from core.vtkDrawing import TransformWithMatrix
 from core.project import ProjectController
+from core.data import DisplayVolumeRegistry
+from core.data.DisplayVolumeRegistry import PriorityLow
 
 
 class TransformationList(QObject):
@@ -153,8 +155,20 @@ class TransformationList(QObject):
 			if index >= 0 and index < len(self._transformations):
 				projectController = ProjectController.Instance()
 				projectController.loadMovingDataSet(self._transformations[index].filename)
+				self._prefetchNeighbours(index)
 			self.transformationChanged.emit(self)
 
+	def _prefetchNeighbours(self, index):
+		"""
+		Loads the data sets of the neighbouring transformations in the
+		background, so that stepping through the history does not have
+		to wait for the data to be read.
+		"""
+		registry = DisplayVolumeRegistry.Instance()
+		for neighbour in [index + 1, index - 1]:
+			if neighbour >= 0 and neighbour < len(self._transformations):
+				registry.prefetch(self._transformations[neighbour].filename, priority=PriorityLow)
+
 	# Override methods for list behaviour
 
 	def __getitem__(self, index):
@@ -10,18 +10,19 @@ from core.operations import Multiply
 from core.operations import Add
 from core.operations import ClosestPoints
 from core.operations import Subtract
-from core.operations import LineIntersectionWithTriangle
+from core.operations import RayBoxIntersections
 from core.operations import Length
-from core.operations import Normalize
+from core.data.DataSampler import DataSampler
+from core.data.DataSampler import EdgeCandidates
 from core.vtkDrawing import CreateSphere
 from core.vtkDrawing import CreateLine
 from core.vtkDrawing import TransformWithMatrix
 from vtk import vtkAssembly
 from vtk import vtkProp3DFollower
 from vtk import vtkMath
-from vtk import vtkImageInterpolator
 from PySide.QtCore import Signal
 from PySide.QtCore import Slot
+import numpy as np
 
 
 class TwoStepPicker(Picker):
@@ -41,6 +42,8 @@ class TwoStepPicker(Picker):
 		self.sphereSource = None
 		self.samples = None
 		self.sampleDiffs = None
+		self.edgeCandidates = None
+		self.sampler = DataSampler()
 
 	def setPropertiesWidget(self, widget):
 		self.propertiesWidget = widget.twoStepWidget
@@ -109,28 +112,26 @@ class TwoStepPicker(Picker):
 
 		# If shift key is pushed in, try to snap to logical points along the ray
 		if iren.GetShiftKey() != 0:
-			# Get the index of the sample that is closest to the point on the ray
-			sampleIndex = int(len(self.sampleDiffs) * locationRatio)
+			# Get the index of the sample that is closest to the point on the ray.
+			# The first sample lies on p1 and the last sample on p2.
+			lastIndex = len(self.sampleDiffs) - 1
+			sampleIndex = int(round(lastIndex * locationRatio))
 			# Sample size is the amount of samples before and after the sample index
 			# that are going to be analyzed
 			sampleSize = 10
-			# Calculate the lower and upper bound index
-			lowerBoundIndex = max(0, sampleIndex-sampleSize)
-			upperBoundIndex = min(len(self.sampleDiffs), sampleIndex+sampleSize)
-			samples = self.sampleDiffs[lowerBoundIndex:upperBoundIndex]
+			# Prefer the edge candidates near the sample index. If there are none,
+			# take all the samples around the sample index.
+			indices = self.edgeCandidates[np.abs(self.edgeCandidates - sampleIndex) <= sampleSize]
+			if not len(indices):
+				lowerBoundIndex = max(0, sampleIndex-sampleSize)
+				upperBoundIndex = min(len(self.sampleDiffs), sampleIndex+sampleSize+1)
+				indices = np.arange(lowerBoundIndex, upperBoundIndex)
 			# Create a penalty for the local samples that gives penalties to samples
 			# that lay further away from the mouse
-			penalty = [(sampleSize + 1) / float(1 + abs(i-sampleSize)) for i in range(2*sampleSize+1)]
-			offset = lowerBoundIndex - (sampleIndex - sampleSize)
-			resamples = []
-			for i in range(len(samples)):
-				resamples.append(samples[i] * penalty[i+offset])
-			maxIndex = resamples.index(max(resamples))
-
-			# lowerBoundIndex is the index of where the sampling starts
-			# maxIndex is number that counts from the lowerBoundIndex
-			locationIndex = lowerBoundIndex + maxIndex
-			locationRatio = locationIndex / float(len(self.sampleDiffs))
+			distances = np.abs(indices - sampleIndex)
+			penalty = (sampleSize + 1) / (1.0 + distances)
+			locationIndex = int(indices[np.argmax(self.sampleDiffs[indices] * penalty)])
+			locationRatio = locationIndex / float(max(1, lastIndex))
 			location = Add(p1, Multiply(Subtract(p2, p1), locationRatio))
 
 		if not self.sphereSource:
@@ -212,25 +213,12 @@ class TwoStepPicker(Picker):
 		# have to be transformed again
 		transform.Inverse()
 		localIntersects = map(lambda x: list(transform.TransformPoint(x[0], x[1], x[2])), sortedIntersections)
-		# ab is vector pointing from localIntersects[0] to localIntersects[1]
-		ab = Subtract(localIntersects[1], localIntersects[0])
-		abLength = Length(ab)
-		nrOfSteps = 256  # TODO: make this number dependent on data size and length of vector
-		stepLength = abLength / float(nrOfSteps)
-		abNorm = Normalize(ab)
-		abStep = Multiply(abNorm, stepLength)
-		sampleLoc = localIntersects[0]
-
-		interpolator = vtkImageInterpolator()
-		interpolator.Initialize(self.widget.imageData)
-		self.samples = []
-		for i in range(nrOfSteps + 1):
-			# Get sample from volume
-			self.samples.append(interpolator.Interpolate(sampleLoc[0], sampleLoc[1], sampleLoc[2], 0))
-			# Update the sampling position
-			sampleLoc = Add(sampleLoc, abStep)
-
-		self.propertiesWidget.setSamples(self.samples, self.widget.imageData.GetScalarRange())
+		# The number of samples depends on the length of the ray and the spacing
+		# of the data. The sampler keeps its view on the data between picks.
+		self.sampler.setImageData(self.widget.imageData)
+		self.samples = self.sampler.sampleLine(localIntersects[0], localIntersects[1])
+
+		self.propertiesWidget.setSamples(self.samples.tolist(), self.widget.imageData.GetScalarRange())
 		self._analyzeSamples(self.samples)
 
 	def _addToRender(self, prop):
@@ -268,11 +256,11 @@ class TwoStepPicker(Picker):
 		self.widget.render()
 
 	def _analyzeSamples(self, samples):
-		self.sampleDiffs = []
-		for index in range(len(samples)-1):
-			sample = samples[index]
-			nextSample = samples[index+1]
-			self.sampleDiffs.append(abs(nextSample - sample))
+		"""
+		Calculates the gradient magnitude along the ray and the indices of
+		the samples that are most likely to lie on an edge.
+		"""
+		self.sampleDiffs, self.edgeCandidates = EdgeCandidates(samples)
 
 
 def rayForMouse(renderer, selectionX, selectionY):
@@ -342,41 +330,18 @@ def sortedLocations(p1, p2, camPos):
 
 
 def intersectionsWithBounds(bounds, transform, point1, point2):
-	# Create points for all of the corners of the bounds
-	p = [[0 for x in range(3)] for x in range(8)]
-	p[0] = [bounds[0], bounds[2], bounds[4]]
-	p[1] = [bounds[1], bounds[2], bounds[4]]
-	p[2] = [bounds[0], bounds[3], bounds[4]]
-	p[3] = [bounds[0], bounds[2], bounds[5]]
-	p[4] = [bounds[1], bounds[3], bounds[4]]
-	p[5] = [bounds[0], bounds[3], bounds[5]]
-	p[6] = [bounds[1], bounds[2], bounds[5]]
-	p[7] = [bounds[1], bounds[3], bounds[5]]
-
-	# Transform corner points
-	tp = map(lambda x: list(transform.TransformPoint(x[0], x[1], x[2])), p)
-
-	# Create triangles for each face of the cube
-	triangles = []
-	triangles.append([tp[0], tp[1], tp[4]])
-	triangles.append([tp[0], tp[2], tp[4]])
-	triangles.append([tp[0], tp[2], tp[5]])
-	triangles.append([tp[0], tp[3], tp[5]])
-	triangles.append([tp[0], tp[1], tp[6]])
-	triangles.append([tp[0], tp[3], tp[6]])
-	triangles.append([tp[7], tp[6], tp[3]])
-	triangles.append([tp[7], tp[5], tp[3]])
-	triangles.append([tp[7], tp[5], tp[2]])
-	triangles.append([tp[7], tp[4], tp[2]])
-	triangles.append([tp[7], tp[6], tp[1]])
-	triangles.append([tp[7], tp[4], tp[1]])
-
-	# Check intersection for each triangle
-	result = map(lambda x: LineIntersectionWithTriangle(point1, point2, x), triangles)
-	intersections = [x[1] for x in result if x[0]]
-	assert len(intersections) == 2 or len(intersections) == 0
-
-	if len(intersections) == 2:
-		return intersections
-	else:
+	"""
+	Returns the points where the line segment from point1 to point2 enters
+	and leaves the bounds that are transformed by transform. If the segment
+	starts or ends within the bounds, that point is used instead.
+	Returns None if the segment does not intersect the bounds.
+	"""
+	p1 = np.asarray(point1, dtype=np.float64)
+	p2 = np.asarray(point2, dtype=np.float64)
+	hits, tNear, tFar = RayBoxIntersections(p1, p2 - p1, bounds, transform.GetMatrix())
+	tNear = max(tNear[0], 0.0)
+	tFar = min(tFar[0], 1.0)
+	if not hits[0] or tNear >= tFar:
 		return None
+
+	return [list(p1 + (p2 - p1) * tNear), list(p1 + (p2 - p1) * tFar)]
@@ -11,10 +11,6 @@ from ParameterModel import ParameterModel
 from ParameterListView import ParameterListView
 from ParameterWidget import ParameterWidget
 
-from SurfacePicker import SurfacePicker
-from TwoStepPicker import TwoStepPicker
-
 from TransformationTool import TransformationTool
-from UserTransformationTool import UserTransformationTool
-from LandmarkTransformationTool import LandmarkTransformationTool
-from DeformableTransformationTool import DeformableTransformationTool
+# The transformation tools and pickers are imported from their modules on
+# first use (ui.transformations.LandmarkTransformationTool etc.)
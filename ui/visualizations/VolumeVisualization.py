@@ -8,6 +8,7 @@ from PySide.QtCore import Signal
 from PySide.QtCore import QObject
 from vtk import vtkColorTransferFunction
 from vtk import vtkPiecewiseFunction
+from core.data.DataQuantizer import Quantization
 
 # Define Render Types
 # TODO: Render types are not suited for visualization names
@@ -40,6 +41,9 @@ class VolumeVisualization(QObject):
 
 		self.volProp = None
 		self.visualizationType = None
+		# Maps values of the source data to values of the display data
+		self.shift = 0.0
+		self.scale = 1.0
 
 	def getParameterWidget(self):
 		"""
@@ -58,6 +62,26 @@ class VolumeVisualization(QObject):
 	def setMapper(self, mapper):
 		raise NotImplementedError()
 
+	def setQuantization(self, imageData):
+		"""
+		Takes over the shift and scale of (quantized) display data. All
+		the parameters of the visualization are in values of the source
+		data and are mapped to display values with displayValue().
+		:type imageData: vtkImageData
+		"""
+		self.shift, self.scale = Quantization(imageData)
+
+	def displayValue(self, value):
+		return (value + self.shift) * self.scale
+
+	def setDisplayFunctions(self, colorFunction, opacityFunction):
+		"""
+		Sets the transfer functions on the volume property. The transfer
+		functions are in values of the source data.
+		"""
+		self.volProp.SetColor(DisplayColorFunction(colorFunction, self.shift, self.scale))
+		self.volProp.SetScalarOpacity(DisplayOpacityFunction(opacityFunction, self.shift, self.scale))
+
 	def shaderType(self):
 		raise NotImplementedError()
 
@@ -85,3 +109,35 @@ def CreateRangeFunctions(imageData, color=None):
 	opacityFunction.AddSegment(minimum, 0.0, maximum, 1.0)
 
 	return colorFunction, opacityFunction
+
+
+def DisplayColorFunction(colorFunction, shift, scale):
+	"""
+	Returns a copy of the color function of which the values are mapped
+	with shift and scale. Returns the function itself for the identity.
+	:rtype: vtkColorTransferFunction
+	"""
+	if shift == 0.0 and scale == 1.0:
+		return colorFunction
+	result = vtkColorTransferFunction()
+	for index in range(colorFunction.GetSize()):
+		node = [0.0] * 6
+		colorFunction.GetNodeValue(index, node)
+		result.AddRGBPoint((node[0] + shift) * scale, node[1], node[2], node[3], node[4], node[5])
+	return result
+
+
+def DisplayOpacityFunction(opacityFunction, shift, scale):
+	"""
+	Returns a copy of the opacity function of which the values are mapped
+	with shift and scale. Returns the function itself for the identity.
+	:rtype: vtkPiecewiseFunction
+	"""
+	if shift == 0.0 and scale == 1.0:
+		return opacityFunction
+	result = vtkPiecewiseFunction()
+	for index in range(opacityFunction.GetSize()):
+		node = [0.0] * 4
+		opacityFunction.GetNodeValue(index, node)
+		result.AddPoint((node[0] + shift) * scale, node[1], node[2], node[3])
+	return result
@@ -77,8 +77,7 @@ class VolumeVisualizationCT(VolumeVisualization):
 			self.opacityFunction.AddPoint(self.sections[x], self.sectionsOpacity[x])
 			self.opacityFunction.AddPoint(self.sections[x+1]-0.05, self.sectionsOpacity[x])
 
-		self.volProp.SetColor(self.colorFunction)
-		self.volProp.SetScalarOpacity(self.opacityFunction)
+		self.setDisplayFunctions(self.colorFunction, self.opacityFunction)
 
 		self.updatedTransferFunction.emit()
 
@@ -6,6 +6,7 @@ VolumeVisualizationMIDA
 """
 from VolumeVisualization import VolumeVisualization
 from VolumeVisualization import VisualizationTypeMIDA
+from core.data.DataQuantizer import SourceScalarRange
 from vtk import vtkVolumeProperty
 from vtk import vtkColorTransferFunction
 from vtk import vtkPiecewiseFunction
@@ -107,7 +108,7 @@ class VolumeVisualizationMIDA(VolumeVisualization):
 			self.upperBound = self.maximum
 			return
 			
-		self.minimum, self.maximum = imageData.GetScalarRange()
+		self.minimum, self.maximum = SourceScalarRange(imageData)
 		self.lowerBound = self.minimum
 		self.upperBound = self.maximum
 		self.window = abs(self.maximum - self.minimum)
@@ -126,8 +127,7 @@ class VolumeVisualizationMIDA(VolumeVisualization):
 	@overrides(VolumeVisualization)
 	def updateTransferFunction(self):
 		self.colorFunction, self.opacityFunction = CreateRangeFunctions(self.minimum, self.maximum, self.window, self.level)
-		self.volProp.SetColor(self.colorFunction)
-		self.volProp.SetScalarOpacity(self.opacityFunction)
+		self.setDisplayFunctions(self.colorFunction, self.opacityFunction)
 
 		if self.mapper:
 			lowerBound = (self.lowerBound - self.minimum) / (self.maximum - self.minimum)
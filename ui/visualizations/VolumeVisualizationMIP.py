@@ -6,6 +6,7 @@ VolumeVisualizationMIP
 """
 from VolumeVisualization import VolumeVisualization
 from VolumeVisualization import VisualizationTypeMIP
+from core.data.DataQuantizer import SourceScalarRange
 from ui.widgets.SliderFloatWidget import SliderFloatWidget
 from vtk import vtkVolumeProperty
 from vtk import vtkColorTransferFunction
@@ -126,7 +127,7 @@ class VolumeVisualizationMIP(VolumeVisualization):
 			self.upperBound = self.maximum
 			return
 
-		self.minimum, self.maximum = imageData.GetScalarRange()
+		self.minimum, self.maximum = SourceScalarRange(imageData)
 		self.lowerBound = self.minimum
 		self.upperBound = self.maximum
 		self.window = self.maximum - self.minimum
@@ -143,15 +144,14 @@ class VolumeVisualizationMIP(VolumeVisualization):
 	@overrides(VolumeVisualization)
 	def updateTransferFunction(self):
 		self.colorFunction, self.opacityFunction = CreateRangeFunctions(self.minimum, self.maximum, self.window, self.level, self.lowerBound, self.upperBound)
-		self.volProp.SetColor(self.colorFunction)
-		self.volProp.SetScalarOpacity(self.opacityFunction)
+		self.setDisplayFunctions(self.colorFunction, self.opacityFunction)
 
 		lowerBound = (self.lowerBound - self.minimum) / (self.maximum - self.minimum)
 		upperBound = (self.upperBound - self.minimum) / (self.maximum - self.minimum)
 
 		if self.mapper:
-			self.mapper.SetWindow(self.window)
-			self.mapper.SetLevel(self.level)
+			self.mapper.SetWindow(self.window * self.scale)
+			self.mapper.SetLevel(self.displayValue(self.level))
 			self.mapper.SetLowerBound(lowerBound)
 			self.mapper.SetUpperBound(upperBound)
 
@@ -6,6 +6,7 @@ VolumeVisualizationRamp
 """
 from VolumeVisualization import VolumeVisualization
 from VolumeVisualization import VisualizationTypeRamp
+from core.data.DataQuantizer import SourceScalarRange
 from vtk import vtkVolumeProperty
 from vtk import vtkColorTransferFunction
 from vtk import vtkPiecewiseFunction
@@ -50,8 +51,7 @@ class VolumeVisualizationRamp(VolumeVisualization):
 		self.opacityFunction = vtkPiecewiseFunction()
 		self.opacityFunction.AddSegment(self.minimum, 0.0, self.maximum, 1.0)
 
-		self.volProp.SetColor(self.colorFunction)
-		self.volProp.SetScalarOpacity(self.opacityFunction)
+		self.setDisplayFunctions(self.colorFunction, self.opacityFunction)
 
 		self.updatedTransferFunction.emit()
 
@@ -62,7 +62,7 @@ class VolumeVisualizationRamp(VolumeVisualization):
 		not dependent on the imageData.
 		:type imageData: vtkImageData
 		"""
-		self.minimum, self.maximum = imageData.GetScalarRange()
+		self.minimum, self.maximum = SourceScalarRange(imageData)
 
 	@overrides(VolumeVisualization)
 	def getParameterWidget(self):
@@ -6,6 +6,7 @@ VolumeVisualizationSimple
 """
 from VolumeVisualization import VolumeVisualization
 from VolumeVisualization import VisualizationTypeSimple
+from core.data.DataQuantizer import SourceScalarRange
 from vtk import vtkVolumeProperty
 from vtk import vtkColorTransferFunction
 from vtk import vtkPiecewiseFunction
@@ -143,7 +144,7 @@ class VolumeVisualizationSimple(VolumeVisualization):
 			self.opacity = 1.0
 			return
 
-		self.minimum, self.maximum = imageData.GetScalarRange()
+		self.minimum, self.maximum = SourceScalarRange(imageData)
 		self.lowerBound = self.minimum
 		self.upperBound = self.maximum
 		self.opacity = 1.0
@@ -179,8 +180,7 @@ class VolumeVisualizationSimple(VolumeVisualization):
 		self.opacityFunction.AddPoint(self.upperBound, 0)
 		self.opacityFunction.AddPoint(self.maximum+0.0001, 0)
 
-		self.volProp.SetColor(self.colorFunction)
-		self.volProp.SetScalarOpacity(self.opacityFunction)
+		self.setDisplayFunctions(self.colorFunction, self.opacityFunction)
 
 		self.updatedTransferFunction.emit()
 
@@ -6,6 +6,7 @@ VolumeVisualizationTransferFunction
 """
 from VolumeVisualization import VolumeVisualization
 from VolumeVisualization import VisualizationTypeTransferFunction
+from core.data.DataQuantizer import SourceScalarRange
 from vtk import vtkVolumeProperty
 from vtk import vtkColorTransferFunction
 from vtk import vtkPiecewiseFunction
@@ -73,7 +74,7 @@ class VolumeVisualizationTransferFunction(VolumeVisualization):
 			return
 
 		self.imageData = imageData
-		self.minimum, self.maximum = imageData.GetScalarRange()
+		self.minimum, self.maximum = SourceScalarRange(imageData)
 		self.transferFunction.setRange([self.minimum, self.maximum])
 
 	@overrides(VolumeVisualization)
@@ -100,8 +101,7 @@ class VolumeVisualizationTransferFunction(VolumeVisualization):
 			self.opacityFunction.AddPoint(self.minimum, 0)
 			self.opacityFunction.AddPoint(self.maximum, 0)
 
-		self.volProp.SetColor(self.colorFunction)
-		self.volProp.SetScalarOpacity(self.opacityFunction)
+		self.setDisplayFunctions(self.colorFunction, self.opacityFunction)
 
 		self.updatedTransferFunction.emit()
 
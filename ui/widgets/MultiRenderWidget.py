@@ -5,7 +5,6 @@ MultiRenderWidget
 	Berend Klein Haneveld
 """
 
-from vtk import vtkOpenGLGPUMultiVolumeRayCastMapper
 from vtk import vtkRenderer
 from vtk import vtkInteractorStyleTrackballCamera
 from vtk import vtkImagePlaneWidget
@@ -21,9 +20,13 @@ from PySide.QtCore import Signal
 from PySide.QtCore import Slot
 from ui.transformations import TransformationList
 from ui.transformations import ClippingBox
-from vtk.qt4.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
+from ui.RenderWindowInteractor import RenderWindowInteractor
+from ui.RenderScheduler import RenderScheduler
+from ui.LevelOfDetail import LevelOfDetail
 from core.vtkDrawing import CreateBounds
 from core.vtkDrawing import CreateOrientationGrid
+from core.MapperBackend import MapperBackend
+from core.data.SubVolume import ExtractSubVolume
 
 
 class MultiRenderWidget(QWidget):
@@ -74,23 +77,29 @@ class MultiRenderWidget(QWidget):
 		self.rendererOverlay.SetInteractive(0)
 		self.renderer.GetActiveCamera().AddObserver("ModifiedEvent", self._syncCameras)
 
-		self.rwi = QVTKRenderWindowInteractor(parent=self)
+		self.rwi = RenderWindowInteractor(parent=self)
 		self.rwi.SetInteractorStyle(vtkInteractorStyleTrackballCamera())
 		self.rwi.GetRenderWindow().AddRenderer(self.renderer)
 		self.rwi.GetRenderWindow().AddRenderer(self.rendererOverlay)
 		self.rwi.GetRenderWindow().SetNumberOfLayers(2)
-		self.rwi.SetDesiredUpdateRate(0)
+		MapperBackend.Instance().configureInteractor(self.rwi)
 
 		self._imagePlaneWidgets = [vtkImagePlaneWidget() for i in range(3)]
 		for index in range(3):
 			self._imagePlaneWidgets[index].DisplayTextOn()
 			self._imagePlaneWidgets[index].SetInteractor(self.rwi)
 
-		self.mapper = vtkOpenGLGPUMultiVolumeRayCastMapper()
+		# Render coarser data while the user is interacting. Every level of
+		# detail has its own mapper, self.mapper passes the settings on.
+		self.levelOfDetail = LevelOfDetail(self, MapperBackend.Instance().createMultiVolumeMapper)
+		self.mapper = self.levelOfDetail.mapper
 		self.mapper.SetBlendModeToComposite()
 		self.volume = vtkVolume()
-		self.volume.SetMapper(self.mapper)
+		self.volume.SetMapper(self.levelOfDetail.activeMapper())
 		self.renderer.AddViewProp(self.volume)
+		if MapperBackend.Instance().isSoftware():
+			# The CPU backend renders the moving data with a separate volume
+			self.renderer.AddViewProp(self.levelOfDetail.activeMapper().secondVolume)
 
 		self.fixedGridItems = []
 		self.movingGridItems = []
@@ -99,6 +108,9 @@ class MultiRenderWidget(QWidget):
 		# Create two empty datasets
 		self.fixedImageData = CreateEmptyImageData()
 		self.movingImageData = CreateEmptyImageData()
+		# Part of the fixed image data that is given to the mapper
+		self.fixedRenderData = self.fixedImageData
+		self.renderExtent = None
 
 		self.fixedVolumeProperty = vtkVolumeProperty()
 		self.movingVolumeProperty = vtkVolumeProperty()
@@ -115,6 +127,9 @@ class MultiRenderWidget(QWidget):
 		self.mapper.SetInputData(0, self.fixedImageData)
 		self.mapper.SetInputData(1, self.movingImageData)
 
+		self.levelOfDetail.observe(self.clippingBox.clippingBox)
+		self.levelOfDetail.setImageData([self.fixedImageData, self.movingImageData])
+
 		self._transformations = TransformationList()
 		self._transformations.transformationChanged.connect(self.updateTransformation)
 		self._shouldResetCamera = False
@@ -129,6 +144,13 @@ class MultiRenderWidget(QWidget):
 		self.setLayout(layout)
 
 	def render(self):
+		"""
+		Schedules a render. The actual rendering is done by the render
+		scheduler once per turn of the event loop.
+		"""
+		RenderScheduler.Instance().scheduleRender(self)
+
+	def renderNow(self):
 		if self._shouldResetCamera:
 			self.renderer.ResetCamera()
 			self._shouldResetCamera = False
@@ -147,9 +169,12 @@ class MultiRenderWidget(QWidget):
 			self.fixedImageData = CreateEmptyImageData()
 		if self.movingImageData is None:
 			self.movingImageData = CreateEmptyImageData()
+		self.fixedRenderData = self.fixedImageData
+		self.renderExtent = None
 
-		self.mapper.SetInputData(0, self.fixedImageData)
+		self.mapper.SetInputData(0, self.fixedRenderData)
 		self.mapper.SetInputData(1, self.movingImageData)
+		self.levelOfDetail.setImageData([self.fixedRenderData, self.movingImageData])
 
 		for index in range(3):
 			self._imagePlaneWidgets[index].SetInputData(self.fixedImageData)
@@ -168,9 +193,12 @@ class MultiRenderWidget(QWidget):
 			self.movingImageData = CreateEmptyImageData()
 		if self.fixedImageData is None:
 			self.fixedImageData = CreateEmptyImageData()
+			self.fixedRenderData = self.fixedImageData
+			self.renderExtent = None
 
-		self.mapper.SetInputData(0, self.fixedImageData)
+		self.mapper.SetInputData(0, self.fixedRenderData)
 		self.mapper.SetInputData(1, self.movingImageData)
+		self.levelOfDetail.setImageData([self.fixedRenderData, self.movingImageData])
 
 		self._updateGrids()
 		self._shouldResetCamera = True
@@ -261,6 +289,32 @@ class MultiRenderWidget(QWidget):
 			else:
 				self._imagePlaneWidgets[sliceIndex].Off()
 
+	def setRenderExtent(self, extent):
+		"""
+		Gives only the part of the fixed image data within the extent to
+		the mapper. Use None for the complete image data. The moving data
+		is always rendered completely, because it can be transformed.
+		"""
+		if self.clippingBox.imageData is not self.fixedImageData:
+			extent = None
+		if extent == self.renderExtent:
+			return
+		self.renderExtent = extent
+		self.fixedRenderData = ExtractSubVolume(self.fixedImageData, extent)
+		self.mapper.SetInputData(0, self.fixedRenderData)
+		self.levelOfDetail.setImageData([self.fixedRenderData, self.movingImageData])
+		self.render()
+
+	def setLevelOfDetailMapper(self, mapper):
+		"""
+		Called by the level of detail to render with the mapper of the
+		current level of detail.
+		"""
+		if MapperBackend.Instance().isSoftware():
+			self.renderer.RemoveViewProp(self.volume.GetMapper().secondVolume)
+			self.renderer.AddViewProp(mapper.secondVolume)
+		self.volume.SetMapper(mapper)
+
 	def showClippingBox(self, show):
 		self.clippingBox.showClippingBox(show)
 		self.render()
@@ -8,17 +8,20 @@ RenderWidget
 from vtk import vtkRenderer
 from vtk import vtkVolume
 from vtk import vtkInteractorStyleTrackballCamera
-from vtk import vtkOpenGLGPUVolumeRayCastMapper
 from vtk import vtkTransform
 from vtk import vtkImagePlaneWidget
 from PySide.QtGui import QGridLayout
 from PySide.QtGui import QWidget
 from PySide.QtCore import Signal
 from PySide.QtCore import Slot
-from vtk.qt4.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
+from ui.RenderWindowInteractor import RenderWindowInteractor
 from ui.transformations import ClippingBox
+from ui.RenderScheduler import RenderScheduler
+from ui.LevelOfDetail import LevelOfDetail
 from core.vtkDrawing import CreateBounds
 from core.vtkDrawing import CreateOrientationGrid
+from core.MapperBackend import MapperBackend
+from core.data.SubVolume import ExtractSubVolume
 
 
 class RenderWidget(QWidget):
@@ -46,12 +49,12 @@ class RenderWidget(QWidget):
 		self.rendererOverlay.SetInteractive(0)
 		self.renderer.GetActiveCamera().AddObserver("ModifiedEvent", self._syncCameras)
 
-		self.rwi = QVTKRenderWindowInteractor(parent=self)
+		self.rwi = RenderWindowInteractor(parent=self)
 		self.rwi.SetInteractorStyle(vtkInteractorStyleTrackballCamera())
 		self.rwi.GetRenderWindow().AddRenderer(self.renderer)
 		self.rwi.GetRenderWindow().AddRenderer(self.rendererOverlay)
 		self.rwi.GetRenderWindow().SetNumberOfLayers(2)
-		self.rwi.SetDesiredUpdateRate(0)
+		MapperBackend.Instance().configureInteractor(self.rwi)
 
 		self.imagePlaneWidgets = [vtkImagePlaneWidget() for i in range(3)]
 		for index in range(3):
@@ -61,10 +64,15 @@ class RenderWidget(QWidget):
 			self.imagePlaneWidgets[index].SetMarginSizeX(0.0)
 			self.imagePlaneWidgets[index].SetMarginSizeY(0.0)
 
-		self.mapper = vtkOpenGLGPUVolumeRayCastMapper()
-		self.mapper.SetAutoAdjustSampleDistances(1)
+		# Render coarser data while the user is interacting. Every level of
+		# detail has its own mapper, self.mapper passes the settings on.
+		self.levelOfDetail = LevelOfDetail(self, MapperBackend.Instance().createVolumeMapper)
+		self.mapper = self.levelOfDetail.mapper
 		self.volume = None
 		self.imageData = None
+		# Part of the image data that is given to the mapper
+		self.renderData = None
+		self.renderExtent = None
 		self.VolumeVisualization = None
 		self.shouldResetCamera = False
 		self.gridItems = []
@@ -73,6 +81,8 @@ class RenderWidget(QWidget):
 		self.clippingBox = ClippingBox()
 		self.clippingBox.setWidget(self)
 
+		self.levelOfDetail.observe(self.clippingBox.clippingBox)
+
 		# Keep track of the base and user transforms
 		self.baseTransform = vtkTransform()
 		self.userTransform = vtkTransform()
@@ -87,6 +97,13 @@ class RenderWidget(QWidget):
 		self.setLayout(layout)
 
 	def render(self):
+		"""
+		Schedules a render. The actual rendering is done by the render
+		scheduler once per turn of the event loop.
+		"""
+		RenderScheduler.Instance().scheduleRender(self)
+
+	def renderNow(self):
 		self.clippingBox.update()
 		if self.shouldResetCamera:
 			self.renderer.ResetCamera()
@@ -105,6 +122,8 @@ class RenderWidget(QWidget):
 		new image data is given to the mapper.
 		"""
 		self.imageData = imageData
+		self.renderData = imageData
+		self.renderExtent = None
 		# Clean up the data grid
 		self._cleanUpGrids()
 
@@ -113,12 +132,14 @@ class RenderWidget(QWidget):
 				self.renderer.RemoveViewProp(self.volume)
 			print "Warning: image data is None"
 			self.clippingBox.setImageData(None)
+			self.levelOfDetail.setImageData([])
 			self.mapper.RemoveAllInputs()
 			self.render()
 			return
 
 		# Set the image data for the mapper
 		self.mapper.SetInputData(self.imageData)
+		self.levelOfDetail.setImageData([self.imageData])
 
 		# Set the image data for the slices
 		for index in range(3):
@@ -133,6 +154,27 @@ class RenderWidget(QWidget):
 		# Don't call render, because camera should only be reset
 		# when a volume property is loaded
 
+	def setRenderExtent(self, extent):
+		"""
+		Gives only the part of the image data within the extent to the
+		mapper. Use None for the complete image data.
+		"""
+		if extent == self.renderExtent or self.imageData is None:
+			return
+		self.renderExtent = extent
+		self.renderData = ExtractSubVolume(self.imageData, extent)
+		self.mapper.SetInputData(self.renderData)
+		self.levelOfDetail.setImageData([self.renderData])
+		self.render()
+
+	def setLevelOfDetailMapper(self, mapper):
+		"""
+		Called by the level of detail to render with the mapper of the
+		current level of detail.
+		"""
+		if self.volume is not None:
+			self.volume.SetMapper(mapper)
+
 	def showClippingBox(self, show):
 		self.clippingBox.showClippingBox(show)
 		self.render()
@@ -171,8 +213,9 @@ class RenderWidget(QWidget):
 		self.mapper.SetShaderType(self.volumeVisualization.shaderType())
 		if self.volume.GetProperty() != self.volumeVisualization.volProp:
 			self.volume.SetProperty(self.volumeVisualization.volProp)
-		if self.volume.GetMapper() != self.mapper:
-			self.volume.SetMapper(self.mapper)
+		mapper = self.levelOfDetail.activeMapper()
+		if self.volume.GetMapper() != mapper:
+			self.volume.SetMapper(mapper)
 
 		self.render()
 
@@ -8,18 +8,18 @@ SliceCompareViewerWidget
 from vtk import vtkRenderer
 from vtk import vtkInteractorStyleUser
 from vtk import vtkCellPicker
-from vtk import vtkImageMapToColors
-from vtk import vtkColorTransferFunction
 from vtk import vtkDataSetMapper
 from vtk import vtkActor
-from vtk import vtkImageMathematics
 from PySide.QtGui import QGridLayout
 from PySide.QtGui import QWidget
 from PySide.QtCore import Signal
-from vtk.qt4.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
+from ui.RenderWindowInteractor import RenderWindowInteractor
 from ui.Interactor import Interactor
+from ui.RenderScheduler import RenderScheduler
 from core.vtkDrawing import CreateSquare
 from core.vtkDrawing import CreateLine
+from core.data.SliceCompositor import SliceCompositor
+from core.data.SliceCompositor import CompareModes
 
 
 class SliceCompareViewerWidget(QWidget, Interactor):
@@ -30,6 +30,7 @@ class SliceCompareViewerWidget(QWidget, Interactor):
 
 	slicePositionChanged = Signal(object)
 	mouseMoved = Signal(object)
+	compareModeChanged = Signal(object)
 
 	def __init__(self):
 		super(SliceCompareViewerWidget, self).__init__()
@@ -44,7 +45,7 @@ class SliceCompareViewerWidget(QWidget, Interactor):
 		self.rendererOverlay.SetInteractive(0)
 		self.renderer.GetActiveCamera().AddObserver("ModifiedEvent", self._syncCameras)
 
-		self.rwi = QVTKRenderWindowInteractor(parent=self)
+		self.rwi = RenderWindowInteractor(parent=self)
 		self.rwi.SetInteractorStyle(vtkInteractorStyleUser())
 		self.rwi.GetRenderWindow().AddRenderer(self.renderer)
 		self.rwi.GetRenderWindow().AddRenderer(self.rendererOverlay)
@@ -64,6 +65,7 @@ class SliceCompareViewerWidget(QWidget, Interactor):
 		self.picker.SetTolerance(1e-6)
 
 		self.locator = []
+		self.compositor = SliceCompositor()
 
 		self.setStyleSheet("background-color: #333")
 
@@ -82,8 +84,11 @@ class SliceCompareViewerWidget(QWidget, Interactor):
 		self.rendererOverlay.GetActiveCamera().ShallowCopy(camera)
 
 	def charTyped(self, arg1, arg2):
-		# print arg1.GetKeyCode()
-		pass
+		# Cycle through the compare modes with 'm'
+		if arg1.GetKeyCode() == "m" and hasattr(self, "dataSetMapper"):
+			self.nextCompareMode()
+			self.updateCompareView()
+			self.render()
 
 	def setLocatorPosition(self, position):
 		for actor in self.locator:
@@ -117,18 +122,20 @@ class SliceCompareViewerWidget(QWidget, Interactor):
 
 		self.mouseMoved.emit(pickPosition)
 
-	def adjustTransferFunction(self, transferfunction, lower, upper):
-		transfer = vtkColorTransferFunction()
-		val1 = [0.0 for _ in range(6)]
-		val2 = [0.0 for _ in range(6)]
-		transferfunction.GetNodeValue(0, val1)
-		transferfunction.GetNodeValue(1, val2)
-		val1[0] = lower
-		val2[0] = upper
-		transfer.AddRGBPoint(val1[0], val1[1], val1[2], val1[3], val1[4], val1[5])
-		transfer.AddRGBPoint(val2[0], val2[1], val2[2], val2[3], val2[4], val2[5])
-		transfer.Build()
-		return transfer
+	def setCompareMode(self, mode):
+		"""
+		Sets the mode that is used to combine the fixed and moving slice.
+		See core.data.SliceCompositor for the available modes.
+		"""
+		self.compositor.setMode(mode)
+		self.compareModeChanged.emit(mode)
+
+	def compareMode(self):
+		return self.compositor.mode
+
+	def nextCompareMode(self):
+		index = CompareModes.index(self.compositor.mode)
+		self.setCompareMode(CompareModes[(index + 1) % len(CompareModes)])
 
 	def updateCompareView(self):
 		fixedSlice = self.fixedSlicerWidget.slicer.GetResliceOutput()
@@ -140,71 +147,17 @@ class SliceCompareViewerWidget(QWidget, Interactor):
 		lower = level - window / 2.0
 		upper = level + window / 2.0
 
-		fixedTransfer = self.adjustTransferFunction(self.fixedSlicerWidget.transfer, lower, upper)
-		movingTransfer = self.adjustTransferFunction(self.movingSlicerWidget.transfer, lower, upper)
-
-		fixedMap = vtkImageMapToColors()
-		fixedMap.SetInputData(fixedSlice)
-		fixedMap.SetLookupTable(fixedTransfer)
-
-		movingMap = vtkImageMapToColors()
-		movingMap.SetInputData(movingSlice)
-		movingMap.SetLookupTable(movingTransfer)
-
-		maths = vtkImageMathematics()
-		maths.SetInputConnection(0, fixedMap.GetOutputPort())
-		maths.SetInputConnection(1, movingMap.GetOutputPort())
-		maths.SetOperationToAdd()
-		maths.Update()
-
-		# self.blender = vtkImageBlend()
-		# self.blender.SetOpacity(0, 0.5)
-		# self.blender.SetOpacity(1, 0.5)
-		# self.blender.AddInputConnection(fixedMap.GetOutputPort())
-		# self.blender.AddInputConnection(movingMap.GetOutputPort())
-
-		# redChannel = vtkImageExtractComponents()
-		# greenChannel = vtkImageExtractComponents()
-		# blueChannel = vtkImageExtractComponents()
-
-		# redChannel.SetInputConnection(self.blender.GetOutputPort())
-		# greenChannel.SetInputConnection(self.blender.GetOutputPort())
-		# blueChannel.SetInputConnection(self.blender.GetOutputPort())
-
-		# redChannel.SetComponents(0)
-		# greenChannel.SetComponents(1)
-		# blueChannel.SetComponents(2)
-
-		# redScale = vtkImageShiftScale()
-		# greenScale = vtkImageShiftScale()
-		# blueScale = vtkImageShiftScale()
-
-		# redScale.SetInputConnection(redChannel.GetOutputPort())
-		# greenScale.SetInputConnection(greenChannel.GetOutputPort())
-		# blueScale.SetInputConnection(blueChannel.GetOutputPort())
-
-		# redScale.SetScale(2.0)
-		# greenScale.SetScale(2.0)
-		# blueScale.SetScale(2.0)
-
-		# result = vtkImageAppendComponents()
-		# result.AddInputConnection(redScale.GetOutputPort())
-		# result.AddInputConnection(greenScale.GetOutputPort())
-		# result.AddInputConnection(blueScale.GetOutputPort())
-
-		# fixedMap.Update()
-
-		# otherMath = vtkImageMathematics()
-		# otherMath.SetOperationToMax()
-		# otherMath.AddInputData(maths.GetOutput())
-		# otherMath.SetConstantK(1.0)
+		self.compositor.fixedColor = self.fixedSlicerWidget.color
+		self.compositor.movingColor = self.movingSlicerWidget.color
+		# The output of the compositor is reused, so the mapper only
+		# has to be connected once
+		output = self.compositor.compose(fixedSlice, movingSlice, lower, upper)
 
 		if not hasattr(self, "dataSetMapper"):
 			self.dataSetMapper = vtkDataSetMapper()
-
-		# Do not establish a vtk pipeline connection!
-		# Otherwise the pipeline will be executed on every render call...
-		self.dataSetMapper.SetInputData(maths.GetOutput())
+			# Do not establish a vtk pipeline connection!
+			# Otherwise the pipeline will be executed on every render call...
+			self.dataSetMapper.SetInputData(output)
 
 		if not hasattr(self, "actor"):
 			self.actor = vtkActor()
@@ -233,5 +186,12 @@ class SliceCompareViewerWidget(QWidget, Interactor):
 				self.rendererOverlay.AddViewProp(actor)
 
 	def render(self):
+		"""
+		Schedules a render. The actual rendering is done by the render
+		scheduler once per turn of the event loop.
+		"""
+		RenderScheduler.Instance().scheduleRender(self)
+
+	def renderNow(self):
 		self.renderer.Render()
 		self.rwi.GetRenderWindow().Render()
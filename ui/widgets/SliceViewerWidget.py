@@ -13,8 +13,9 @@ from vtk import vtkColorTransferFunction
 from PySide.QtGui import QGridLayout
 from PySide.QtGui import QWidget
 from PySide.QtCore import Signal
-from vtk.qt4.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
+from ui.RenderWindowInteractor import RenderWindowInteractor
 from ui.Interactor import Interactor
+from ui.RenderScheduler import RenderScheduler
 from core.vtkDrawing import CreateSquare
 from core.vtkDrawing import CreateLine
 
@@ -43,7 +44,7 @@ class SliceViewerWidget(QWidget, Interactor):
 		self.rendererOverlay.SetInteractive(0)
 		self.renderer.GetActiveCamera().AddObserver("ModifiedEvent", self._syncCameras)
 
-		self.rwi = QVTKRenderWindowInteractor(parent=self)
+		self.rwi = RenderWindowInteractor(parent=self)
 		self.rwi.SetInteractorStyle(vtkInteractorStyleUser())
 		self.rwi.GetRenderWindow().AddRenderer(self.renderer)
 		self.rwi.GetRenderWindow().AddRenderer(self.rendererOverlay)
@@ -163,6 +164,13 @@ class SliceViewerWidget(QWidget, Interactor):
 		self.mouseMoved.emit(pickPosition)
 
 	def render(self):
+		"""
+		Schedules a render. The actual rendering is done by the render
+		scheduler once per turn of the event loop.
+		"""
+		RenderScheduler.Instance().scheduleRender(self)
+
+	def renderNow(self):
 		self.slicer.UpdatePlacement()
 		self.renderer.Render()
 		self.rwi.GetRenderWindow().Render()
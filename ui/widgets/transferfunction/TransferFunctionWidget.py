@@ -10,6 +10,7 @@ from ui.widgets.transferfunction import TransferFunctionNodeItem
 from ui.widgets.transferfunction import TransferFunctionItem
 from ui.widgets.ColorWidget import ColorButton
 from core.data.DataAnalyzer import DataAnalyzer
+from core.data.DataQuantizer import SourceScalarRange
 from PySide.QtGui import QWidget
 from PySide.QtGui import QGridLayout
 from PySide.QtGui import QGraphicsLineItem
@@ -81,7 +82,7 @@ class TransferFunctionWidget(QWidget):
 		bins = DataAnalyzer.histogramForData(imageData, 256)
 		self.histogram.bins = bins
 		self.histogram.enabled = True
-		self.range = imageData.GetScalarRange()
+		self.range = SourceScalarRange(imageData)
 
 		# Create and add nodes from the transfer function
 		self.updateNodes()